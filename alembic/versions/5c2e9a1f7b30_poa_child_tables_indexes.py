@@ -0,0 +1,99 @@
+"""poa child tables and composite indexes
+
+Revision ID: 5c2e9a1f7b30
+Revises: xxx
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c2e9a1f7b30'
+down_revision: Union[str, Sequence[str], None] = 'xxx'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _child_tables() -> dict:
+    return {
+        'strategic_objective_kpis': [
+            sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column('objective_id', sa.Integer(), nullable=False),
+            sa.Column('nombre', sa.String(length=255), nullable=False, server_default=''),
+            sa.Column('proposito', sa.Text(), nullable=False, server_default=''),
+            sa.Column('formula', sa.Text(), nullable=False, server_default=''),
+            sa.Column('periodicidad', sa.String(length=100), nullable=False, server_default=''),
+            sa.Column('estandar', sa.String(length=20), nullable=False, server_default=''),
+            sa.Column('referencia', sa.String(length=120), nullable=False, server_default=''),
+            sa.Column('orden', sa.Integer(), nullable=False, server_default='0'),
+        ],
+        'strategic_objective_milestones': [
+            sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column('objective_id', sa.Integer(), nullable=False),
+            sa.Column('nombre', sa.String(length=255), nullable=False, server_default=''),
+            sa.Column('logrado', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('fecha_realizacion', sa.Date(), nullable=True),
+            sa.Column('orden', sa.Integer(), nullable=False, server_default='0'),
+        ],
+        'poa_activity_budgets': [
+            sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column('activity_id', sa.Integer(), nullable=False),
+            sa.Column('tipo', sa.String(length=120), nullable=False, server_default=''),
+            sa.Column('rubro', sa.String(length=255), nullable=False, server_default=''),
+            sa.Column('mensual', sa.Numeric(), nullable=False, server_default='0'),
+            sa.Column('anual', sa.Numeric(), nullable=False, server_default='0'),
+            sa.Column('autorizado', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('orden', sa.Integer(), nullable=False, server_default='0'),
+        ],
+        'poa_activity_deliverables': [
+            sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column('activity_id', sa.Integer(), nullable=False),
+            sa.Column('nombre', sa.String(length=255), nullable=False, server_default=''),
+            sa.Column('validado', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('orden', sa.Integer(), nullable=False, server_default='0'),
+        ],
+        'poa_activity_milestone_links': [
+            sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column('activity_id', sa.Integer(), nullable=False),
+            sa.Column('milestone_id', sa.Integer(), nullable=False),
+            sa.Column('orden', sa.Integer(), nullable=False, server_default='0'),
+        ],
+    }
+
+
+CHILD_INDEXES = [
+    ('ix_strategic_objective_kpis_objective_orden', 'strategic_objective_kpis', ['objective_id', 'orden', 'id']),
+    ('ix_strategic_objective_milestones_objective_orden', 'strategic_objective_milestones', ['objective_id', 'orden', 'id']),
+    ('ix_poa_activity_budgets_activity_orden', 'poa_activity_budgets', ['activity_id', 'orden', 'id']),
+    ('ix_poa_activity_deliverables_activity_orden', 'poa_activity_deliverables', ['activity_id', 'orden', 'id']),
+    ('ix_poa_activity_milestone_links_activity_orden', 'poa_activity_milestone_links', ['activity_id', 'orden', 'id']),
+    ('ix_poa_activity_milestone_links_milestone', 'poa_activity_milestone_links', ['milestone_id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Las tablas pueden existir ya, creadas por el arranque de la aplicación.
+    inspector = sa.inspect(op.get_bind())
+    for table_name, columns in _child_tables().items():
+        if not inspector.has_table(table_name):
+            op.create_table(table_name, *columns)
+    for index_name, table_name, columns in CHILD_INDEXES:
+        existing = {item.get('name') for item in inspector.get_indexes(table_name)} if inspector.has_table(table_name) else set()
+        if index_name not in existing:
+            op.create_index(index_name, table_name, columns, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Sólo se retiran los índices: las tablas siguen en uso por la aplicación.
+    inspector = sa.inspect(op.get_bind())
+    for index_name, table_name, _ in reversed(CHILD_INDEXES):
+        if not inspector.has_table(table_name):
+            continue
+        if index_name in {item.get('name') for item in inspector.get_indexes(table_name)}:
+            op.drop_index(index_name, table_name=table_name)
@@ -0,0 +1,54 @@
+"""poa responsable_key columns
+
+Revision ID: 8d41c7e2a9b5
+Revises: 5c2e9a1f7b30
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d41c7e2a9b5'
+down_revision: Union[str, Sequence[str], None] = '5c2e9a1f7b30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+OWNER_TABLES = ('poa_activities', 'poa_subactivities')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    for table_name in OWNER_TABLES:
+        if not inspector.has_table(table_name):
+            continue
+        columns = {item.get('name') for item in inspector.get_columns(table_name)}
+        if 'responsable_key' not in columns:
+            op.add_column(table_name, sa.Column('responsable_key', sa.String(length=255), nullable=True, server_default=''))
+        index_name = f'ix_{table_name}_responsable_key'
+        if index_name not in {item.get('name') for item in inspector.get_indexes(table_name)}:
+            op.create_index(index_name, table_name, ['responsable_key'], unique=False)
+        # Se normaliza en Python: LOWER de SQLite sólo convierte caracteres ASCII.
+        rows = bind.execute(sa.text(f'SELECT id, responsable FROM {table_name}')).fetchall()
+        updates = [{'key': str(row[1] or '').strip().lower(), 'row_id': int(row[0])} for row in rows]
+        if updates:
+            bind.execute(sa.text(f'UPDATE {table_name} SET responsable_key = :key WHERE id = :row_id'), updates)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    for table_name in reversed(OWNER_TABLES):
+        if not inspector.has_table(table_name):
+            continue
+        index_name = f'ix_{table_name}_responsable_key'
+        if index_name in {item.get('name') for item in inspector.get_indexes(table_name)}:
+            op.drop_index(index_name, table_name=table_name)
+        if 'responsable_key' in {item.get('name') for item in inspector.get_columns(table_name)}:
+            op.drop_column(table_name, 'responsable_key')
@@ -0,0 +1,67 @@
+"""poa change sequence
+
+Revision ID: a7d2c9e4b813
+Revises: f1b6d84c2e59
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d2c9e4b813'
+down_revision: Union[str, Sequence[str], None] = 'f1b6d84c2e59'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+LOG_TABLE = 'poa_change_log'
+SEQUENCE_TABLE = 'poa_change_sequence'
+SEQ_INDEX = 'ix_poa_change_log_seq'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    start = 0
+    if inspector.has_table(LOG_TABLE):
+        columns = {item.get('name') for item in inspector.get_columns(LOG_TABLE)}
+        if 'seq' not in columns:
+            op.add_column(LOG_TABLE, sa.Column('seq', sa.Integer(), nullable=True))
+        op.execute(sa.text(f'UPDATE {LOG_TABLE} SET seq = id WHERE seq IS NULL'))
+        existing = {item.get('name') for item in sa.inspect(bind).get_indexes(LOG_TABLE)}
+        if SEQ_INDEX not in existing:
+            op.create_index(SEQ_INDEX, LOG_TABLE, ['seq'], unique=False)
+        start = int(bind.execute(sa.text(f'SELECT MAX(seq) FROM {LOG_TABLE}')).scalar() or 0)
+    # La tabla puede existir ya, creada por el arranque de la aplicación.
+    if not inspector.has_table(SEQUENCE_TABLE):
+        op.create_table(
+            SEQUENCE_TABLE,
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('value', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('pruned_through', sa.Integer(), nullable=False, server_default='0'),
+            sa.PrimaryKeyConstraint('id'),
+        )
+    if bind.execute(sa.text(f'SELECT 1 FROM {SEQUENCE_TABLE} WHERE id = 1')).first() is None:
+        op.execute(
+            sa.text(f'INSERT INTO {SEQUENCE_TABLE} (id, value, pruned_through) VALUES (1, :value, 0)').bindparams(value=start)
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table(SEQUENCE_TABLE):
+        op.drop_table(SEQUENCE_TABLE)
+    if inspector.has_table(LOG_TABLE):
+        existing = {item.get('name') for item in inspector.get_indexes(LOG_TABLE)}
+        if SEQ_INDEX in existing:
+            op.drop_index(SEQ_INDEX, table_name=LOG_TABLE)
+        columns = {item.get('name') for item in inspector.get_columns(LOG_TABLE)}
+        if 'seq' in columns:
+            with op.batch_alter_table(LOG_TABLE) as batch_op:
+                batch_op.drop_column('seq')
@@ -0,0 +1,46 @@
+"""form outbox claim lease
+
+Revision ID: b4e8f1c6a3d7
+Revises: a7d2c9e4b813
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4e8f1c6a3d7'
+down_revision: Union[str, Sequence[str], None] = 'a7d2c9e4b813'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLE_NAME = 'form_notification_outbox'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Las columnas pueden existir ya, agregadas por el arranque de la aplicación.
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(TABLE_NAME):
+        return
+    columns = {item['name'] for item in inspector.get_columns(TABLE_NAME)}
+    if 'claimed_at' not in columns:
+        op.add_column(TABLE_NAME, sa.Column('claimed_at', sa.DateTime(), nullable=True))
+    if 'claimed_by' not in columns:
+        op.add_column(TABLE_NAME, sa.Column('claimed_by', sa.String(), nullable=True, server_default=''))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(TABLE_NAME):
+        return
+    columns = {item['name'] for item in inspector.get_columns(TABLE_NAME)}
+    with op.batch_alter_table(TABLE_NAME) as batch_op:
+        for name in ('claimed_by', 'claimed_at'):
+            if name in columns:
+                batch_op.drop_column(name)
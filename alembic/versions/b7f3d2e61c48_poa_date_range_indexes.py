@@ -0,0 +1,43 @@
+"""poa date range indexes
+
+Revision ID: b7f3d2e61c48
+Revises: 8d41c7e2a9b5
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7f3d2e61c48'
+down_revision: Union[str, Sequence[str], None] = '8d41c7e2a9b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+DATE_TABLES = ('poa_activities', 'poa_subactivities')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    for table_name in DATE_TABLES:
+        if not inspector.has_table(table_name):
+            continue
+        index_name = f'ix_{table_name}_fechas'
+        if index_name not in {item.get('name') for item in inspector.get_indexes(table_name)}:
+            op.create_index(index_name, table_name, ['fecha_inicial', 'fecha_final'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    for table_name in reversed(DATE_TABLES):
+        if not inspector.has_table(table_name):
+            continue
+        index_name = f'ix_{table_name}_fechas'
+        if index_name in {item.get('name') for item in inspector.get_indexes(table_name)}:
+            op.drop_index(index_name, table_name=table_name)
@@ -0,0 +1,79 @@
+"""public landing rollups
+
+Revision ID: c3f8a5d91b07
+Revises: e4a9c1d03f27
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f8a5d91b07'
+down_revision: Union[str, Sequence[str], None] = 'e4a9c1d03f27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+PAGE_TABLE = 'public_landing_page_rollup'
+DAILY_TABLE = 'public_landing_daily_rollup'
+LOCATION_TABLE = 'public_landing_location_rollup'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Las tablas pueden existir ya, creadas por el arranque de la aplicación;
+    # los datos se construyen desde public_landing_visits al arrancar.
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(PAGE_TABLE):
+        op.create_table(
+            PAGE_TABLE,
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('page', sa.String(), nullable=False),
+            sa.Column('visits', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('unique_sketch', sa.LargeBinary(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('page'),
+        )
+        op.create_index(op.f('ix_public_landing_page_rollup_id'), PAGE_TABLE, ['id'], unique=False)
+    if not inspector.has_table(DAILY_TABLE):
+        op.create_table(
+            DAILY_TABLE,
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('page', sa.String(), nullable=False),
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('visits', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('unique_sketch', sa.LargeBinary(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('page', 'day', name='uq_public_landing_daily_rollup_page_day'),
+        )
+        op.create_index(op.f('ix_public_landing_daily_rollup_id'), DAILY_TABLE, ['id'], unique=False)
+    if not inspector.has_table(LOCATION_TABLE):
+        op.create_table(
+            LOCATION_TABLE,
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('page', sa.String(), nullable=False),
+            sa.Column('label', sa.String(), nullable=False),
+            sa.Column('visits', sa.Integer(), nullable=False, server_default='0'),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('page', 'label', name='uq_public_landing_location_rollup_page_label'),
+        )
+        op.create_index(op.f('ix_public_landing_location_rollup_id'), LOCATION_TABLE, ['id'], unique=False)
+        op.create_index(
+            'ix_public_landing_location_rollup_page_visits',
+            LOCATION_TABLE,
+            ['page', 'visits'],
+            unique=False,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    for table_name in (LOCATION_TABLE, DAILY_TABLE, PAGE_TABLE):
+        if inspector.has_table(table_name):
+            op.drop_table(table_name)
@@ -0,0 +1,53 @@
+"""poa activity dependencies
+
+Revision ID: e4a9c1d03f27
+Revises: b7f3d2e61c48
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a9c1d03f27'
+down_revision: Union[str, Sequence[str], None] = 'b7f3d2e61c48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLE_NAME = 'poa_activity_dependencies'
+INDEXES = [
+    ('ix_poa_activity_dependencies_successor', ['successor_id']),
+    ('ix_poa_activity_dependencies_objective', ['objective_id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # La tabla puede existir ya, creada por el arranque de la aplicación.
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(TABLE_NAME):
+        op.create_table(
+            TABLE_NAME,
+            sa.Column('predecessor_id', sa.Integer(), nullable=False),
+            sa.Column('successor_id', sa.Integer(), nullable=False),
+            sa.Column('objective_id', sa.Integer(), nullable=False),
+            sa.Column('lag_dias', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.current_timestamp()),
+            sa.PrimaryKeyConstraint('predecessor_id', 'successor_id'),
+        )
+        inspector = sa.inspect(op.get_bind())
+    existing = {item.get('name') for item in inspector.get_indexes(TABLE_NAME)}
+    for index_name, columns in INDEXES:
+        if index_name not in existing:
+            op.create_index(index_name, TABLE_NAME, columns, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table(TABLE_NAME):
+        op.drop_table(TABLE_NAME)
@@ -0,0 +1,67 @@
+"""form notification outbox
+
+Revision ID: f1b6d84c2e59
+Revises: c3f8a5d91b07
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b6d84c2e59'
+down_revision: Union[str, Sequence[str], None] = 'c3f8a5d91b07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLE_NAME = 'form_notification_outbox'
+INDEXES = [
+    ('ix_form_notification_outbox_id', ['id']),
+    ('ix_form_notification_outbox_submission_id', ['submission_id']),
+    ('ix_form_notification_outbox_form_id', ['form_id']),
+    ('ix_form_notification_outbox_status_next', ['status', 'next_attempt_at']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # La tabla puede existir ya, creada por el arranque de la aplicación.
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(TABLE_NAME):
+        op.create_table(
+            TABLE_NAME,
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('submission_id', sa.Integer(), nullable=False),
+            sa.Column('form_id', sa.Integer(), nullable=False),
+            sa.Column('channel', sa.String(), nullable=False),
+            sa.Column('target', sa.String(), nullable=True),
+            sa.Column('payload', sa.JSON(), nullable=True),
+            sa.Column('status', sa.String(), nullable=False, server_default='pendiente'),
+            sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('max_attempts', sa.Integer(), nullable=False, server_default='6'),
+            sa.Column('next_attempt_at', sa.DateTime(), nullable=True),
+            sa.Column('last_error', sa.Text(), nullable=True),
+            sa.Column('last_status_code', sa.Integer(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.Column('sent_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['form_id'], ['form_definitions.id']),
+            sa.ForeignKeyConstraint(['submission_id'], ['form_submissions.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        inspector = sa.inspect(op.get_bind())
+    existing = {item.get('name') for item in inspector.get_indexes(TABLE_NAME)}
+    for index_name, columns in INDEXES:
+        if index_name not in existing:
+            op.create_index(index_name, TABLE_NAME, columns, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table(TABLE_NAME):
+        op.drop_table(TABLE_NAME)
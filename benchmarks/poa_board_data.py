@@ -0,0 +1,175 @@
+"""Latencia de /api/poa/board-data según el tamaño de las tablas hijas del POA.
+
+Crea una base SQLite temporal, siembra un tablero fijo (ejes, objetivos y
+actividades) y va llenando KPIs, hitos, presupuestos, entregables y vínculos
+de hitos con filas de relleno hasta cada tamaño pedido. Para cada tamaño mide
+la petición con los índices compuestos y sin ellos.
+
+Uso::
+
+    python benchmarks/poa_board_data.py
+    python benchmarks/poa_board_data.py --sizes 1000,10000,100000 --repeat 7
+    python benchmarks/poa_board_data.py --database-url postgresql://...
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+CHILD_TABLES = {
+    "strategic_objective_kpis": "objective_id",
+    "strategic_objective_milestones": "objective_id",
+    "poa_activity_budgets": "activity_id",
+    "poa_activity_deliverables": "activity_id",
+    "poa_activity_milestone_links": "activity_id",
+}
+
+
+def _parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Filas por tabla hija, separadas por coma.")
+    parser.add_argument("--repeat", type=int, default=5, help="Peticiones medidas por escenario.")
+    parser.add_argument("--objectives", type=int, default=20, help="Objetivos visibles en el tablero.")
+    parser.add_argument("--activities", type=int, default=10, help="Actividades por objetivo.")
+    parser.add_argument("--database-url", default="", help="Usar esta base en lugar de una SQLite temporal.")
+    return parser.parse_args(argv)
+
+
+def _configure_environment(args: argparse.Namespace) -> None:
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+        return
+    data_dir = tempfile.mkdtemp(prefix="sipet-bench-")
+    os.environ.pop("DATABASE_URL", None)
+    os.environ["SIPET_DATA_DIR"] = data_dir
+    os.environ["SQLITE_DB_PATH"] = os.path.join(data_dir, "bench.db")
+    os.environ.setdefault("AUTH_COOKIE_SECRET", "benchmark-secret")
+
+
+def _seed_board(core, objectives: int, activities: int) -> Dict[str, List[int]]:
+    db = core.SessionLocal()
+    try:
+        axis = core.StrategicAxisConfig(nombre="Eje benchmark", codigo="bm-01", orden=999, is_active=True)
+        db.add(axis)
+        db.flush()
+        objective_ids: List[int] = []
+        activity_ids: List[int] = []
+        for obj_idx in range(objectives):
+            objective = core.StrategicObjectiveConfig(
+                eje_id=axis.id,
+                nombre=f"Objetivo {obj_idx + 1}",
+                codigo=f"bm-01-{obj_idx + 1:02d}",
+                orden=obj_idx + 1,
+                is_active=True,
+            )
+            db.add(objective)
+            db.flush()
+            objective_ids.append(int(objective.id))
+            for act_idx in range(activities):
+                activity = core.POAActivity(
+                    objective_id=objective.id,
+                    nombre=f"Actividad {obj_idx + 1}.{act_idx + 1}",
+                    responsable="benchmark",
+                )
+                db.add(activity)
+                db.flush()
+                activity_ids.append(int(activity.id))
+        db.commit()
+        return {"objective_id": objective_ids, "activity_id": activity_ids}
+    finally:
+        db.close()
+
+
+def _fill_child_tables(core, target_rows: int, board_ids: Dict[str, List[int]]) -> None:
+    from sqlalchemy import text
+
+    with core.engine.begin() as conn:
+        for table_name, parent_column in CHILD_TABLES.items():
+            current = int(conn.execute(text(f"SELECT COUNT(*) FROM {table_name}")).scalar() or 0)
+            missing = target_rows - current
+            if missing <= 0:
+                continue
+            visible = board_ids[parent_column]
+            rows = []
+            for offset in range(missing):
+                position = current + offset
+                # Una fila de cada 50 pertenece al tablero; el resto simula otros planes.
+                parent_id = visible[position % len(visible)] if position % 50 == 0 else 1_000_000 + position
+                rows.append({"parent_id": parent_id, "orden": (position % 7) + 1})
+            if table_name == "poa_activity_milestone_links":
+                sql = "INSERT INTO poa_activity_milestone_links (activity_id, milestone_id, orden) VALUES (:parent_id, :parent_id, :orden)"
+            else:
+                label_column = "rubro" if table_name == "poa_activity_budgets" else "nombre"
+                sql = f"INSERT INTO {table_name} ({parent_column}, {label_column}, orden) VALUES (:parent_id, 'relleno', :orden)"
+            conn.execute(text(sql), rows)
+
+
+def _drop_child_indexes(core) -> None:
+    from sqlalchemy import inspect, text
+
+    with core.engine.begin() as conn:
+        inspector = inspect(conn)
+        for table_name in CHILD_TABLES:
+            for index in inspector.get_indexes(table_name):
+                conn.execute(text(f"DROP INDEX {index['name']}"))
+
+
+def _restore_child_indexes(core, ejes_poa) -> None:
+    ejes_poa.reset_poa_schema_registry()
+    with core.engine.begin() as conn:
+        for _, _, apply_step in ejes_poa._POA_SCHEMA_STEPS:
+            apply_step(conn)
+
+
+def _measure(client, repeat: int) -> Dict[str, float]:
+    client.get("/api/poa/board-data")
+    timings: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get("/api/poa/board-data")
+        timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f"board-data respondió {response.status_code}: {response.text[:200]}")
+    return {"p50": statistics.median(timings), "max": max(timings)}
+
+
+def main(argv: List[str] | None = None) -> int:
+    args = _parse_args(list(sys.argv[1:] if argv is None else argv))
+    _configure_environment(args)
+    sys.path.insert(0, ROOT_DIR)
+    os.chdir(ROOT_DIR)
+
+    from fastapi.testclient import TestClient
+    from fastapi_modulo import main as core
+    from fastapi_modulo.modulos.planificacion import ejes_poa
+
+    client = TestClient(core.app)
+    client.cookies.set(core.AUTH_COOKIE_NAME, core._build_session_cookie("benchmark", "superadministrador", "default"))
+    client.cookies.set("user_name", "benchmark")
+    client.cookies.set("user_role", "superadministrador")
+    client.cookies.set("tenant_id", "default")
+
+    board_ids = _seed_board(core, args.objectives, args.activities)
+    sizes = [int(item) for item in str(args.sizes).split(",") if item.strip()]
+    print(f"Tablero: {len(board_ids['objective_id'])} objetivos, {len(board_ids['activity_id'])} actividades")
+    print(f"{'filas/tabla':>12} | {'con índices p50':>16} | {'sin índices p50':>16} | {'max (idx)':>10}")
+    print("-" * 64)
+    for size in sizes:
+        _fill_child_tables(core, size, board_ids)
+        indexed = _measure(client, args.repeat)
+        _drop_child_indexes(core)
+        plain = _measure(client, args.repeat)
+        _restore_child_indexes(core, ejes_poa)
+        print(f"{size:>12} | {indexed['p50']:>13.1f} ms | {plain['p50']:>13.1f} ms | {indexed['max']:>7.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,505 @@
+# -*- coding: utf-8 -*-
+"""
+Geolocalización de IPs para las visitas y solicitudes públicas, sin red en la petición.
+
+El backend ``local`` carga un archivo de rangos IP (CSV, opcionalmente ``.gz``)
+en arreglos ordenados por IP inicial y resuelve con búsqueda binaria. Formatos
+aceptados:
+
+- con encabezado: ``network`` (CIDR) o ``start_ip``/``end_ip`` (también
+  ``ip_start``/``ip_end``), más ``country``/``country_code``,
+  ``region``/``stateprov``/``subdivision`` y ``city``;
+- sin encabezado: ``cidr,country,region,city`` o ``inicio,fin,country,region,city``
+  (IPs en texto o como enteros).
+
+Los rangos anidados o traslapados se aplanan al cargar en tramos disjuntos:
+en cada IP gana el rango más angosto que la cubre (el más específico) y, a
+igual tamaño, el que empieza después (o el último del archivo si empiezan igual).
+
+Los registros se guardan de inmediato con la ubicación que envía el proxy en
+los encabezados; ``enqueue_enrichment`` deja pendiente lo que falte y un hilo
+de fondo lo completa por lotes con el backend de ``GEOIP_BACKEND`` (``local``,
+``http`` o una cadena; por defecto ``local,http``). El backend ``http`` (ipwho.is /
+ipapi.co) sólo se consulta desde ese hilo y cubre lo que el archivo de rangos
+no resuelve; si ``GEOIP_DB_PATH`` no existe se avisa al cargar y sólo queda
+``http``. Al completar una visita también se
+mueve su conteo entre etiquetas en ``landing_analytics``.
+
+Uso desde línea de comandos::
+
+    python -m fastapi_modulo.geoip buscar 8.8.8.8
+    python -m fastapi_modulo.geoip completar 500
+"""
+from __future__ import annotations
+
+import bisect
+import csv
+import gzip
+import heapq
+import ipaddress
+import io
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import httpx
+
+from fastapi_modulo.landing_analytics import location_label, relabel_visit
+
+GEOIP_DB_PATH = (
+    os.environ.get("GEOIP_DB_PATH")
+    or os.path.join(
+        (os.environ.get("SIPET_DATA_DIR") or os.path.expanduser("~/.sipet/data")).strip(),
+        "geoip",
+        "ip_ranges.csv",
+    )
+).strip()
+GEOIP_BACKEND = (os.environ.get("GEOIP_BACKEND") or "local,http").strip().lower()
+HTTP_CACHE_TTL_SECONDS = 60 * 60 * 6
+ENRICH_BATCH_SIZE = 100
+ENRICH_QUEUE_MAX = int((os.environ.get("GEOIP_QUEUE_MAX") or "10000").strip() or "10000")
+BACKFILL_LIMIT = int((os.environ.get("GEOIP_BACKFILL_LIMIT") or "500").strip() or "500")
+
+KIND_VISIT = "visita"
+KIND_LEAD = "solicitud"
+
+_IPV4_MAX = (1 << 32) - 1
+_NETWORK_COLUMNS = ("network", "cidr")
+_START_COLUMNS = ("start_ip", "ip_start", "ip_from", "start")
+_END_COLUMNS = ("end_ip", "ip_end", "ip_to", "end")
+_COUNTRY_COLUMNS = ("country_code", "country_iso_code", "country")
+_REGION_COLUMNS = ("region", "stateprov", "subdivision", "subdivision_1_name", "region_name")
+_CITY_COLUMNS = ("city", "city_name")
+
+Location = Tuple[str, str, str]
+
+
+def _core():
+    from fastapi_modulo import main as core
+
+    return core
+
+
+def empty_location() -> Dict[str, str]:
+    return {"country": "", "region": "", "city": ""}
+
+
+def _as_dict(location: Location) -> Dict[str, str]:
+    return {"country": location[0], "region": location[1], "city": location[2]}
+
+
+def is_public_ip(value: str) -> bool:
+    raw = (value or "").strip()
+    if not raw:
+        return False
+    try:
+        ip_obj = ipaddress.ip_address(raw)
+    except ValueError:
+        return False
+    return not (
+        ip_obj.is_private
+        or ip_obj.is_loopback
+        or ip_obj.is_link_local
+        or ip_obj.is_multicast
+        or ip_obj.is_reserved
+        or ip_obj.is_unspecified
+    )
+
+
+def _parse_ip_bound(value: str) -> Optional[Tuple[int, int]]:
+    raw = (value or "").strip()
+    if not raw:
+        return None
+    if raw.isdigit():
+        number = int(raw)
+        return number, 4 if number <= _IPV4_MAX else 6
+    try:
+        ip_obj = ipaddress.ip_address(raw)
+    except ValueError:
+        return None
+    return int(ip_obj), ip_obj.version
+
+
+def _flatten_ranges(items: List[Tuple[int, int, Location]]) -> List[Tuple[int, int, Location]]:
+    """Tramos disjuntos y ordenados a partir de rangos ordenados por inicio (gana el más angosto)."""
+    flat: List[Tuple[int, int, Location]] = []
+    active: List[Tuple[int, int, int, Location]] = []
+    index, total = 0, len(items)
+    cursor = items[0][0] if items else 0
+    while index < total or active:
+        if not active and index < total:
+            cursor = max(cursor, items[index][0])
+        while index < total and items[index][0] <= cursor:
+            start, end, location = items[index]
+            heapq.heappush(active, (end - start, -index, end, location))
+            index += 1
+        while active and active[0][2] < cursor:
+            heapq.heappop(active)
+        if not active:
+            continue
+        _, _, end, location = active[0]
+        if index < total:
+            end = min(end, items[index][0] - 1)
+        if flat and flat[-1][1] == cursor - 1 and flat[-1][2] == location:
+            flat[-1] = (flat[-1][0], end, location)
+        else:
+            flat.append((cursor, end, location))
+        cursor = end + 1
+    return flat
+
+
+class LocalRangeBackend:
+    """Rangos IP en memoria, ordenados por inicio; búsqueda con ``bisect``."""
+
+    offline = True
+
+    def __init__(self, path: str = GEOIP_DB_PATH):
+        self.path = path
+        self.loaded = False
+        self.ranges = 0
+        self._starts: Dict[int, List[int]] = {4: [], 6: []}
+        self._ends: Dict[int, List[int]] = {4: [], 6: []}
+        self._locations: Dict[int, List[Location]] = {4: [], 6: []}
+
+    def _open(self):
+        if self.path.endswith(".gz"):
+            return io.TextIOWrapper(gzip.open(self.path, "rb"), encoding="utf-8", newline="")
+        return open(self.path, "r", encoding="utf-8", newline="")
+
+    @staticmethod
+    def _pick(row: Dict[str, str], columns: Sequence[str]) -> str:
+        for column in columns:
+            value = (row.get(column) or "").strip()
+            if value:
+                return value
+        return ""
+
+    def _parse_row(self, row: List[str], header: Optional[Dict[str, int]]) -> Optional[Tuple[int, int, int, Location]]:
+        if header is not None:
+            named = {name: row[index] for name, index in header.items() if index < len(row)}
+            network = self._pick(named, _NETWORK_COLUMNS)
+            start_raw = self._pick(named, _START_COLUMNS)
+            end_raw = self._pick(named, _END_COLUMNS)
+            fields = (
+                self._pick(named, _COUNTRY_COLUMNS),
+                self._pick(named, _REGION_COLUMNS),
+                self._pick(named, _CITY_COLUMNS),
+            )
+        elif row and "/" in row[0]:
+            network, start_raw, end_raw = row[0], "", ""
+            fields = tuple((row[1:4] + ["", "", ""])[:3])
+        else:
+            network = ""
+            start_raw, end_raw = (row + ["", ""])[:2]
+            fields = tuple((row[2:5] + ["", "", ""])[:3])
+        if network:
+            try:
+                net = ipaddress.ip_network(network.strip(), strict=False)
+            except ValueError:
+                return None
+            start, end, version = int(net.network_address), int(net.broadcast_address), net.version
+        else:
+            start_bound = _parse_ip_bound(start_raw)
+            end_bound = _parse_ip_bound(end_raw)
+            if not start_bound or not end_bound:
+                return None
+            (start, version), (end, _) = start_bound, end_bound
+        country, region, city = (str(value or "").strip() for value in fields)
+        if end < start or not (country or region or city):
+            return None
+        return start, end, version, (country.upper() if len(country) <= 3 else country, region, city)
+
+    def load(self) -> int:
+        """Lee el archivo completo; devuelve el número de rangos cargados."""
+        collected: Dict[int, List[Tuple[int, int, Location]]] = {4: [], 6: []}
+        interned: Dict[Location, Location] = {}
+        if os.path.exists(self.path):
+            with self._open() as fh:
+                reader = csv.reader(fh)
+                header: Optional[Dict[str, int]] = None
+                first = True
+                for row in reader:
+                    if not row or row[0].startswith("#"):
+                        continue
+                    if first and _parse_ip_bound(row[0]) is None and "/" not in row[0]:
+                        header = {name.strip().lower(): index for index, name in enumerate(row)}
+                        first = False
+                        continue
+                    first = False
+                    parsed = self._parse_row(row, header)
+                    if parsed:
+                        start, end, version, location = parsed
+                        collected[version].append((start, end, interned.setdefault(location, location)))
+        else:
+            print(f"[geoip] No existe el archivo de rangos {self.path}; la geolocalización local queda vacía.")
+        for version, items in collected.items():
+            items.sort(key=lambda item: item[0])
+            items = _flatten_ranges(items)
+            self._starts[version] = [item[0] for item in items]
+            self._ends[version] = [item[1] for item in items]
+            self._locations[version] = [item[2] for item in items]
+        self.ranges = sum(len(items) for items in collected.values())
+        self.loaded = True
+        return self.ranges
+
+    def lookup(self, ip_address: str, allow_network: bool = False) -> Optional[Dict[str, str]]:
+        del allow_network
+        try:
+            ip_obj = ipaddress.ip_address((ip_address or "").strip())
+        except ValueError:
+            return None
+        value = int(ip_obj)
+        starts = self._starts[ip_obj.version]
+        position = bisect.bisect_right(starts, value) - 1
+        if position < 0 or value > self._ends[ip_obj.version][position]:
+            return None
+        return _as_dict(self._locations[ip_obj.version][position])
+
+
+class HTTPProviderBackend:
+    """Proveedores públicos (ipwho.is, ipapi.co); sólo para el hilo de enriquecimiento."""
+
+    offline = False
+    loaded = True
+    provider_urls = ("https://ipwho.is/{ip}", "https://ipapi.co/{ip}/json/")
+
+    def __init__(self, ttl_seconds: int = HTTP_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._cache: Dict[str, Tuple[float, Optional[Dict[str, str]]]] = {}
+
+    def load(self) -> int:
+        return 0
+
+    def lookup(self, ip_address: str, allow_network: bool = False) -> Optional[Dict[str, str]]:
+        if not allow_network:
+            return None
+        ip_value = (ip_address or "").strip()
+        cached = self._cache.get(ip_value)
+        if cached and cached[0] > time.time():
+            return dict(cached[1]) if cached[1] else None
+        resolved: Optional[Dict[str, str]] = None
+        timeout = httpx.Timeout(1.8, connect=1.0)
+        for template in self.provider_urls:
+            url = template.format(ip=ip_value)
+            try:
+                response = httpx.get(url, timeout=timeout)
+                if response.status_code != 200:
+                    continue
+                data = response.json() if response.headers.get("content-type", "").startswith("application/json") else {}
+                if not isinstance(data, dict):
+                    continue
+                if "ipwho.is" in url and data.get("success") is False:
+                    continue
+                country = (
+                    str(data.get("country_code") or data.get("countryCode") or data.get("country") or "")
+                    .strip()
+                    .upper()
+                )
+                region = str(data.get("region") or data.get("regionName") or "").strip()
+                city = str(data.get("city") or "").strip()
+                if country or region or city:
+                    resolved = {"country": country, "region": region, "city": city}
+                    break
+            except Exception:
+                continue
+        self._cache[ip_value] = (time.time() + self.ttl_seconds, resolved)
+        return dict(resolved) if resolved else None
+
+
+class ChainBackend:
+    """Consulta los backends en orden y devuelve la primera ubicación encontrada."""
+
+    def __init__(self, backends: Iterable[Any]):
+        self.backends = list(backends)
+        self.offline = all(backend.offline for backend in self.backends)
+        self.loaded = False
+
+    def load(self) -> int:
+        total = sum(backend.load() for backend in self.backends)
+        self.loaded = True
+        return total
+
+    def lookup(self, ip_address: str, allow_network: bool = False) -> Optional[Dict[str, str]]:
+        for backend in self.backends:
+            if not backend.loaded or (not backend.offline and not allow_network):
+                continue
+            found = backend.lookup(ip_address, allow_network=allow_network)
+            if found:
+                return found
+        return None
+
+
+_BACKEND_FACTORIES = {
+    "local": LocalRangeBackend,
+    "http": HTTPProviderBackend,
+}
+_BACKEND_LOCK = threading.Lock()
+_BACKEND: Optional[Any] = None
+
+
+def build_backend(spec: str = GEOIP_BACKEND) -> ChainBackend:
+    names = [name.strip() for name in (spec or "").split(",") if name.strip() in _BACKEND_FACTORIES]
+    return ChainBackend(_BACKEND_FACTORIES[name]() for name in names)
+
+
+def set_geoip_backend(backend: Any) -> None:
+    """Reemplaza el backend activo (debe exponer ``load``, ``lookup``, ``offline`` y ``loaded``)."""
+    global _BACKEND
+    with _BACKEND_LOCK:
+        _BACKEND = backend
+
+
+def get_geoip_backend() -> Any:
+    """Backend activo; lo construye y carga en la primera llamada (lectura de disco)."""
+    global _BACKEND
+    with _BACKEND_LOCK:
+        if _BACKEND is None:
+            _BACKEND = build_backend()
+        backend = _BACKEND
+    if not backend.loaded:
+        with _BACKEND_LOCK:
+            if not backend.loaded:
+                backend.load()
+    return backend
+
+
+def _models() -> Dict[str, Any]:
+    core = _core()
+    return {KIND_VISIT: core.PublicLandingVisit, KIND_LEAD: core.PublicLeadRequest}
+
+
+def enrich_records(items: Iterable[Tuple[str, int, str]], backend: Optional[Any] = None) -> int:
+    """Completa país/región/ciudad vacíos de los registros; devuelve cuántos cambiaron."""
+    resolver = backend or get_geoip_backend()
+    models = _models()
+    resolved: Dict[str, Optional[Dict[str, str]]] = {}
+    pending: Dict[str, Dict[int, str]] = {}
+    for kind, record_id, ip_value in items:
+        if kind not in models:
+            continue
+        if ip_value not in resolved:
+            resolved[ip_value] = resolver.lookup(ip_value, allow_network=True)
+        if resolved[ip_value]:
+            pending.setdefault(kind, {})[int(record_id)] = ip_value
+    if not pending:
+        return 0
+    changed = 0
+    db = _core().SessionLocal()
+    try:
+        for kind, ids in pending.items():
+            model = models[kind]
+            for record in db.query(model).filter(model.id.in_(sorted(ids))).with_for_update().all():
+                location = resolved[ids[int(record.id)]] or {}
+                old_label = location_label(record.country, record.region, record.city)
+                touched = False
+                for field in ("country", "region", "city"):
+                    if not (getattr(record, field) or "").strip() and location.get(field):
+                        setattr(record, field, location[field])
+                        touched = True
+                if touched and kind == KIND_VISIT:
+                    relabel_visit(db, record.page, old_label, location_label(record.country, record.region, record.city))
+                changed += int(touched)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return changed
+
+
+def backfill_missing_locations(limit: int = BACKFILL_LIMIT, backend: Optional[Any] = None) -> int:
+    """Enriquece los registros recientes que quedaron sin ninguna ubicación."""
+    models = _models()
+    items: List[Tuple[str, int, str]] = []
+    db = _core().SessionLocal()
+    try:
+        for kind, model in models.items():
+            rows = (
+                db.query(model.id, model.ip_address)
+                .filter(
+                    model.ip_address.isnot(None),
+                    (model.country.is_(None)) | (model.country == ""),
+                    (model.region.is_(None)) | (model.region == ""),
+                    (model.city.is_(None)) | (model.city == ""),
+                )
+                .order_by(model.id.desc())
+                .limit(max(0, int(limit)))
+                .all()
+            )
+            items.extend((kind, int(row.id), str(row.ip_address)) for row in rows if is_public_ip(str(row.ip_address)))
+    finally:
+        db.close()
+    return enrich_records(items, backend) if items else 0
+
+
+_QUEUE: "queue.Queue[Tuple[str, int, str]]" = queue.Queue(maxsize=max(1, ENRICH_QUEUE_MAX))
+_WORKER_LOCK = threading.Lock()
+_WORKER_STATE: Dict[str, Any] = {"thread": None}
+
+
+def _enrichment_worker() -> None:
+    try:
+        backend = get_geoip_backend()
+        backfill_missing_locations(backend=backend)
+    except Exception as exc:
+        print(f"[geoip] Error al cargar el backend o completar pendientes: {exc}")
+        backend = None
+    while True:
+        batch = [_QUEUE.get()]
+        while len(batch) < ENRICH_BATCH_SIZE:
+            try:
+                batch.append(_QUEUE.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            enrich_records(batch, backend or get_geoip_backend())
+        except Exception as exc:
+            print(f"[geoip] Error al enriquecer {len(batch)} registros: {exc}")
+
+
+def start_enrichment_worker() -> None:
+    """Arranca (una sola vez) el hilo que carga el backend y procesa la cola."""
+    with _WORKER_LOCK:
+        thread = _WORKER_STATE["thread"]
+        if thread is not None and thread.is_alive():
+            return
+        thread = threading.Thread(target=_enrichment_worker, name="geoip-enrichment", daemon=True)
+        _WORKER_STATE["thread"] = thread
+    thread.start()
+
+
+def enqueue_enrichment(kind: str, record_id: int, ip_address: str) -> bool:
+    """Encola un registro para geolocalizarlo en segundo plano; no bloquea."""
+    ip_value = (ip_address or "").strip()
+    if not record_id or not is_public_ip(ip_value):
+        return False
+    start_enrichment_worker()
+    try:
+        _QUEUE.put_nowait((kind, int(record_id), ip_value))
+    except queue.Full:
+        return False
+    return True
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = list(sys.argv[1:] if argv is None else argv)
+    command = (args[0] if args else "").strip().lower()
+    if command == "buscar" and len(args) > 1:
+        backend = get_geoip_backend()
+        print(json.dumps(backend.lookup(args[1], allow_network=True) or empty_location(), ensure_ascii=False))
+        return 0
+    if command == "completar":
+        limit = int(args[1]) if len(args) > 1 else BACKFILL_LIMIT
+        print(f"Registros actualizados: {backfill_missing_locations(limit)}")
+        return 0
+    print("Uso: python -m fastapi_modulo.geoip buscar IP | completar [LIMITE]")
+    return 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
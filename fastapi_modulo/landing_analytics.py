@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""
+Métricas pre-agregadas de las páginas públicas (landing).
+
+Cada visita registrada actualiza, en la misma transacción:
+
+- ``public_landing_page_rollup``: total de visitas de la página y un sketch
+  HyperLogLog de IPs únicas (``2**HLL_PRECISION`` registros de un byte);
+- ``public_landing_daily_rollup``: visitas y sketch del día;
+- ``public_landing_location_rollup``: visitas por etiqueta de ubicación.
+
+``landing_metrics`` sólo lee esas filas (una de página, una del día y las
+ubicaciones principales) y ``cached_landing_metrics`` guarda el resultado
+``LANDING_METRICS_TTL`` segundos. Los contadores se suman en SQL con un upsert
+(``INSERT ... ON CONFLICT DO UPDATE SET visits = visits + :n``) y el sketch se
+combina tras leer la fila con ``SELECT ... FOR UPDATE``, así varios procesos
+pueden registrar visitas a la vez sin perder incrementos.
+
+Uso desde línea de comandos::
+
+    python -m fastapi_modulo.landing_analytics reconstruir
+    python -m fastapi_modulo.landing_analytics metricas funcionalidades
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+import sys
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select, update
+
+HLL_PRECISION = 12
+HLL_REGISTERS = 1 << HLL_PRECISION
+METRICS_TTL_SECONDS = float((os.environ.get("LANDING_METRICS_TTL") or "15").strip() or "15")
+TOP_LOCATIONS = 4
+UNKNOWN_LOCATION = "Ubicación no disponible"
+
+_METRICS_LOCK = threading.Lock()
+_METRICS_CACHE: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+
+def _core():
+    from fastapi_modulo import main as core
+
+    return core
+
+
+def location_label(country: Optional[str], region: Optional[str], city: Optional[str]) -> str:
+    country = (country or "").strip()
+    region = (region or "").strip()
+    city = (city or "").strip()
+    if city and region:
+        return f"{city}, {region}"
+    if city and country:
+        return f"{city}, {country}"
+    if region and country:
+        return f"{region}, {country}"
+    return country or UNKNOWN_LOCATION
+
+
+def empty_sketch() -> bytearray:
+    return bytearray(HLL_REGISTERS)
+
+
+def _sketch(value: Optional[bytes]) -> bytearray:
+    if not value or len(value) != HLL_REGISTERS:
+        return empty_sketch()
+    return bytearray(value)
+
+
+def sketch_add(registers: bytearray, value: str) -> bool:
+    """Agrega ``value`` al sketch; devuelve True si cambió algún registro."""
+    hashed = int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+    index = hashed >> (64 - HLL_PRECISION)
+    rest_bits = 64 - HLL_PRECISION
+    rest = hashed & ((1 << rest_bits) - 1)
+    rank = rest_bits - rest.bit_length() + 1
+    if rank > registers[index]:
+        registers[index] = rank
+        return True
+    return False
+
+
+def sketch_merge(target: bytearray, other: bytes) -> None:
+    for index, rank in enumerate(other[:HLL_REGISTERS]):
+        if rank > target[index]:
+            target[index] = rank
+
+
+def sketch_estimate(registers: Optional[bytes]) -> int:
+    """Cardinalidad estimada (error típico ~1.6 % con 4096 registros)."""
+    if not registers:
+        return 0
+    m = len(registers)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / sum(2.0 ** -rank for rank in registers)
+    zeros = registers.count(0)
+    if estimate <= 2.5 * m and zeros:
+        estimate = m * math.log(m / zeros)
+    return int(round(estimate))
+
+
+def _visit_day(visit: Any) -> date:
+    created_at = getattr(visit, "created_at", None)
+    return (created_at or datetime.utcnow()).date()
+
+
+def _insert(db, table):
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+
+def _add_visits(db, model, keys: Dict[str, Any], count: int) -> None:
+    """Suma ``count`` a la fila de ``keys`` creándola si no existe (upsert atómico)."""
+    table = model.__table__
+    values = {"visits": count, **keys}
+    changes: Dict[str, Any] = {"visits": table.c.visits + count}
+    if "updated_at" in table.c:
+        values["updated_at"] = changes["updated_at"] = datetime.utcnow()
+    stmt = _insert(db, table).values(**values)
+    db.execute(stmt.on_conflict_do_update(index_elements=list(keys), set_=changes))
+
+
+def _merge_sketch(db, model, keys: Dict[str, Any], sketch: bytearray) -> None:
+    """Combina ``sketch`` con el de la fila, bloqueada con FOR UPDATE hasta el commit."""
+    table = model.__table__
+    where = [table.c[name] == value for name, value in keys.items()]
+    current = db.execute(select(table.c.unique_sketch).where(*where).with_for_update()).scalar()
+    merged = _sketch(current)
+    sketch_merge(merged, sketch)
+    if current is None or bytes(merged) != bytes(current):
+        db.execute(update(table).where(*where).values(unique_sketch=bytes(merged)))
+
+
+def record_visits(db, visits: Iterable[Any]) -> int:
+    """Suma ``visits`` (objetos con page/ip_address/created_at/ubicación) a los rollups; no hace commit."""
+    core = _core()
+    pages: Dict[str, Tuple[int, bytearray]] = {}
+    days: Dict[Tuple[str, date], Tuple[int, bytearray]] = {}
+    locations: Dict[Tuple[str, str], int] = {}
+    total = 0
+    for visit in visits:
+        page = str(visit.page or "")
+        ip_value = str(visit.ip_address or "").strip()
+        day_key = (page, _visit_day(visit))
+        page_count, page_sketch = pages.get(page) or (0, empty_sketch())
+        day_count, day_sketch = days.get(day_key) or (0, empty_sketch())
+        if ip_value:
+            sketch_add(page_sketch, ip_value)
+            sketch_add(day_sketch, ip_value)
+        pages[page] = (page_count + 1, page_sketch)
+        days[day_key] = (day_count + 1, day_sketch)
+        label_key = (page, location_label(visit.country, visit.region, visit.city))
+        locations[label_key] = locations.get(label_key, 0) + 1
+        total += 1
+    # Orden fijo de claves para que dos transacciones no se bloqueen en cruz.
+    for page in sorted(pages):
+        count, sketch = pages[page]
+        keys = {"page": page}
+        _add_visits(db, core.PublicLandingPageRollup, keys, count)
+        _merge_sketch(db, core.PublicLandingPageRollup, keys, sketch)
+    for page, day in sorted(days):
+        count, sketch = days[(page, day)]
+        keys = {"page": page, "day": day}
+        _add_visits(db, core.PublicLandingDailyRollup, keys, count)
+        _merge_sketch(db, core.PublicLandingDailyRollup, keys, sketch)
+    for page, label in sorted(locations):
+        _add_visits(db, core.PublicLandingLocationRollup, {"page": page, "label": label}, locations[(page, label)])
+    return total
+
+
+def relabel_visit(db, page: str, old_label: str, new_label: str) -> None:
+    """Mueve una visita entre etiquetas de ubicación (tras geolocalizarla); no hace commit."""
+    if old_label == new_label:
+        return
+    Location = _core().PublicLandingLocationRollup
+    table = Location.__table__
+    db.execute(
+        update(table)
+        .where(table.c.page == page, table.c.label == old_label, table.c.visits > 0)
+        .values(visits=table.c.visits - 1)
+    )
+    _add_visits(db, Location, {"page": page, "label": new_label}, 1)
+
+
+def landing_metrics(db, page: str, today: Optional[date] = None) -> Dict[str, Any]:
+    core = _core()
+    Location = core.PublicLandingLocationRollup
+    current = today or datetime.utcnow().date()
+    page_row = db.query(core.PublicLandingPageRollup).filter_by(page=page).first()
+    day_row = db.query(core.PublicLandingDailyRollup).filter_by(page=page, day=current).first()
+    location_rows = (
+        db.query(Location.label, Location.visits)
+        .filter(Location.page == page, Location.visits > 0)
+        .order_by(Location.visits.desc(), Location.label.asc())
+        .limit(TOP_LOCATIONS)
+        .all()
+    )
+    return {
+        "page": page,
+        "total_visits": int(page_row.visits or 0) if page_row else 0,
+        "unique_visitors": sketch_estimate(page_row.unique_sketch) if page_row else 0,
+        "visits_today": int(day_row.visits or 0) if day_row else 0,
+        "top_locations": [{"label": row.label, "count": int(row.visits)} for row in location_rows],
+    }
+
+
+def cached_landing_metrics(page: str) -> Dict[str, Any]:
+    """``landing_metrics`` con caché de ``METRICS_TTL_SECONDS`` por página."""
+    now = time.monotonic()
+    with _METRICS_LOCK:
+        cached = _METRICS_CACHE.get(page)
+        if cached and cached[0] > now:
+            return dict(cached[1])
+    db = _core().SessionLocal()
+    try:
+        payload = landing_metrics(db, page)
+    finally:
+        db.close()
+    with _METRICS_LOCK:
+        _METRICS_CACHE[page] = (now + METRICS_TTL_SECONDS, payload)
+    return dict(payload)
+
+
+def invalidate_metrics_cache() -> None:
+    with _METRICS_LOCK:
+        _METRICS_CACHE.clear()
+
+
+def rebuild_rollups(db, batch_size: int = 2000) -> int:
+    """Recalcula todos los rollups desde ``public_landing_visits``; no hace commit."""
+    core = _core()
+    Visit = core.PublicLandingVisit
+    for model in (core.PublicLandingPageRollup, core.PublicLandingDailyRollup, core.PublicLandingLocationRollup):
+        db.query(model).delete(synchronize_session=False)
+    db.flush()
+    total = 0
+    last_id = 0
+    while True:
+        batch = (
+            db.query(Visit)
+            .filter(Visit.id > last_id)
+            .order_by(Visit.id.asc())
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+        total += record_visits(db, batch)
+        last_id = int(batch[-1].id)
+        db.flush()
+        db.expunge_all()
+    return total
+
+
+def ensure_rollups_seeded() -> int:
+    """Al arrancar: si hay visitas pero ningún rollup (instalación previa), los construye."""
+    core = _core()
+    db = core.SessionLocal()
+    try:
+        if db.query(core.PublicLandingPageRollup.id).first() is not None:
+            return 0
+        if db.query(core.PublicLandingVisit.id).first() is None:
+            return 0
+        total = rebuild_rollups(db)
+        db.commit()
+        invalidate_metrics_cache()
+        return total
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = list(sys.argv[1:] if argv is None else argv)
+    command = (args[0] if args else "").strip().lower()
+    if command not in {"reconstruir", "metricas"}:
+        print("Uso: python -m fastapi_modulo.landing_analytics reconstruir | metricas [PAGINA]")
+        return 2
+    db = _core().SessionLocal()
+    try:
+        if command == "reconstruir":
+            total = rebuild_rollups(db)
+            db.commit()
+            print(f"Visitas agregadas: {total}")
+        else:
+            page = args[1] if len(args) > 1 else "funcionalidades"
+            print(json.dumps(landing_metrics(db, page), ensure_ascii=False, indent=2))
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
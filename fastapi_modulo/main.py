@@ -10,16 +10,19 @@ import hmac
 import time
 import unicodedata
 import shutil
-from datetime import datetime, date as Date, timedelta
+import asyncio
+import threading
+from collections import OrderedDict
+from datetime import datetime, date as Date
 from urllib.parse import urlparse
 from typing import Any, Dict, List, Optional
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, create_model
 from fastapi import Request, UploadFile, HTTPException
 from fastapi import File
 from fastapi import FastAPI
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, Date, ForeignKey, Text, JSON, UniqueConstraint, func, inspect
+from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, Date, ForeignKey, Text, JSON, LargeBinary, UniqueConstraint, Index, event, func, inspect
 from sqlalchemy.orm import sessionmaker, declarative_base, relationship
 from cryptography.fernet import Fernet, InvalidToken
 from textwrap import dedent
@@ -41,10 +44,39 @@ from fastapi_modulo.modulos.proyectando.datos_preliminares import router as proy
 from fastapi_modulo.modulos.proyectando.crecimiento_general import router as proyectando_crecimiento_general_router
 from fastapi_modulo.modulos.proyectando.sucursales import router as proyectando_sucursales_router
 from fastapi_modulo.modulos.proyectando.no_acceso import router as proyectando_no_acceso_router
-from fastapi_modulo.modulos.planificacion.ejes_poa import router as ejes_poa_router
+from fastapi_modulo.modulos.planificacion.ejes_poa import (
+    bootstrap_poa_schema,
+    reset_poa_schema_registry,
+    router as ejes_poa_router,
+)
+from fastapi_modulo.modulos.notificaciones.event_bus import get_event_broker, install_session_hooks
+from fastapi_modulo.modulos.notificaciones.inbox import (
+    deadline_sweep_loop,
+    install_directory_hooks,
+    notify_quiz_submission,
+)
+from fastapi_modulo.modulos.planificacion.poa_changes import install_change_hooks as install_poa_change_hooks
+from fastapi_modulo.modulos.planificacion.poa_critical_path import SLACK_WARNING_DAYS
+from fastapi_modulo.modulos.planificacion.poa_dashboard import dashboard_aggregates, dashboard_snapshot
+from fastapi_modulo.modulos.planificacion.poa_rollup import progress_rollover_loop
 from fastapi_modulo.modulos.plantillas.plantillas_forms import router as plantillas_forms_router
+from fastapi_modulo.modulos.plantillas.form_outbox import dispatch_loop as form_outbox_dispatch_loop
 from fastapi_modulo.modulos.diagnostico.diagnostico import router as diagnostico_router
 from fastapi_modulo.modulos.kpis.kpis import router as kpis_router
+from fastapi_modulo.geoip import (
+    KIND_LEAD as GEOIP_KIND_LEAD,
+    enqueue_enrichment as enqueue_geoip_enrichment,
+    start_enrichment_worker as start_geoip_enrichment_worker,
+)
+from fastapi_modulo.landing_analytics import (
+    cached_landing_metrics,
+    ensure_rollups_seeded as ensure_landing_rollups_seeded,
+)
+from fastapi_modulo.visit_buffer import (
+    replay_spill_files as replay_visit_spill_files,
+    visit_buffer as public_visit_buffer,
+)
+from fastapi_modulo.site_config import DB_MAX_AGE_SECONDS as SITE_CONFIG_DB_MAX_AGE_SECONDS, site_config_cache
 from fastapi import Response, Form, Body
 from fastapi.responses import JSONResponse, RedirectResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
@@ -53,8 +85,8 @@ from fastapi import Depends
 from typing import Set
 
 import struct
-import ipaddress
-import httpx
+import smtplib
+from email.message import EmailMessage
 from reportes.reportes import (
     SYSTEM_REPORT_HEADER_TEMPLATE_ID,
     build_default_report_header_template,
@@ -83,6 +115,12 @@ DEFAULT_LOGIN_IDENTITY = {
     "login_message": "Incrementando el nivel de eficiencia",
 }
 PLANTILLAS_STORE_PATH = (os.environ.get("PLANTILLAS_STORE_PATH") or os.path.join(RUNTIME_STORE_DIR, "plantillas_store.json")).strip()
+PERSONALIZACION_UPLOADS_DIR = os.path.join("fastapi_modulo", "modulos", "personalizacion", "uploads")
+SITE_CONFIG_COLORES = "colores"
+SITE_CONFIG_LOGIN_IDENTITY = "login_identity"
+SITE_CONFIG_LOGIN_CONTEXT = "login_identity_context"
+SITE_CONFIG_LOGO_EMPRESA = "logo_empresa"
+SITE_CONFIG_PLANTILLAS = "plantillas"
 AUTH_COOKIE_NAME = "auth_session"
 SIPET_PREMIUM_UI_TEMPLATE_CSS = dedent("""
     .sipet-ui-template .table-excel {
@@ -246,8 +284,6 @@ PASSKEY_COOKIE_AUTH = "passkey_auth"
 PASSKEY_COOKIE_MFA_GATE = "passkey_mfa_gate"
 PASSKEY_CHALLENGE_TTL_SECONDS = 300
 NON_DATA_FIELD_TYPES = {"header", "paragraph", "html", "divider", "pagebreak"}
-GEOIP_CACHE_TTL_SECONDS = 60 * 60 * 6
-_GEOIP_CACHE: Dict[str, Dict[str, Any]] = {}
 LOGIN_RATE_LIMIT_WINDOW_SECONDS = int((os.environ.get("LOGIN_RATE_LIMIT_WINDOW_SECONDS") or "300").strip() or "300")
 LOGIN_RATE_LIMIT_MAX_ATTEMPTS = int((os.environ.get("LOGIN_RATE_LIMIT_MAX_ATTEMPTS") or "7").strip() or "7")
 _LOGIN_ATTEMPTS: Dict[str, List[float]] = {}
@@ -452,7 +488,7 @@ def _ensure_store_parent_dir(path: str) -> None:
         os.makedirs(parent, exist_ok=True)
 
 
-def _load_login_identity() -> Dict[str, str]:
+def _read_login_identity() -> Dict[str, str]:
     data = DEFAULT_LOGIN_IDENTITY.copy()
     if os.path.exists(IDENTIDAD_LOGIN_CONFIG_PATH):
         try:
@@ -465,10 +501,19 @@ def _load_login_identity() -> Dict[str, str]:
     return data
 
 
+def _load_login_identity() -> Dict[str, str]:
+    return site_config_cache.get(
+        SITE_CONFIG_LOGIN_IDENTITY,
+        _read_login_identity,
+        watch=(IDENTIDAD_LOGIN_CONFIG_PATH,),
+    )
+
+
 def _save_login_identity(data: Dict[str, str]) -> None:
     _ensure_store_parent_dir(IDENTIDAD_LOGIN_CONFIG_PATH)
     with open(IDENTIDAD_LOGIN_CONFIG_PATH, "w", encoding="utf-8") as fh:
         json.dump(data, fh, ensure_ascii=False, indent=2)
+    site_config_cache.invalidate(SITE_CONFIG_LOGIN_IDENTITY, SITE_CONFIG_LOGIN_CONTEXT)
 
 
 def _get_upload_ext(upload: UploadFile) -> str:
@@ -582,8 +627,8 @@ def _build_login_asset_url(filename: Optional[str], default_filename: str) -> st
     return f"/templates/imagenes/{selected}?v={version}"
 
 
-def _resolve_personalizacion_logo_empresa_url() -> str:
-    uploads_dir = os.path.join("fastapi_modulo", "modulos", "personalizacion", "uploads")
+def _read_personalizacion_logo_empresa_url() -> str:
+    uploads_dir = PERSONALIZACION_UPLOADS_DIR
     candidates = sorted(
         glob.glob(os.path.join(uploads_dir, "logo_empresa.*")),
         key=lambda p: os.path.getmtime(p) if os.path.exists(p) else 0,
@@ -597,6 +642,14 @@ def _resolve_personalizacion_logo_empresa_url() -> str:
     return f"/personalizar/uploads/{filename}?v={version}"
 
 
+def _resolve_personalizacion_logo_empresa_url() -> str:
+    return site_config_cache.get(
+        SITE_CONFIG_LOGO_EMPRESA,
+        _read_personalizacion_logo_empresa_url,
+        watch=(PERSONALIZACION_UPLOADS_DIR,),
+    )
+
+
 def _resolve_sidebar_logo_url(login_identity: Dict[str, str]) -> str:
     identity_data = _load_login_identity()
     identity_logo_filename = str(identity_data.get("logo_filename") or "").strip()
@@ -613,7 +666,7 @@ def _resolve_sidebar_logo_url(login_identity: Dict[str, str]) -> str:
     return identity_logo_url or "/templates/icon/icon.png"
 
 
-def _get_login_identity_context() -> Dict[str, str]:
+def _build_login_identity_context() -> Dict[str, str]:
     data = _load_login_identity()
     return {
         "login_favicon_url": _build_login_asset_url(
@@ -637,7 +690,16 @@ def _get_login_identity_context() -> Dict[str, str]:
     }
 
 
-def _load_plantillas_store() -> List[Dict[str, str]]:
+def _get_login_identity_context() -> Dict[str, str]:
+    # Las URLs llevan ?v=mtime de cada imagen: también se vigila el directorio de imágenes.
+    return site_config_cache.get(
+        SITE_CONFIG_LOGIN_CONTEXT,
+        _build_login_identity_context,
+        watch=(IDENTIDAD_LOGIN_CONFIG_PATH, IDENTIDAD_LOGIN_IMAGE_DIR),
+    )
+
+
+def _read_plantillas_store() -> List[Dict[str, str]]:
     if not os.path.exists(PLANTILLAS_STORE_PATH):
         return _with_system_templates([])
     try:
@@ -676,10 +738,15 @@ def _with_system_templates(templates: List[Dict[str, str]]) -> List[Dict[str, st
     return [default_header, *templates]
 
 
+def _load_plantillas_store() -> List[Dict[str, str]]:
+    return site_config_cache.get(SITE_CONFIG_PLANTILLAS, _read_plantillas_store, watch=(PLANTILLAS_STORE_PATH,))
+
+
 def _save_plantillas_store(templates: List[Dict[str, str]]) -> None:
     os.makedirs(os.path.dirname(PLANTILLAS_STORE_PATH), exist_ok=True)
     with open(PLANTILLAS_STORE_PATH, "w", encoding="utf-8") as fh:
         json.dump(templates, fh, ensure_ascii=False, indent=2)
+    site_config_cache.invalidate(SITE_CONFIG_PLANTILLAS)
 
 
 def build_view_buttons_html(view_buttons: Optional[List[Dict]]) -> str:
@@ -855,6 +922,8 @@ IS_SQLITE_DATABASE = DATABASE_URL.startswith("sqlite:///")
 PRIMARY_DB_PATH = _extract_sqlite_path(DATABASE_URL)
 APP_ENV = APP_ENV_DEFAULT
 SESSION_MAX_AGE_SECONDS = int((os.environ.get("SESSION_MAX_AGE_SECONDS") or "28800").strip() or "28800")
+SESSION_IDENTITY_CACHE_TTL_SECONDS = int((os.environ.get("SESSION_IDENTITY_CACHE_TTL_SECONDS") or "60").strip() or "60")
+SESSION_IDENTITY_CACHE_MAX = int((os.environ.get("SESSION_IDENTITY_CACHE_MAX") or "512").strip() or "512")
 COOKIE_SECURE = (os.environ.get("COOKIE_SECURE") or "").strip().lower() in {"1", "true", "yes", "on"} or APP_ENV in {
     "production",
     "prod",
@@ -880,6 +949,7 @@ CSRF_PROTECTION_ENABLED = (os.environ.get("CSRF_PROTECTION_ENABLED") or "true").
 ENGINE_CONNECT_ARGS = {"check_same_thread": False} if IS_SQLITE_DATABASE else {}
 engine = create_engine(DATABASE_URL, connect_args=ENGINE_CONNECT_ARGS)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+install_session_hooks(SessionLocal)
 Base = declarative_base()
 
 class Colores(Base):
@@ -922,6 +992,9 @@ class Usuario(Base):
     jefe_inmediato = relationship("Usuario", remote_side=[id], backref="subordinados")
 
 
+install_directory_hooks(SessionLocal, Usuario)
+
+
 class StrategicAxisConfig(Base):
     __tablename__ = "strategic_axes_config"
 
@@ -974,6 +1047,7 @@ class POAActivity(Base):
     nombre = Column(String, nullable=False)
     codigo = Column(String, default="")
     responsable = Column(String, nullable=False)
+    responsable_key = Column(String, default="", index=True)
     entregable = Column(String, default="")
     fecha_inicial = Column(Date)
     fecha_final = Column(Date)
@@ -1002,6 +1076,7 @@ class POASubactivity(Base):
     nombre = Column(String, nullable=False)
     codigo = Column(String, default="")
     responsable = Column(String, nullable=False)
+    responsable_key = Column(String, default="", index=True)
     entregable = Column(String, default="")
     fecha_inicial = Column(Date)
     fecha_final = Column(Date)
@@ -1014,6 +1089,19 @@ class POASubactivity(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
+def normalize_owner_key(value: Any) -> str:
+    """Clave de responsable con el mismo criterio que ``_user_aliases``."""
+    return str(value or "").strip().lower()
+
+
+@event.listens_for(POAActivity, "before_insert")
+@event.listens_for(POAActivity, "before_update")
+@event.listens_for(POASubactivity, "before_insert")
+@event.listens_for(POASubactivity, "before_update")
+def _sync_responsable_key(mapper, connection, target) -> None:
+    target.responsable_key = normalize_owner_key(target.responsable)
+
+
 class POADeliverableApproval(Base):
     __tablename__ = "poa_deliverable_approvals"
 
@@ -1030,6 +1118,36 @@ class POADeliverableApproval(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
+class POAProgressRollup(Base):
+    __tablename__ = "poa_progress_rollup"
+    __table_args__ = (
+        UniqueConstraint("scope", "entity_id", name="uq_poa_progress_rollup_scope_entity"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String, nullable=False, index=True)
+    entity_id = Column(Integer, nullable=False)
+    parent_id = Column(Integer, index=True)
+    avance = Column(Integer, default=0, nullable=False)
+    total_items = Column(Integer, default=0, nullable=False)
+    done_items = Column(Integer, default=0, nullable=False)
+    next_change_on = Column(Date, index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class POAChangeLog(Base):
+    __tablename__ = "poa_change_log"
+
+    id = Column(Integer, primary_key=True, index=True)
+    entity_type = Column(String, nullable=False)
+    entity_id = Column(Integer, nullable=False, default=0)
+    action = Column(String, nullable=False, default="upsert")
+    objective_id = Column(Integer, index=True)
+    activity_id = Column(Integer)
+    changed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    seq = Column(Integer, index=True)
+
+
 class FormDefinition(Base):
     __tablename__ = "form_definitions"
 
@@ -1081,6 +1199,31 @@ class FormSubmission(Base):
     form = relationship("FormDefinition", back_populates="submissions")
 
 
+class FormNotificationOutbox(Base):
+    __tablename__ = "form_notification_outbox"
+    __table_args__ = (
+        Index("ix_form_notification_outbox_status_next", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    submission_id = Column(Integer, ForeignKey("form_submissions.id"), nullable=False, index=True)
+    form_id = Column(Integer, ForeignKey("form_definitions.id"), nullable=False, index=True)
+    channel = Column(String, nullable=False)
+    target = Column(String, default="")
+    payload = Column(JSON, default=dict)
+    status = Column(String, default="pendiente", nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=6, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    claimed_at = Column(DateTime)
+    claimed_by = Column(String, default="")
+    last_error = Column(Text, default="")
+    last_status_code = Column(Integer)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    sent_at = Column(DateTime)
+
+
 class DocumentoEvidencia(Base):
     __tablename__ = "documentos_evidencia"
 
@@ -1120,6 +1263,27 @@ class UserNotificationRead(Base):
     read_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
 
+class UserNotification(Base):
+    __tablename__ = "user_notifications"
+    __table_args__ = (
+        UniqueConstraint("user_key", "notification_id", name="uq_user_notification_scope"),
+        Index("ix_user_notifications_inbox", "user_key", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_key = Column(String, nullable=False)
+    notification_id = Column(String, nullable=False, index=True)
+    kind = Column(String, nullable=False, index=True)
+    title = Column(String, default="")
+    message = Column(Text, default="")
+    deadline_state = Column(String, default="")
+    href = Column(String, default="")
+    source_activity_id = Column(Integer, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    read_at = Column(DateTime)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class PublicLandingVisit(Base):
     __tablename__ = "public_landing_visits"
 
@@ -1134,6 +1298,42 @@ class PublicLandingVisit(Base):
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
 
 
+class PublicLandingPageRollup(Base):
+    __tablename__ = "public_landing_page_rollup"
+
+    id = Column(Integer, primary_key=True, index=True)
+    page = Column(String, nullable=False, unique=True)
+    visits = Column(Integer, default=0, nullable=False)
+    unique_sketch = Column(LargeBinary)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class PublicLandingDailyRollup(Base):
+    __tablename__ = "public_landing_daily_rollup"
+    __table_args__ = (
+        UniqueConstraint("page", "day", name="uq_public_landing_daily_rollup_page_day"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    page = Column(String, nullable=False)
+    day = Column(Date, nullable=False)
+    visits = Column(Integer, default=0, nullable=False)
+    unique_sketch = Column(LargeBinary)
+
+
+class PublicLandingLocationRollup(Base):
+    __tablename__ = "public_landing_location_rollup"
+    __table_args__ = (
+        UniqueConstraint("page", "label", name="uq_public_landing_location_rollup_page_label"),
+        Index("ix_public_landing_location_rollup_page_visits", "page", "visits"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    page = Column(String, nullable=False)
+    label = Column(String, nullable=False)
+    visits = Column(Integer, default=0, nullable=False)
+
+
 class PublicLeadRequest(Base):
     __tablename__ = "public_lead_requests"
 
@@ -1575,6 +1775,23 @@ def ensure_forms_schema() -> None:
         conn.commit()
 
 
+def ensure_form_outbox_schema() -> None:
+    if not IS_SQLITE_DATABASE or not PRIMARY_DB_PATH:
+        return
+    with sqlite3.connect(PRIMARY_DB_PATH) as conn:
+        table_exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='form_notification_outbox'"
+        ).fetchone()
+        if not table_exists:
+            return
+        cols = {row[1] for row in conn.execute('PRAGMA table_info(\"form_notification_outbox\")').fetchall()}
+        if "claimed_at" not in cols:
+            conn.execute('ALTER TABLE \"form_notification_outbox\" ADD COLUMN \"claimed_at\" DATETIME')
+        if "claimed_by" not in cols:
+            conn.execute('ALTER TABLE \"form_notification_outbox\" ADD COLUMN \"claimed_by\" VARCHAR DEFAULT \"\"')
+        conn.commit()
+
+
 def unify_users_table() -> None:
     """
     Unifica usuarios legacy (`usuarios`) dentro de la tabla canónica `users`.
@@ -1767,6 +1984,7 @@ def unify_users_table() -> None:
 Base.metadata.create_all(bind=engine)
 ensure_documentos_schema()
 ensure_forms_schema()
+ensure_form_outbox_schema()
 unify_users_table()
 ensure_default_roles()
 ensure_passkey_user_schema()
@@ -1775,6 +1993,11 @@ protect_sensitive_user_fields()
 ensure_system_superadmin_user()
 ensure_demo_admin_user_seed()
 ensure_default_strategic_axes_data()
+bootstrap_poa_schema(engine)
+install_poa_change_hooks(
+    SessionLocal,
+    (StrategicAxisConfig, StrategicObjectiveConfig, POAActivity, POASubactivity, POADeliverableApproval),
+)
 
 app = FastAPI(
     title="Módulo de Planificación Estratégica y POA",
@@ -1821,6 +2044,68 @@ async def seed_default_users_on_startup():
         print(f"[seed-startup] Error al sembrar usuarios por defecto: {exc}")
 
 
+@app.on_event("startup")
+async def start_event_bus_listener():
+    # Con Redis, cada worker escucha aunque no tenga conexiones SSE (invalidaciones de caché).
+    await get_event_broker().ensure_listening()
+
+
+@app.on_event("startup")
+async def start_poa_progress_rollover():
+    asyncio.create_task(progress_rollover_loop())
+
+
+@app.on_event("startup")
+async def start_notification_deadline_sweep():
+    asyncio.create_task(deadline_sweep_loop())
+
+
+@app.on_event("startup")
+async def start_geoip_enrichment():
+    start_geoip_enrichment_worker()
+
+
+@app.on_event("startup")
+async def start_public_visit_buffer():
+    try:
+        recovered = await asyncio.to_thread(replay_visit_spill_files)
+        if recovered:
+            print(f"[visit-buffer] Visitas recuperadas de spill: {recovered}")
+    except Exception as exc:
+        print(f"[visit-buffer] Error al recuperar spill: {exc}")
+    public_visit_buffer.start()
+
+
+@app.on_event("shutdown")
+async def stop_public_visit_buffer():
+    await asyncio.to_thread(public_visit_buffer.stop)
+
+
+@app.on_event("startup")
+async def start_form_outbox_dispatcher():
+    app.state.form_outbox_task = asyncio.create_task(form_outbox_dispatch_loop())
+
+
+@app.on_event("shutdown")
+async def stop_form_outbox_dispatcher():
+    task = getattr(app.state, "form_outbox_task", None)
+    if task is None or task.done():
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+@app.on_event("startup")
+async def seed_landing_rollups():
+    try:
+        await asyncio.to_thread(ensure_landing_rollups_seeded)
+    except Exception as exc:
+        print(f"[landing-analytics] Error al construir métricas agregadas: {exc}")
+
+
 @app.get("/health")
 def healthcheck():
     payload = {"status": "ok"}
@@ -1923,6 +2208,10 @@ async def enforce_backend_login(request: Request, call_next):
     request.state.user_name = session_data["username"]
     request.state.user_role = session_data["role"]
     request.state.tenant_id = _normalize_tenant_id(session_data.get("tenant_id"))
+    identity = _cached_session_identity(session_token)
+    if identity is None:
+        identity = await asyncio.to_thread(_resolve_session_identity, session_token, session_data)
+    request.state.identity = identity
 
     if (
         CSRF_PROTECTION_ENABLED
@@ -2219,6 +2508,13 @@ def _current_user_record(request: Request, db) -> Optional[Usuario]:
     session_username = (getattr(request.state, "user_name", None) or request.cookies.get("user_name") or "").strip()
     if not session_username:
         return None
+    identity = getattr(request.state, "identity", None)
+    if identity is not None and identity.username == session_username:
+        return db.get(Usuario, identity.user_id) if identity.user_id else None
+    return _lookup_user_record(session_username, db)
+
+
+def _lookup_user_record(session_username: str, db) -> Optional[Usuario]:
     lookup_hash = _sensitive_lookup_hash(session_username)
     user = db.query(Usuario).filter(Usuario.usuario_hash == lookup_hash).first()
     if not user:
@@ -2245,6 +2541,117 @@ def _user_aliases(user: Optional[Usuario], session_username: str) -> Set[str]:
     return aliases
 
 
+class SessionIdentity:
+    """Identidad compacta de la sesión: se resuelve una vez por petición."""
+
+    __slots__ = ("user_id", "username", "aliases", "department", "role", "tenant_id")
+
+    def __init__(
+        self,
+        user_id: Optional[int],
+        username: str,
+        aliases: frozenset,
+        department: str,
+        role: str,
+        tenant_id: str,
+    ):
+        self.user_id = user_id
+        self.username = username
+        self.aliases = aliases
+        self.department = department
+        self.role = role
+        self.tenant_id = tenant_id
+
+
+_SESSION_IDENTITY_CACHE: "OrderedDict[str, tuple[float, SessionIdentity]]" = OrderedDict()
+_SESSION_IDENTITY_LOCK = threading.Lock()
+
+
+def _session_identity_key(session_token: str) -> str:
+    return hashlib.sha256((session_token or "").encode("utf-8")).hexdigest()
+
+
+def _cached_session_identity(session_token: str) -> Optional[SessionIdentity]:
+    if not session_token or SESSION_IDENTITY_CACHE_TTL_SECONDS <= 0:
+        return None
+    key = _session_identity_key(session_token)
+    now = time.monotonic()
+    with _SESSION_IDENTITY_LOCK:
+        entry = _SESSION_IDENTITY_CACHE.get(key)
+        if not entry:
+            return None
+        expires_at, identity = entry
+        if expires_at <= now:
+            _SESSION_IDENTITY_CACHE.pop(key, None)
+            return None
+        _SESSION_IDENTITY_CACHE.move_to_end(key)
+        return identity
+
+
+def _store_session_identity(session_token: str, identity: SessionIdentity) -> None:
+    if not session_token or SESSION_IDENTITY_CACHE_TTL_SECONDS <= 0:
+        return
+    key = _session_identity_key(session_token)
+    with _SESSION_IDENTITY_LOCK:
+        _SESSION_IDENTITY_CACHE[key] = (time.monotonic() + SESSION_IDENTITY_CACHE_TTL_SECONDS, identity)
+        _SESSION_IDENTITY_CACHE.move_to_end(key)
+        while len(_SESSION_IDENTITY_CACHE) > max(SESSION_IDENTITY_CACHE_MAX, 1):
+            _SESSION_IDENTITY_CACHE.popitem(last=False)
+
+
+def invalidate_session_identity_cache(session_token: str = "") -> None:
+    """Sin token se vacía toda la caché (p. ej. tras editar usuarios)."""
+    with _SESSION_IDENTITY_LOCK:
+        if session_token:
+            _SESSION_IDENTITY_CACHE.pop(_session_identity_key(session_token), None)
+        else:
+            _SESSION_IDENTITY_CACHE.clear()
+
+
+def _build_session_identity(session_data: Dict[str, str], db) -> SessionIdentity:
+    session_username = (session_data.get("username") or "").strip()
+    user = _lookup_user_record(session_username, db) if session_username else None
+    department = (user.departamento or "").strip().lower() if user and user.departamento else ""
+    return SessionIdentity(
+        user_id=int(user.id) if user and getattr(user, "id", None) else None,
+        username=session_username,
+        aliases=frozenset(_user_aliases(user, session_username)),
+        department=department,
+        role=normalize_role_name(session_data.get("role")),
+        tenant_id=_normalize_tenant_id(session_data.get("tenant_id")),
+    )
+
+
+def _resolve_session_identity(session_token: str, session_data: Dict[str, str]) -> SessionIdentity:
+    identity = _cached_session_identity(session_token)
+    if identity is not None:
+        return identity
+    db = SessionLocal()
+    try:
+        identity = _build_session_identity(session_data, db)
+    finally:
+        db.close()
+    _store_session_identity(session_token, identity)
+    return identity
+
+
+def _request_identity(request: Request, db) -> SessionIdentity:
+    identity = getattr(request.state, "identity", None)
+    session_username = (getattr(request.state, "user_name", None) or request.cookies.get("user_name") or "").strip()
+    if identity is not None and identity.username == session_username:
+        return identity
+    identity = _build_session_identity(
+        {
+            "username": session_username,
+            "role": getattr(request.state, "user_role", None) or request.cookies.get("user_role") or "",
+            "tenant_id": get_current_tenant(request),
+        },
+        db,
+    )
+    request.state.identity = identity
+    return identity
+
+
 def _date_to_iso(value: Optional[Date]) -> str:
     if not value:
         return ""
@@ -2318,22 +2725,18 @@ def _is_user_process_owner(request: Request, db, process_owner: str) -> bool:
     owner = (process_owner or "").strip().lower()
     if not owner:
         return False
-    session_username = (getattr(request.state, "user_name", None) or request.cookies.get("user_name") or "").strip()
-    user = _current_user_record(request, db)
-    aliases = _user_aliases(user, session_username)
-    if owner in aliases:
+    identity = _request_identity(request, db)
+    if owner in identity.aliases:
         return True
-    user_department = (user.departamento or "").strip().lower() if user and user.departamento else ""
-    return bool(user_department and user_department == owner)
+    return bool(identity.department and identity.department == owner)
 
 
 def _notification_user_key(request: Request, db) -> str:
-    session_username = (getattr(request.state, "user_name", None) or request.cookies.get("user_name") or "").strip()
-    user = _current_user_record(request, db)
-    if user and getattr(user, "id", None):
-        return f"user:{int(user.id)}"
-    if session_username:
-        return f"username:{session_username.lower()}"
+    identity = _request_identity(request, db)
+    if identity.user_id:
+        return f"user:{int(identity.user_id)}"
+    if identity.username:
+        return f"username:{identity.username.lower()}"
     return ""
 
 
@@ -2347,78 +2750,6 @@ def _public_client_ip(request: Request) -> str:
     return (request.client.host if request.client else "") or ""
 
 
-def _is_public_ip_address(value: str) -> bool:
-    raw = (value or "").strip()
-    if not raw:
-        return False
-    try:
-        ip_obj = ipaddress.ip_address(raw)
-    except ValueError:
-        return False
-    if (
-        ip_obj.is_private
-        or ip_obj.is_loopback
-        or ip_obj.is_link_local
-        or ip_obj.is_multicast
-        or ip_obj.is_reserved
-        or ip_obj.is_unspecified
-    ):
-        return False
-    return True
-
-
-def _geoip_lookup_by_ip(ip_address: str) -> Dict[str, str]:
-    ip_value = (ip_address or "").strip()
-    if not _is_public_ip_address(ip_value):
-        return {"country": "", "region": "", "city": ""}
-
-    now_ts = int(time.time())
-    cached = _GEOIP_CACHE.get(ip_value)
-    if cached and int(cached.get("expires_at") or 0) > now_ts:
-        return {
-            "country": str(cached.get("country") or ""),
-            "region": str(cached.get("region") or ""),
-            "city": str(cached.get("city") or ""),
-        }
-
-    resolved = {"country": "", "region": "", "city": ""}
-    provider_urls = [
-        f"https://ipwho.is/{ip_value}",
-        f"https://ipapi.co/{ip_value}/json/",
-    ]
-    timeout = httpx.Timeout(1.8, connect=1.0)
-    for url in provider_urls:
-        try:
-            response = httpx.get(url, timeout=timeout)
-            if response.status_code != 200:
-                continue
-            data = response.json() if response.headers.get("content-type", "").startswith("application/json") else {}
-            if not isinstance(data, dict):
-                continue
-            if "ipwho.is" in url and data.get("success") is False:
-                continue
-            country = (
-                str(data.get("country_code") or data.get("countryCode") or data.get("country") or "")
-                .strip()
-                .upper()
-            )
-            region = str(data.get("region") or data.get("regionName") or "").strip()
-            city = str(data.get("city") or "").strip()
-            if country or region or city:
-                resolved = {"country": country, "region": region, "city": city}
-                break
-        except Exception:
-            continue
-
-    _GEOIP_CACHE[ip_value] = {
-        "country": resolved["country"],
-        "region": resolved["region"],
-        "city": resolved["city"],
-        "expires_at": now_ts + GEOIP_CACHE_TTL_SECONDS,
-    }
-    return resolved
-
-
 def _public_client_location(request: Request) -> Dict[str, str]:
     country = (
         request.headers.get("cf-ipcountry")
@@ -2432,16 +2763,7 @@ def _public_client_location(request: Request) -> Dict[str, str]:
         or ""
     ).strip()
     city = (request.headers.get("x-vercel-ip-city") or request.headers.get("x-city") or "").strip()
-    if country and (region or city):
-        return {"country": country, "region": region, "city": city}
-
-    resolved = _geoip_lookup_by_ip(_public_client_ip(request))
-    if not country:
-        country = (resolved.get("country") or "").strip().upper()
-    if not region:
-        region = (resolved.get("region") or "").strip()
-    if not city:
-        city = (resolved.get("city") or "").strip()
+    # Sólo encabezados del proxy: lo que falte lo completa el hilo de geoip.
     return {"country": country, "region": region, "city": city}
 
 
@@ -2546,6 +2868,7 @@ async def guardar_colores(request: Request, data: dict = Body(...)):
                 db.add(color)
         db.commit()
         db.close()
+        site_config_cache.invalidate(SITE_CONFIG_COLORES)
         return JSONResponse({"success": True})
     except Exception as e:
         return JSONResponse({"success": False, "error": str(e)}, status_code=500)
@@ -2606,100 +2929,36 @@ def web_funcionalidades(request: Request):
 @app.post("/api/public/track-visit")
 def track_public_visit(request: Request, data: dict = Body(default={})):
     page = _sanitize_public_page(str(data.get("page") or "funcionalidades"))
-    db = SessionLocal()
-    try:
-        geo = _public_client_location(request)
-        visit = PublicLandingVisit(
-            page=page,
-            ip_address=_public_client_ip(request),
-            user_agent=request.headers.get("user-agent") or "",
-            referrer=request.headers.get("referer") or "",
-            country=geo["country"],
-            region=geo["region"],
-            city=geo["city"],
-        )
-        db.add(visit)
-        db.commit()
-        return JSONResponse({"success": True})
-    except Exception as exc:
-        db.rollback()
-        return JSONResponse({"success": False, "error": str(exc)}, status_code=500)
-    finally:
-        db.close()
+    geo = _public_client_location(request)
+    # Se escribe por lotes desde visit_buffer; la petición no toca la base.
+    public_visit_buffer.add(
+        {
+            "page": page,
+            "ip_address": _public_client_ip(request),
+            "user_agent": request.headers.get("user-agent") or "",
+            "referrer": request.headers.get("referer") or "",
+            "country": geo["country"],
+            "region": geo["region"],
+            "city": geo["city"],
+            "created_at": datetime.utcnow(),
+        }
+    )
+    return JSONResponse({"success": True})
+
+
+@app.get("/api/admin/visit-buffer")
+def public_visit_buffer_stats(request: Request):
+    require_superadmin(request)
+    return JSONResponse({"success": True, "data": public_visit_buffer.stats()})
 
 
 @app.get("/api/public/landing-metrics")
 def public_landing_metrics(request: Request):
     page = _sanitize_public_page(request.query_params.get("page", "funcionalidades"))
-    db = SessionLocal()
     try:
-        total_visits = db.query(PublicLandingVisit).filter(PublicLandingVisit.page == page).count()
-        unique_visitors = (
-            db.query(func.count(func.distinct(PublicLandingVisit.ip_address)))
-            .filter(PublicLandingVisit.page == page, PublicLandingVisit.ip_address.isnot(None))
-            .scalar()
-            or 0
-        )
-        today_start = datetime.combine(datetime.utcnow().date(), datetime.min.time())
-        visits_today = (
-            db.query(PublicLandingVisit)
-            .filter(PublicLandingVisit.page == page, PublicLandingVisit.created_at >= today_start)
-            .count()
-        )
-        recent_rows = (
-            db.query(
-                PublicLandingVisit.country,
-                PublicLandingVisit.region,
-                PublicLandingVisit.city,
-                PublicLandingVisit.ip_address,
-            )
-            .filter(PublicLandingVisit.page == page)
-            .order_by(PublicLandingVisit.created_at.desc())
-            .limit(700)
-            .all()
-        )
-        location_counts: Dict[str, int] = {}
-        for row in recent_rows:
-            country = (row.country or "").strip()
-            region = (row.region or "").strip()
-            city = (row.city or "").strip()
-            if not (country or region or city):
-                resolved = _geoip_lookup_by_ip(str(row.ip_address or "").strip())
-                country = (resolved.get("country") or "").strip()
-                region = (resolved.get("region") or "").strip()
-                city = (resolved.get("city") or "").strip()
-            if city and region:
-                key = f"{city}, {region}"
-            elif city and country:
-                key = f"{city}, {country}"
-            elif region and country:
-                key = f"{region}, {country}"
-            elif country:
-                key = country
-            else:
-                key = "Ubicación no disponible"
-            location_counts[key] = location_counts.get(key, 0) + 1
-        top_locations = sorted(
-            [{"label": key, "count": value} for key, value in location_counts.items()],
-            key=lambda item: item["count"],
-            reverse=True,
-        )[:4]
-        return JSONResponse(
-            {
-                "success": True,
-                "data": {
-                    "page": page,
-                    "total_visits": int(total_visits),
-                    "unique_visitors": int(unique_visitors),
-                    "visits_today": int(visits_today),
-                    "top_locations": top_locations,
-                },
-            }
-        )
+        return JSONResponse({"success": True, "data": cached_landing_metrics(page)})
     except Exception as exc:
         return JSONResponse({"success": False, "error": str(exc)}, status_code=500)
-    finally:
-        db.close()
 
 
 @app.post("/api/public/lead-request")
@@ -2738,6 +2997,8 @@ def public_lead_request(request: Request, data: dict = Body(default={})):
         )
         db.add(record)
         db.commit()
+        if not (geo["country"] and (geo["region"] or geo["city"])):
+            enqueue_geoip_enrichment(GEOIP_KIND_LEAD, record.id, record.ip_address)
         return JSONResponse(
             {
                 "success": True,
@@ -2805,6 +3066,7 @@ def public_quiz_discount(request: Request, data: dict = Body(default={})):
             user_agent=request.headers.get("user-agent") or "",
         )
         db.add(record)
+        notify_quiz_submission(db, record)
         db.commit()
         db.refresh(record)
         return JSONResponse(
@@ -3258,7 +3520,8 @@ def passkey_auth_verify(
 
 @app.get("/logout")
 @app.get("/logout/")
-def logout():
+def logout(request: Request):
+    invalidate_session_identity_cache(request.cookies.get(AUTH_COOKIE_NAME, ""))
     response = RedirectResponse(url="/web/login", status_code=303)
     response.delete_cookie(AUTH_COOKIE_NAME)
     response.delete_cookie("user_role")
@@ -3270,11 +3533,16 @@ def logout():
     return response
 
 
-def get_colores_context() -> Dict[str, str]:
+def _read_colores() -> Dict[str, str]:
     db = SessionLocal()
-    colores = {c.key: c.value for c in db.query(Colores).all()}
-    db.close()
-    return colores
+    try:
+        return {c.key: c.value for c in db.query(Colores).all()}
+    finally:
+        db.close()
+
+
+def get_colores_context() -> Dict[str, str]:
+    return site_config_cache.get(SITE_CONFIG_COLORES, _read_colores, max_age=SITE_CONFIG_DB_MAX_AGE_SECONDS)
 
 
 def get_db():
@@ -3662,17 +3930,38 @@ def _notification_email_settings(form_definition: FormDefinition) -> Dict[str, A
     }
 
 
-def send_form_submission_email_notification(
+def build_form_submission_email(
     form_definition: FormDefinition,
     submission: FormSubmission,
 ) -> Dict[str, Any]:
+    """Mensaje serializable para la outbox, o ``{"reason": ...}`` si no se debe enviar."""
     settings = _notification_email_settings(form_definition)
     if not settings["enabled"]:
-        return {"sent": False, "reason": "not_enabled"}
-    recipients = [*settings["to"], *settings["cc"]]
-    if not recipients:
-        return {"sent": False, "reason": "no_recipients"}
+        return {"reason": "not_enabled"}
+    if not [*settings["to"], *settings["cc"]]:
+        return {"reason": "no_recipients"}
+    if not (os.environ.get("SMTP_HOST") or "").strip():
+        return {"reason": "smtp_not_configured"}
+
+    payload_text = json.dumps(submission.data or {}, ensure_ascii=False, indent=2)
+    body = "\n".join(
+        [
+            "Se recibió un nuevo envío de formulario.",
+            f"Formulario: {form_definition.name} ({form_definition.slug})",
+            f"Submission ID: {submission.id}",
+            f"Fecha: {submission.submitted_at.isoformat() if submission.submitted_at else ''}",
+            f"IP: {submission.ip_address or ''}",
+            f"User-Agent: {submission.user_agent or ''}",
+            "",
+            "Datos enviados:",
+            payload_text,
+        ]
+    )
+    return {"subject": settings["subject"], "to": settings["to"], "cc": settings["cc"], "body": body}
+
 
+def deliver_form_email(message_data: Dict[str, Any]) -> None:
+    """Envía por SMTP un mensaje de ``build_form_submission_email``; lanza excepción si falla."""
     smtp_host = (os.environ.get("SMTP_HOST") or "").strip()
     smtp_port = int(os.environ.get("SMTP_PORT") or 587)
     smtp_user = (os.environ.get("SMTP_USER") or "").strip()
@@ -3681,47 +3970,28 @@ def send_form_submission_email_notification(
     smtp_use_ssl = _to_bool(os.environ.get("SMTP_USE_SSL"), default=False)
     smtp_use_tls = _to_bool(os.environ.get("SMTP_USE_TLS"), default=not smtp_use_ssl)
     if not smtp_host:
-        return {"sent": False, "reason": "smtp_not_configured"}
+        raise RuntimeError("SMTP no configurado")
 
     message = EmailMessage()
-    message["Subject"] = settings["subject"]
+    message["Subject"] = message_data.get("subject") or ""
     message["From"] = smtp_from
-    message["To"] = ", ".join(settings["to"])
-    if settings["cc"]:
-        message["Cc"] = ", ".join(settings["cc"])
-    payload_text = json.dumps(submission.data or {}, ensure_ascii=False, indent=2)
-    message.set_content(
-        "\n".join(
-            [
-                "Se recibió un nuevo envío de formulario.",
-                f"Formulario: {form_definition.name} ({form_definition.slug})",
-                f"Submission ID: {submission.id}",
-                f"Fecha: {submission.submitted_at.isoformat() if submission.submitted_at else ''}",
-                f"IP: {submission.ip_address or ''}",
-                f"User-Agent: {submission.user_agent or ''}",
-                "",
-                "Datos enviados:",
-                payload_text,
-            ]
-        )
-    )
-
-    try:
-        if smtp_use_ssl:
-            with smtplib.SMTP_SSL(smtp_host, smtp_port, timeout=10) as server:
-                if smtp_user:
-                    server.login(smtp_user, smtp_password)
-                server.send_message(message)
-        else:
-            with smtplib.SMTP(smtp_host, smtp_port, timeout=10) as server:
-                if smtp_use_tls:
-                    server.starttls()
-                if smtp_user:
-                    server.login(smtp_user, smtp_password)
-                server.send_message(message)
-    except Exception as exc:
-        return {"sent": False, "reason": "smtp_error", "detail": str(exc)}
-        return {"sent": True}
+    message["To"] = ", ".join(message_data.get("to") or [])
+    if message_data.get("cc"):
+        message["Cc"] = ", ".join(message_data["cc"])
+    message.set_content(message_data.get("body") or "")
+
+    if smtp_use_ssl:
+        with smtplib.SMTP_SSL(smtp_host, smtp_port, timeout=10) as server:
+            if smtp_user:
+                server.login(smtp_user, smtp_password)
+            server.send_message(message)
+    else:
+        with smtplib.SMTP(smtp_host, smtp_port, timeout=10) as server:
+            if smtp_use_tls:
+                server.starttls()
+            if smtp_user:
+                server.login(smtp_user, smtp_password)
+            server.send_message(message)
 
 
 def _normalize_form_submission_payload(
@@ -3841,13 +4111,14 @@ def _normalize_webhook_configs(form_definition: FormDefinition) -> List[Dict[str
     return normalized
 
 
-def send_form_submission_webhooks(
+def build_form_submission_webhook_requests(
     form_definition: FormDefinition,
     submission: FormSubmission,
-) -> Dict[str, Any]:
+) -> List[Dict[str, Any]]:
+    """Una petición serializable por webhook configurado, lista para la outbox."""
     hooks = _normalize_webhook_configs(form_definition)
     if not hooks:
-        return {"attempted": 0, "succeeded": 0, "failed": 0, "results": []}
+        return []
 
     base_payload = {
         "event": "form_submission.created",
@@ -3864,56 +4135,13 @@ def send_form_submission_webhooks(
         },
         "data": submission.data or {},
     }
-
-    results: List[Dict[str, Any]] = []
-    succeeded = 0
-    for hook in hooks:
-        payload = (
-            base_payload.get("data", {})
-            if hook["payload_mode"] == "data_only"
-            else base_payload
-        )
-        try:
-            if hook["method"] == "GET":
-                response = httpx.request(
-                    method=hook["method"],
-                    url=hook["url"],
-                    params=payload if isinstance(payload, dict) else {},
-                    headers=hook["headers"],
-                    timeout=hook["timeout"],
-                )
-            else:
-                response = httpx.request(
-                    method=hook["method"],
-                    url=hook["url"],
-                    json=payload,
-                    headers=hook["headers"],
-                    timeout=hook["timeout"],
-                )
-            ok = 200 <= response.status_code < 300
-            if ok:
-                succeeded += 1
-            results.append(
-                {
-                    "url": hook["url"],
-                    "method": hook["method"],
-                    "status_code": response.status_code,
-                    "ok": ok,
-                }
-            )
-        except Exception as exc:
-            results.append(
-                {
-                    "url": hook["url"],
-                    "method": hook["method"],
-                    "ok": False,
-                    "error": str(exc),
-                }
-            )
-
-    attempted = len(hooks)
-    failed = attempted - succeeded
-    return {"attempted": attempted, "succeeded": succeeded, "failed": failed, "results": results}
+    return [
+        {
+            **hook,
+            "body": base_payload.get("data", {}) if hook["payload_mode"] == "data_only" else base_payload,
+        }
+        for hook in hooks
+    ]
 
 
 def _normalize_submission_value(value: Any) -> str:
@@ -5279,6 +5507,7 @@ def actualizar_usuario_seguro(request: Request, user_id: int, data: dict = Body(
         db.add(user)
         db.commit()
         db.refresh(user)
+        invalidate_session_identity_cache()
 
         return JSONResponse(
             {
@@ -5371,8 +5600,8 @@ def listar_usuarios_sanitizados(request: Request):
     finally:
         db.close()
 
-@app.get("/inicio", response_class=HTMLResponse)
-def inicio_page(request: Request):
+def _build_inicio_snapshot(db) -> Dict[str, Any]:
+    """Datos del tablero de inicio que salen de la base; se guardan por versión de datos."""
     perspective_defs = [
         {
             "key": "financiera",
@@ -5416,15 +5645,6 @@ def inicio_page(request: Request):
                 return item["key"]
         return "procesos_internos"
 
-    def add_months(anchor: Date, delta: int) -> Date:
-        idx = (anchor.month - 1) + delta
-        year = anchor.year + (idx // 12)
-        month = (idx % 12) + 1
-        return datetime(year, month, 1).date()
-
-    def month_end(month_start: Date) -> Date:
-        return add_months(month_start, 1) - timedelta(days=1)
-
     metrics = {
         item["key"]: {"objectives": 0, "activities": 0, "progress_values": []}
         for item in perspective_defs
@@ -5438,152 +5658,116 @@ def inicio_page(request: Request):
     objective_name_by_id: Dict[int, str] = {}
     objective_axis_name_by_id: Dict[int, str] = {}
 
-    db = SessionLocal()
-    try:
-        axes = (
-            db.query(StrategicAxisConfig)
-            .filter(StrategicAxisConfig.is_active == True)
-            .all()
-        )
-        axis_by_id = {int(axis.id): axis for axis in axes}
-        objectives = (
-            db.query(StrategicObjectiveConfig)
-            .filter(StrategicObjectiveConfig.is_active == True)
-            .all()
-        )
-        objective_ids = [int(obj.id) for obj in objectives]
-        activities = (
-            db.query(POAActivity)
-            .filter(POAActivity.objective_id.in_(objective_ids))
-            .all()
-            if objective_ids else []
-        )
-        activity_ids = [int(activity.id) for activity in activities]
-        subactivities = (
-            db.query(POASubactivity)
-            .filter(POASubactivity.activity_id.in_(activity_ids))
-            .all()
-            if activity_ids else []
+    axes = (
+        db.query(StrategicAxisConfig)
+        .filter(StrategicAxisConfig.is_active == True)
+        .all()
+    )
+    axis_by_id = {int(axis.id): axis for axis in axes}
+    objectives = (
+        db.query(StrategicObjectiveConfig)
+        .filter(StrategicObjectiveConfig.is_active == True)
+        .all()
+    )
+    aggregates = dashboard_aggregates(db)
+    now = aggregates["today"]
+    status_counts.update(aggregates["status_counts"])
+    activity_count_by_objective = aggregates["activities_by_objective"]
+    objective_rollup = aggregates["objective_progress"]
+    objective_slack_by_id = aggregates["objective_slack"]
+
+    for objective in objectives:
+        axis = axis_by_id.get(int(objective.eje_id))
+        axis_name = (axis.nombre if axis else "").strip() or "Sin eje"
+        objective_name_by_id[int(objective.id)] = (objective.nombre or "").strip() or "Sin nombre"
+        objective_axis_name_by_id[int(objective.id)] = axis_name
+        blob = " ".join(
+            [
+                str(objective.nombre or ""),
+                str(getattr(objective, "hito", "") or ""),
+                str(objective.descripcion or ""),
+                str(axis_name),
+            ]
         )
-        sub_by_activity: Dict[int, List[POASubactivity]] = {}
-        for sub in subactivities:
-            sub_by_activity.setdefault(int(sub.activity_id), []).append(sub)
-
-        now = datetime.utcnow().date()
-        activity_progress_by_id: Dict[int, int] = {}
-        activity_status_by_id: Dict[int, str] = {}
-        activity_progress_by_objective: Dict[int, List[int]] = {}
-
-        for activity in activities:
-            subs = sub_by_activity.get(int(activity.id), [])
-            status = _activity_status(activity, now)
-            if subs:
-                done_subs = sum(1 for sub in subs if sub.fecha_final and sub.fecha_final <= now)
-                progress = int(round((done_subs / len(subs)) * 100))
-            else:
-                progress = 100 if status == "Terminada" else 0
-            activity_status_by_id[int(activity.id)] = status
-            activity_progress_by_id[int(activity.id)] = progress
-            status_counts[status] = status_counts.get(status, 0) + 1
-            activity_progress_by_objective.setdefault(int(activity.objective_id), []).append(progress)
-
-        for objective in objectives:
-            axis = axis_by_id.get(int(objective.eje_id))
-            axis_name = (axis.nombre if axis else "").strip() or "Sin eje"
-            objective_name_by_id[int(objective.id)] = (objective.nombre or "").strip() or "Sin nombre"
-            objective_axis_name_by_id[int(objective.id)] = axis_name
-            blob = " ".join(
-                [
-                    str(objective.nombre or ""),
-                    str(getattr(objective, "hito", "") or ""),
-                    str(objective.descripcion or ""),
-                    str(axis_name),
-                ]
+        perspective_key = classify_perspective(blob)
+        activity_count = activity_count_by_objective.get(int(objective.id), 0)
+        objective_progress = objective_rollup.get(int(objective.id), 0)
+
+        metrics[perspective_key]["objectives"] += 1
+        metrics[perspective_key]["activities"] += activity_count
+        metrics[perspective_key]["progress_values"].append(objective_progress)
+
+        total_objectives += 1
+        total_activities += activity_count
+        total_progress_values.append(objective_progress)
+
+        # Holgura de la ruta crítica: negativa = el cierre del objetivo ya se recorrió.
+        objective_slack = objective_slack_by_id.get(int(objective.id))
+        if objective_slack is not None and objective_slack < 0:
+            objective_status = "rojo"
+            objective_status_label = "Atrasado"
+            risk_score = 100 - objective_slack
+        elif objective_slack is not None and objective_slack <= SLACK_WARNING_DAYS:
+            objective_status = "amarillo"
+            objective_status_label = "En riesgo"
+            risk_score = 50 + (SLACK_WARNING_DAYS - objective_slack)
+        elif objective_slack is not None:
+            objective_status = "verde"
+            objective_status_label = "Controlado"
+            risk_score = 0
+        # Sin ruta crítica (objetivo sin actividades con fechas): regla por fecha final y avance.
+        elif objective.fecha_final and objective.fecha_final < now and objective_progress < 100:
+            objective_status = "rojo"
+            objective_status_label = "Atrasado"
+            risk_score = 100 + (100 - objective_progress)
+        elif objective_progress < 60 and objective.fecha_final and (objective.fecha_final - now).days <= 45:
+            objective_status = "amarillo"
+            objective_status_label = "En riesgo"
+            risk_score = 60 + (60 - objective_progress)
+        elif objective_progress < 30:
+            objective_status = "amarillo"
+            objective_status_label = "En riesgo"
+            risk_score = 50 + (30 - objective_progress)
+        else:
+            objective_status = "verde"
+            objective_status_label = "Controlado"
+            risk_score = 0
+        if risk_score > 0:
+            risk_objective_rows.append(
+                {
+                    "id": int(objective.id),
+                    "nombre": objective_name_by_id[int(objective.id)],
+                    "eje": axis_name,
+                    "perspectiva": perspective_title_map.get(perspective_key, "Procesos"),
+                    "lider": (objective.lider or "").strip() or ((axis.lider_departamento or "").strip() if axis else "") or "Sin líder",
+                    "avance": objective_progress,
+                    "status": objective_status,
+                    "status_label": objective_status_label,
+                    "fecha_fin": objective.fecha_final.isoformat() if objective.fecha_final else "Sin fecha",
+                    "holgura": objective_slack,
+                    "score": risk_score,
+                }
             )
-            perspective_key = classify_perspective(blob)
-            progress_list = activity_progress_by_objective.get(int(objective.id), [])
-            objective_progress = int(round(sum(progress_list) / len(progress_list))) if progress_list else 0
-
-            metrics[perspective_key]["objectives"] += 1
-            metrics[perspective_key]["activities"] += len(progress_list)
-            metrics[perspective_key]["progress_values"].append(objective_progress)
-
-            total_objectives += 1
-            total_activities += len(progress_list)
-            total_progress_values.append(objective_progress)
-
-            due_days = 9999
-            if objective.fecha_final:
-                due_days = (objective.fecha_final - now).days
-            if objective.fecha_final and objective.fecha_final < now and objective_progress < 100:
-                objective_status = "rojo"
-                objective_status_label = "Atrasado"
-                risk_score = 100 + (100 - objective_progress)
-            elif objective_progress < 60 and due_days <= 45:
-                objective_status = "amarillo"
-                objective_status_label = "En riesgo"
-                risk_score = 60 + (60 - objective_progress)
-            elif objective_progress < 30:
-                objective_status = "amarillo"
-                objective_status_label = "En riesgo"
-                risk_score = 50 + (30 - objective_progress)
-            else:
-                objective_status = "verde"
-                objective_status_label = "Controlado"
-                risk_score = 0
-            if risk_score > 0:
-                risk_objective_rows.append(
-                    {
-                        "id": int(objective.id),
-                        "nombre": objective_name_by_id[int(objective.id)],
-                        "eje": axis_name,
-                        "perspectiva": perspective_title_map.get(perspective_key, "Procesos"),
-                        "lider": (objective.lider or "").strip() or ((axis.lider_departamento or "").strip() if axis else "") or "Sin líder",
-                        "avance": objective_progress,
-                        "status": objective_status,
-                        "status_label": objective_status_label,
-                        "fecha_fin": objective.fecha_final.isoformat() if objective.fecha_final else "Sin fecha",
-                        "score": risk_score,
-                    }
-                )
 
-        for activity in activities:
-            status_name = activity_status_by_id.get(int(activity.id), "No iniciada")
-            status_key, status_label = status_chip_map.get(status_name, ("gris", "No iniciado"))
-            progress = activity_progress_by_id.get(int(activity.id), 0)
-            due_days = 9999
-            if activity.fecha_final:
-                due_days = (activity.fecha_final - now).days
-
-            score = 0
-            if status_name == "Atrasada":
-                score += 100
-            elif status_name == "En revisión":
-                score += 70
-            elif status_name == "En proceso" and progress < 50 and due_days <= 30:
-                score += 55
-            elif status_name == "No iniciada" and due_days <= 15:
-                score += 40
-            score += max(0, 20 - min(20, progress // 5))
-            if score > 0:
-                start_label = activity.fecha_inicial.isoformat() if activity.fecha_inicial else "Sin inicio"
-                end_label = activity.fecha_final.isoformat() if activity.fecha_final else "Sin fin"
-                critical_activity_rows.append(
-                    {
-                        "id": int(activity.id),
-                        "nombre": (activity.nombre or "").strip() or "Actividad sin nombre",
-                        "periodo": f"{start_label} - {end_label}",
-                        "objetivo": objective_name_by_id.get(int(activity.objective_id), "Sin objetivo"),
-                        "responsable": (activity.responsable or "").strip() or "Sin responsable",
-                        "avance": progress,
-                        "entregables": 1 if (activity.entregable or "").strip() else 0,
-                        "status": status_key,
-                        "status_label": status_label,
-                        "score": score,
-                    }
-                )
-    finally:
-        db.close()
+    for activity in aggregates["critical_activities"]:
+        status_key, status_label = status_chip_map.get(activity["status"], ("gris", "No iniciado"))
+        start_label = activity["fecha_inicial"].isoformat() if activity["fecha_inicial"] else "Sin inicio"
+        end_label = activity["fecha_final"].isoformat() if activity["fecha_final"] else "Sin fin"
+        critical_activity_rows.append(
+            {
+                "id": activity["id"],
+                "nombre": (activity["nombre"] or "").strip() or "Actividad sin nombre",
+                "periodo": f"{start_label} - {end_label}",
+                "objetivo": objective_name_by_id.get(activity["objective_id"], "Sin objetivo"),
+                "responsable": (activity["responsable"] or "").strip() or "Sin responsable",
+                "avance": activity["avance"],
+                "entregables": 1 if (activity["entregable"] or "").strip() else 0,
+                "status": status_key,
+                "status_label": status_label,
+                "holgura": activity["holgura"],
+                "score": activity["score"],
+            }
+        )
 
     total_progress = int(round(sum(total_progress_values) / len(total_progress_values))) if total_progress_values else 0
     terminadas = status_counts.get("Terminada", 0)
@@ -5594,6 +5778,63 @@ def inicio_page(request: Request):
         + status_counts.get("En proceso", 0)
     )
 
+    month_names = ["Ene", "Feb", "Mar", "Abr", "May", "Jun", "Jul", "Ago", "Sep", "Oct", "Nov", "Dic"]
+    trend_labels = [
+        f"{month_names[point['month'].month - 1]}-{str(point['month'].year)[-2:]}"
+        for point in aggregates["trend"]
+    ]
+    trend_expected = [point["expected"] for point in aggregates["trend"]]
+    trend_real = [point["real"] for point in aggregates["trend"]]
+
+    perspective_progress = []
+    perspective_objectives = []
+    for item in perspective_defs:
+        data = metrics[item["key"]]
+        avg_progress = int(round(sum(data["progress_values"]) / len(data["progress_values"]))) if data["progress_values"] else 0
+        perspective_progress.append(avg_progress)
+        perspective_objectives.append(int(data["objectives"]))
+
+    donut_labels = ["No iniciado", "En proceso", "En revisión", "Terminada", "Atrasada"]
+    donut_values = [
+        status_counts.get("No iniciada", 0),
+        status_counts.get("En proceso", 0),
+        status_counts.get("En revisión", 0),
+        status_counts.get("Terminada", 0),
+        status_counts.get("Atrasada", 0),
+    ]
+
+    return {
+        "today": now,
+        "total_objectives": total_objectives,
+        "total_activities": total_activities,
+        "total_progress": total_progress,
+        "completion_ratio": completion_ratio,
+        "riesgo_count": riesgo_count,
+        "risk_rows": sorted(risk_objective_rows, key=lambda item: item["score"], reverse=True)[:8],
+        "critical_rows": sorted(critical_activity_rows, key=lambda item: item["score"], reverse=True)[:10],
+        "charts": {
+            "trend": {"labels": trend_labels, "real": trend_real, "expected": trend_expected},
+            "perspectives": {
+                "labels": [item["title"] for item in perspective_defs],
+                "avance": perspective_progress,
+                "meta": [85, 85, 85, 85],
+                "objetivos": perspective_objectives,
+            },
+            "status": {"labels": donut_labels, "values": donut_values},
+        },
+    }
+
+
+@app.get("/inicio", response_class=HTMLResponse)
+def inicio_page(request: Request):
+    snapshot = dashboard_snapshot(_build_inicio_snapshot)
+    now = snapshot["today"]
+    total_objectives = snapshot["total_objectives"]
+    total_activities = snapshot["total_activities"]
+    total_progress = snapshot["total_progress"]
+    completion_ratio = snapshot["completion_ratio"]
+    riesgo_count = snapshot["riesgo_count"]
+
     presupuesto_rows = 0
     presupuesto_total = 0.0
     presupuesto_por_rubro: Dict[str, float] = {}
@@ -5643,7 +5884,7 @@ def inicio_page(request: Request):
         proyectando_total = 0
 
     objective_rows_html = []
-    for row in sorted(risk_objective_rows, key=lambda item: item["score"], reverse=True)[:8]:
+    for row in snapshot["risk_rows"]:
         objective_rows_html.append(
             f"""
             <tr>
@@ -5655,17 +5896,18 @@ def inicio_page(request: Request):
                 <span>{row['avance']}%</span>
               </td>
               <td><span class="bscA__status" data-status="{escape(row['status'])}">{escape(row['status_label'])}</span></td>
+              <td class="bscA__num">{'—' if row['holgura'] is None else f"{row['holgura']} d"}</td>
               <td class="bscA__mono">{escape(row['fecha_fin'])}</td>
             </tr>
             """
         )
     if not objective_rows_html:
         objective_rows_html.append(
-            '<tr><td colspan="6" class="bscA__empty">Sin objetivos en riesgo en este momento.</td></tr>'
+            '<tr><td colspan="7" class="bscA__empty">Sin objetivos en riesgo en este momento.</td></tr>'
         )
 
     activity_rows_html = []
-    for row in sorted(critical_activity_rows, key=lambda item: item["score"], reverse=True)[:10]:
+    for row in snapshot["critical_rows"]:
         activity_rows_html.append(
             f"""
             <tr>
@@ -5677,92 +5919,24 @@ def inicio_page(request: Request):
                 <span>{row['avance']}%</span>
               </td>
               <td class="bscA__num">{row['entregables']}</td>
+              <td class="bscA__num">{row['holgura']} d</td>
               <td><span class="bscA__status" data-status="{escape(row['status'])}">{escape(row['status_label'])}</span></td>
             </tr>
             """
         )
     if not activity_rows_html:
         activity_rows_html.append(
-            '<tr><td colspan="6" class="bscA__empty">Sin actividades críticas en este momento.</td></tr>'
+            '<tr><td colspan="7" class="bscA__empty">Sin actividades críticas en este momento.</td></tr>'
         )
 
-    now = datetime.utcnow().date()
-    month_anchor = now.replace(day=1)
-    month_names = ["Ene", "Feb", "Mar", "Abr", "May", "Jun", "Jul", "Ago", "Sep", "Oct", "Nov", "Dic"]
-    trend_labels: List[str] = []
-    trend_expected: List[int] = []
-    trend_real: List[int] = []
-
-    if total_activities > 0:
-        db = SessionLocal()
-        try:
-            objective_ids = [
-                int(item.id)
-                for item in db.query(StrategicObjectiveConfig)
-                .filter(StrategicObjectiveConfig.is_active == True)
-                .all()
-            ]
-            activities = (
-                db.query(POAActivity)
-                .filter(POAActivity.objective_id.in_(objective_ids))
-                .all()
-                if objective_ids
-                else []
-            )
-            for offset in range(-11, 1):
-                ref_start = add_months(month_anchor, offset)
-                ref_end = month_end(ref_start)
-                trend_labels.append(f"{month_names[ref_start.month - 1]}-{str(ref_start.year)[-2:]}")
-                expected_due = sum(1 for activity in activities if activity.fecha_final and activity.fecha_final <= ref_end)
-                real_done = sum(
-                    1
-                    for activity in activities
-                    if activity.fecha_final
-                    and activity.fecha_final <= ref_end
-                    and _activity_status(activity, now) == "Terminada"
-                )
-                trend_expected.append(int(round((expected_due / len(activities)) * 100)) if activities else 0)
-                trend_real.append(int(round((real_done / len(activities)) * 100)) if activities else 0)
-        finally:
-            db.close()
-    else:
-        for offset in range(-11, 1):
-            ref_start = add_months(month_anchor, offset)
-            trend_labels.append(f"{month_names[ref_start.month - 1]}-{str(ref_start.year)[-2:]}")
-            trend_expected.append(0)
-            trend_real.append(0)
-
-    perspective_progress = []
-    perspective_objectives = []
-    for item in perspective_defs:
-        data = metrics[item["key"]]
-        avg_progress = int(round(sum(data["progress_values"]) / len(data["progress_values"]))) if data["progress_values"] else 0
-        perspective_progress.append(avg_progress)
-        perspective_objectives.append(int(data["objectives"]))
-
-    donut_labels = ["No iniciado", "En proceso", "En revisión", "Terminada", "Atrasada"]
-    donut_values = [
-        status_counts.get("No iniciada", 0),
-        status_counts.get("En proceso", 0),
-        status_counts.get("En revisión", 0),
-        status_counts.get("Terminada", 0),
-        status_counts.get("Atrasada", 0),
-    ]
-
     top_budget = sorted(presupuesto_por_rubro.items(), key=lambda item: item[1], reverse=True)[:6]
     budget_labels = [f"Rubro {item[0]}" for item in top_budget]
     budget_aprobado = [int(round(item[1])) for item in top_budget]
     budget_ejercido = [int(round(item[1] * (pres_ejecutado_pct / 100.0))) for item in top_budget]
 
+
     charts_payload = {
-        "trend": {"labels": trend_labels, "real": trend_real, "expected": trend_expected},
-        "perspectives": {
-            "labels": [item["title"] for item in perspective_defs],
-            "avance": perspective_progress,
-            "meta": [85, 85, 85, 85],
-            "objetivos": perspective_objectives,
-        },
-        "status": {"labels": donut_labels, "values": donut_values},
+        **snapshot["charts"],
         "budget": {"labels": budget_labels, "aprobado": budget_aprobado, "ejercido": budget_ejercido},
     }
     charts_payload_json = json.dumps(charts_payload, ensure_ascii=False).replace("</", "<\\/")
@@ -6078,7 +6252,7 @@ def inicio_page(request: Request):
           <div class="bscA__cardHeader">
             <div>
               <h3>Objetivos en riesgo</h3>
-              <p>Prioridad directiva (impacto + atraso + avance)</p>
+              <p>Prioridad por holgura de la ruta crítica</p>
             </div>
             <button class="bscA__btn" type="button">Ver todos</button>
           </div>
@@ -6091,6 +6265,7 @@ def inicio_page(request: Request):
                   <th>Líder</th>
                   <th>Avance</th>
                   <th>Estado</th>
+                  <th>Holgura</th>
                   <th>Fecha fin</th>
                 </tr>
               </thead>
@@ -6104,7 +6279,7 @@ def inicio_page(request: Request):
           <div class="bscA__cardHeader">
             <div>
               <h3>Actividades POA críticas</h3>
-              <p>Top actividades por atraso o revisión pendiente</p>
+              <p>Actividades pendientes con menor holgura</p>
             </div>
             <button class="bscA__btn bscA__btn--ghost" type="button">Exportar</button>
           </div>
@@ -6117,6 +6292,7 @@ def inicio_page(request: Request):
                   <th>Responsable</th>
                   <th>Avance</th>
                   <th>Entregables</th>
+                  <th>Holgura</th>
                   <th>Estado</th>
                 </tr>
               </thead>
@@ -6425,6 +6601,7 @@ async def empresa_base_datos_importar(request: Request, db_file: UploadFile = Fi
         if os.path.exists(db_path):
             shutil.copy2(db_path, backup_path)
         os.replace(tmp_path, db_path)
+        reset_poa_schema_registry()
         return RedirectResponse(
             url="/empresa/base-datos?status=ok&msg=Base%20de%20datos%20importada%20correctamente",
             status_code=303,
@@ -230,6 +230,7 @@ def api_guardar_colaborador(request: Request, data: dict = Body(...)):
         _encrypt_sensitive,
         _sensitive_lookup_hash,
         hash_password,
+        invalidate_session_identity_cache,
         normalize_role_name,
         require_admin_or_superadmin,
     )
@@ -348,6 +349,7 @@ def api_guardar_colaborador(request: Request, data: dict = Body(...)):
             db.add(existing)
             db.commit()
             db.refresh(existing)
+            invalidate_session_identity_cache()
             meta = _load_colab_meta()
             meta[str(existing.id)] = {
                 "colaborador": colaborador,
@@ -398,6 +400,7 @@ def api_guardar_colaborador(request: Request, data: dict = Body(...)):
         db.add(nuevo)
         db.commit()
         db.refresh(nuevo)
+        invalidate_session_identity_cache()
         meta = _load_colab_meta()
         meta[str(nuevo.id)] = {
             "colaborador": colaborador,
@@ -453,6 +456,7 @@ def api_eliminar_colaborador(request: Request, colaborador_id: int):
     from fastapi_modulo.main import (
         Usuario,
         Rol,
+        invalidate_session_identity_cache,
         normalize_role_name,
         require_admin_or_superadmin,
         is_superadmin,
@@ -477,6 +481,7 @@ def api_eliminar_colaborador(request: Request, colaborador_id: int):
             )
         db.delete(user)
         db.commit()
+        invalidate_session_identity_cache()
         meta = _load_colab_meta()
         key = str(colaborador_id)
         if key in meta:
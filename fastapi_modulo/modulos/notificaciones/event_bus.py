@@ -0,0 +1,239 @@
+"""Bus de eventos en proceso para empujar cambios por Server-Sent Events.
+
+Los manejadores no publican directamente: ``queue_event`` deja el evento en
+``session.info`` y sólo se publica cuando la transacción se confirma (un
+rollback lo descarta). El transporte es intercambiable:
+
+- ``InMemoryBroker`` (predeterminado y para pruebas) entrega dentro del proceso.
+- ``RedisBroker`` reparte entre workers mediante pub/sub de Redis; se activa
+  con ``EVENT_BUS_REDIS_URL``.
+
+En cada proceso, ``EventHub`` mantiene las colas de las conexiones SSE abiertas
+y reparte cada evento recibido del broker. Los eventos ``internal.*`` no llegan
+a las conexiones SSE: sólo los atienden los manejadores registrados con
+``on_event`` en cada proceso (p. ej. invalidar cachés locales).
+"""
+from __future__ import annotations
+
+import abc
+import asyncio
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import event
+
+EVENT_BUS_CHANNEL = (os.environ.get("EVENT_BUS_CHANNEL") or "sipet:events").strip() or "sipet:events"
+EVENT_BUS_REDIS_URL = (os.environ.get("EVENT_BUS_REDIS_URL") or "").strip()
+SUBSCRIBER_QUEUE_SIZE = int((os.environ.get("EVENT_BUS_QUEUE_SIZE") or "256").strip() or "256")
+
+INTERNAL_PREFIX = "internal."
+
+_PENDING_KEY = "event_bus_pending"
+
+
+class Subscription:
+    """Cola de una conexión; ``lagged`` indica que se descartaron eventos."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int = SUBSCRIBER_QUEUE_SIZE):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.lagged = False
+
+    def _offer(self, payload: Dict[str, Any]) -> None:
+        try:
+            self.queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            self.lagged = True
+
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventHub:
+    """Reparte eventos a las suscripciones locales; seguro entre hilos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions: List[Subscription] = []
+        self._handlers: Dict[str, List[Callable[[Dict[str, Any]], None]]] = {}
+
+    def add_handler(self, event_type: str, handler: Callable[[Dict[str, Any]], None]) -> None:
+        with self._lock:
+            handlers = self._handlers.setdefault(event_type, [])
+            if handler not in handlers:
+                handlers.append(handler)
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscriptions)
+
+    def dispatch(self, payload: Dict[str, Any]) -> None:
+        event_type = str(payload.get("type") or "")
+        with self._lock:
+            handlers = list(self._handlers.get(event_type, ()))
+            targets = [] if event_type.startswith(INTERNAL_PREFIX) else list(self._subscriptions)
+        for handler in handlers:
+            try:
+                handler(payload)
+            except Exception as exc:
+                print(f"[event-bus] Error en el manejador de {event_type}: {exc}")
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._offer, payload)
+            except RuntimeError:
+                # El loop de la conexión ya se cerró.
+                self.unsubscribe(subscription)
+
+
+class EventBroker(abc.ABC):
+    """Transporte de eventos entre procesos; las subclases definen ``publish``."""
+
+    def __init__(self, hub: EventHub):
+        self.hub = hub
+
+    @abc.abstractmethod
+    def publish(self, payload: Dict[str, Any]) -> None:
+        """Entrega ``payload`` a todos los procesos suscritos."""
+
+    async def ensure_listening(self) -> None:
+        """Arranca la recepción remota si el broker la necesita."""
+        return None
+
+
+class InMemoryBroker(EventBroker):
+    def publish(self, payload: Dict[str, Any]) -> None:
+        self.hub.dispatch(payload)
+
+
+class RedisBroker(EventBroker):
+    def __init__(self, hub: EventHub, url: str, channel: str = EVENT_BUS_CHANNEL):
+        super().__init__(hub)
+        import redis
+
+        self.url = url
+        self.channel = channel
+        self._client = redis.Redis.from_url(url)
+        self._listener: Optional[asyncio.Task] = None
+
+    def publish(self, payload: Dict[str, Any]) -> None:
+        try:
+            self._client.publish(self.channel, json.dumps(payload, default=str))
+        except Exception as exc:
+            print(f"[event-bus] No se pudo publicar en Redis: {exc}")
+
+    async def ensure_listening(self) -> None:
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self) -> None:
+        import redis.asyncio as redis_async
+
+        while True:
+            client = redis_async.Redis.from_url(self.url)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    try:
+                        self.hub.dispatch(json.loads(message.get("data") or b"{}"))
+                    except (TypeError, ValueError):
+                        continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                print(f"[event-bus] Conexión con Redis perdida: {exc}")
+                await asyncio.sleep(2.0)
+            finally:
+                try:
+                    await pubsub.close()
+                    await client.close()
+                except Exception:
+                    pass
+
+
+_HUB = EventHub()
+_BROKER: Optional[EventBroker] = None
+_BROKER_LOCK = threading.Lock()
+
+
+def get_event_hub() -> EventHub:
+    return _HUB
+
+
+def get_event_broker() -> EventBroker:
+    global _BROKER
+    if _BROKER is None:
+        with _BROKER_LOCK:
+            if _BROKER is None:
+                _BROKER = RedisBroker(_HUB, EVENT_BUS_REDIS_URL) if EVENT_BUS_REDIS_URL else InMemoryBroker(_HUB)
+    return _BROKER
+
+
+def set_event_broker(broker: Optional[EventBroker]) -> None:
+    """Sustituye el broker (pruebas o despliegues con otro transporte)."""
+    global _BROKER
+    with _BROKER_LOCK:
+        _BROKER = broker
+
+
+def on_event(event_type: str, handler: Callable[[Dict[str, Any]], None]) -> None:
+    """Registra un manejador local para ``event_type`` (propio o llegado de otro worker)."""
+    _HUB.add_handler(event_type, handler)
+
+
+def publish_event(payload: Dict[str, Any]) -> None:
+    get_event_broker().publish(payload)
+
+
+def queue_event(db, event_type: str, **fields: Any) -> None:
+    """Encola un evento para publicarlo cuando ``db`` confirme la transacción."""
+    db.info.setdefault(_PENDING_KEY, []).append({"type": event_type, **fields})
+
+
+def _resolve_pending(session) -> None:
+    pending = session.info.get(_PENDING_KEY)
+    if not pending:
+        return
+    if any(callable(item.get("cursor")) for item in pending):
+        session.flush()
+    for item in pending:
+        cursor = item.get("cursor")
+        if callable(cursor):
+            item["cursor"] = cursor()
+
+
+def _publish_pending(session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    for payload in pending or []:
+        publish_event(payload)
+
+
+def _discard_pending(session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def install_session_hooks(session_factory) -> None:
+    """Publica los eventos encolados tras cada commit de ``session_factory``."""
+    if event.contains(session_factory, "after_commit", _publish_pending):
+        return
+    event.listen(session_factory, "before_commit", _resolve_pending)
+    event.listen(session_factory, "after_commit", _publish_pending)
+    event.listen(session_factory, "after_rollback", _discard_pending)
@@ -0,0 +1,616 @@
+"""Bandeja de notificaciones materializada por usuario.
+
+Cada evento (aprobación de entregable, resolución de entregable, vencimiento
+de actividades/subactividades y cuestionario público) escribe sus filas en
+``user_notifications`` dentro de la misma transacción que lo origina, una por
+destinatario. El resumen de notificaciones queda como una lectura indexada
+``LIMIT 25`` por ``user_key`` y marcar como leída actualiza la propia fila.
+
+Los avisos de vencimiento dependen de la fecha, así que un barrido diario los
+vuelve a calcular; las ocurrencias de elementos recurrentes salen del índice
+``poa_occurrences``. El directorio de destinatarios (usuarios activos con sus
+alias descifrados) se arma una vez por proceso y se descarta cuando se confirma
+un cambio de usuario o vence ``NOTIFICATION_DIRECTORY_TTL``:
+``install_directory_hooks`` anota el cambio al hacer flush, invalida tras el
+commit (nunca si hay rollback) y avisa a los demás workers por el bus de
+eventos. Uso desde línea de comandos::
+
+    python -m fastapi_modulo.modulos.notificaciones.inbox rebuild
+    python -m fastapi_modulo.modulos.notificaciones.inbox sweep
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
+
+from fastapi_modulo.modulos.notificaciones.event_bus import on_event, queue_event
+from fastapi_modulo.modulos.planificacion.poa_calendar import (
+    ENTITY_ACTIVITY,
+    ENTITY_SUBACTIVITY,
+    ensure_occurrences_current,
+    upcoming_recurrences,
+)
+
+KIND_APPROVAL = "poa_aprobacion"
+KIND_DELIVERABLE = "poa_entregable"
+KIND_DEADLINE = "actividad_fecha"
+KIND_QUIZ = "quiz_descuento"
+
+INBOX_LIMIT = 25
+DEADLINE_LOOKAHEAD_DAYS = 2
+QUIZ_BACKFILL_LIMIT = 20
+DIRECTORY_TTL_SECONDS = float((os.environ.get("NOTIFICATION_DIRECTORY_TTL") or "300").strip() or "300")
+DIRECTORY_EVENT = "internal.user_directory"
+_DIRECTORY_DIRTY_KEY = "user_directory_dirty"
+
+_SWEEP_LOCK = threading.Lock()
+_SWEEP_DAY: Optional[date] = None
+_DIRECTORY_LOCK = threading.Lock()
+_DIRECTORY_CACHE: Optional[Tuple[float, List[Dict[str, Any]]]] = None
+_DIRECTORY_GENERATION = 0
+
+
+def _core():
+    from fastapi_modulo import main as core
+
+    return core
+
+
+def _today() -> date:
+    return datetime.utcnow().date()
+
+
+def _clean_ids(values: Iterable[Any]) -> Set[int]:
+    return {int(value) for value in values if value is not None and int(value) > 0}
+
+
+def _load_recipient_directory(db) -> List[Dict[str, Any]]:
+    """Usuarios activos con sus alias, departamento y rol normalizado."""
+    core = _core()
+    Usuario = core.Usuario
+    directory: List[Dict[str, Any]] = []
+    for user in db.query(Usuario).filter(Usuario.is_active.isnot(False)).all():
+        directory.append(
+            {
+                "key": f"user:{int(user.id)}",
+                "aliases": core._user_aliases(user, ""),
+                "department": (user.departamento or "").strip().lower(),
+                "role": core.normalize_role_name(user.role),
+            }
+        )
+    return directory
+
+
+def _recipient_directory(db) -> List[Dict[str, Any]]:
+    """Directorio cacheado por proceso; se recarga tras una invalidación o al vencer el TTL."""
+    global _DIRECTORY_CACHE
+    now = time.monotonic()
+    with _DIRECTORY_LOCK:
+        cached = _DIRECTORY_CACHE
+        generation = _DIRECTORY_GENERATION
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    directory = _load_recipient_directory(db)
+    with _DIRECTORY_LOCK:
+        # Si alguien invalidó mientras se cargaba, no se guarda una versión que pudo quedar vieja.
+        if generation == _DIRECTORY_GENERATION:
+            _DIRECTORY_CACHE = (now + DIRECTORY_TTL_SECONDS, directory)
+    return directory
+
+
+def invalidate_recipient_directory() -> None:
+    """Descarta el directorio de destinatarios (altas, cambios o bajas de usuarios)."""
+    global _DIRECTORY_CACHE, _DIRECTORY_GENERATION
+    with _DIRECTORY_LOCK:
+        _DIRECTORY_GENERATION += 1
+        _DIRECTORY_CACHE = None
+
+
+def install_directory_hooks(session_factory, user_model) -> None:
+    """Invalida el directorio cuando se confirma una transacción que tocó ``user_model``."""
+
+    def _mark(session, flush_context) -> None:
+        if session.info.get(_DIRECTORY_DIRTY_KEY):
+            return
+        touched = (*session.new, *session.dirty, *session.deleted)
+        if any(isinstance(item, user_model) for item in touched):
+            session.info[_DIRECTORY_DIRTY_KEY] = True
+            queue_event(session, DIRECTORY_EVENT)
+
+    def _invalidate(session) -> None:
+        if session.info.pop(_DIRECTORY_DIRTY_KEY, None):
+            invalidate_recipient_directory()
+
+    def _discard(session) -> None:
+        session.info.pop(_DIRECTORY_DIRTY_KEY, None)
+
+    event.listen(session_factory, "after_flush", _mark)
+    event.listen(session_factory, "after_commit", _invalidate)
+    event.listen(session_factory, "after_rollback", _discard)
+    on_event(DIRECTORY_EVENT, lambda payload: invalidate_recipient_directory())
+
+
+def _keys_for_alias(directory: List[Dict[str, Any]], name: str) -> Set[str]:
+    target = (name or "").strip().lower()
+    if not target:
+        return set()
+    keys = {entry["key"] for entry in directory if target in entry["aliases"]}
+    # Sin usuario registrado, la sesión usa "username:<nombre>" como clave.
+    return keys or {f"username:{target}"}
+
+
+def _keys_for_process_owner(directory: List[Dict[str, Any]], process_owner: str) -> Set[str]:
+    owner = (process_owner or "").strip().lower()
+    keys = {
+        entry["key"]
+        for entry in directory
+        if entry["role"] in {"administrador", "superadministrador"}
+        or (owner and (owner in entry["aliases"] or entry["department"] == owner))
+    }
+    if owner and not any(owner in entry["aliases"] for entry in directory):
+        keys.add(f"username:{owner}")
+    return keys
+
+
+def _sync_rows(db, existing_rows: Iterable[Any], desired: Dict[Tuple[str, str], Dict[str, Any]]) -> int:
+    """Deja en la bandeja exactamente ``desired``; conserva ``read_at`` de las filas que siguen."""
+    Notification = _core().UserNotification
+    existing = {(row.user_key, row.notification_id): row for row in existing_rows}
+    changed = 0
+    touched_users: Set[str] = set()
+    for key, row in existing.items():
+        if key not in desired:
+            db.delete(row)
+            changed += 1
+            touched_users.add(key[0])
+    now = datetime.utcnow()
+    for (user_key, notification_id), payload in desired.items():
+        row = existing.get((user_key, notification_id))
+        if row is None:
+            row = Notification(user_key=user_key, notification_id=notification_id)
+            db.add(row)
+            changed += 1
+            touched_users.add(user_key)
+        elif any(getattr(row, field) != value for field, value in payload.items()):
+            touched_users.add(user_key)
+        for field, value in payload.items():
+            setattr(row, field, value)
+        row.updated_at = now
+    db.flush()
+    for user_key in sorted(touched_users):
+        queue_event(db, "notification.changed", user_key=user_key)
+    return changed
+
+
+def _rows_for_notification_ids(db, notification_ids: Iterable[str]) -> List[Any]:
+    ids = sorted({str(item) for item in notification_ids if item})
+    if not ids:
+        return []
+    Notification = _core().UserNotification
+    return db.query(Notification).filter(Notification.notification_id.in_(ids)).all()
+
+
+def _approval_payload(approval, activity, objective) -> Dict[str, Any]:
+    return {
+        "kind": KIND_APPROVAL,
+        "title": "Aprobación de entregable pendiente",
+        "message": (
+            f"Actividad {(activity.nombre if activity else 'sin nombre')} "
+            f"({activity.codigo if activity else ''}) - Objetivo {(objective.nombre if objective else '')}"
+        ).strip(),
+        "deadline_state": "",
+        "href": "/poa/crear",
+        "created_at": approval.created_at or datetime.utcnow(),
+        "source_activity_id": int(approval.activity_id or 0) or None,
+    }
+
+
+def notify_pending_approval(db, approval, activity=None, objective=None, directory=None) -> int:
+    """Publica una aprobación pendiente a los dueños del proceso y a administración."""
+    core = _core()
+    if approval.id is None:
+        db.flush()
+    if activity is None:
+        activity = db.get(core.POAActivity, approval.activity_id)
+    if objective is None:
+        objective = db.get(core.StrategicObjectiveConfig, approval.objective_id)
+    notification_id = f"poa-approval-{int(approval.id)}"
+    queue_event(
+        db,
+        f"poa.approval.{(approval.status or 'pendiente').strip().lower()}",
+        entity_id=int(approval.id),
+        objective_id=int(approval.objective_id or 0) or None,
+        activity_id=int(approval.activity_id or 0) or None,
+    )
+    desired: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    if (approval.status or "").strip().lower() == "pendiente":
+        payload = _approval_payload(approval, activity, objective)
+        for user_key in _keys_for_process_owner(directory or _recipient_directory(db), approval.process_owner):
+            desired[(user_key, notification_id)] = payload
+    return _sync_rows(db, _rows_for_notification_ids(db, [notification_id]), desired)
+
+
+def notify_approval_resolved(db, approval, activity=None, directory=None) -> int:
+    """Retira la aprobación pendiente y avisa al solicitante del resultado."""
+    core = _core()
+    if activity is None:
+        activity = db.get(core.POAActivity, approval.activity_id)
+    directory = directory or _recipient_directory(db)
+    changed = notify_pending_approval(db, approval, activity=activity, directory=directory)
+    status = (approval.status or "").strip().lower()
+    notification_id = f"poa-deliverable-{int(approval.id)}"
+    desired: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    if status in {"autorizada", "rechazada"}:
+        label = "autorizado" if status == "autorizada" else "rechazado"
+        message = f"{(activity.nombre if activity else 'Actividad')} · Entregable {label}"
+        if (approval.comment or "").strip():
+            message = f"{message} · {approval.comment.strip()}"
+        payload = {
+            "kind": KIND_DELIVERABLE,
+            "title": f"Entregable {label}",
+            "message": message,
+            "deadline_state": "",
+            "href": f"/poa/crear?activity_id={int(approval.activity_id or 0)}",
+            "created_at": approval.resolved_at or datetime.utcnow(),
+            "source_activity_id": int(approval.activity_id or 0) or None,
+        }
+        for user_key in _keys_for_alias(directory, approval.requester):
+            desired[(user_key, notification_id)] = payload
+    return changed + _sync_rows(db, _rows_for_notification_ids(db, [notification_id]), desired)
+
+
+def notify_quiz_submission(db, quiz, directory=None) -> int:
+    """Publica un cuestionario público a los superadministradores."""
+    if quiz.id is None:
+        db.flush()
+    notification_id = f"quiz-submission-{int(quiz.id)}"
+    payload = {
+        "kind": KIND_QUIZ,
+        "title": "Nuevo cuestionario de descuento",
+        "message": (
+            f"{(quiz.nombre or '').strip()} · {(quiz.cooperativa or '').strip()} · "
+            f"{int(quiz.correctas or 0)}/10 correctas · {int(quiz.descuento or 0)}% de descuento"
+        ),
+        "deadline_state": "",
+        "href": "/usuarios",
+        "created_at": quiz.created_at or datetime.utcnow(),
+        "source_activity_id": None,
+    }
+    desired = {
+        (entry["key"], notification_id): payload
+        for entry in (directory or _recipient_directory(db))
+        if entry["role"] == "superadministrador"
+    }
+    return _sync_rows(db, _rows_for_notification_ids(db, [notification_id]), desired)
+
+
+def _deadline_message(label: str, nombre: str, due: date, today: date, parent_name: str = "") -> Tuple[str, str, str]:
+    delta_days = (due - today).days
+    if delta_days < 0:
+        if parent_name:
+            return "Tarea atrasada", f"{nombre} (subtarea de {parent_name}) está atrasada desde {due.isoformat()}", "atrasada"
+        return "Tarea atrasada", f"{nombre} está atrasada desde {due.isoformat()}", "atrasada"
+    if delta_days == 0:
+        return f"{label} vence hoy", f"{nombre} vence hoy", "por_vencer"
+    return f"{label} por vencer", f"{nombre} vence el {due.isoformat()}", "por_vencer"
+
+
+def _desired_deadlines(
+    db,
+    activity_ids: Optional[Set[int]],
+    today: date,
+    directory: List[Dict[str, Any]],
+) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    core = _core()
+    POAActivity = core.POAActivity
+    POASubactivity = core.POASubactivity
+    lookahead = today + timedelta(days=DEADLINE_LOOKAHEAD_DAYS)
+    desired: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    activity_query = db.query(POAActivity).filter(
+        POAActivity.fecha_final.isnot(None),
+        POAActivity.fecha_final <= lookahead,
+    )
+    if activity_ids is not None:
+        activity_query = activity_query.filter(POAActivity.id.in_(sorted(activity_ids)))
+    for activity in activity_query.all():
+        if (activity.entrega_estado or "").strip().lower() == "aprobada":
+            continue
+        if not (activity.responsable or "").strip():
+            continue
+        title, message, state = _deadline_message("Actividad", activity.nombre, activity.fecha_final, today)
+        payload = {
+            "kind": KIND_DEADLINE,
+            "title": title,
+            "message": message,
+            "deadline_state": state,
+            "href": "/poa/crear",
+            "created_at": datetime.combine(activity.fecha_final, datetime.min.time()),
+            "source_activity_id": int(activity.id),
+        }
+        for user_key in _keys_for_alias(directory, activity.responsable):
+            desired[(user_key, f"activity-deadline-{int(activity.id)}")] = payload
+
+    sub_query = (
+        db.query(POASubactivity, POAActivity)
+        .join(POAActivity, POAActivity.id == POASubactivity.activity_id)
+        .filter(POASubactivity.fecha_final.isnot(None), POASubactivity.fecha_final <= lookahead)
+    )
+    if activity_ids is not None:
+        sub_query = sub_query.filter(POASubactivity.activity_id.in_(sorted(activity_ids)))
+    for subactivity, parent in sub_query.all():
+        if not (subactivity.responsable or "").strip():
+            continue
+        # Si la actividad ya está terminada, no generar alerta de atraso para sus subtareas.
+        if core._activity_status(parent, today=today) == "Terminada":
+            continue
+        title, message, state = _deadline_message(
+            "Subtarea", subactivity.nombre, subactivity.fecha_final, today, parent_name=parent.nombre
+        )
+        payload = {
+            "kind": KIND_DEADLINE,
+            "title": title,
+            "message": message,
+            "deadline_state": state,
+            "href": f"/poa/crear?activity_id={int(parent.id or 0)}&subactivity_id={int(subactivity.id or 0)}",
+            "created_at": datetime.combine(subactivity.fecha_final, datetime.min.time()),
+            "source_activity_id": int(parent.id),
+        }
+        for user_key in _keys_for_alias(directory, subactivity.responsable):
+            desired[(user_key, f"subactivity-deadline-{int(subactivity.id)}")] = payload
+    desired.update(_desired_recurrences(db, activity_ids, today, lookahead, directory))
+    return desired
+
+
+def _desired_recurrences(
+    db,
+    activity_ids: Optional[Set[int]],
+    today: date,
+    lookahead: date,
+    directory: List[Dict[str, Any]],
+) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """Avisos de las ocurrencias intermedias de elementos recurrentes (rango sobre ``poa_occurrences``)."""
+    core = _core()
+    POAActivity = core.POAActivity
+    POASubactivity = core.POASubactivity
+    occurrences = upcoming_recurrences(db, today, lookahead, activity_ids)
+    if not occurrences:
+        return {}
+    activity_occurrence_ids = {entity_id for entity_type, entity_id, _ in occurrences if entity_type == ENTITY_ACTIVITY}
+    sub_occurrence_ids = {entity_id for entity_type, entity_id, _ in occurrences if entity_type == ENTITY_SUBACTIVITY}
+    subactivities = {
+        int(item.id): item
+        for item in (
+            db.query(POASubactivity).filter(POASubactivity.id.in_(sorted(sub_occurrence_ids))).all()
+            if sub_occurrence_ids
+            else []
+        )
+    }
+    parent_ids = activity_occurrence_ids | {int(item.activity_id) for item in subactivities.values()}
+    activities = {
+        int(item.id): item for item in db.query(POAActivity).filter(POAActivity.id.in_(sorted(parent_ids))).all()
+    }
+
+    desired: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for entity_type, entity_id, due in occurrences:
+        if entity_type == ENTITY_ACTIVITY:
+            activity = activities.get(entity_id)
+            if activity is None or (activity.entrega_estado or "").strip().lower() == "aprobada":
+                continue
+            owner, nombre, parent_name, label = activity.responsable, activity.nombre, "", "Actividad"
+            href = "/poa/crear"
+        else:
+            subactivity = subactivities.get(entity_id)
+            activity = activities.get(int(subactivity.activity_id)) if subactivity is not None else None
+            if activity is None or core._activity_status(activity, today=today) == "Terminada":
+                continue
+            owner, nombre, parent_name, label = subactivity.responsable, subactivity.nombre, activity.nombre, "Subtarea"
+            href = f"/poa/crear?activity_id={int(activity.id)}&subactivity_id={entity_id}"
+        if not (owner or "").strip():
+            continue
+        title, message, state = _deadline_message(label, nombre, due, today, parent_name=parent_name)
+        payload = {
+            "kind": KIND_DEADLINE,
+            "title": title,
+            "message": message,
+            "deadline_state": state,
+            "href": href,
+            "created_at": datetime.combine(due, datetime.min.time()),
+            "source_activity_id": int(activity.id),
+        }
+        notification_id = f"{entity_type}-occurrence-{entity_id}-{due.strftime('%Y%m%d')}"
+        for user_key in _keys_for_alias(directory, owner):
+            desired[(user_key, notification_id)] = payload
+    return desired
+
+
+def sync_deadline_notifications(
+    db,
+    activity_ids: Optional[Iterable[Any]] = None,
+    today: Optional[date] = None,
+    directory=None,
+) -> int:
+    """Recalcula los avisos de vencimiento; sin ``activity_ids`` recorre todo el POA."""
+    Notification = _core().UserNotification
+    current = today or _today()
+    ids = None if activity_ids is None else _clean_ids(activity_ids)
+    if ids is not None and not ids:
+        return 0
+    existing_query = db.query(Notification).filter(Notification.kind == KIND_DEADLINE)
+    if ids is not None:
+        existing_query = existing_query.filter(Notification.source_activity_id.in_(sorted(ids)))
+    desired = _desired_deadlines(db, ids, current, directory or _recipient_directory(db))
+    return _sync_rows(db, existing_query.all(), desired)
+
+
+def rebuild_notification_inbox(db, today: Optional[date] = None) -> int:
+    """Reconstruye la bandeja desde los datos vivos y conserva las lecturas previas."""
+    core = _core()
+    Notification = core.UserNotification
+    Approval = core.POADeliverableApproval
+    Quiz = core.PublicQuizSubmission
+    ReadMark = core.UserNotificationRead
+    invalidate_recipient_directory()
+    directory = _recipient_directory(db)
+
+    previous_reads: Dict[Tuple[str, str], datetime] = {
+        (row.user_key, row.notification_id): row.read_at for row in db.query(Notification).filter(Notification.read_at.isnot(None))
+    }
+    for row in db.query(ReadMark).all():
+        previous_reads.setdefault((row.user_key, row.notification_id), row.read_at)
+    # Las resoluciones de entregables son históricas: no se pueden recalcular y se conservan.
+    db.query(Notification).filter(Notification.kind != KIND_DELIVERABLE).delete(synchronize_session=False)
+    db.flush()
+
+    pending = (
+        db.query(Approval, core.POAActivity, core.StrategicObjectiveConfig)
+        .outerjoin(core.POAActivity, core.POAActivity.id == Approval.activity_id)
+        .outerjoin(core.StrategicObjectiveConfig, core.StrategicObjectiveConfig.id == Approval.objective_id)
+        .filter(Approval.status == "pendiente")
+        .all()
+    )
+    for approval, activity, objective in pending:
+        notify_pending_approval(db, approval, activity=activity, objective=objective, directory=directory)
+    quizzes = db.query(Quiz).order_by(Quiz.created_at.desc(), Quiz.id.desc()).limit(QUIZ_BACKFILL_LIMIT).all()
+    for quiz in quizzes:
+        notify_quiz_submission(db, quiz, directory=directory)
+    sync_deadline_notifications(db, today=today, directory=directory)
+
+    total = 0
+    for row in db.query(Notification).all():
+        total += 1
+        read_at = previous_reads.get((row.user_key, row.notification_id))
+        if read_at:
+            row.read_at = read_at
+    db.flush()
+    return total
+
+
+def ensure_notification_inbox_current(db) -> None:
+    """Una vez por proceso y día: construye la bandeja si está vacía o barre vencimientos."""
+    global _SWEEP_DAY
+    today = _today()
+    if _SWEEP_DAY == today:
+        return
+    with _SWEEP_LOCK:
+        if _SWEEP_DAY == today:
+            return
+        Notification = _core().UserNotification
+        ensure_occurrences_current(db)
+        try:
+            if db.query(Notification.id).first() is None:
+                rebuild_notification_inbox(db, today)
+            else:
+                sync_deadline_notifications(db, today=today)
+            db.commit()
+        except SQLAlchemyError:
+            db.rollback()
+            return
+        _SWEEP_DAY = today
+
+
+def _serialize_row(row) -> Dict[str, Any]:
+    item = {
+        "id": row.notification_id,
+        "kind": row.kind or "",
+        "title": row.title or "",
+        "message": row.message or "",
+        "created_at": (row.created_at or datetime.utcnow()).isoformat(),
+        "href": row.href or "",
+        "read": bool(row.read_at),
+    }
+    if row.deadline_state:
+        item["deadline_state"] = row.deadline_state
+    return item
+
+
+def inbox_items(db, user_key: str, limit: int = INBOX_LIMIT) -> List[Dict[str, Any]]:
+    """Últimas notificaciones del usuario (índice ``user_key, created_at``)."""
+    if not user_key:
+        return []
+    Notification = _core().UserNotification
+    rows = (
+        db.query(Notification)
+        .filter(Notification.user_key == user_key)
+        .order_by(Notification.created_at.desc(), Notification.id.desc())
+        .limit(limit)
+        .all()
+    )
+    return [_serialize_row(row) for row in rows]
+
+
+def mark_inbox_read(db, user_key: str, notification_ids: Iterable[str]) -> Set[str]:
+    """Marca como leídas las filas de la bandeja; devuelve los ids encontrados."""
+    ids = sorted({str(item).strip() for item in notification_ids if str(item or "").strip()})
+    if not user_key or not ids:
+        return set()
+    Notification = _core().UserNotification
+    rows = (
+        db.query(Notification)
+        .filter(Notification.user_key == user_key, Notification.notification_id.in_(ids))
+        .all()
+    )
+    now = datetime.utcnow()
+    for row in rows:
+        row.read_at = now
+    return {row.notification_id for row in rows}
+
+
+async def deadline_sweep_loop() -> None:
+    """Tarea de fondo: recalcula los vencimientos poco después de medianoche UTC."""
+    while True:
+        now = datetime.utcnow()
+        next_run = datetime(now.year, now.month, now.day) + timedelta(days=1, minutes=2)
+        await asyncio.sleep(max(60.0, (next_run - now).total_seconds()))
+        try:
+            await asyncio.to_thread(_run_sweep_job)
+        except Exception as exc:
+            print(f"[notificaciones] Error en barrido de vencimientos: {exc}")
+
+
+def _run_sweep_job() -> int:
+    global _SWEEP_DAY
+    db = _core().SessionLocal()
+    try:
+        ensure_occurrences_current(db)
+        changed = sync_deadline_notifications(db)
+        db.commit()
+        _SWEEP_DAY = _today()
+        return changed
+    except SQLAlchemyError:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = list(sys.argv[1:] if argv is None else argv)
+    command = (args[0] if args else "").strip().lower()
+    if command not in {"rebuild", "sweep"}:
+        print("Uso: python -m fastapi_modulo.modulos.notificaciones.inbox [rebuild|sweep]")
+        return 2
+    if command == "sweep":
+        print(f"[notificaciones] Filas actualizadas: {_run_sweep_job()}")
+        return 0
+    db = _core().SessionLocal()
+    try:
+        ensure_occurrences_current(db)
+        total = rebuild_notification_inbox(db)
+        db.commit()
+    finally:
+        db.close()
+    print(f"[notificaciones] Filas reconstruidas: {total}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -103,6 +103,11 @@ async def _store_asset(field: str, file_obj: UploadFile) -> Optional[str]:
     return filename
 
 
+def _invalidate_logo_cache() -> None:
+    from fastapi_modulo.main import SITE_CONFIG_LOGO_EMPRESA, site_config_cache
+    site_config_cache.invalidate(SITE_CONFIG_LOGO_EMPRESA)
+
+
 def _asset_url(filename: str) -> str:
     return f"/personalizar/uploads/{filename}"
 
@@ -149,6 +154,7 @@ def restablecer_assets(request: Request) -> JSONResponse:
     for field in ASSET_FIELDS:
         if _restore_active_from_default(field):
             restored.append(field)
+    _invalidate_logo_cache()
     return JSONResponse({"ok": True, "restored": restored, "assets": _assets_state()})
 
 
@@ -213,6 +219,7 @@ async def guardar_personalizacion(
         saved = await _store_asset(field, upload) if upload else None
         if saved:
             updated.append(field)
+    _invalidate_logo_cache()
 
     return JSONResponse(
         {
@@ -1,9 +1,14 @@
 from __future__ import annotations
 
-from datetime import datetime, timedelta
+from datetime import datetime
+from decimal import Decimal
 from textwrap import dedent
-from typing import Any, Dict, List, Set
+from typing import Any, Callable, Dict, List, Set
+import asyncio
+import hashlib
 import sqlite3
+import threading
+import time
 import csv
 import json
 import os
@@ -12,10 +17,91 @@ from io import StringIO
 from pathlib import Path
 
 from fastapi import APIRouter, Body, Request, Query, UploadFile, File
-from fastapi.responses import HTMLResponse, JSONResponse, Response
-from sqlalchemy import func, text
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, Response, StreamingResponse
+from sqlalchemy import func, inspect, text
 from sqlalchemy.exc import SQLAlchemyError
 
+from fastapi_modulo.modulos.notificaciones.event_bus import get_event_broker, get_event_hub
+from fastapi_modulo.modulos.notificaciones.inbox import (
+    ensure_notification_inbox_current,
+    inbox_items,
+    mark_inbox_read,
+    notify_approval_resolved,
+    notify_pending_approval,
+    sync_deadline_notifications,
+)
+from fastapi_modulo.modulos.planificacion.plan_export import (
+    PLAN_EXPORT_MEDIA_TYPE,
+    render_plan_export,
+    render_plan_sections,
+    schedule_plan_prerender,
+)
+from fastapi_modulo.modulos.planificacion.poa_calendar import (
+    MAX_RANGE_DAYS as OCCURRENCE_MAX_RANGE_DAYS,
+    create_occurrences_table,
+    ensure_occurrences_current,
+    occurrences_between,
+    refresh_activity_occurrences,
+)
+from fastapi_modulo.modulos.planificacion.poa_changes import (
+    ACTION_DELETE,
+    ACTION_RESET,
+    ENTITY_ACTIVITY,
+    ENTITY_AXIS,
+    ENTITY_OBJECTIVE,
+    ENTITY_SUBACTIVITY,
+    changes_since,
+    create_change_sequence_table,
+    poa_data_version,
+    record_poa_change,
+)
+from fastapi_modulo.modulos.planificacion.poa_critical_path import (
+    activity_dependencies,
+    add_dependency,
+    create_dependencies_table,
+    critical_path_snapshot,
+    delete_activity_dependencies,
+    delete_objective_dependencies,
+    remove_dependency,
+    schedule_payload,
+    slack_by_activity,
+)
+from fastapi_modulo.modulos.planificacion.poa_import import (
+    DB_WRITE_ERROR,
+    IMPORT_BACKGROUND_BYTES,
+    JOB_DONE as IMPORT_JOB_DONE,
+    create_import_job,
+    import_job_status,
+    missing_csv_headers,
+    read_csv_headers,
+    run_import_job,
+    spool_upload,
+)
+from fastapi_modulo.modulos.planificacion.poa_timeline import (
+    DEFAULT_ZOOM as TIMELINE_DEFAULT_ZOOM,
+    MAX_RANGE_DAYS as TIMELINE_MAX_RANGE_DAYS,
+    ZOOM_LEVELS as TIMELINE_ZOOM_LEVELS,
+    create_timeline_indexes,
+    timeline_window,
+)
+from fastapi_modulo.modulos.planificacion.poa_tree import (
+    ancestor_rows,
+    create_subactivity_closure_table,
+    link_subactivity,
+    move_subtree,
+    subtree_depths,
+    subtree_rows,
+    unlink_activity_subactivities,
+    unlink_subtree,
+)
+from fastapi_modulo.modulos.planificacion.poa_rollup import (
+    SCOPE_ACTIVITY,
+    SCOPE_AXIS,
+    SCOPE_OBJECTIVE,
+    progress_rollup_maps,
+    refresh_progress_rollups,
+)
+
 router = APIRouter()
 
 _APP_ENV = (os.environ.get("APP_ENV") or os.environ.get("ENVIRONMENT") or "development").strip().lower()
@@ -56,6 +142,7 @@ def _bind_core_symbols() -> None:
         '_validate_child_date_range',
         '_current_user_record',
         '_user_aliases',
+        '_request_identity',
         '_resolve_process_owner_for_objective',
         '_is_user_process_owner',
         '_notification_user_key',
@@ -124,11 +211,11 @@ def _poa_access_level_for_request(request: Request, db) -> str:
     _bind_core_symbols()
     if is_admin_or_superadmin(request):
         return "todas_tareas"
-    user = _current_user_record(request, db)
-    if not user or not getattr(user, "id", None):
+    identity = _request_identity(request, db)
+    if not identity.user_id:
         return "mis_tareas"
     meta = _load_colab_meta()
-    entry = meta.get(str(int(user.id))) if isinstance(meta, dict) else None
+    entry = meta.get(str(int(identity.user_id))) if isinstance(meta, dict) else None
     return _normalize_poa_access_level((entry or {}).get("poa_access_level", "mis_tareas"))
 
 
@@ -180,8 +267,14 @@ VALID_ACTIVITY_PERIODICITIES = {
 }
 
 
-def _ensure_strategic_identity_table(db) -> None:
-    db.execute(
+def _serial_id_column(conn) -> str:
+    if conn.dialect.name == "postgresql":
+        return "id SERIAL PRIMARY KEY"
+    return "id INTEGER PRIMARY KEY"
+
+
+def _create_strategic_identity_table(conn) -> None:
+    conn.execute(
         text(
             """
             CREATE TABLE IF NOT EXISTS strategic_identity_config (
@@ -213,12 +306,12 @@ def _normalize_foundation_text(raw: Any) -> str:
     return str(raw or "").strip()
 
 
-def _ensure_objective_kpi_table(db) -> None:
-    db.execute(
+def _create_objective_kpi_table(conn) -> None:
+    conn.execute(
         text(
-            """
+            f"""
             CREATE TABLE IF NOT EXISTS strategic_objective_kpis (
-              id INTEGER PRIMARY KEY AUTOINCREMENT,
+              {_serial_id_column(conn)},
               objective_id INTEGER NOT NULL,
               nombre VARCHAR(255) NOT NULL DEFAULT '',
               proposito TEXT NOT NULL DEFAULT '',
@@ -232,18 +325,18 @@ def _ensure_objective_kpi_table(db) -> None:
         )
     )
     # Backfill para instalaciones existentes sin la columna de referencia.
-    try:
-        cols = db.execute(text("PRAGMA table_info(strategic_objective_kpis)")).fetchall()
-        col_names = {str(col[1]).strip().lower() for col in cols if len(col) > 1}
-        if "referencia" not in col_names:
-            db.execute(
-                text(
-                    "ALTER TABLE strategic_objective_kpis ADD COLUMN referencia VARCHAR(120) NOT NULL DEFAULT ''"
-                )
+    if "referencia" not in _table_column_names(conn, "strategic_objective_kpis"):
+        conn.execute(
+            text(
+                "ALTER TABLE strategic_objective_kpis ADD COLUMN referencia VARCHAR(120) NOT NULL DEFAULT ''"
             )
-    except Exception:
-        # Evita romper el flujo si la BD no soporta PRAGMA/ALTER esperado.
-        pass
+        )
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_strategic_objective_kpis_objective_orden "
+            "ON strategic_objective_kpis (objective_id, orden, id)"
+        )
+    )
 
 
 def _normalize_kpi_items(raw: Any) -> List[Dict[str, str]]:
@@ -274,12 +367,108 @@ def _normalize_kpi_items(raw: Any) -> List[Dict[str, str]]:
     return cleaned
 
 
+def _child_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float, Decimal)):
+        return float(value)
+    return str(value)
+
+
+def _sync_child_rows(
+    db,
+    table: str,
+    parent_column: str,
+    parent_id: int,
+    columns: List[str],
+    rows: List[Dict[str, Any]],
+    key: Callable[[Any], Any],
+) -> List[int]:
+    """Sincroniza las filas hijas de ``parent_id`` con ``rows`` y devuelve sus ids en orden.
+
+    Cada fila entrante se empareja con una guardada por ``id`` (si lo trae y
+    pertenece al padre) o por ``key``. Las emparejadas sólo se actualizan si
+    cambió algún valor, las nuevas se insertan y las sobrantes se eliminan;
+    cada grupo va en un solo ``executemany``. ``columns`` debe incluir ``orden``.
+    """
+    column_sql = ", ".join(columns)
+    stored = (
+        db.execute(
+            text(f"SELECT id, {column_sql} FROM {table} WHERE {parent_column} = :pid ORDER BY orden ASC, id ASC"),
+            {"pid": int(parent_id)},
+        )
+        .mappings()
+        .all()
+    )
+    by_id = {int(row["id"]): row for row in stored}
+    by_key: Dict[Any, List[Any]] = {}
+    for row in stored:
+        by_key.setdefault(key(row), []).append(row)
+    claimed: Set[int] = set()
+    matches: List[Any] = []
+    for item in rows:
+        try:
+            item_id = int(item.get("id") or 0)
+        except (TypeError, ValueError):
+            item_id = 0
+        match = by_id.get(item_id)
+        if match is not None and item_id not in claimed:
+            claimed.add(item_id)
+            matches.append(match)
+        else:
+            matches.append(None)
+    for idx, item in enumerate(rows):
+        if matches[idx] is not None:
+            continue
+        for candidate in by_key.get(key(item), []):
+            candidate_id = int(candidate["id"])
+            if candidate_id not in claimed:
+                claimed.add(candidate_id)
+                matches[idx] = candidate
+                break
+
+    inserts: List[Dict[str, Any]] = []
+    updates: List[Dict[str, Any]] = []
+    for item, match in zip(rows, matches):
+        values = {column: item.get(column) for column in columns}
+        if match is None:
+            inserts.append({**values, "parent_id": int(parent_id)})
+        elif any(_child_value(match[column]) != _child_value(values[column]) for column in columns):
+            updates.append({**values, "row_id": int(match["id"])})
+    deletes = [{"row_id": int(row["id"])} for row in stored if int(row["id"]) not in claimed]
+
+    if deletes:
+        db.execute(text(f"DELETE FROM {table} WHERE id = :row_id"), deletes)
+    if updates:
+        assignments = ", ".join(f"{column} = :{column}" for column in columns)
+        db.execute(text(f"UPDATE {table} SET {assignments} WHERE id = :row_id"), updates)
+    new_ids: Dict[int, int] = {}
+    if inserts:
+        placeholders = ", ".join(f":{column}" for column in columns)
+        db.execute(
+            text(f"INSERT INTO {table} ({parent_column}, {column_sql}) VALUES (:parent_id, {placeholders})"),
+            inserts,
+        )
+        kept = {int(match["id"]) for match in matches if match is not None}
+        for row in db.execute(
+            text(f"SELECT id, orden FROM {table} WHERE {parent_column} = :pid"),
+            {"pid": int(parent_id)},
+        ).fetchall():
+            if int(row[0]) not in kept:
+                new_ids[int(row[1] or 0)] = int(row[0])
+    return [
+        int(match["id"]) if match is not None else new_ids.get(int(item.get("orden") or 0), 0)
+        for item, match in zip(rows, matches)
+    ]
+
+
 def _kpis_by_objective_ids(db, objective_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
     result: Dict[int, List[Dict[str, Any]]] = {}
     if not objective_ids:
         return result
     _ensure_objective_kpi_table(db)
-    db.commit()
     placeholders = ", ".join([f":id_{idx}" for idx, _ in enumerate(objective_ids)])
     sql = text(
         f"""
@@ -310,32 +499,21 @@ def _kpis_by_objective_ids(db, objective_ids: List[int]) -> Dict[int, List[Dict[
     return result
 
 
-def _replace_objective_kpis(db, objective_id: int, items: Any) -> None:
+def _replace_objective_kpis(db, objective_id: int, items: Any) -> List[Dict[str, Any]]:
     clean = _normalize_kpi_items(items)
     _ensure_objective_kpi_table(db)
-    db.execute(text("DELETE FROM strategic_objective_kpis WHERE objective_id = :oid"), {"oid": int(objective_id)})
-    for item in clean:
-        db.execute(
-            text(
-                """
-                INSERT INTO strategic_objective_kpis (
-                  objective_id, nombre, proposito, formula, periodicidad, estandar, referencia, orden
-                ) VALUES (
-                  :objective_id, :nombre, :proposito, :formula, :periodicidad, :estandar, :referencia, :orden
-                )
-                """
-            ),
-            {
-                "objective_id": int(objective_id),
-                "nombre": item["nombre"],
-                "proposito": item["proposito"],
-                "formula": item["formula"],
-                "periodicidad": item["periodicidad"],
-                "estandar": item["estandar"],
-                "referencia": item["referencia"],
-                "orden": int(item["orden"]),
-            },
-        )
+    ids = _sync_child_rows(
+        db,
+        "strategic_objective_kpis",
+        "objective_id",
+        int(objective_id),
+        ["nombre", "proposito", "formula", "periodicidad", "estandar", "referencia", "orden"],
+        clean,
+        key=lambda row: str(row["nombre"] or "").strip().lower(),
+    )
+    for item, item_id in zip(clean, ids):
+        item["id"] = item_id
+    return clean
 
 
 def _delete_objective_kpis(db, objective_id: int) -> None:
@@ -343,12 +521,12 @@ def _delete_objective_kpis(db, objective_id: int) -> None:
     db.execute(text("DELETE FROM strategic_objective_kpis WHERE objective_id = :oid"), {"oid": int(objective_id)})
 
 
-def _ensure_objective_milestone_table(db) -> None:
-    db.execute(
+def _create_objective_milestone_table(conn) -> None:
+    conn.execute(
         text(
-            """
+            f"""
             CREATE TABLE IF NOT EXISTS strategic_objective_milestones (
-              id INTEGER PRIMARY KEY AUTOINCREMENT,
+              {_serial_id_column(conn)},
               objective_id INTEGER NOT NULL,
               nombre VARCHAR(255) NOT NULL DEFAULT '',
               logrado INTEGER NOT NULL DEFAULT 0,
@@ -358,23 +536,25 @@ def _ensure_objective_milestone_table(db) -> None:
             """
         )
     )
-    try:
-        cols = db.execute(text("PRAGMA table_info(strategic_objective_milestones)")).fetchall()
-        col_names = {str(col[1]).strip().lower() for col in cols if len(col) > 1}
-        if "logrado" not in col_names:
-            db.execute(
-                text(
-                    "ALTER TABLE strategic_objective_milestones ADD COLUMN logrado INTEGER NOT NULL DEFAULT 0"
-                )
+    col_names = _table_column_names(conn, "strategic_objective_milestones")
+    if "logrado" not in col_names:
+        conn.execute(
+            text(
+                "ALTER TABLE strategic_objective_milestones ADD COLUMN logrado INTEGER NOT NULL DEFAULT 0"
             )
-        if "fecha_realizacion" not in col_names:
-            db.execute(
-                text(
-                    "ALTER TABLE strategic_objective_milestones ADD COLUMN fecha_realizacion DATE"
-                )
+        )
+    if "fecha_realizacion" not in col_names:
+        conn.execute(
+            text(
+                "ALTER TABLE strategic_objective_milestones ADD COLUMN fecha_realizacion DATE"
             )
-    except Exception:
-        pass
+        )
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_strategic_objective_milestones_objective_orden "
+            "ON strategic_objective_milestones (objective_id, orden, id)"
+        )
+    )
 
 
 def _normalize_milestone_items(raw: Any) -> List[Dict[str, Any]]:
@@ -400,7 +580,6 @@ def _milestones_by_objective_ids(db, objective_ids: List[int]) -> Dict[int, List
     if not objective_ids:
         return result
     _ensure_objective_milestone_table(db)
-    db.commit()
     placeholders = ", ".join([f":id_{idx}" for idx, _ in enumerate(objective_ids)])
     sql = text(
         f"""
@@ -431,23 +610,26 @@ def _milestones_by_objective_ids(db, objective_ids: List[int]) -> Dict[int, List
 def _replace_objective_milestones(db, objective_id: int, items: Any) -> List[Dict[str, Any]]:
     clean = _normalize_milestone_items(items)
     _ensure_objective_milestone_table(db)
-    db.execute(text("DELETE FROM strategic_objective_milestones WHERE objective_id = :oid"), {"oid": int(objective_id)})
-    for item in clean:
-        db.execute(
-            text(
-                """
-                INSERT INTO strategic_objective_milestones (objective_id, nombre, logrado, fecha_realizacion, orden)
-                VALUES (:objective_id, :nombre, :logrado, :fecha_realizacion, :orden)
-                """
-            ),
-            {
-                "objective_id": int(objective_id),
-                "nombre": item["nombre"],
-                "logrado": 1 if item.get("logrado") else 0,
-                "fecha_realizacion": item.get("fecha_realizacion") or None,
-                "orden": int(item["orden"]),
-            },
-        )
+    rows = [
+        {
+            "nombre": item["nombre"],
+            "logrado": 1 if item.get("logrado") else 0,
+            "fecha_realizacion": item.get("fecha_realizacion") or None,
+            "orden": int(item["orden"]),
+        }
+        for item in clean
+    ]
+    ids = _sync_child_rows(
+        db,
+        "strategic_objective_milestones",
+        "objective_id",
+        int(objective_id),
+        ["nombre", "logrado", "fecha_realizacion", "orden"],
+        rows,
+        key=lambda row: str(row["nombre"] or "").strip().lower(),
+    )
+    for item, item_id in zip(clean, ids):
+        item["id"] = item_id
     return clean
 
 
@@ -456,12 +638,12 @@ def _delete_objective_milestones(db, objective_id: int) -> None:
     db.execute(text("DELETE FROM strategic_objective_milestones WHERE objective_id = :oid"), {"oid": int(objective_id)})
 
 
-def _ensure_poa_budget_table(db) -> None:
-    db.execute(
+def _create_poa_budget_table(conn) -> None:
+    conn.execute(
         text(
-            """
+            f"""
             CREATE TABLE IF NOT EXISTS poa_activity_budgets (
-              id INTEGER PRIMARY KEY AUTOINCREMENT,
+              {_serial_id_column(conn)},
               activity_id INTEGER NOT NULL,
               tipo VARCHAR(120) NOT NULL DEFAULT '',
               rubro VARCHAR(255) NOT NULL DEFAULT '',
@@ -473,6 +655,12 @@ def _ensure_poa_budget_table(db) -> None:
             """
         )
     )
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_poa_activity_budgets_activity_orden "
+            "ON poa_activity_budgets (activity_id, orden, id)"
+        )
+    )
 
 
 def _to_budget_amount(value: Any) -> float:
@@ -528,7 +716,6 @@ def _budgets_by_activity_ids(db, activity_ids: List[int]) -> Dict[int, List[Dict
     if not activity_ids:
         return result
     _ensure_poa_budget_table(db)
-    db.commit()
     placeholders = ", ".join([f":id_{idx}" for idx, _ in enumerate(activity_ids)])
     sql = text(
         f"""
@@ -561,28 +748,28 @@ def _budgets_by_activity_ids(db, activity_ids: List[int]) -> Dict[int, List[Dict
 def _replace_activity_budgets(db, activity_id: int, items: Any) -> List[Dict[str, Any]]:
     clean = _normalize_budget_items(items)
     _ensure_poa_budget_table(db)
-    db.execute(text("DELETE FROM poa_activity_budgets WHERE activity_id = :aid"), {"aid": int(activity_id)})
-    for item in clean:
-        db.execute(
-            text(
-                """
-                INSERT INTO poa_activity_budgets (
-                  activity_id, tipo, rubro, mensual, anual, autorizado, orden
-                ) VALUES (
-                  :activity_id, :tipo, :rubro, :mensual, :anual, :autorizado, :orden
-                )
-                """
-            ),
-            {
-                "activity_id": int(activity_id),
-                "tipo": item["tipo"],
-                "rubro": item["rubro"],
-                "mensual": float(item["mensual"]),
-                "anual": float(item["anual"]),
-                "autorizado": 1 if item.get("autorizado") else 0,
-                "orden": int(item["orden"]),
-            },
-        )
+    rows = [
+        {
+            "tipo": item["tipo"],
+            "rubro": item["rubro"],
+            "mensual": float(item["mensual"]),
+            "anual": float(item["anual"]),
+            "autorizado": 1 if item.get("autorizado") else 0,
+            "orden": int(item["orden"]),
+        }
+        for item in clean
+    ]
+    ids = _sync_child_rows(
+        db,
+        "poa_activity_budgets",
+        "activity_id",
+        int(activity_id),
+        ["tipo", "rubro", "mensual", "anual", "autorizado", "orden"],
+        rows,
+        key=lambda row: (str(row["tipo"] or "").strip(), str(row["rubro"] or "").strip().lower()),
+    )
+    for item, item_id in zip(clean, ids):
+        item["id"] = item_id
     return clean
 
 
@@ -591,12 +778,12 @@ def _delete_activity_budgets(db, activity_id: int) -> None:
     db.execute(text("DELETE FROM poa_activity_budgets WHERE activity_id = :aid"), {"aid": int(activity_id)})
 
 
-def _ensure_poa_deliverables_table(db) -> None:
-    db.execute(
+def _create_poa_deliverables_table(conn) -> None:
+    conn.execute(
         text(
-            """
+            f"""
             CREATE TABLE IF NOT EXISTS poa_activity_deliverables (
-              id INTEGER PRIMARY KEY AUTOINCREMENT,
+              {_serial_id_column(conn)},
               activity_id INTEGER NOT NULL,
               nombre VARCHAR(255) NOT NULL DEFAULT '',
               validado INTEGER NOT NULL DEFAULT 0,
@@ -605,6 +792,12 @@ def _ensure_poa_deliverables_table(db) -> None:
             """
         )
     )
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_poa_activity_deliverables_activity_orden "
+            "ON poa_activity_deliverables (activity_id, orden, id)"
+        )
+    )
 
 
 def _normalize_deliverable_items(raw: Any) -> List[Dict[str, Any]]:
@@ -640,7 +833,6 @@ def _deliverables_by_activity_ids(db, activity_ids: List[int]) -> Dict[int, List
     if not activity_ids:
         return result
     _ensure_poa_deliverables_table(db)
-    db.commit()
     placeholders = ", ".join([f":id_{idx}" for idx, _ in enumerate(activity_ids)])
     sql = text(
         f"""
@@ -670,25 +862,26 @@ def _deliverables_by_activity_ids(db, activity_ids: List[int]) -> Dict[int, List
 def _replace_activity_deliverables(db, activity_id: int, items: Any) -> List[Dict[str, Any]]:
     clean = _normalize_deliverable_items(items)
     _ensure_poa_deliverables_table(db)
-    db.execute(text("DELETE FROM poa_activity_deliverables WHERE activity_id = :aid"), {"aid": int(activity_id)})
-    for item in clean:
-        db.execute(
-            text(
-                """
-                INSERT INTO poa_activity_deliverables (
-                  activity_id, nombre, validado, orden
-                ) VALUES (
-                  :activity_id, :nombre, :validado, :orden
-                )
-                """
-            ),
-            {
-                "activity_id": int(activity_id),
-                "nombre": item["nombre"],
-                "validado": 1 if item.get("validado") else 0,
-                "orden": int(item["orden"]),
-            },
-        )
+    rows = [
+        {
+            "id": item["id"],
+            "nombre": item["nombre"],
+            "validado": 1 if item.get("validado") else 0,
+            "orden": int(item["orden"]),
+        }
+        for item in clean
+    ]
+    ids = _sync_child_rows(
+        db,
+        "poa_activity_deliverables",
+        "activity_id",
+        int(activity_id),
+        ["nombre", "validado", "orden"],
+        rows,
+        key=lambda row: str(row["nombre"] or "").strip().lower(),
+    )
+    for item, item_id in zip(clean, ids):
+        item["id"] = item_id
     return clean
 
 
@@ -697,39 +890,36 @@ def _delete_activity_deliverables(db, activity_id: int) -> None:
     db.execute(text("DELETE FROM poa_activity_deliverables WHERE activity_id = :aid"), {"aid": int(activity_id)})
 
 
-def _ensure_poa_subactivity_recurrence_columns(db) -> None:
-    try:
-        cols = db.execute(text("PRAGMA table_info(poa_subactivities)")).fetchall()
-        col_names = {str(col[1]).strip().lower() for col in cols if len(col) > 1}
-        if "recurrente" not in col_names:
-            db.execute(
-                text(
-                    "ALTER TABLE poa_subactivities ADD COLUMN recurrente INTEGER NOT NULL DEFAULT 0"
-                )
+def _create_poa_subactivity_recurrence_columns(conn) -> None:
+    col_names = _table_column_names(conn, "poa_subactivities")
+    if not col_names:
+        return
+    if "recurrente" not in col_names:
+        conn.execute(
+            text(
+                "ALTER TABLE poa_subactivities ADD COLUMN recurrente INTEGER NOT NULL DEFAULT 0"
             )
-        if "periodicidad" not in col_names:
-            db.execute(
-                text(
-                    "ALTER TABLE poa_subactivities ADD COLUMN periodicidad VARCHAR(50) NOT NULL DEFAULT ''"
-                )
+        )
+    if "periodicidad" not in col_names:
+        conn.execute(
+            text(
+                "ALTER TABLE poa_subactivities ADD COLUMN periodicidad VARCHAR(50) NOT NULL DEFAULT ''"
             )
-        if "cada_xx_dias" not in col_names:
-            db.execute(
-                text(
-                    "ALTER TABLE poa_subactivities ADD COLUMN cada_xx_dias INTEGER"
-                )
+        )
+    if "cada_xx_dias" not in col_names:
+        conn.execute(
+            text(
+                "ALTER TABLE poa_subactivities ADD COLUMN cada_xx_dias INTEGER"
             )
-        db.commit()
-    except Exception:
-        db.rollback()
+        )
 
 
-def _ensure_activity_milestone_link_table(db) -> None:
-    db.execute(
+def _create_activity_milestone_link_table(conn) -> None:
+    conn.execute(
         text(
-            """
+            f"""
             CREATE TABLE IF NOT EXISTS poa_activity_milestone_links (
-              id INTEGER PRIMARY KEY AUTOINCREMENT,
+              {_serial_id_column(conn)},
               activity_id INTEGER NOT NULL,
               milestone_id INTEGER NOT NULL,
               orden INTEGER NOT NULL DEFAULT 0
@@ -737,6 +927,18 @@ def _ensure_activity_milestone_link_table(db) -> None:
             """
         )
     )
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_poa_activity_milestone_links_activity_orden "
+            "ON poa_activity_milestone_links (activity_id, orden, id)"
+        )
+    )
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_poa_activity_milestone_links_milestone "
+            "ON poa_activity_milestone_links (milestone_id)"
+        )
+    )
 
 
 def _normalize_impacted_milestone_ids(raw: Any) -> List[int]:
@@ -758,7 +960,6 @@ def _activity_milestones_by_activity_ids(db, activity_ids: List[int]) -> Dict[in
         return result
     _ensure_objective_milestone_table(db)
     _ensure_activity_milestone_link_table(db)
-    db.commit()
     placeholders = ", ".join([f":id_{idx}" for idx, _ in enumerate(activity_ids)])
     sql = text(
         f"""
@@ -788,21 +989,15 @@ def _activity_milestones_by_activity_ids(db, activity_ids: List[int]) -> Dict[in
 def _replace_activity_milestone_links(db, activity_id: int, milestone_ids: Any) -> List[int]:
     clean_ids = _normalize_impacted_milestone_ids(milestone_ids)
     _ensure_activity_milestone_link_table(db)
-    db.execute(text("DELETE FROM poa_activity_milestone_links WHERE activity_id = :aid"), {"aid": int(activity_id)})
-    for idx, milestone_id in enumerate(clean_ids, start=1):
-        db.execute(
-            text(
-                """
-                INSERT INTO poa_activity_milestone_links (activity_id, milestone_id, orden)
-                VALUES (:activity_id, :milestone_id, :orden)
-                """
-            ),
-            {
-                "activity_id": int(activity_id),
-                "milestone_id": int(milestone_id),
-                "orden": idx,
-            },
-        )
+    _sync_child_rows(
+        db,
+        "poa_activity_milestone_links",
+        "activity_id",
+        int(activity_id),
+        ["milestone_id", "orden"],
+        [{"milestone_id": int(milestone_id), "orden": idx} for idx, milestone_id in enumerate(clean_ids, start=1)],
+        key=lambda row: int(row["milestone_id"] or 0),
+    )
     return clean_ids
 
 
@@ -810,6 +1005,149 @@ def _delete_activity_milestone_links(db, activity_id: int) -> None:
     _ensure_activity_milestone_link_table(db)
     db.execute(text("DELETE FROM poa_activity_milestone_links WHERE activity_id = :aid"), {"aid": int(activity_id)})
 
+
+def _create_responsable_key_columns(conn) -> None:
+    for table_name in ("poa_activities", "poa_subactivities"):
+        col_names = _table_column_names(conn, table_name)
+        if not col_names:
+            continue
+        if "responsable_key" not in col_names:
+            conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN responsable_key VARCHAR(255) DEFAULT ''"))
+        conn.execute(
+            text(f"CREATE INDEX IF NOT EXISTS ix_{table_name}_responsable_key ON {table_name} (responsable_key)")
+        )
+        # Se normaliza en Python: LOWER de SQLite sólo convierte caracteres ASCII.
+        rows = conn.execute(text(f"SELECT id, responsable, responsable_key FROM {table_name}")).fetchall()
+        updates = []
+        for row_id, responsable, current_key in rows:
+            key = str(responsable or "").strip().lower()
+            if key != (current_key or ""):
+                updates.append({"key": key, "row_id": int(row_id)})
+        if updates:
+            conn.execute(text(f"UPDATE {table_name} SET responsable_key = :key WHERE id = :row_id"), updates)
+
+
+# Versión vigente de cada paso de esquema; subirla fuerza a reaplicarlo una vez.
+_POA_SCHEMA_STEPS = [
+    ("strategic_identity_config", 1, _create_strategic_identity_table),
+    ("strategic_objective_kpis", 2, _create_objective_kpi_table),
+    ("strategic_objective_milestones", 2, _create_objective_milestone_table),
+    ("poa_activity_budgets", 2, _create_poa_budget_table),
+    ("poa_activity_deliverables", 2, _create_poa_deliverables_table),
+    ("poa_subactivities_recurrence", 1, _create_poa_subactivity_recurrence_columns),
+    ("poa_activity_milestone_links", 2, _create_activity_milestone_link_table),
+    ("poa_subactivity_closure", 1, create_subactivity_closure_table),
+    ("poa_responsable_keys", 1, _create_responsable_key_columns),
+    ("poa_occurrences", 2, create_occurrences_table),
+    ("poa_date_indexes", 1, create_timeline_indexes),
+    ("poa_activity_dependencies", 1, create_dependencies_table),
+    ("poa_change_sequence", 1, create_change_sequence_table),
+]
+_POA_SCHEMA_VERSIONS = {name: version for name, version, _ in _POA_SCHEMA_STEPS}
+_POA_SCHEMA_READY: Dict[str, int] = {}
+_POA_SCHEMA_LOCK = threading.Lock()
+
+
+def _table_column_names(conn, table_name: str) -> Set[str]:
+    inspector = inspect(conn)
+    if not inspector.has_table(table_name):
+        return set()
+    return {str(col.get("name") or "").strip().lower() for col in inspector.get_columns(table_name)}
+
+
+def bootstrap_poa_schema(bind) -> None:
+    """Aplica los pasos de esquema pendientes y los registra en schema_registry."""
+    with _POA_SCHEMA_LOCK:
+        with bind.begin() as conn:
+            conn.execute(
+                text(
+                    """
+                    CREATE TABLE IF NOT EXISTS schema_registry (
+                      name VARCHAR(80) PRIMARY KEY,
+                      version INTEGER NOT NULL DEFAULT 0,
+                      applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                    )
+                    """
+                )
+            )
+            applied = {
+                str(row[0]): int(row[1] or 0)
+                for row in conn.execute(text("SELECT name, version FROM schema_registry")).fetchall()
+            }
+            for name, version, apply_step in _POA_SCHEMA_STEPS:
+                if applied.get(name, 0) >= version:
+                    continue
+                apply_step(conn)
+                params = {"name": name, "version": version, "applied_at": datetime.utcnow()}
+                updated = conn.execute(
+                    text("UPDATE schema_registry SET version = :version, applied_at = :applied_at WHERE name = :name"),
+                    params,
+                )
+                if not updated.rowcount:
+                    conn.execute(
+                        text("INSERT INTO schema_registry (name, version, applied_at) VALUES (:name, :version, :applied_at)"),
+                        params,
+                    )
+        _POA_SCHEMA_READY.clear()
+        _POA_SCHEMA_READY.update(_POA_SCHEMA_VERSIONS)
+
+
+def reset_poa_schema_registry() -> None:
+    """Olvida el estado en memoria; usar tras reemplazar el archivo de base de datos."""
+    with _POA_SCHEMA_LOCK:
+        _POA_SCHEMA_READY.clear()
+
+
+def _ensure_poa_schema(db, name: str) -> None:
+    if _POA_SCHEMA_READY.get(name) == _POA_SCHEMA_VERSIONS[name]:
+        return
+    bootstrap_poa_schema(db.get_bind())
+
+
+def _ensure_strategic_identity_table(db) -> None:
+    _ensure_poa_schema(db, "strategic_identity_config")
+
+
+def _ensure_objective_kpi_table(db) -> None:
+    _ensure_poa_schema(db, "strategic_objective_kpis")
+
+
+def _ensure_objective_milestone_table(db) -> None:
+    _ensure_poa_schema(db, "strategic_objective_milestones")
+
+
+def _ensure_poa_budget_table(db) -> None:
+    _ensure_poa_schema(db, "poa_activity_budgets")
+
+
+def _ensure_poa_deliverables_table(db) -> None:
+    _ensure_poa_schema(db, "poa_activity_deliverables")
+
+
+def _ensure_poa_subactivity_recurrence_columns(db) -> None:
+    _ensure_poa_schema(db, "poa_subactivities_recurrence")
+
+
+def _ensure_activity_milestone_link_table(db) -> None:
+    _ensure_poa_schema(db, "poa_activity_milestone_links")
+
+
+def _ensure_subactivity_closure_table(db) -> None:
+    _ensure_poa_schema(db, "poa_subactivity_closure")
+
+
+def _ensure_occurrences_table(db) -> None:
+    _ensure_poa_schema(db, "poa_occurrences")
+
+
+def _ensure_date_indexes(db) -> None:
+    _ensure_poa_schema(db, "poa_date_indexes")
+
+
+def _ensure_dependencies_table(db) -> None:
+    _ensure_poa_schema(db, "poa_activity_dependencies")
+
+
 STRATEGIC_POA_CSV_HEADERS = [
     "tipo_registro",
     "axis_codigo",
@@ -901,68 +1239,6 @@ def _strategic_poa_template_rows() -> List[Dict[str, str]]:
     ]
 
 
-def _csv_value(row: Dict[str, Any], key: str) -> str:
-    return str((row.get(key) or "")).strip()
-
-
-def _normalize_import_kind(value: str) -> str:
-    raw = str(value or "").strip().lower()
-    aliases = {
-        "axis": "eje",
-        "eje": "eje",
-        "objetivo": "objetivo",
-        "objective": "objetivo",
-        "actividad": "actividad",
-        "activity": "actividad",
-        "subactividad": "subactividad",
-        "subactivity": "subactividad",
-    }
-    return aliases.get(raw, raw)
-
-
-def _parse_import_date(value: str) -> Any:
-    raw = str(value or "").strip()
-    if not raw:
-        return None
-    try:
-        return datetime.strptime(raw, "%Y-%m-%d").date()
-    except ValueError:
-        raise ValueError(f"Fecha inválida '{raw}', use formato YYYY-MM-DD")
-
-
-def _parse_import_int(value: str, fallback: int = 0) -> int:
-    raw = str(value or "").strip()
-    if not raw:
-        return fallback
-    return int(raw)
-
-
-def _parse_import_bool(value: str) -> bool:
-    raw = str(value or "").strip().lower()
-    return raw in {"1", "true", "yes", "si", "sí", "on"}
-
-
-def _descendant_subactivity_ids(db, activity_id: int, root_id: int) -> List[int]:
-    rows = (
-        db.query(POASubactivity.id, POASubactivity.parent_subactivity_id)
-        .filter(POASubactivity.activity_id == activity_id)
-        .all()
-    )
-    children: Dict[int, List[int]] = {}
-    for sub_id, parent_id in rows:
-        if parent_id is None:
-            continue
-        children.setdefault(int(parent_id), []).append(int(sub_id))
-    collected: List[int] = []
-    stack = [int(root_id)]
-    while stack:
-        current = stack.pop()
-        for child in children.get(current, []):
-            collected.append(child)
-            stack.append(child)
-    return collected
-
-
 def _serialize_poa_subactivity(item: POASubactivity) -> Dict[str, Any]:
     _bind_core_symbols()
     today = datetime.utcnow().date()
@@ -992,10 +1268,13 @@ def _serialize_poa_activity(
     budget_items: List[Dict[str, Any]] | None = None,
     hitos_impacta: List[Dict[str, Any]] | None = None,
     deliverables: List[Dict[str, Any]] | None = None,
+    progress: int | None = None,
 ) -> Dict[str, Any]:
     _bind_core_symbols()
     today = datetime.utcnow().date()
-    if subactivities:
+    if progress is not None:
+        activity_progress = int(progress)
+    elif subactivities:
         done_subs = sum(1 for sub in subactivities if sub.fecha_final and today >= sub.fecha_final)
         activity_progress = int(round((done_subs / len(subactivities)) * 100))
     else:
@@ -5018,10 +5297,26 @@ EJES_ESTRATEGICOS_HTML = dedent("""
               credentials: "same-origin",
               body: formData,
             });
-            const payload = await response.json().catch(() => ({}));
+            let payload = await response.json().catch(() => ({}));
             if (!response.ok || payload.success === false) {
               throw new Error(payload.error || "No se pudo importar el archivo.");
             }
+            if (response.status === 202 && payload.status_url) {
+              while (true) {
+                await new Promise((resolve) => setTimeout(resolve, 1500));
+                const statusResponse = await fetch(payload.status_url, { credentials: "same-origin" });
+                const statusPayload = await statusResponse.json().catch(() => ({}));
+                const job = statusPayload.data || {};
+                if (!statusResponse.ok || statusPayload.success === false || job.status === "error") {
+                  throw new Error(job.error || statusPayload.error || "No se pudo importar el archivo.");
+                }
+                if (job.status === "completado") {
+                  payload = job;
+                  break;
+                }
+                showMsg(`Importando plantilla estratégica y POA... ${Number(job.progress || 0)}%`);
+              }
+            }
             await Promise.all([loadDepartments(), loadAxes()]);
             await loadCollaborators();
             await loadObjectiveActivities();
@@ -8459,10 +8754,26 @@ POA_LIMPIO_HTML = dedent("""
               credentials: "same-origin",
               body: formData,
             });
-            const payload = await response.json().catch(() => ({}));
+            let payload = await response.json().catch(() => ({}));
             if (!response.ok || payload.success === false) {
               throw new Error(payload.error || "No se pudo importar el archivo.");
             }
+            if (response.status === 202 && payload.status_url) {
+              while (true) {
+                await new Promise((resolve) => setTimeout(resolve, 1500));
+                const statusResponse = await fetch(payload.status_url, { credentials: "same-origin" });
+                const statusPayload = await statusResponse.json().catch(() => ({}));
+                const job = statusPayload.data || {};
+                if (!statusResponse.ok || statusPayload.success === false || job.status === "error") {
+                  throw new Error(job.error || statusPayload.error || "No se pudo importar el archivo.");
+                }
+                if (job.status === "completado") {
+                  payload = job;
+                  break;
+                }
+                showMsg(`Importando plantilla estratégica y POA... ${Number(job.progress || 0)}%`);
+              }
+            }
             await loadBoard();
             const summary = payload.summary || {};
             const created = Number(summary.created || 0);
@@ -8576,6 +8887,16 @@ def estrategia_tactica_tablero_control_page(request: Request):
     )
 
 
+_IMPORT_TASKS: Set[asyncio.Task] = set()
+
+
+def _discard_spooled_upload(spooled: Dict[str, Any]) -> None:
+    try:
+        os.unlink(spooled["path"])
+    except OSError:
+        pass
+
+
 @router.get("/api/planificacion/plantilla-plan-poa.csv")
 def download_strategic_poa_template():
     output = StringIO()
@@ -8589,341 +8910,69 @@ def download_strategic_poa_template():
 
 
 @router.post("/api/planificacion/importar-plan-poa")
-async def import_strategic_poa_csv(file: UploadFile = File(...)):
+async def import_strategic_poa_csv(
+    request: Request,
+    file: UploadFile = File(...),
+    dry_run: bool = Query(False),
+    background: bool = Query(False),
+):
     _bind_core_symbols()
     filename = (file.filename or "").strip().lower()
     if not filename.endswith(".csv"):
         return JSONResponse({"success": False, "error": "El archivo debe ser CSV (.csv)."}, status_code=400)
 
-    raw_bytes = await file.read()
-    if not raw_bytes:
+    spooled = await spool_upload(file)
+    if not spooled["size_bytes"]:
+        _discard_spooled_upload(spooled)
         return JSONResponse({"success": False, "error": "El archivo CSV está vacío."}, status_code=400)
-    try:
-        raw_text = raw_bytes.decode("utf-8-sig")
-    except UnicodeDecodeError:
-        try:
-            raw_text = raw_bytes.decode("latin-1")
-        except UnicodeDecodeError:
-            return JSONResponse(
-                {"success": False, "error": "No se pudo leer el archivo. Usa codificación UTF-8."},
-                status_code=400,
-            )
-
-    reader = csv.DictReader(StringIO(raw_text))
-    if not reader.fieldnames:
+    headers = read_csv_headers(spooled["path"], spooled["encoding"])
+    if not headers:
+        _discard_spooled_upload(spooled)
         return JSONResponse({"success": False, "error": "Encabezados CSV no válidos."}, status_code=400)
-    missing_headers = [h for h in ["tipo_registro"] if h not in reader.fieldnames]
+    missing_headers = missing_csv_headers(headers)
     if missing_headers:
+        _discard_spooled_upload(spooled)
         return JSONResponse(
             {"success": False, "error": f"Faltan columnas obligatorias: {', '.join(missing_headers)}"},
             status_code=400,
         )
 
-    db = SessionLocal()
-    summary = {"created": 0, "updated": 0, "skipped": 0, "errors": []}
-    try:
-        _ensure_poa_subactivity_recurrence_columns(db)
-        axes = db.query(StrategicAxisConfig).all()
-        axis_by_code = {str((item.codigo or "")).strip().lower(): item for item in axes if (item.codigo or "").strip()}
-        objectives = db.query(StrategicObjectiveConfig).all()
-        objective_by_code = {str((item.codigo or "")).strip().lower(): item for item in objectives if (item.codigo or "").strip()}
-        activities = db.query(POAActivity).all()
-        activity_by_key: Dict[str, POAActivity] = {}
-        activity_by_code_list: Dict[str, List[POAActivity]] = {}
-        for item in activities:
-            code = str((item.codigo or "")).strip().lower()
-            if not code:
-                continue
-            objective_key = f"{int(item.objective_id)}::{code}"
-            activity_by_key[objective_key] = item
-            activity_by_code_list.setdefault(code, []).append(item)
-        subactivities = db.query(POASubactivity).all()
-        sub_by_activity_code: Dict[str, Dict[str, POASubactivity]] = {}
-        activity_code_by_id = {int(item.id): str((item.codigo or "")).strip().lower() for item in activities}
-        for sub in subactivities:
-            activity_code = activity_code_by_id.get(int(sub.activity_id or 0), "")
-            sub_code = str((sub.codigo or "")).strip().lower()
-            if not activity_code or not sub_code:
-                continue
-            sub_by_activity_code.setdefault(activity_code, {})[sub_code] = sub
-
-        max_axis_order = db.query(func.max(StrategicAxisConfig.orden)).scalar() or 0
-        objective_order_by_axis: Dict[int, int] = {}
-        for item in objectives:
-            axis_id = int(item.eje_id or 0)
-            objective_order_by_axis[axis_id] = max(objective_order_by_axis.get(axis_id, 0), int(item.orden or 0))
-
-        for row_index, row in enumerate(reader, start=2):
-            try:
-                kind = _normalize_import_kind(_csv_value(row, "tipo_registro"))
-                if kind not in {"eje", "objetivo", "actividad", "subactividad"}:
-                    summary["skipped"] += 1
-                    summary["errors"].append(f"Fila {row_index}: tipo_registro no reconocido.")
-                    continue
-
-                if kind == "eje":
-                    axis_code = _csv_value(row, "axis_codigo").lower()
-                    axis_name = _csv_value(row, "axis_nombre")
-                    if not axis_code:
-                        raise ValueError("axis_codigo es obligatorio para tipo_registro=eje.")
-                    if not axis_name and axis_code not in axis_by_code:
-                        raise ValueError("axis_nombre es obligatorio al crear un eje.")
-                    axis_order = _parse_import_int(_csv_value(row, "axis_orden"), 0)
-                    axis = axis_by_code.get(axis_code)
-                    if axis:
-                        if axis_name:
-                            axis.nombre = axis_name
-                        axis.lider_departamento = _csv_value(row, "axis_lider_departamento")
-                        axis.responsabilidad_directa = _csv_value(row, "axis_responsabilidad_directa")
-                        axis.descripcion = _csv_value(row, "axis_descripcion")
-                        if axis_order > 0:
-                            axis.orden = axis_order
-                        db.add(axis)
-                        summary["updated"] += 1
-                    else:
-                        max_axis_order += 1
-                        axis = StrategicAxisConfig(
-                            nombre=axis_name or "Nuevo eje",
-                            codigo=axis_code,
-                            lider_departamento=_csv_value(row, "axis_lider_departamento"),
-                            responsabilidad_directa=_csv_value(row, "axis_responsabilidad_directa"),
-                            descripcion=_csv_value(row, "axis_descripcion"),
-                            orden=axis_order if axis_order > 0 else max_axis_order,
-                            is_active=True,
-                        )
-                        db.add(axis)
-                        db.flush()
-                        axis_by_code[axis_code] = axis
-                        summary["created"] += 1
-                    continue
-
-                if kind == "objetivo":
-                    axis_code = _csv_value(row, "axis_codigo").lower()
-                    axis = axis_by_code.get(axis_code)
-                    if not axis:
-                        raise ValueError("axis_codigo no existe. Carga primero el eje.")
-                    objective_code = _csv_value(row, "objective_codigo").lower()
-                    objective_name = _csv_value(row, "objective_nombre")
-                    if not objective_code:
-                        raise ValueError("objective_codigo es obligatorio para tipo_registro=objetivo.")
-                    objective = objective_by_code.get(objective_code)
-                    start_date = _parse_import_date(_csv_value(row, "objective_fecha_inicial"))
-                    end_date = _parse_import_date(_csv_value(row, "objective_fecha_final"))
-                    if (start_date and not end_date) or (end_date and not start_date):
-                        raise ValueError("objective_fecha_inicial y objective_fecha_final deben definirse juntas.")
-                    if start_date and end_date:
-                        range_error = _validate_date_range(start_date, end_date, "Objetivo")
-                        if range_error:
-                            raise ValueError(range_error)
-                    objective_order = _parse_import_int(_csv_value(row, "objective_orden"), 0)
-                    if objective:
-                        if objective_name:
-                            objective.nombre = objective_name
-                        objective.eje_id = int(axis.id)
-                        objective.hito = _csv_value(row, "objective_hito")
-                        objective.lider = _csv_value(row, "objective_lider")
-                        objective.fecha_inicial = start_date
-                        objective.fecha_final = end_date
-                        objective.descripcion = _csv_value(row, "objective_descripcion")
-                        if objective_order > 0:
-                            objective.orden = objective_order
-                        db.add(objective)
-                        summary["updated"] += 1
-                    else:
-                        if not objective_name:
-                            raise ValueError("objective_nombre es obligatorio al crear un objetivo.")
-                        next_obj_order = objective_order if objective_order > 0 else (objective_order_by_axis.get(int(axis.id), 0) + 1)
-                        objective = StrategicObjectiveConfig(
-                            eje_id=int(axis.id),
-                            codigo=objective_code,
-                            nombre=objective_name,
-                            hito=_csv_value(row, "objective_hito"),
-                            lider=_csv_value(row, "objective_lider"),
-                            fecha_inicial=start_date,
-                            fecha_final=end_date,
-                            descripcion=_csv_value(row, "objective_descripcion"),
-                            orden=next_obj_order,
-                            is_active=True,
-                        )
-                        db.add(objective)
-                        db.flush()
-                        objective_by_code[objective_code] = objective
-                        objective_order_by_axis[int(axis.id)] = max(objective_order_by_axis.get(int(axis.id), 0), int(next_obj_order))
-                        summary["created"] += 1
-                    continue
+    identity = getattr(request.state, "identity", None)
+    job_id = create_import_job(spooled, file.filename or "", dry_run, owner=getattr(identity, "username", "") or "")
+    status_url = f"/api/planificacion/importar-plan-poa/{job_id}"
+    if background or spooled["size_bytes"] >= IMPORT_BACKGROUND_BYTES:
+        task = asyncio.create_task(asyncio.to_thread(run_import_job, job_id))
+        _IMPORT_TASKS.add(task)
+        task.add_done_callback(_IMPORT_TASKS.discard)
+        return JSONResponse(
+            {"success": True, "background": True, "job_id": job_id, "status_url": status_url, "data": import_job_status(job_id)},
+            status_code=202,
+        )
 
-                if kind == "actividad":
-                    objective_code = _csv_value(row, "objective_codigo").lower()
-                    objective = objective_by_code.get(objective_code)
-                    if not objective:
-                        raise ValueError("objective_codigo no existe. Carga primero el objetivo.")
-                    activity_code = _csv_value(row, "activity_codigo").lower()
-                    activity_name = _csv_value(row, "activity_nombre")
-                    if not activity_code:
-                        raise ValueError("activity_codigo es obligatorio para tipo_registro=actividad.")
-                    activity_key = f"{int(objective.id)}::{activity_code}"
-                    activity = activity_by_key.get(activity_key)
-                    start_date = _parse_import_date(_csv_value(row, "activity_fecha_inicial"))
-                    end_date = _parse_import_date(_csv_value(row, "activity_fecha_final"))
-                    if (start_date and not end_date) or (end_date and not start_date):
-                        raise ValueError("activity_fecha_inicial y activity_fecha_final deben definirse juntas.")
-                    if start_date and end_date:
-                        range_error = _validate_date_range(start_date, end_date, "Actividad")
-                        if range_error:
-                            raise ValueError(range_error)
-                        parent_range_error = _validate_child_date_range(
-                            start_date,
-                            end_date,
-                            objective.fecha_inicial,
-                            objective.fecha_final,
-                            "Actividad",
-                            "Objetivo",
-                        )
-                        if parent_range_error:
-                            raise ValueError(parent_range_error)
-                    recurrente = _parse_import_bool(_csv_value(row, "activity_recurrente"))
-                    periodicidad = _csv_value(row, "activity_periodicidad").lower()
-                    cada_xx_dias = _parse_import_int(_csv_value(row, "activity_cada_xx_dias"), 0)
-                    if recurrente:
-                        if periodicidad not in VALID_ACTIVITY_PERIODICITIES:
-                            raise ValueError("activity_periodicidad no es válida para actividad recurrente.")
-                        if periodicidad == "cada_xx_dias" and cada_xx_dias <= 0:
-                            raise ValueError("activity_cada_xx_dias debe ser mayor a 0 para periodicidad cada_xx_dias.")
-                    else:
-                        periodicidad = ""
-                        cada_xx_dias = 0
-
-                    if activity:
-                        if activity_name:
-                            activity.nombre = activity_name
-                        activity.responsable = _csv_value(row, "activity_responsable")
-                        activity.entregable = _csv_value(row, "activity_entregable")
-                        activity.fecha_inicial = start_date
-                        activity.fecha_final = end_date
-                        activity.descripcion = _csv_value(row, "activity_descripcion")
-                        activity.recurrente = recurrente
-                        activity.periodicidad = periodicidad
-                        activity.cada_xx_dias = cada_xx_dias if periodicidad == "cada_xx_dias" else None
-                        db.add(activity)
-                        summary["updated"] += 1
-                    else:
-                        if not activity_name:
-                            raise ValueError("activity_nombre es obligatorio al crear una actividad.")
-                        activity = POAActivity(
-                            objective_id=int(objective.id),
-                            codigo=activity_code,
-                            nombre=activity_name,
-                            responsable=_csv_value(row, "activity_responsable"),
-                            entregable=_csv_value(row, "activity_entregable"),
-                            fecha_inicial=start_date,
-                            fecha_final=end_date,
-                            descripcion=_csv_value(row, "activity_descripcion"),
-                            recurrente=recurrente,
-                            periodicidad=periodicidad,
-                            cada_xx_dias=cada_xx_dias if periodicidad == "cada_xx_dias" else None,
-                            entrega_estado="ninguna",
-                            created_by="import_csv",
-                        )
-                        db.add(activity)
-                        db.flush()
-                        activity_by_key[activity_key] = activity
-                        activity_by_code_list.setdefault(activity_code, []).append(activity)
-                        summary["created"] += 1
-                    continue
+    await asyncio.to_thread(run_import_job, job_id)
+    job = import_job_status(job_id) or {}
+    if job.get("status") != IMPORT_JOB_DONE:
+        return JSONResponse({"success": False, "job_id": job_id, "error": job.get("error") or DB_WRITE_ERROR}, status_code=500)
+    return JSONResponse(
+        {
+            "success": True,
+            "dry_run": bool(dry_run),
+            "job_id": job_id,
+            "summary": job.get("summary") or {},
+            "errors_omitted": job.get("errors_omitted", 0),
+        }
+    )
 
-                if kind == "subactividad":
-                    objective_code = _csv_value(row, "objective_codigo").lower()
-                    activity_code = _csv_value(row, "activity_codigo").lower()
-                    sub_code = _csv_value(row, "subactivity_codigo").lower()
-                    if not activity_code or not sub_code:
-                        raise ValueError("activity_codigo y subactivity_codigo son obligatorios para subactividad.")
-
-                    activity = None
-                    if objective_code:
-                        objective = objective_by_code.get(objective_code)
-                        if objective:
-                            activity = activity_by_key.get(f"{int(objective.id)}::{activity_code}")
-                    if activity is None:
-                        candidates = activity_by_code_list.get(activity_code, [])
-                        if len(candidates) == 1:
-                            activity = candidates[0]
-                    if activity is None:
-                        raise ValueError("No se encontró la actividad destino para esta subactividad.")
-
-                    sub_map = sub_by_activity_code.setdefault(activity_code, {})
-                    sub = sub_map.get(sub_code)
-                    parent_code = _csv_value(row, "subactivity_parent_codigo").lower()
-                    parent_sub = sub_map.get(parent_code) if parent_code else None
-                    level_raw = _parse_import_int(_csv_value(row, "subactivity_nivel"), 0)
-                    level = level_raw if level_raw > 0 else ((int(parent_sub.nivel) + 1) if parent_sub else 1)
-                    if level > MAX_SUBTASK_DEPTH:
-                        raise ValueError(f"subactivity_nivel no puede ser mayor a {MAX_SUBTASK_DEPTH}.")
-                    sub_name = _csv_value(row, "subactivity_nombre")
-                    if not sub and not sub_name:
-                        raise ValueError("subactivity_nombre es obligatorio al crear una subactividad.")
-                    start_date = _parse_import_date(_csv_value(row, "subactivity_fecha_inicial"))
-                    end_date = _parse_import_date(_csv_value(row, "subactivity_fecha_final"))
-                    if (start_date and not end_date) or (end_date and not start_date):
-                        raise ValueError("subactivity_fecha_inicial y subactivity_fecha_final deben definirse juntas.")
-                    if start_date and end_date:
-                        range_error = _validate_date_range(start_date, end_date, "Subactividad")
-                        if range_error:
-                            raise ValueError(range_error)
-                        parent_range_error = _validate_child_date_range(
-                            start_date,
-                            end_date,
-                            activity.fecha_inicial,
-                            activity.fecha_final,
-                            "Subactividad",
-                            "Actividad",
-                        )
-                        if parent_range_error:
-                            raise ValueError(parent_range_error)
-
-                    if sub:
-                        if sub_name:
-                            sub.nombre = sub_name
-                        sub.parent_subactivity_id = int(parent_sub.id) if parent_sub else None
-                        sub.nivel = level
-                        sub.responsable = _csv_value(row, "subactivity_responsable")
-                        sub.entregable = _csv_value(row, "subactivity_entregable")
-                        sub.fecha_inicial = start_date
-                        sub.fecha_final = end_date
-                        sub.descripcion = _csv_value(row, "subactivity_descripcion")
-                        db.add(sub)
-                        summary["updated"] += 1
-                    else:
-                        sub = POASubactivity(
-                            activity_id=int(activity.id),
-                            parent_subactivity_id=int(parent_sub.id) if parent_sub else None,
-                            nivel=level,
-                            codigo=sub_code,
-                            nombre=sub_name,
-                            responsable=_csv_value(row, "subactivity_responsable"),
-                            entregable=_csv_value(row, "subactivity_entregable"),
-                            fecha_inicial=start_date,
-                            fecha_final=end_date,
-                            descripcion=_csv_value(row, "subactivity_descripcion"),
-                            assigned_by="import_csv",
-                        )
-                        db.add(sub)
-                        db.flush()
-                        sub_map[sub_code] = sub
-                        summary["created"] += 1
-            except Exception as row_error:
-                summary["skipped"] += 1
-                summary["errors"].append(f"Fila {row_index}: {row_error}")
 
-        db.commit()
-        return JSONResponse({"success": True, "summary": summary})
-    except (sqlite3.OperationalError, SQLAlchemyError):
-        db.rollback()
-        return JSONResponse(
-            {"success": False, "error": "No se pudo escribir en la base de datos (modo solo lectura o bloqueo)."},
-            status_code=500,
-        )
-    finally:
-        db.close()
+@router.get("/api/planificacion/importar-plan-poa/{job_id}")
+def import_strategic_poa_csv_status(request: Request, job_id: str):
+    _bind_core_symbols()
+    job = import_job_status(job_id)
+    identity = getattr(request.state, "identity", None)
+    username = getattr(identity, "username", "") or ""
+    if job is None or (job.get("owner") and job["owner"] != username and not is_admin_or_superadmin(request)):
+        return JSONResponse({"success": False, "error": "Importación no encontrada."}, status_code=404)
+    return JSONResponse({"success": True, "data": job})
 
 
 @router.get("/api/strategic-identity")
@@ -8932,7 +8981,6 @@ def get_strategic_identity():
     db = SessionLocal()
     try:
         _ensure_strategic_identity_table(db)
-        db.commit()
         rows = db.execute(
             text("SELECT bloque, payload FROM strategic_identity_config WHERE bloque IN ('mision', 'vision', 'valores')")
         ).fetchall()
@@ -8972,7 +9020,6 @@ def get_strategic_foundation():
     db = SessionLocal()
     try:
         _ensure_strategic_identity_table(db)
-        db.commit()
         row = db.execute(
             text("SELECT payload FROM strategic_identity_config WHERE bloque = 'fundamentacion' LIMIT 1")
         ).fetchone()
@@ -9007,6 +9054,7 @@ def save_strategic_foundation(data: dict = Body(...)):
             {"payload": encoded},
         )
         db.commit()
+        schedule_plan_prerender()
         return JSONResponse({"success": True, "data": {"texto": texto}})
     except (sqlite3.OperationalError, SQLAlchemyError):
         db.rollback()
@@ -9021,172 +9069,19 @@ def save_strategic_foundation(data: dict = Body(...)):
 @router.get("/api/strategic-plan/export-doc")
 def export_strategic_plan_doc():
     _bind_core_symbols()
+    filename = f"plan_estrategico_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.doc"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
     db = SessionLocal()
     try:
         _ensure_strategic_identity_table(db)
-        db.commit()
-        identity_rows = db.execute(
-            text(
-                "SELECT bloque, payload FROM strategic_identity_config "
-                "WHERE bloque IN ('mision','vision','valores','fundamentacion')"
-            )
-        ).fetchall()
-        payload_map = {str(row[0] or "").strip().lower(): str(row[1] or "") for row in identity_rows}
-
-        def _parse_lines(block: str, prefix: str) -> List[Dict[str, str]]:
-            raw = payload_map.get(block, "[]")
-            try:
-                data = json.loads(raw)
-            except Exception:
-                data = []
-            return _normalize_identity_lines(data, prefix)
-
-        mision = _parse_lines("mision", "m")
-        vision = _parse_lines("vision", "v")
-        valores = _parse_lines("valores", "val")
         try:
-            foundation_payload = json.loads(payload_map.get("fundamentacion", "{}") or "{}")
-        except Exception:
-            foundation_payload = {}
-        fundamentacion_html = _normalize_foundation_text(foundation_payload.get("texto"))
-
-        axes = (
-            db.query(StrategicAxisConfig)
-            .filter(StrategicAxisConfig.is_active == True)
-            .order_by(StrategicAxisConfig.orden.asc(), StrategicAxisConfig.id.asc())
-            .all()
-        )
-        axis_data = [_serialize_strategic_axis(axis) for axis in axes]
-        objective_ids = [
-            int(obj.get("id") or 0)
-            for axis in axis_data
-            for obj in (axis.get("objetivos") or [])
-            if int(obj.get("id") or 0) > 0
-        ]
-        kpis_by_objective = _kpis_by_objective_ids(db, sorted(set(objective_ids)))
-
-        for axis in axis_data:
-            for obj in axis.get("objetivos", []):
-                obj_id = int(obj.get("id") or 0)
-                obj["kpis"] = kpis_by_objective.get(obj_id, [])
-
-        def _lines_html(rows: List[Dict[str, str]]) -> str:
-            if not rows:
-                return "<p>N/D</p>"
-            return "<ul>" + "".join(
-                f"<li><strong>{escape(str(item.get('code') or '').upper())}</strong>: {escape(str(item.get('text') or ''))}</li>"
-                for item in rows
-            ) + "</ul>"
-
-        axes_html_parts: List[str] = []
-        for axis in axis_data:
-            axis_name = escape(str(axis.get("nombre") or "Sin nombre"))
-            axis_desc = str(axis.get("descripcion") or "")
-            objectives = axis.get("objetivos") or []
-            objectives_html: List[str] = []
-            for obj in objectives:
-                obj_name = escape(str(obj.get("nombre") or "Sin nombre"))
-                obj_desc = str(obj.get("descripcion") or "")
-                kpis = obj.get("kpis") or []
-                if kpis:
-                    kpi_rows = "".join(
-                        "<tr>"
-                        f"<td>{escape(str(k.get('nombre') or ''))}</td>"
-                        f"<td>{escape(str(k.get('proposito') or ''))}</td>"
-                        f"<td>{escape(str(k.get('formula') or ''))}</td>"
-                        f"<td>{escape(str(k.get('periodicidad') or ''))}</td>"
-                        f"<td>{escape(str(k.get('estandar') or ''))}</td>"
-                        "</tr>"
-                        for k in kpis
-                    )
-                    kpis_html = (
-                        "<table class='kpi-table'>"
-                        "<thead><tr><th>Nombre</th><th>Propósito</th><th>Fórmula</th><th>Periodicidad</th><th>Estándar</th></tr></thead>"
-                        f"<tbody>{kpi_rows}</tbody></table>"
-                    )
-                else:
-                    kpis_html = "<p>Sin KPIs registrados.</p>"
-                objectives_html.append(
-                    "<section class='objective'>"
-                    f"<h4>{obj_name}</h4>"
-                    f"<div class='rich'>{obj_desc or '<p>Sin descripción.</p>'}</div>"
-                    "<h5>KPIs</h5>"
-                    f"{kpis_html}"
-                    "</section>"
-                )
-            axes_html_parts.append(
-                "<section class='axis'>"
-                f"<h2>{axis_name}</h2>"
-                "<h3>Descripción</h3>"
-                f"<div class='rich'>{axis_desc or '<p>Sin descripción.</p>'}</div>"
-                "<h3>Objetivos estratégicos</h3>"
-                f"{''.join(objectives_html) if objectives_html else '<p>Sin objetivos registrados.</p>'}"
-                "</section>"
-            )
-
-        now = datetime.utcnow().strftime("%Y-%m-%d")
-        html_doc = f"""<!doctype html>
-<html>
-<head>
-  <meta charset="utf-8">
-  <title>Plan Estratégico</title>
-  <style>
-    @page {{ margin: 2.2cm; }}
-    body {{ font-family: Arial, sans-serif; color:#0f172a; }}
-    h1 {{ font-size: 34px; margin: 0 0 8px; color:#0f3d2e; }}
-    h2 {{ font-size: 24px; margin: 0 0 10px; color:#0f3d2e; }}
-    h3 {{ font-size: 17px; margin: 12px 0 6px; }}
-    h4 {{ font-size: 15px; margin: 10px 0 4px; }}
-    h5 {{ font-size: 13px; margin: 10px 0 6px; color:#334155; text-transform: uppercase; }}
-    p, li {{ font-size: 12px; line-height: 1.5; }}
-    .cover {{ display:flex; flex-direction:column; justify-content:center; min-height: 90vh; }}
-    .subtitle {{ color:#475569; font-size:16px; }}
-    .date {{ margin-top: 16px; color:#64748b; }}
-    .page-break {{ page-break-before: always; }}
-    .rich p {{ margin: 0 0 8px; }}
-    .axis {{ margin-bottom: 20px; }}
-    .objective {{ border:1px solid #dbe4ea; border-radius:8px; padding:10px; margin:8px 0; }}
-    .kpi-table {{ width:100%; border-collapse: collapse; margin-top: 6px; }}
-    .kpi-table th, .kpi-table td {{ border:1px solid #dbe4ea; padding:6px; font-size:11px; text-align:left; vertical-align:top; }}
-    .kpi-table th {{ background:#f1f5f9; }}
-  </style>
-</head>
-<body>
-  <section class="cover">
-    <h1>Plan estratégico</h1>
-    <p class="subtitle">Edición y administración del plan estratégico de la institución</p>
-    <p class="date">Fecha de exportación: {escape(now)}</p>
-  </section>
-
-  <section class="page-break">
-    <h2>Misión, Visión y Valores</h2>
-    <h3>Misión</h3>
-    {_lines_html(mision)}
-    <h3>Visión</h3>
-    {_lines_html(vision)}
-    <h3>Valores</h3>
-    {_lines_html(valores)}
-  </section>
-
-  <section class="page-break">
-    <h2>Fundamentación</h2>
-    <div class="rich">{fundamentacion_html or '<p>Sin fundamentación registrada.</p>'}</div>
-  </section>
-
-  <section class="page-break">
-    <h2>Ejes estratégicos</h2>
-    {''.join(axes_html_parts) if axes_html_parts else '<p>Sin ejes estratégicos registrados.</p>'}
-  </section>
-</body>
-</html>"""
-        filename = f"plan_estrategico_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.doc"
-        return Response(
-            content=html_doc,
-            media_type="application/msword; charset=utf-8",
-            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
-        )
+            path = render_plan_export(db)
+        except OSError:
+            # Sin disco escribible: se genera en memoria, sin copia.
+            return Response("".join(render_plan_sections(db)), media_type=PLAN_EXPORT_MEDIA_TYPE, headers=headers)
     finally:
         db.close()
+    return FileResponse(path, media_type=PLAN_EXPORT_MEDIA_TYPE, headers=headers)
 
 
 @router.put("/api/strategic-identity/{bloque}")
@@ -9213,6 +9108,7 @@ def save_strategic_identity_block(bloque: str, data: dict = Body(...)):
             {"bloque": block, "payload": encoded},
         )
         db.commit()
+        schedule_plan_prerender()
         return JSONResponse({"success": True, "data": {"bloque": block, "lineas": lines}})
     except (sqlite3.OperationalError, SQLAlchemyError):
         db.rollback()
@@ -9248,6 +9144,7 @@ def clear_strategic_identity_block(bloque: str):
             {"bloque": block, "payload": encoded},
         )
         db.commit()
+        schedule_plan_prerender()
         return JSONResponse({"success": True, "data": {"bloque": block, "lineas": lines}})
     except (sqlite3.OperationalError, SQLAlchemyError):
         db.rollback()
@@ -9287,44 +9184,19 @@ def list_strategic_axes(request: Request):
                 obj["hitos"] = milestones_by_objective.get(obj_id, [])
                 if obj["hitos"]:
                     obj["hito"] = str(obj["hitos"][0].get("nombre") or obj.get("hito") or "")
-        activities = (
-            db.query(POAActivity)
-            .filter(POAActivity.objective_id.in_(objective_ids))
-            .all()
-            if objective_ids else []
-        )
-        activity_ids = [int(item.id) for item in activities if getattr(item, "id", None)]
-        subactivities = (
-            db.query(POASubactivity)
-            .filter(POASubactivity.activity_id.in_(activity_ids))
-            .all()
-            if activity_ids else []
+        rollups = progress_rollup_maps(
+            db,
+            objective_ids=objective_ids,
+            axis_ids=[axis_data.get("id") for axis_data in payload_axes],
         )
-        sub_by_activity: Dict[int, List[POASubactivity]] = {}
-        for sub in subactivities:
-            sub_by_activity.setdefault(int(sub.activity_id), []).append(sub)
-
-        today = datetime.utcnow().date()
-        activity_progress_by_objective: Dict[int, List[int]] = {}
-        for activity in activities:
-            subs = sub_by_activity.get(int(activity.id), [])
-            if subs:
-                done_subs = sum(1 for sub in subs if sub.fecha_final and today >= sub.fecha_final)
-                progress = int(round((done_subs / len(subs)) * 100))
-            else:
-                progress = 100 if _activity_status(activity) == "Terminada" else 0
-            activity_progress_by_objective.setdefault(int(activity.objective_id), []).append(progress)
+        objective_progress_map = rollups[SCOPE_OBJECTIVE]
+        axis_progress_map = rollups[SCOPE_AXIS]
 
         mv_agg: Dict[str, List[int]] = {}
         for axis_data in payload_axes:
-            objective_progress: List[int] = []
             for obj in axis_data.get("objetivos", []):
-                obj_id = int(obj.get("id") or 0)
-                progress_list = activity_progress_by_objective.get(obj_id, [])
-                obj_progress = int(round(sum(progress_list) / len(progress_list))) if progress_list else 0
-                obj["avance"] = obj_progress
-                objective_progress.append(obj_progress)
-            axis_progress = int(round(sum(objective_progress) / len(objective_progress))) if objective_progress else 0
+                obj["avance"] = objective_progress_map.get(int(obj.get("id") or 0), 0)
+            axis_progress = axis_progress_map.get(int(axis_data.get("id") or 0), 0)
             axis_data["avance"] = axis_progress
             base_code = "".join(ch for ch in str(axis_data.get("codigo") or "").split("-", 1)[0].lower() if ch.isalnum())
             axis_data["base_code"] = base_code
@@ -9454,7 +9326,11 @@ def create_strategic_axis(request: Request, data: dict = Body(...)):
             is_active=True,
         )
         db.add(axis)
+        db.flush()
+        refresh_progress_rollups(db, axis_ids=[axis.id])
+        record_poa_change(db, ENTITY_AXIS, axis.id)
         db.commit()
+        schedule_plan_prerender()
         db.refresh(axis)
         return JSONResponse({"success": True, "data": _serialize_strategic_axis(axis)})
     except (sqlite3.OperationalError, SQLAlchemyError):
@@ -9507,7 +9383,9 @@ def update_strategic_axis(axis_id: int, data: dict = Body(...)):
         axis.descripcion = (data.get("descripcion") or "").strip()
         axis.orden = axis_order
         db.add(axis)
+        record_poa_change(db, ENTITY_AXIS, axis.id)
         db.commit()
+        schedule_plan_prerender()
         db.refresh(axis)
         return JSONResponse({"success": True, "data": _serialize_strategic_axis(axis)})
     except (sqlite3.OperationalError, SQLAlchemyError):
@@ -9528,8 +9406,14 @@ def delete_strategic_axis(axis_id: int):
         axis = db.query(StrategicAxisConfig).filter(StrategicAxisConfig.id == axis_id).first()
         if not axis:
             return JSONResponse({"success": False, "error": "Eje no encontrado"}, status_code=404)
+        objective_ids = [obj.id for obj in (axis.objetivos or [])]
         db.delete(axis)
+        refresh_progress_rollups(db, objective_ids=objective_ids, axis_ids=[axis_id])
+        for objective_id in objective_ids:
+            record_poa_change(db, ENTITY_OBJECTIVE, objective_id, ACTION_DELETE, objective_id=objective_id)
+        record_poa_change(db, ENTITY_AXIS, axis_id, ACTION_DELETE)
         db.commit()
+        schedule_plan_prerender()
         return JSONResponse({"success": True})
     except (sqlite3.OperationalError, SQLAlchemyError):
         db.rollback()
@@ -9598,6 +9482,9 @@ def create_strategic_objective(axis_id: int, data: dict = Body(...)):
             is_active=True,
         )
         db.add(objective)
+        db.flush()
+        refresh_progress_rollups(db, objective_ids=[objective.id])
+        record_poa_change(db, ENTITY_OBJECTIVE, objective.id, objective_id=objective.id)
         db.commit()
         db.refresh(objective)
         milestone_rows: List[Dict[str, Any]] = []
@@ -9606,11 +9493,14 @@ def create_strategic_objective(axis_id: int, data: dict = Body(...)):
             if milestone_rows:
                 objective.hito = str(milestone_rows[0].get("nombre") or "").strip()
                 db.add(objective)
+                record_poa_change(db, ENTITY_OBJECTIVE, objective.id, objective_id=objective.id)
                 db.commit()
                 db.refresh(objective)
         if "kpis" in data:
             _replace_objective_kpis(db, int(objective.id), data.get("kpis"))
+            record_poa_change(db, ENTITY_OBJECTIVE, objective.id, objective_id=objective.id)
             db.commit()
+        schedule_plan_prerender()
         payload = _serialize_strategic_objective(objective)
         if "hitos" in data:
             payload["hitos"] = milestone_rows
@@ -9682,7 +9572,9 @@ def update_strategic_objective(objective_id: int, data: dict = Body(...)):
             db.add(objective)
         if "kpis" in data:
             _replace_objective_kpis(db, int(objective.id), data.get("kpis"))
+        record_poa_change(db, ENTITY_OBJECTIVE, objective.id, objective_id=objective.id)
         db.commit()
+        schedule_plan_prerender()
         db.refresh(objective)
         payload = _serialize_strategic_objective(objective)
         if "hitos" in data:
@@ -9704,8 +9596,13 @@ def delete_strategic_objective(objective_id: int):
             return JSONResponse({"success": False, "error": "Objetivo no encontrado"}, status_code=404)
         _delete_objective_kpis(db, int(objective.id))
         _delete_objective_milestones(db, int(objective.id))
+        _ensure_dependencies_table(db)
+        delete_objective_dependencies(db, int(objective.id))
         db.delete(objective)
+        refresh_progress_rollups(db, objective_ids=[objective_id])
+        record_poa_change(db, ENTITY_OBJECTIVE, objective_id, ACTION_DELETE, objective_id=objective_id)
         db.commit()
+        schedule_plan_prerender()
         return JSONResponse({"success": True})
     finally:
         db.close()
@@ -9730,9 +9627,7 @@ def _allowed_objectives_for_user(request: Request, db) -> List[StrategicObjectiv
             .all()
         )
 
-    session_username = (getattr(request.state, "user_name", None) or request.cookies.get("user_name") or "").strip()
-    user = _current_user_record(request, db)
-    aliases = _user_aliases(user, session_username)
+    aliases = set(_request_identity(request, db).aliases)
     alias_set = {str(item or "").strip().lower() for item in aliases if str(item or "").strip()}
     if not alias_set:
         return []
@@ -9740,7 +9635,7 @@ def _allowed_objectives_for_user(request: Request, db) -> List[StrategicObjectiv
     objective_ids: Set[int] = set()
     own_activities = (
         db.query(POAActivity.id, POAActivity.objective_id)
-        .filter(func.lower(POAActivity.responsable).in_(alias_set))
+        .filter(POAActivity.responsable_key.in_(alias_set))
         .all()
     )
     for _aid, oid in own_activities:
@@ -9752,7 +9647,7 @@ def _allowed_objectives_for_user(request: Request, db) -> List[StrategicObjectiv
     own_subactivities = (
         db.query(POASubactivity.id, POAActivity.objective_id)
         .join(POAActivity, POAActivity.id == POASubactivity.activity_id)
-        .filter(func.lower(POASubactivity.responsable).in_(alias_set))
+        .filter(POASubactivity.responsable_key.in_(alias_set))
         .all()
     )
     for _sid, oid in own_subactivities:
@@ -9774,118 +9669,212 @@ def _allowed_objectives_for_user(request: Request, db) -> List[StrategicObjectiv
     )
 
 
+def _pending_approvals_with_context(db) -> List[tuple]:
+    """Aprobaciones pendientes con su actividad y objetivo en una sola consulta."""
+    return (
+        db.query(POADeliverableApproval, POAActivity, StrategicObjectiveConfig)
+        .outerjoin(POAActivity, POAActivity.id == POADeliverableApproval.activity_id)
+        .outerjoin(StrategicObjectiveConfig, StrategicObjectiveConfig.id == POADeliverableApproval.objective_id)
+        .filter(POADeliverableApproval.status == "pendiente")
+        .order_by(POADeliverableApproval.created_at.desc(), POADeliverableApproval.id.desc())
+        .all()
+    )
+
+
+def _board_objective_payloads(request: Request, db, objectives: List[StrategicObjectiveConfig], aliases: Set[str]) -> List[Dict[str, Any]]:
+    objective_ids = [obj.id for obj in objectives]
+    axis_ids = sorted({obj.eje_id for obj in objectives})
+    axes = (
+        db.query(StrategicAxisConfig)
+        .filter(StrategicAxisConfig.id.in_(axis_ids))
+        .all()
+        if axis_ids else []
+    )
+    axis_name_map = {axis.id: axis.nombre for axis in axes}
+    milestones_by_objective = _milestones_by_objective_ids(db, objective_ids)
+    schedules = critical_path_snapshot(db)
+    can_validate_all = is_admin_or_superadmin(request)
+    payloads: List[Dict[str, Any]] = []
+    for obj in objectives:
+        leader = (obj.lider or "").strip().lower()
+        payloads.append(
+            {
+                **_serialize_strategic_objective(obj),
+                "axis_name": axis_name_map.get(obj.eje_id, ""),
+                "hitos": milestones_by_objective.get(int(obj.id), []),
+                "holgura": schedules.get(int(obj.id), {}).get("holgura"),
+                "ruta_critica": list(schedules.get(int(obj.id), {}).get("ruta_critica", [])),
+                "can_validate_deliverables": bool(leader and leader in aliases) or can_validate_all,
+            }
+        )
+    return payloads
+
+
+POA_ACTIVITY_FIELDS = (
+    "id", "objective_id", "nombre", "codigo", "responsable", "entregable", "fecha_inicial", "fecha_final",
+    "inicio_forzado", "recurrente", "periodicidad", "cada_xx_dias", "status", "avance", "entrega_estado",
+    "entrega_solicitada_por", "entrega_solicitada_at", "entrega_aprobada_por", "entrega_aprobada_at",
+    "created_by", "descripcion", "budget_items", "hitos_impacta", "entregables", "subactivities",
+    "can_change_status", "holgura", "critica",
+)
+BOARD_PAGE_MAX_LIMIT = 500
+
+
+def _parse_board_fields(raw: str | None) -> Set[str] | None:
+    """``fields=a,b`` incluye sólo esos campos; ``fields=-subactivities`` los excluye."""
+    tokens = [token.strip() for token in str(raw or "").split(",") if token.strip()]
+    if not tokens:
+        return None
+    excluded = {token[1:] for token in tokens if token.startswith("-")}
+    included = {token for token in tokens if not token.startswith("-")}
+    selected = (included or set(POA_ACTIVITY_FIELDS)) - excluded
+    return (selected | {"id", "objective_id"}) & set(POA_ACTIVITY_FIELDS)
+
+
+def _board_activity_payloads(
+    db,
+    activities: List[POAActivity],
+    alias_set: Set[str],
+    fields: Set[str] | None = None,
+) -> List[Dict[str, Any]]:
+    def wants(key: str) -> bool:
+        return fields is None or key in fields
+
+    activity_ids = [int(activity.id) for activity in activities if getattr(activity, "id", None)]
+    subactivities = (
+        db.query(POASubactivity)
+        .filter(POASubactivity.activity_id.in_(activity_ids))
+        .order_by(POASubactivity.id.asc())
+        .all()
+        if activity_ids and wants("subactivities") else []
+    )
+    sub_by_activity: Dict[int, List[POASubactivity]] = {}
+    for sub in subactivities:
+        sub_by_activity.setdefault(sub.activity_id, []).append(sub)
+    activity_progress_map = progress_rollup_maps(db, activity_ids=activity_ids)[SCOPE_ACTIVITY] if wants("avance") else {}
+    budgets_by_activity = _budgets_by_activity_ids(db, activity_ids) if wants("budget_items") else {}
+    deliverables_by_activity = _deliverables_by_activity_ids(db, activity_ids) if wants("entregables") else {}
+    impacted_milestones_by_activity = _activity_milestones_by_activity_ids(db, activity_ids) if wants("hitos_impacta") else {}
+    schedule_by_activity = slack_by_activity(critical_path_snapshot(db)) if wants("holgura") or wants("critica") else {}
+    payloads: List[Dict[str, Any]] = []
+    for activity in activities:
+        payload = {
+            **_serialize_poa_activity(
+                activity,
+                sub_by_activity.get(activity.id, []),
+                budgets_by_activity.get(int(activity.id), []),
+                impacted_milestones_by_activity.get(int(activity.id), []),
+                deliverables_by_activity.get(int(activity.id), []),
+                activity_progress_map.get(int(activity.id)) if wants("avance") else 0,
+            ),
+            "can_change_status": bool((activity.responsable or "").strip().lower() in alias_set),
+            "holgura": schedule_by_activity.get(int(activity.id), {}).get("holgura"),
+            "critica": bool(schedule_by_activity.get(int(activity.id), {}).get("critica")),
+        }
+        if fields is not None:
+            payload = {key: value for key, value in payload.items() if key in fields}
+        payloads.append(payload)
+    return payloads
+
+
+def _board_etag(request: Request, db, data_version: int) -> str:
+    """ETag fuerte: versión de datos, identidad/permisos del usuario, día y parámetros."""
+    identity = _request_identity(request, db)
+    parts = [
+        str(data_version),
+        datetime.utcnow().date().isoformat(),
+        identity.username,
+        identity.role,
+        identity.department,
+        ",".join(sorted(identity.aliases)),
+        _poa_access_level_for_request(request, db),
+        str(request.url.query or ""),
+    ]
+    digest = hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:32]
+    return f'"poa-{digest}"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = (request.headers.get("if-none-match") or "").strip()
+    if not header:
+        return False
+    candidates = {item.strip().removeprefix("W/") for item in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def _board_pending_approvals(request: Request, db) -> List[Dict[str, Any]]:
+    approvals_for_user = []
+    for approval, activity, objective in _pending_approvals_with_context(db):
+        if not _is_user_process_owner(request, db, approval.process_owner):
+            continue
+        approvals_for_user.append(
+            {
+                "id": approval.id,
+                "activity_id": approval.activity_id,
+                "objective_id": approval.objective_id,
+                "process_owner": approval.process_owner or "",
+                "requester": approval.requester or "",
+                "created_at": approval.created_at.isoformat() if approval.created_at else "",
+                "activity_nombre": (activity.nombre if activity else ""),
+                "activity_codigo": (activity.codigo if activity else ""),
+                "objective_nombre": (objective.nombre if objective else ""),
+                "objective_codigo": (objective.codigo if objective else ""),
+            }
+        )
+    return approvals_for_user
+
+
 @router.get("/api/poa/board-data")
-def poa_board_data(request: Request):
+def poa_board_data(
+    request: Request,
+    axis_id: int | None = Query(None, ge=1),
+    objective_id: int | None = Query(None, ge=1),
+    after: int = Query(0, ge=0),
+    limit: int | None = Query(None, ge=1, le=BOARD_PAGE_MAX_LIMIT),
+    fields: str | None = Query(None),
+):
     _bind_core_symbols()
     db = SessionLocal()
     try:
         _ensure_poa_subactivity_recurrence_columns(db)
+        data_version = poa_data_version(db)
+        etag = _board_etag(request, db, data_version)
+        cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if _etag_matches(request, etag):
+            return Response(status_code=304, headers=cache_headers)
+
         objectives = _allowed_objectives_for_user(request, db)
+        if axis_id:
+            objectives = [obj for obj in objectives if int(obj.eje_id or 0) == axis_id]
+        if objective_id:
+            objectives = [obj for obj in objectives if int(obj.id) == objective_id]
         objective_ids = [obj.id for obj in objectives]
-        objective_axis_map = {obj.id: obj.eje_id for obj in objectives}
-        axis_ids = sorted(set(objective_axis_map.values()))
-        axes = (
-            db.query(StrategicAxisConfig)
-            .filter(StrategicAxisConfig.id.in_(axis_ids))
-            .all()
-            if axis_ids else []
-        )
-        axis_name_map = {axis.id: axis.nombre for axis in axes}
-        milestones_by_objective = _milestones_by_objective_ids(db, objective_ids)
-
-        activities = (
+        activity_query = (
             db.query(POAActivity)
-            .filter(POAActivity.objective_id.in_(objective_ids))
+            .filter(POAActivity.objective_id.in_(objective_ids), POAActivity.id > after)
             .order_by(POAActivity.id.asc())
-            .all()
-            if objective_ids else []
-        )
-        activity_ids = [item.id for item in activities]
-        subactivities = (
-            db.query(POASubactivity)
-            .filter(POASubactivity.activity_id.in_(activity_ids))
-            .order_by(POASubactivity.id.asc())
-            .all()
-            if activity_ids else []
-        )
-        sub_by_activity: Dict[int, List[POASubactivity]] = {}
-        for sub in subactivities:
-            sub_by_activity.setdefault(sub.activity_id, []).append(sub)
-        budgets_by_activity = _budgets_by_activity_ids(db, [int(activity.id) for activity in activities if getattr(activity, "id", None)])
-        deliverables_by_activity = _deliverables_by_activity_ids(db, [int(activity.id) for activity in activities if getattr(activity, "id", None)])
-        impacted_milestones_by_activity = _activity_milestones_by_activity_ids(
-            db,
-            [int(activity.id) for activity in activities if getattr(activity, "id", None)],
         )
+        activities = (activity_query.limit(limit + 1).all() if limit else activity_query.all()) if objective_ids else []
+        next_after = None
+        if limit and len(activities) > limit:
+            activities = activities[:limit]
+            next_after = int(activities[-1].id)
+        activity_fields = _parse_board_fields(fields)
         session_username = (getattr(request.state, "user_name", None) or request.cookies.get("user_name") or "").strip()
-        user = _current_user_record(request, db)
-        aliases = _user_aliases(user, session_username)
+        aliases = set(_request_identity(request, db).aliases)
         alias_set = {str(item or "").strip().lower() for item in aliases if str(item or "").strip()}
         poa_access_level = _poa_access_level_for_request(request, db)
         session_role_raw = str(getattr(request.state, "user_role", None) or request.cookies.get("user_role") or "")
         session_role_normalized = normalize_role_name(session_role_raw)
-        objective_can_validate: Dict[int, bool] = {}
-        for obj in objectives:
-            leader = (obj.lider or "").strip().lower()
-            objective_can_validate[int(obj.id)] = bool(leader and leader in aliases) or is_admin_or_superadmin(request)
-
-        pending_approvals = (
-            db.query(POADeliverableApproval)
-            .filter(POADeliverableApproval.status == "pendiente")
-            .order_by(POADeliverableApproval.created_at.desc())
-            .all()
-        )
-        approvals_for_user = []
-        for approval in pending_approvals:
-            if not _is_user_process_owner(request, db, approval.process_owner):
-                continue
-            activity = next((item for item in activities if item.id == approval.activity_id), None)
-            if not activity:
-                activity = db.query(POAActivity).filter(POAActivity.id == approval.activity_id).first()
-            objective = next((item for item in objectives if item.id == approval.objective_id), None)
-            if not objective:
-                objective = db.query(StrategicObjectiveConfig).filter(StrategicObjectiveConfig.id == approval.objective_id).first()
-            approvals_for_user.append(
-                {
-                    "id": approval.id,
-                    "activity_id": approval.activity_id,
-                    "objective_id": approval.objective_id,
-                    "process_owner": approval.process_owner or "",
-                    "requester": approval.requester or "",
-                    "created_at": approval.created_at.isoformat() if approval.created_at else "",
-                    "activity_nombre": (activity.nombre if activity else ""),
-                    "activity_codigo": (activity.codigo if activity else ""),
-                    "objective_nombre": (objective.nombre if objective else ""),
-                    "objective_codigo": (objective.codigo if objective else ""),
-                }
-            )
 
         return JSONResponse(
             {
                 "success": True,
-                "objectives": [
-                    {
-                        **_serialize_strategic_objective(obj),
-                        "axis_name": axis_name_map.get(obj.eje_id, ""),
-                        "hitos": milestones_by_objective.get(int(obj.id), []),
-                        "can_validate_deliverables": bool(objective_can_validate.get(int(obj.id), False)),
-                    }
-                    for obj in objectives
-                ],
-                "activities": [
-                    {
-                        **_serialize_poa_activity(
-                            activity,
-                            sub_by_activity.get(activity.id, []),
-                            budgets_by_activity.get(int(activity.id), []),
-                            impacted_milestones_by_activity.get(int(activity.id), []),
-                            deliverables_by_activity.get(int(activity.id), []),
-                        ),
-                        "can_change_status": bool((activity.responsable or "").strip().lower() in alias_set),
-                    }
-                    for activity in activities
-                ],
-                "pending_approvals": approvals_for_user,
+                "cursor": data_version,
+                "next_after": next_after,
+                "objectives": _board_objective_payloads(request, db, objectives, aliases),
+                "activities": _board_activity_payloads(db, activities, alias_set, activity_fields),
+                "pending_approvals": _board_pending_approvals(request, db),
                 "permissions": {
                     "poa_access_level": poa_access_level,
                     "can_manage_content": bool(is_admin_or_superadmin(request)),
@@ -9900,12 +9889,370 @@ def poa_board_data(request: Request):
                     "objectives_count": len(objectives),
                     "activities_count": len(activities),
                 },
+            },
+            headers=cache_headers,
+        )
+    finally:
+        db.close()
+
+
+@router.get("/api/poa/changes")
+def poa_board_changes(request: Request, since: int = Query(0, ge=0), limit: int = Query(500, ge=1, le=5000)):
+    _bind_core_symbols()
+    db = SessionLocal()
+    try:
+        current_version = poa_data_version(db)
+        if since > current_version:
+            # Cursor de otra base (restauración/importación): el cliente debe recargar todo.
+            return JSONResponse({"success": True, "reset": True, "cursor": current_version})
+        feed = changes_since(db, since, limit)
+        if feed["expired"]:
+            # El cursor es anterior a lo podado del registro: faltan cambios.
+            return JSONResponse({"success": True, "reset": True, "cursor": current_version})
+        rows = feed["rows"]
+        cursor = feed["cursor"] if feed["cursor"] is not None else since
+        if any(row.action == ACTION_RESET for row in rows):
+            return JSONResponse({"success": True, "reset": True, "cursor": current_version})
+
+        # Sólo cuenta la última acción de cada entidad dentro del lote.
+        latest: Dict[tuple, Any] = {}
+        axis_ids: Set[int] = set()
+        for row in rows:
+            if row.entity_type == ENTITY_AXIS:
+                axis_ids.add(int(row.entity_id))
+                continue
+            if row.entity_type in {ENTITY_OBJECTIVE, ENTITY_ACTIVITY}:
+                latest[(row.entity_type, int(row.entity_id))] = row
+
+        allowed = {int(obj.id): obj for obj in _allowed_objectives_for_user(request, db)}
+        objective_ids: Set[int] = {int(obj.id) for obj in allowed.values() if int(obj.eje_id or 0) in axis_ids}
+        activity_ids: Set[int] = set()
+        deleted_objectives: Set[int] = set()
+        deleted_activities: Set[int] = set()
+        for (entity_type, entity_id), row in latest.items():
+            if entity_type == ENTITY_OBJECTIVE:
+                if row.action == ACTION_DELETE or entity_id not in allowed:
+                    deleted_objectives.add(entity_id)
+                else:
+                    objective_ids.add(entity_id)
+            elif row.action == ACTION_DELETE:
+                deleted_activities.add(entity_id)
+            else:
+                activity_ids.add(entity_id)
+
+        activities = (
+            db.query(POAActivity).filter(POAActivity.id.in_(sorted(activity_ids))).order_by(POAActivity.id.asc()).all()
+            if activity_ids else []
+        )
+        visible_activities = []
+        for activity in activities:
+            if int(activity.objective_id or 0) in allowed:
+                visible_activities.append(activity)
+            else:
+                deleted_activities.add(int(activity.id))
+        deleted_activities.update(activity_ids - {int(activity.id) for activity in activities})
+        objectives = [allowed[objective_id] for objective_id in sorted(objective_ids) if objective_id in allowed]
+
+        aliases = set(_request_identity(request, db).aliases)
+        alias_set = {str(item or "").strip().lower() for item in aliases if str(item or "").strip()}
+        return JSONResponse(
+            {
+                "success": True,
+                "reset": False,
+                "cursor": cursor,
+                "has_more": bool(feed["has_more"]),
+                "objectives": _board_objective_payloads(request, db, objectives, aliases),
+                "activities": _board_activity_payloads(db, visible_activities, alias_set),
+                "deleted": {
+                    "objectives": sorted(deleted_objectives),
+                    "activities": sorted(deleted_activities),
+                },
+                "pending_approvals": _board_pending_approvals(request, db) if rows else None,
             }
         )
     finally:
         db.close()
 
 
+@router.get("/api/poa/occurrences")
+def poa_occurrences(
+    request: Request,
+    desde: str = Query(...),
+    hasta: str = Query(...),
+    objective_id: int | None = Query(None, ge=1),
+    activity_id: int | None = Query(None, ge=1),
+    incluir_finales: bool = Query(True),
+):
+    _bind_core_symbols()
+    start_date, start_error = _parse_date_field(desde, "Fecha desde")
+    end_date, end_error = _parse_date_field(hasta, "Fecha hasta")
+    if start_error or end_error:
+        return JSONResponse({"success": False, "error": start_error or end_error}, status_code=400)
+    if start_date > end_date:
+        return JSONResponse({"success": False, "error": "La fecha desde no puede ser mayor que la fecha hasta"}, status_code=400)
+    if (end_date - start_date).days > OCCURRENCE_MAX_RANGE_DAYS:
+        return JSONResponse(
+            {"success": False, "error": f"El rango no puede exceder {OCCURRENCE_MAX_RANGE_DAYS} días"},
+            status_code=400,
+        )
+    db = SessionLocal()
+    try:
+        _ensure_poa_subactivity_recurrence_columns(db)
+        _ensure_occurrences_table(db)
+        ensure_occurrences_current(db)
+        objective_ids = {int(obj.id) for obj in _allowed_objectives_for_user(request, db)}
+        if objective_id:
+            objective_ids &= {objective_id}
+        data = occurrences_between(
+            db,
+            start_date,
+            end_date,
+            objective_ids=objective_ids,
+            activity_id=activity_id,
+            include_final=incluir_finales,
+        )
+        return JSONResponse(
+            {"success": True, "desde": start_date.isoformat(), "hasta": end_date.isoformat(), "total": len(data), "data": data}
+        )
+    finally:
+        db.close()
+
+
+@router.get("/api/poa/timeline")
+def poa_timeline(
+    request: Request,
+    desde: str = Query(...),
+    hasta: str = Query(...),
+    zoom: str = Query(TIMELINE_DEFAULT_ZOOM),
+    axis_id: int | None = Query(None, ge=1),
+    objective_id: int | None = Query(None, ge=1),
+):
+    _bind_core_symbols()
+    zoom = (zoom or "").strip().lower()
+    if zoom not in TIMELINE_ZOOM_LEVELS:
+        return JSONResponse(
+            {"success": False, "error": f"Zoom inválido. Usa: {', '.join(TIMELINE_ZOOM_LEVELS)}"},
+            status_code=400,
+        )
+    start_date, start_error = _parse_date_field(desde, "Fecha desde")
+    end_date, end_error = _parse_date_field(hasta, "Fecha hasta")
+    if start_error or end_error:
+        return JSONResponse({"success": False, "error": start_error or end_error}, status_code=400)
+    if start_date > end_date:
+        return JSONResponse({"success": False, "error": "La fecha desde no puede ser mayor que la fecha hasta"}, status_code=400)
+    if (end_date - start_date).days > TIMELINE_MAX_RANGE_DAYS:
+        return JSONResponse(
+            {"success": False, "error": f"El rango no puede exceder {TIMELINE_MAX_RANGE_DAYS} días"},
+            status_code=400,
+        )
+    db = SessionLocal()
+    try:
+        if _poa_access_level_for_request(request, db) != "todas_tareas":
+            return JSONResponse({"success": False, "error": "No autorizado para ver el diagrama de Gantt"}, status_code=403)
+        _ensure_date_indexes(db)
+        etag = _board_etag(request, db, poa_data_version(db))
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if _etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+        objectives = [
+            obj
+            for obj in _allowed_objectives_for_user(request, db)
+            if (not axis_id or int(obj.eje_id or 0) == axis_id) and (not objective_id or int(obj.id) == objective_id)
+        ]
+        data = timeline_window(db, start_date, end_date, zoom, [obj.id for obj in objectives])
+        return JSONResponse({"success": True, **data}, headers=headers)
+    finally:
+        db.close()
+
+
+@router.get("/api/poa/objectives/{objective_id}/critical-path")
+def poa_objective_critical_path(request: Request, objective_id: int):
+    _bind_core_symbols()
+    db = SessionLocal()
+    try:
+        allowed_ids = {int(obj.id) for obj in _allowed_objectives_for_user(request, db)}
+        if objective_id not in allowed_ids:
+            return JSONResponse({"success": False, "error": "No autorizado para este objetivo"}, status_code=403)
+        _ensure_dependencies_table(db)
+        etag = _board_etag(request, db, poa_data_version(db))
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if _etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+        schedule = critical_path_snapshot(db).get(objective_id)
+        if schedule is None:
+            data = {"fecha_limite": "", "fin_proyectado": "", "holgura": None, "ruta_critica": [], "ciclo": [], "actividades": []}
+        else:
+            data = schedule_payload(schedule)
+        return JSONResponse({"success": True, "objective_id": objective_id, "data": data}, headers=headers)
+    finally:
+        db.close()
+
+
+@router.get("/api/poa/activities/{activity_id}/dependencies")
+def poa_activity_dependencies(request: Request, activity_id: int):
+    _bind_core_symbols()
+    db = SessionLocal()
+    try:
+        activity = db.query(POAActivity).filter(POAActivity.id == activity_id).first()
+        if not activity:
+            return JSONResponse({"success": False, "error": "Actividad no encontrada"}, status_code=404)
+        allowed_ids = {int(obj.id) for obj in _allowed_objectives_for_user(request, db)}
+        if int(activity.objective_id) not in allowed_ids:
+            return JSONResponse({"success": False, "error": "No autorizado para esta actividad"}, status_code=403)
+        _ensure_dependencies_table(db)
+        return JSONResponse({"success": True, "data": activity_dependencies(db, activity_id)})
+    finally:
+        db.close()
+
+
+@router.post("/api/poa/activities/{activity_id}/dependencies")
+def add_poa_activity_dependency(request: Request, activity_id: int, data: dict = Body(...)):
+    _bind_core_symbols()
+    if not is_admin_or_superadmin(request):
+        return JSONResponse({"success": False, "error": "Solo administrador puede editar actividades"}, status_code=403)
+    try:
+        predecessor_id = int(data.get("predecessor_id") or 0)
+        lag_days = int(data.get("lag_dias") or 0)
+    except (TypeError, ValueError):
+        return JSONResponse({"success": False, "error": "predecessor_id y lag_dias deben ser enteros"}, status_code=400)
+    db = SessionLocal()
+    try:
+        activity = db.query(POAActivity).filter(POAActivity.id == activity_id).first()
+        predecessor = db.query(POAActivity).filter(POAActivity.id == predecessor_id).first() if predecessor_id else None
+        if not activity or not predecessor:
+            return JSONResponse({"success": False, "error": "Actividad no encontrada"}, status_code=404)
+        _ensure_dependencies_table(db)
+        try:
+            add_dependency(db, predecessor, activity, lag_days)
+        except ValueError as exc:
+            db.rollback()
+            return JSONResponse({"success": False, "error": str(exc)}, status_code=400)
+        record_poa_change(db, ENTITY_ACTIVITY, activity.id, objective_id=activity.objective_id, activity_id=activity.id)
+        record_poa_change(db, ENTITY_OBJECTIVE, activity.objective_id, objective_id=activity.objective_id)
+        try:
+            db.commit()
+        except (sqlite3.OperationalError, SQLAlchemyError):
+            db.rollback()
+            return JSONResponse(
+                {"success": False, "error": "No se pudo escribir en la base de datos (modo solo lectura o bloqueo)."},
+                status_code=500,
+            )
+        return JSONResponse({"success": True, "data": activity_dependencies(db, activity_id)})
+    finally:
+        db.close()
+
+
+@router.delete("/api/poa/activities/{activity_id}/dependencies/{predecessor_id}")
+def delete_poa_activity_dependency(request: Request, activity_id: int, predecessor_id: int):
+    _bind_core_symbols()
+    if not is_admin_or_superadmin(request):
+        return JSONResponse({"success": False, "error": "Solo administrador puede editar actividades"}, status_code=403)
+    db = SessionLocal()
+    try:
+        activity = db.query(POAActivity).filter(POAActivity.id == activity_id).first()
+        if not activity:
+            return JSONResponse({"success": False, "error": "Actividad no encontrada"}, status_code=404)
+        _ensure_dependencies_table(db)
+        if not remove_dependency(db, predecessor_id, activity_id):
+            return JSONResponse({"success": False, "error": "Dependencia no encontrada"}, status_code=404)
+        record_poa_change(db, ENTITY_ACTIVITY, activity.id, objective_id=activity.objective_id, activity_id=activity.id)
+        record_poa_change(db, ENTITY_OBJECTIVE, activity.objective_id, objective_id=activity.objective_id)
+        try:
+            db.commit()
+        except (sqlite3.OperationalError, SQLAlchemyError):
+            db.rollback()
+            return JSONResponse(
+                {"success": False, "error": "No se pudo escribir en la base de datos (modo solo lectura o bloqueo)."},
+                status_code=500,
+            )
+        return JSONResponse({"success": True})
+    finally:
+        db.close()
+
+
+POA_EVENTS_HEARTBEAT_SECONDS = float((os.environ.get("POA_EVENTS_HEARTBEAT_SECONDS") or "15").strip() or "15")
+POA_EVENTS_SCOPE_REFRESH_SECONDS = 5.0
+
+
+def _poa_event_scope(request: Request) -> Dict[str, Any]:
+    """Permisos de una conexión SSE: clave de notificaciones y objetivos visibles."""
+    _bind_core_symbols()
+    db = SessionLocal()
+    try:
+        all_access = _poa_access_level_for_request(request, db) == "todas_tareas"
+        return {
+            "user_key": _notification_user_key(request, db),
+            "all_access": all_access,
+            "objective_ids": set() if all_access else {int(obj.id) for obj in _allowed_objectives_for_user(request, db)},
+            "refreshed_at": time.monotonic(),
+            "cursor": poa_data_version(db),
+        }
+    finally:
+        db.close()
+
+
+async def _poa_event_visible(request: Request, scope: Dict[str, Any], payload: Dict[str, Any]) -> bool:
+    event_type = str(payload.get("type") or "")
+    if event_type.startswith("notification."):
+        return bool(scope["user_key"]) and payload.get("user_key") == scope["user_key"]
+    objective_id = payload.get("objective_id")
+    if scope["all_access"] or not objective_id:
+        return True
+    if int(objective_id) in scope["objective_ids"]:
+        return True
+    # Una asignación nueva puede abrir el objetivo: se recalcula con moderación.
+    if time.monotonic() - scope["refreshed_at"] >= POA_EVENTS_SCOPE_REFRESH_SECONDS:
+        scope.update(await asyncio.to_thread(_poa_event_scope, request))
+        return scope["all_access"] or int(objective_id) in scope["objective_ids"]
+    return False
+
+
+def _format_sse(event_type: str, payload: Dict[str, Any], event_id: Any = None) -> str:
+    lines = []
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {json.dumps(payload, ensure_ascii=False, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+@router.get("/api/poa/events")
+async def poa_event_stream(request: Request):
+    scope = await asyncio.to_thread(_poa_event_scope, request)
+    await get_event_broker().ensure_listening()
+    hub = get_event_hub()
+    subscription = hub.subscribe()
+    last_event_id = (request.headers.get("last-event-id") or "").strip()
+
+    async def stream():
+        try:
+            yield _format_sse("ready", {"cursor": scope["cursor"]}, scope["cursor"] or None)
+            if last_event_id.isdigit() and int(last_event_id) < int(scope["cursor"]):
+                yield _format_sse("resync", {"since": int(last_event_id), "cursor": scope["cursor"]})
+            while True:
+                if await request.is_disconnected():
+                    break
+                payload = await subscription.get(POA_EVENTS_HEARTBEAT_SECONDS)
+                if subscription.lagged:
+                    subscription.lagged = False
+                    yield _format_sse("resync", {"reason": "lagged"})
+                if payload is None:
+                    yield ": ping\n\n"
+                    continue
+                if not await _poa_event_visible(request, scope, payload):
+                    continue
+                data = {key: value for key, value in payload.items() if key not in {"type", "user_key"}}
+                yield _format_sse(str(payload.get("type") or "message"), data, payload.get("cursor"))
+        finally:
+            hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/api/poa/activities/no-owner")
 def poa_activities_without_owner(request: Request):
     _bind_core_symbols()
@@ -9917,15 +10264,13 @@ def poa_activities_without_owner(request: Request):
             return JSONResponse({"success": True, "total": 0, "data": []})
         activities = (
             db.query(POAActivity)
-            .filter(POAActivity.objective_id.in_(objective_ids))
+            .filter(POAActivity.objective_id.in_(objective_ids), POAActivity.responsable_key == "")
             .order_by(POAActivity.id.desc())
             .all()
         )
         objective_map = {int(obj.id): obj for obj in objectives}
         rows: List[Dict[str, Any]] = []
         for item in activities:
-            if str(item.responsable or "").strip():
-                continue
             objective = objective_map.get(int(item.objective_id or 0))
             rows.append(
                 {
@@ -9951,38 +10296,13 @@ def notifications_summary(request: Request):
     db = SessionLocal()
     try:
         now = datetime.utcnow()
-        today = now.date()
         tenant_id = _normalize_tenant_id(get_current_tenant(request))
         user_key = _notification_user_key(request, db)
-        items: List[Dict[str, Any]] = []
-
-        pending_approvals = (
-            db.query(POADeliverableApproval)
-            .filter(POADeliverableApproval.status == "pendiente")
-            .order_by(POADeliverableApproval.created_at.desc())
-            .all()
-        )
-        for approval in pending_approvals:
-            if not _is_user_process_owner(request, db, approval.process_owner):
-                continue
-            activity = db.query(POAActivity).filter(POAActivity.id == approval.activity_id).first()
-            objective = db.query(StrategicObjectiveConfig).filter(StrategicObjectiveConfig.id == approval.objective_id).first()
-            items.append(
-                {
-                    "id": f"poa-approval-{approval.id}",
-                    "kind": "poa_aprobacion",
-                    "title": "Aprobación de entregable pendiente",
-                    "message": (
-                        f"Actividad {(activity.nombre if activity else 'sin nombre')} "
-                        f"({activity.codigo if activity else ''}) - Objetivo {(objective.nombre if objective else '')}"
-                    ).strip(),
-                    "created_at": (approval.created_at or now).isoformat(),
-                    "href": "/poa/crear",
-                }
-            )
+        ensure_notification_inbox_current(db)
+        items: List[Dict[str, Any]] = inbox_items(db, user_key)
 
-        # ...línea eliminada: _can_authorize_documents(request) no existe...
-            tenant_id = _get_document_tenant(request)
+        # Autorización de documentos: sólo administración (no existe un permiso más fino).
+        if is_admin_or_superadmin(request):
             docs_query = db.query(DocumentoEvidencia).filter(DocumentoEvidencia.estado.in_(["enviado", "actualizado"]))
             if is_superadmin(request):
                 header_tenant = request.headers.get("x-tenant-id")
@@ -10007,133 +10327,29 @@ def notifications_summary(request: Request):
                     }
                 )
 
-        if is_superadmin(request):
-            quiz_rows = (
-                db.query(PublicQuizSubmission)
-                .order_by(PublicQuizSubmission.created_at.desc(), PublicQuizSubmission.id.desc())
-                .limit(20)
-                .all()
-            )
-            for quiz in quiz_rows:
-                items.append(
-                    {
-                        "id": f"quiz-submission-{quiz.id}",
-                        "kind": "quiz_descuento",
-                        "title": "Nuevo cuestionario de descuento",
-                        "message": (
-                            f"{(quiz.nombre or '').strip()} · {(quiz.cooperativa or '').strip()} · "
-                            f"{int(quiz.correctas or 0)}/10 correctas · {int(quiz.descuento or 0)}% de descuento"
-                        ),
-                        "created_at": (quiz.created_at or now).isoformat(),
-                        "href": "/usuarios",
-                    }
-                )
-
-        session_username = (getattr(request.state, "user_name", None) or request.cookies.get("user_name") or "").strip()
-        user = _current_user_record(request, db)
-        aliases = sorted(_user_aliases(user, session_username))
-        if aliases:
-            lookahead = today + timedelta(days=2)
-            own_activities = (
-                db.query(POAActivity)
-                .filter(func.lower(POAActivity.responsable).in_(aliases))
-                .order_by(POAActivity.fecha_final.asc(), POAActivity.id.asc())
-                .all()
-            )
-            for activity in own_activities:
-                if not activity.fecha_final:
-                    continue
-                if (activity.entrega_estado or "").strip().lower() == "aprobada":
-                    continue
-                if activity.fecha_final > lookahead:
-                    continue
-                delta_days = (activity.fecha_final - today).days
-                if delta_days < 0:
-                    title = "Tarea atrasada"
-                    message = f"{activity.nombre} está atrasada desde {activity.fecha_final.isoformat()}"
-                    deadline_state = "atrasada"
-                elif delta_days == 0:
-                    title = "Actividad vence hoy"
-                    message = f"{activity.nombre} vence hoy"
-                    deadline_state = "por_vencer"
-                else:
-                    title = "Actividad por vencer"
-                    message = f"{activity.nombre} vence el {activity.fecha_final.isoformat()}"
-                    deadline_state = "por_vencer"
-                items.append(
-                    {
-                        "id": f"activity-deadline-{activity.id}",
-                        "kind": "actividad_fecha",
-                        "title": title,
-                        "message": message,
-                        "deadline_state": deadline_state,
-                        "created_at": datetime.combine(activity.fecha_final, datetime.min.time()).isoformat(),
-                        "href": "/poa/crear",
-                    }
-                )
-            own_subactivities = (
-                db.query(POASubactivity, POAActivity)
-                .join(POAActivity, POAActivity.id == POASubactivity.activity_id)
-                .filter(func.lower(POASubactivity.responsable).in_(aliases))
-                .order_by(POASubactivity.fecha_final.asc(), POASubactivity.id.asc())
-                .all()
-            )
-            for subactivity, parent_activity in own_subactivities:
-                if not subactivity.fecha_final:
-                    continue
-                # Si la actividad ya está terminada, no generar alerta de atraso para sus subtareas.
-                if _activity_status(parent_activity, today=today) == "Terminada":
-                    continue
-                if subactivity.fecha_final > lookahead:
-                    continue
-                delta_days = (subactivity.fecha_final - today).days
-                if delta_days < 0:
-                    title = "Tarea atrasada"
-                    message = (
-                        f"{subactivity.nombre} (subtarea de {parent_activity.nombre}) "
-                        f"está atrasada desde {subactivity.fecha_final.isoformat()}"
-                    )
-                    deadline_state = "atrasada"
-                elif delta_days == 0:
-                    title = "Subtarea vence hoy"
-                    message = f"{subactivity.nombre} vence hoy"
-                    deadline_state = "por_vencer"
-                else:
-                    title = "Subtarea por vencer"
-                    message = f"{subactivity.nombre} vence el {subactivity.fecha_final.isoformat()}"
-                    deadline_state = "por_vencer"
-                items.append(
-                    {
-                        "id": f"subactivity-deadline-{subactivity.id}",
-                        "kind": "actividad_fecha",
-                        "title": title,
-                        "message": message,
-                        "deadline_state": deadline_state,
-                        "created_at": datetime.combine(subactivity.fecha_final, datetime.min.time()).isoformat(),
-                        "href": f"/poa/crear?activity_id={int(parent_activity.id or 0)}&subactivity_id={int(subactivity.id or 0)}",
-                    }
-                )
-
-        items.sort(key=lambda item: item.get("created_at") or "", reverse=True)
-        limited_items = items[:25]
-        notification_ids = [str(item.get("id") or "").strip() for item in limited_items if str(item.get("id") or "").strip()]
-        read_ids: Set[str] = set()
-        if user_key and notification_ids:
+        # Los documentos no pasan por la bandeja: su lectura sigue en UserNotificationRead.
+        doc_ids = [str(item.get("id") or "") for item in items if str(item.get("kind") or "") == "documento_autorizacion"]
+        if user_key and doc_ids:
             read_rows = (
                 db.query(UserNotificationRead.notification_id)
                 .filter(
                     UserNotificationRead.tenant_id == tenant_id,
                     UserNotificationRead.user_key == user_key,
-                    UserNotificationRead.notification_id.in_(notification_ids),
+                    UserNotificationRead.notification_id.in_(doc_ids),
                 )
                 .all()
             )
             read_ids = {str(row[0]) for row in read_rows}
-        for item in limited_items:
-            item["read"] = str(item.get("id") or "") in read_ids
+            for item in items:
+                if str(item.get("id") or "") in doc_ids:
+                    item["read"] = str(item.get("id") or "") in read_ids
+
+        items.sort(key=lambda item: item.get("created_at") or "", reverse=True)
+        limited_items = items[:25]
 
         counts = {
             "poa_aprobacion": 0,
+            "poa_entregable": 0,
             "documento_autorizacion": 0,
             "actividad_fecha": 0,
             "actividad_atrasada": 0,
@@ -10180,6 +10396,9 @@ def mark_notification_read(request: Request, data: dict = Body(default={})):
         if not user_key:
             return JSONResponse({"success": False, "error": "Usuario no autenticado"}, status_code=401)
 
+        if mark_inbox_read(db, user_key, [notification_id]):
+            db.commit()
+            return JSONResponse({"success": True})
         row = (
             db.query(UserNotificationRead)
             .filter(
@@ -10223,6 +10442,9 @@ def mark_all_notifications_read(request: Request, data: dict = Body(default={}))
         if not ids:
             return JSONResponse({"success": True, "updated": 0})
 
+        inbox_ids = mark_inbox_read(db, user_key, ids)
+        updates = len(inbox_ids)
+        ids = [notif_id for notif_id in ids if notif_id not in inbox_ids]
         existing = (
             db.query(UserNotificationRead)
             .filter(
@@ -10231,10 +10453,9 @@ def mark_all_notifications_read(request: Request, data: dict = Body(default={}))
                 UserNotificationRead.notification_id.in_(ids),
             )
             .all()
-        )
+        ) if ids else []
         existing_by_id = {row.notification_id: row for row in existing}
         now = datetime.utcnow()
-        updates = 0
         for notif_id in ids:
             row = existing_by_id.get(notif_id)
             if row:
@@ -10309,8 +10530,7 @@ def create_poa_activity(request: Request, data: dict = Body(...)):
         if not objective:
             return JSONResponse({"success": False, "error": "Objetivo no encontrado"}, status_code=404)
         session_username = (getattr(request.state, "user_name", None) or request.cookies.get("user_name") or "").strip()
-        user = _current_user_record(request, db)
-        aliases = _user_aliases(user, session_username)
+        aliases = set(_request_identity(request, db).aliases)
         can_validate_deliverables = bool((objective.lider or "").strip().lower() in aliases) or is_admin_or_superadmin(request)
         if not can_validate_deliverables:
             normalized_deliverables = [{**item, "validado": False} for item in normalized_deliverables]
@@ -10348,6 +10568,11 @@ def create_poa_activity(request: Request, data: dict = Body(...)):
             created_by=created_by,
         )
         db.add(activity)
+        db.flush()
+        refresh_progress_rollups(db, activity_ids=[activity.id])
+        refresh_activity_occurrences(db, [activity.id])
+        sync_deadline_notifications(db, activity_ids=[activity.id])
+        record_poa_change(db, ENTITY_ACTIVITY, activity.id, objective_id=activity.objective_id, activity_id=activity.id)
         db.commit()
         db.refresh(activity)
         budget_rows: List[Dict[str, Any]] = []
@@ -10417,9 +10642,7 @@ def update_poa_activity(request: Request, activity_id: int, data: dict = Body(..
         objective = db.query(StrategicObjectiveConfig).filter(StrategicObjectiveConfig.id == activity.objective_id).first()
         if not objective:
             return JSONResponse({"success": False, "error": "Objetivo no encontrado"}, status_code=404)
-        session_username = (getattr(request.state, "user_name", None) or request.cookies.get("user_name") or "").strip()
-        user = _current_user_record(request, db)
-        aliases = _user_aliases(user, session_username)
+        aliases = set(_request_identity(request, db).aliases)
         can_validate_deliverables = bool((objective.lider or "").strip().lower() in aliases) or is_admin_or_superadmin(request)
         if not can_validate_deliverables:
             normalized_deliverables = [{**item, "validado": False} for item in normalized_deliverables]
@@ -10459,6 +10682,10 @@ def update_poa_activity(request: Request, activity_id: int, data: dict = Body(..
             budget_rows = _replace_activity_budgets(db, int(activity.id), data.get("budget_items"))
         if "impacted_milestone_ids" in data:
             _replace_activity_milestone_links(db, int(activity.id), impacted_milestone_ids)
+        refresh_progress_rollups(db, activity_ids=[activity.id])
+        refresh_activity_occurrences(db, [activity.id])
+        sync_deadline_notifications(db, activity_ids=[activity.id])
+        record_poa_change(db, ENTITY_ACTIVITY, activity.id, objective_id=activity.objective_id, activity_id=activity.id)
         db.commit()
         db.refresh(activity)
         subs = db.query(POASubactivity).filter(POASubactivity.activity_id == activity.id).all()
@@ -10485,11 +10712,19 @@ def delete_poa_activity(request: Request, activity_id: int):
         allowed_ids = {obj.id for obj in _allowed_objectives_for_user(request, db)}
         if activity.objective_id not in allowed_ids and not is_admin_or_superadmin(request):
             return JSONResponse({"success": False, "error": "No autorizado para eliminar esta actividad"}, status_code=403)
+        _ensure_subactivity_closure_table(db)
+        unlink_activity_subactivities(db, int(activity.id))
         db.query(POASubactivity).filter(POASubactivity.activity_id == activity.id).delete()
         _delete_activity_budgets(db, int(activity.id))
         _delete_activity_deliverables(db, int(activity.id))
         _delete_activity_milestone_links(db, int(activity.id))
+        _ensure_dependencies_table(db)
+        delete_activity_dependencies(db, int(activity.id))
         db.delete(activity)
+        refresh_progress_rollups(db, activity_ids=[activity_id])
+        refresh_activity_occurrences(db, [activity_id])
+        sync_deadline_notifications(db, activity_ids=[activity_id])
+        record_poa_change(db, ENTITY_ACTIVITY, activity_id, ACTION_DELETE, objective_id=activity.objective_id, activity_id=activity_id)
         db.commit()
         return JSONResponse({"success": True})
     finally:
@@ -10507,9 +10742,7 @@ def mark_poa_activity_in_progress(request: Request, activity_id: int):
         allowed_ids = {obj.id for obj in _allowed_objectives_for_user(request, db)}
         if activity.objective_id not in allowed_ids and not is_admin_or_superadmin(request):
             return JSONResponse({"success": False, "error": "No autorizado para esta actividad"}, status_code=403)
-        session_username = (getattr(request.state, "user_name", None) or request.cookies.get("user_name") or "").strip()
-        user = _current_user_record(request, db)
-        aliases = _user_aliases(user, session_username)
+        aliases = set(_request_identity(request, db).aliases)
         is_activity_owner = (activity.responsable or "").strip().lower() in aliases
         if not is_activity_owner:
             return JSONResponse({"success": False, "error": "Solo el responsable puede habilitar en proceso"}, status_code=403)
@@ -10519,6 +10752,7 @@ def mark_poa_activity_in_progress(request: Request, activity_id: int):
         if (activity.entrega_estado or "").strip().lower() == "rechazada":
             activity.entrega_estado = "ninguna"
         db.add(activity)
+        record_poa_change(db, ENTITY_ACTIVITY, activity.id, objective_id=activity.objective_id, activity_id=activity.id)
         db.commit()
         db.refresh(activity)
         subs = db.query(POASubactivity).filter(POASubactivity.activity_id == activity.id).all()
@@ -10540,8 +10774,7 @@ def mark_poa_activity_finished(request: Request, activity_id: int, data: dict =
         if activity.objective_id not in allowed_ids and not is_admin_or_superadmin(request):
             return JSONResponse({"success": False, "error": "No autorizado para esta actividad"}, status_code=403)
         session_username = (getattr(request.state, "user_name", None) or request.cookies.get("user_name") or "").strip()
-        user = _current_user_record(request, db)
-        aliases = _user_aliases(user, session_username)
+        aliases = set(_request_identity(request, db).aliases)
         is_activity_owner = (activity.responsable or "").strip().lower() in aliases
         if not is_activity_owner:
             return JSONResponse({"success": False, "error": "Solo el responsable puede declarar terminado"}, status_code=403)
@@ -10593,6 +10826,11 @@ def mark_poa_activity_finished(request: Request, activity_id: int, data: dict =
             activity.entrega_aprobada_at = None
             db.add(approval)
             db.add(activity)
+            notify_pending_approval(db, approval, activity=activity, objective=objective)
+            refresh_progress_rollups(db, activity_ids=[activity.id])
+            refresh_activity_occurrences(db, [activity.id])
+            sync_deadline_notifications(db, activity_ids=[activity.id])
+            record_poa_change(db, ENTITY_ACTIVITY, activity.id, objective_id=activity.objective_id, activity_id=activity.id)
             db.commit()
             db.refresh(activity)
             subs = db.query(POASubactivity).filter(POASubactivity.activity_id == activity.id).all()
@@ -10610,6 +10848,10 @@ def mark_poa_activity_finished(request: Request, activity_id: int, data: dict =
         activity.entrega_aprobada_por = ""
         activity.entrega_aprobada_at = None
         db.add(activity)
+        refresh_progress_rollups(db, activity_ids=[activity.id])
+        refresh_activity_occurrences(db, [activity.id])
+        sync_deadline_notifications(db, activity_ids=[activity.id])
+        record_poa_change(db, ENTITY_ACTIVITY, activity.id, objective_id=activity.objective_id, activity_id=activity.id)
         db.commit()
         db.refresh(activity)
         subs = db.query(POASubactivity).filter(POASubactivity.activity_id == activity.id).all()
@@ -10636,8 +10878,7 @@ def request_poa_activity_completion(request: Request, activity_id: int):
         if activity.objective_id not in allowed_ids and not is_admin_or_superadmin(request):
             return JSONResponse({"success": False, "error": "No autorizado para esta actividad"}, status_code=403)
         session_username = (getattr(request.state, "user_name", None) or request.cookies.get("user_name") or "").strip()
-        user = _current_user_record(request, db)
-        aliases = _user_aliases(user, session_username)
+        aliases = set(_request_identity(request, db).aliases)
         is_activity_owner = (activity.responsable or "").strip().lower() in aliases
         if not is_activity_owner:
             return JSONResponse({"success": False, "error": "Solo el responsable puede solicitar terminación"}, status_code=403)
@@ -10685,6 +10926,11 @@ def request_poa_activity_completion(request: Request, activity_id: int):
         activity.entrega_aprobada_at = None
         db.add(approval)
         db.add(activity)
+        notify_pending_approval(db, approval, activity=activity, objective=objective)
+        refresh_progress_rollups(db, activity_ids=[activity.id])
+        refresh_activity_occurrences(db, [activity.id])
+        sync_deadline_notifications(db, activity_ids=[activity.id])
+        record_poa_change(db, ENTITY_ACTIVITY, activity.id, objective_id=activity.objective_id, activity_id=activity.id)
         db.commit()
         return JSONResponse({"success": True, "message": "Solicitud de aprobación enviada al dueño del proceso"})
     finally:
@@ -10729,6 +10975,11 @@ def decide_poa_deliverable_approval(request: Request, approval_id: int, data: di
             activity.entrega_aprobada_por = ""
             activity.entrega_aprobada_at = None
         db.add(activity)
+        notify_approval_resolved(db, approval, activity=activity)
+        refresh_progress_rollups(db, activity_ids=[activity.id])
+        refresh_activity_occurrences(db, [activity.id])
+        sync_deadline_notifications(db, activity_ids=[activity.id])
+        record_poa_change(db, ENTITY_ACTIVITY, activity.id, objective_id=activity.objective_id, activity_id=activity.id)
         db.commit()
         return JSONResponse({"success": True, "message": "Aprobación procesada correctamente"})
     finally:
@@ -10830,6 +11081,14 @@ def create_poa_subactivity(request: Request, activity_id: int, data: dict = Body
             assigned_by=assigned_by,
         )
         db.add(sub)
+        db.flush()
+        _ensure_subactivity_closure_table(db)
+        link_subactivity(db, int(sub.id), int(parent_sub.id) if parent_sub else None)
+        refresh_progress_rollups(db, activity_ids=[activity.id])
+        refresh_activity_occurrences(db, [activity.id])
+        sync_deadline_notifications(db, activity_ids=[activity.id])
+        record_poa_change(db, ENTITY_SUBACTIVITY, sub.id, objective_id=activity.objective_id, activity_id=activity.id)
+        record_poa_change(db, ENTITY_ACTIVITY, activity.id, objective_id=activity.objective_id, activity_id=activity.id)
         db.commit()
         db.refresh(sub)
         return JSONResponse({"success": True, "data": _serialize_poa_subactivity(sub)})
@@ -10918,6 +11177,11 @@ def update_poa_subactivity(request: Request, subactivity_id: int, data: dict = B
         sub.periodicidad = periodicidad
         sub.cada_xx_dias = cada_xx_dias if periodicidad == "cada_xx_dias" else None
         db.add(sub)
+        refresh_progress_rollups(db, activity_ids=[activity.id])
+        refresh_activity_occurrences(db, [activity.id])
+        sync_deadline_notifications(db, activity_ids=[activity.id])
+        record_poa_change(db, ENTITY_SUBACTIVITY, sub.id, objective_id=activity.objective_id, activity_id=activity.id)
+        record_poa_change(db, ENTITY_ACTIVITY, activity.id, objective_id=activity.objective_id, activity_id=activity.id)
         db.commit()
         db.refresh(sub)
         return JSONResponse({"success": True, "data": _serialize_poa_subactivity(sub)})
@@ -10939,16 +11203,385 @@ def delete_poa_subactivity(request: Request, subactivity_id: int):
         activity = db.query(POAActivity).filter(POAActivity.id == sub.activity_id).first()
         if not activity:
             return JSONResponse({"success": False, "error": "Actividad no encontrada"}, status_code=404)
-        descendants = _descendant_subactivity_ids(db, activity.id, sub.id)
+        _ensure_subactivity_closure_table(db)
+        descendants = [node_id for node_id in unlink_subtree(db, int(sub.id)) if node_id != int(sub.id)]
         if descendants:
             db.query(POASubactivity).filter(POASubactivity.id.in_(descendants)).delete(synchronize_session=False)
         db.delete(sub)
+        refresh_progress_rollups(db, activity_ids=[activity.id])
+        refresh_activity_occurrences(db, [activity.id])
+        sync_deadline_notifications(db, activity_ids=[activity.id])
+        for deleted_id in [int(sub.id), *sorted(descendants or [])]:
+            record_poa_change(db, ENTITY_SUBACTIVITY, deleted_id, ACTION_DELETE, objective_id=activity.objective_id, activity_id=activity.id)
+        record_poa_change(db, ENTITY_ACTIVITY, activity.id, objective_id=activity.objective_id, activity_id=activity.id)
         db.commit()
         return JSONResponse({"success": True})
     finally:
         db.close()
 
 
+def _readable_subactivity(request: Request, db, subactivity_id: int):
+    sub = db.query(POASubactivity).filter(POASubactivity.id == subactivity_id).first()
+    if not sub:
+        return None, JSONResponse({"success": False, "error": "Subactividad no encontrada"}, status_code=404)
+    activity = db.query(POAActivity).filter(POAActivity.id == sub.activity_id).first()
+    if not activity:
+        return None, JSONResponse({"success": False, "error": "Actividad no encontrada"}, status_code=404)
+    if not is_admin_or_superadmin(request):
+        allowed_ids = {obj.id for obj in _allowed_objectives_for_user(request, db)}
+        if activity.objective_id not in allowed_ids:
+            return None, JSONResponse({"success": False, "error": "No autorizado"}, status_code=403)
+    return sub, None
+
+
+@router.get("/api/poa/subactivities/{subactivity_id}/subtree")
+def poa_subactivity_subtree(request: Request, subactivity_id: int):
+    _bind_core_symbols()
+    db = SessionLocal()
+    try:
+        _ensure_poa_subactivity_recurrence_columns(db)
+        _ensure_subactivity_closure_table(db)
+        sub, error = _readable_subactivity(request, db, subactivity_id)
+        if error:
+            return error
+        depths = subtree_depths(db, int(sub.id))
+        data = []
+        for item in subtree_rows(db, int(sub.id)):
+            payload = _serialize_poa_subactivity(item)
+            payload["depth"] = depths.get(int(item.id), 0)
+            data.append(payload)
+        return JSONResponse({"success": True, "root_id": int(sub.id), "data": data})
+    finally:
+        db.close()
+
+
+@router.get("/api/poa/subactivities/{subactivity_id}/ancestors")
+def poa_subactivity_ancestors(request: Request, subactivity_id: int):
+    _bind_core_symbols()
+    db = SessionLocal()
+    try:
+        _ensure_poa_subactivity_recurrence_columns(db)
+        _ensure_subactivity_closure_table(db)
+        sub, error = _readable_subactivity(request, db, subactivity_id)
+        if error:
+            return error
+        data = [_serialize_poa_subactivity(item) for item in ancestor_rows(db, int(sub.id))]
+        return JSONResponse({"success": True, "data": data})
+    finally:
+        db.close()
+
+
+@router.post("/api/poa/subactivities/{subactivity_id}/move")
+def move_poa_subactivity(request: Request, subactivity_id: int, data: dict = Body(...)):
+    _bind_core_symbols()
+    if not is_admin_or_superadmin(request):
+        return JSONResponse({"success": False, "error": "Solo administrador puede mover subtareas"}, status_code=403)
+    db = SessionLocal()
+    try:
+        _ensure_poa_subactivity_recurrence_columns(db)
+        _ensure_subactivity_closure_table(db)
+        sub = db.query(POASubactivity).filter(POASubactivity.id == subactivity_id).first()
+        if not sub:
+            return JSONResponse({"success": False, "error": "Subactividad no encontrada"}, status_code=404)
+        activity = db.query(POAActivity).filter(POAActivity.id == sub.activity_id).first()
+        if not activity:
+            return JSONResponse({"success": False, "error": "Actividad no encontrada"}, status_code=404)
+        try:
+            parent_sub_id = int(data.get("parent_subactivity_id") or 0)
+        except (TypeError, ValueError):
+            return JSONResponse({"success": False, "error": "Subactividad padre inválida"}, status_code=400)
+        parent_sub = None
+        if parent_sub_id:
+            parent_sub = (
+                db.query(POASubactivity)
+                .filter(POASubactivity.id == parent_sub_id, POASubactivity.activity_id == activity.id)
+                .first()
+            )
+            if not parent_sub:
+                return JSONResponse({"success": False, "error": "Subactividad padre no encontrada"}, status_code=404)
+            if sub.fecha_inicial and sub.fecha_final:
+                child_error = _validate_child_date_range(
+                    sub.fecha_inicial,
+                    sub.fecha_final,
+                    parent_sub.fecha_inicial,
+                    parent_sub.fecha_final,
+                    "Subactividad",
+                    "Subactividad padre",
+                )
+                if child_error:
+                    return JSONResponse({"success": False, "error": child_error}, status_code=400)
+        try:
+            moved_ids = move_subtree(db, sub, parent_sub, MAX_SUBTASK_DEPTH)
+        except ValueError as exc:
+            return JSONResponse({"success": False, "error": str(exc)}, status_code=400)
+        for moved_id in moved_ids:
+            record_poa_change(db, ENTITY_SUBACTIVITY, moved_id, objective_id=activity.objective_id, activity_id=activity.id)
+        record_poa_change(db, ENTITY_ACTIVITY, activity.id, objective_id=activity.objective_id, activity_id=activity.id)
+        db.commit()
+        data = [_serialize_poa_subactivity(item) for item in subtree_rows(db, int(sub.id))]
+        return JSONResponse({"success": True, "data": data})
+    except (sqlite3.OperationalError, SQLAlchemyError):
+        db.rollback()
+        return JSONResponse(
+            {"success": False, "error": "No se pudo escribir en la base de datos (modo solo lectura o bloqueo)."},
+            status_code=500,
+        )
+    finally:
+        db.close()
+
+
+POA_BATCH_MAX_OPERATIONS = 200
+_BATCH_FIELDS = {
+    ENTITY_ACTIVITY: {
+        "nombre", "codigo", "responsable", "descripcion", "fecha_inicial", "fecha_final",
+        "inicio_forzado", "recurrente", "periodicidad", "cada_xx_dias",
+    },
+    ENTITY_SUBACTIVITY: {
+        "nombre", "codigo", "responsable", "entregable", "descripcion", "fecha_inicial", "fecha_final",
+        "recurrente", "periodicidad", "cada_xx_dias",
+    },
+}
+
+
+def _batch_recurrence(item: Any, fields: Dict[str, Any]) -> tuple:
+    """``(recurrente, periodicidad, cada_xx_dias, error)`` combinando los cambios con lo guardado."""
+    recurrente = bool(fields["recurrente"]) if "recurrente" in fields else bool(item.recurrente)
+    periodicidad = str((fields["periodicidad"] if "periodicidad" in fields else item.periodicidad) or "").strip().lower()
+    try:
+        cada_xx_dias = int((fields["cada_xx_dias"] if "cada_xx_dias" in fields else item.cada_xx_dias) or 0)
+    except (TypeError, ValueError):
+        return False, "", None, "Cada xx días debe ser un número válido"
+    if not recurrente:
+        return False, "", None, None
+    if periodicidad not in VALID_ACTIVITY_PERIODICITIES:
+        return False, "", None, "Selecciona una periodicidad válida"
+    if periodicidad == "cada_xx_dias" and cada_xx_dias <= 0:
+        return False, "", None, "Cada xx días debe ser mayor a 0"
+    return True, periodicidad, (cada_xx_dias if periodicidad == "cada_xx_dias" else None), None
+
+
+def _batch_dates(item: Any, fields: Dict[str, Any]) -> tuple:
+    start_date, end_date = item.fecha_inicial, item.fecha_final
+    if "fecha_inicial" in fields:
+        start_date, error = _parse_date_field(fields.get("fecha_inicial"), "Fecha inicial", required=True)
+        if error:
+            return None, None, error
+    if "fecha_final" in fields:
+        end_date, error = _parse_date_field(fields.get("fecha_final"), "Fecha final", required=True)
+        if error:
+            return None, None, error
+    return start_date, end_date, None
+
+
+def _apply_batch_update(entity: str, item: Any, fields: Dict[str, Any], snapshot: Dict[str, Dict[int, Any]]) -> str | None:
+    """Valida un cambio parcial contra el snapshot y lo aplica en memoria; devuelve el error o ``None``."""
+    nombre = str((fields["nombre"] if "nombre" in fields else item.nombre) or "").strip()
+    if not nombre:
+        return "Nombre es obligatorio"
+    start_date, end_date, error = _batch_dates(item, fields)
+    if error:
+        return error
+    label = "Actividad" if entity == ENTITY_ACTIVITY else "Subactividad"
+    error = _validate_date_range(start_date, end_date, label)
+    if error:
+        return error
+    if entity == ENTITY_ACTIVITY:
+        objective = snapshot["objectives"].get(int(item.objective_id or 0))
+        if objective is None:
+            return "Objetivo no encontrado"
+        parents = [(objective, "Objetivo")]
+    else:
+        activity = snapshot["activities"].get(int(item.activity_id or 0))
+        if activity is None:
+            return "Actividad no encontrada"
+        parents = [(activity, "Actividad")]
+        parent_sub = snapshot["subactivities"].get(int(item.parent_subactivity_id or 0))
+        if parent_sub is not None:
+            parents.append((parent_sub, "Subactividad padre"))
+    for parent, parent_label in parents:
+        error = _validate_child_date_range(
+            start_date, end_date, parent.fecha_inicial, parent.fecha_final, label, parent_label
+        )
+        if error:
+            return error
+    recurrente, periodicidad, cada_xx_dias, error = _batch_recurrence(item, fields)
+    if error:
+        return error
+
+    item.nombre = nombre
+    for key in ("codigo", "responsable", "entregable", "descripcion"):
+        if key in fields:
+            setattr(item, key, str(fields.get(key) or "").strip())
+    if "inicio_forzado" in fields:
+        item.inicio_forzado = bool(fields.get("inicio_forzado"))
+    item.fecha_inicial = start_date
+    item.fecha_final = end_date
+    item.recurrente = recurrente
+    item.periodicidad = periodicidad
+    item.cada_xx_dias = cada_xx_dias
+    return None
+
+
+def _load_batch_snapshot(db, operations: List[Dict[str, Any]]) -> Dict[str, Dict[int, Any]]:
+    """Carga en pocas consultas las entidades afectadas y sus padres."""
+    activity_ids = {op["id"] for op in operations if op["entity"] == ENTITY_ACTIVITY}
+    sub_ids = {op["id"] for op in operations if op["entity"] == ENTITY_SUBACTIVITY}
+    subactivities: Dict[int, Any] = {}
+    if sub_ids:
+        subactivities = {
+            int(item.id): item for item in db.query(POASubactivity).filter(POASubactivity.id.in_(sorted(sub_ids))).all()
+        }
+        parent_ids = {int(item.parent_subactivity_id) for item in subactivities.values() if item.parent_subactivity_id}
+        parent_ids -= set(subactivities)
+        if parent_ids:
+            subactivities.update(
+                {
+                    int(item.id): item
+                    for item in db.query(POASubactivity).filter(POASubactivity.id.in_(sorted(parent_ids))).all()
+                }
+            )
+        activity_ids |= {int(item.activity_id) for item in subactivities.values()}
+    activities = (
+        {int(item.id): item for item in db.query(POAActivity).filter(POAActivity.id.in_(sorted(activity_ids))).all()}
+        if activity_ids
+        else {}
+    )
+    objective_ids = {int(item.objective_id) for item in activities.values() if item.objective_id}
+    objectives = (
+        {
+            int(item.id): item
+            for item in db.query(StrategicObjectiveConfig).filter(StrategicObjectiveConfig.id.in_(sorted(objective_ids))).all()
+        }
+        if objective_ids
+        else {}
+    )
+    return {"activities": activities, "subactivities": subactivities, "objectives": objectives}
+
+
+def _batch_result_data(entity: str, item: Any) -> Dict[str, Any]:
+    if entity == ENTITY_SUBACTIVITY:
+        return _serialize_poa_subactivity(item)
+    return {
+        "id": item.id,
+        "objective_id": item.objective_id,
+        "nombre": item.nombre or "",
+        "codigo": item.codigo or "",
+        "responsable": item.responsable or "",
+        "fecha_inicial": _date_to_iso(item.fecha_inicial),
+        "fecha_final": _date_to_iso(item.fecha_final),
+        "inicio_forzado": bool(item.inicio_forzado),
+        "descripcion": item.descripcion or "",
+        "recurrente": bool(item.recurrente),
+        "periodicidad": item.periodicidad or "",
+        "cada_xx_dias": item.cada_xx_dias or 0,
+        "status": _activity_status(item),
+    }
+
+
+@router.post("/api/poa/batch")
+def poa_batch_update(request: Request, data: dict = Body(...)):
+    """Aplica una lista de cambios parciales a actividades y subactividades en una sola transacción.
+
+    Cada operación es ``{"entity": "activity"|"subactivity", "id": N, "fields": {...}}``.
+    Con ``atomic`` (predeterminado) un error en cualquier operación descarta todo
+    el lote; sin él se aplican las válidas. La respuesta trae un resultado por
+    operación en el mismo orden.
+    """
+    _bind_core_symbols()
+    if not is_admin_or_superadmin(request):
+        return JSONResponse({"success": False, "error": "Solo administrador puede editar actividades"}, status_code=403)
+    raw_operations = data.get("operations")
+    if not isinstance(raw_operations, list) or not raw_operations:
+        return JSONResponse({"success": False, "error": "Envía al menos una operación"}, status_code=400)
+    if len(raw_operations) > POA_BATCH_MAX_OPERATIONS:
+        return JSONResponse(
+            {"success": False, "error": f"Máximo {POA_BATCH_MAX_OPERATIONS} operaciones por lote"},
+            status_code=400,
+        )
+    atomic = data.get("atomic", True)
+    if not isinstance(atomic, bool):
+        # bool("false") sería True: sólo se aceptan booleanos JSON.
+        return JSONResponse({"success": False, "error": "atomic debe ser true o false"}, status_code=422)
+
+    results: List[Dict[str, Any]] = []
+    operations: List[Dict[str, Any]] = []
+    for index, raw in enumerate(raw_operations):
+        raw = raw if isinstance(raw, dict) else {}
+        entity = str(raw.get("entity") or "").strip().lower()
+        fields = raw.get("fields")
+        try:
+            entity_id = int(raw.get("id") or 0)
+        except (TypeError, ValueError):
+            entity_id = 0
+        result: Dict[str, Any] = {"index": index, "entity": entity, "id": entity_id, "success": False}
+        results.append(result)
+        if str(raw.get("op") or "update").strip().lower() != "update":
+            result["error"] = "Operación no soportada"
+        elif entity not in _BATCH_FIELDS or entity_id <= 0:
+            result["error"] = "Entidad o id inválidos"
+        elif not isinstance(fields, dict) or not fields:
+            result["error"] = "Sin campos para actualizar"
+        elif set(fields) - _BATCH_FIELDS[entity]:
+            result["error"] = "Campos no permitidos: " + ", ".join(sorted(set(fields) - _BATCH_FIELDS[entity]))
+        else:
+            operations.append({"index": index, "entity": entity, "id": entity_id, "fields": fields})
+
+    db = SessionLocal()
+    db.expire_on_commit = False
+    try:
+        _ensure_poa_subactivity_recurrence_columns(db)
+        snapshot = _load_batch_snapshot(db, operations)
+        applied: List[tuple] = []
+        for op in operations:
+            result = results[op["index"]]
+            store = snapshot["activities"] if op["entity"] == ENTITY_ACTIVITY else snapshot["subactivities"]
+            item = store.get(op["id"])
+            if item is None:
+                result["error"] = "Actividad no encontrada" if op["entity"] == ENTITY_ACTIVITY else "Subactividad no encontrada"
+                continue
+            error = _apply_batch_update(op["entity"], item, op["fields"], snapshot)
+            if error:
+                result["error"] = error
+                continue
+            result["success"] = True
+            applied.append((op["entity"], item))
+
+        failed = sum(1 for result in results if not result["success"])
+        if failed and atomic:
+            db.rollback()
+            for result in results:
+                result["success"] = False
+                result.setdefault("error", "No aplicada: otra operación del lote no es válida")
+            return JSONResponse({"success": False, "applied": 0, "failed": failed, "results": results}, status_code=400)
+
+        touched_activity_ids: Set[int] = set()
+        recorded: Set[tuple] = set()
+        for entity, item in applied:
+            activity = item if entity == ENTITY_ACTIVITY else snapshot["activities"][int(item.activity_id)]
+            touched_activity_ids.add(int(activity.id))
+            for key in ((entity, int(item.id)), (ENTITY_ACTIVITY, int(activity.id))):
+                if key in recorded:
+                    continue
+                recorded.add(key)
+                record_poa_change(db, key[0], key[1], objective_id=activity.objective_id, activity_id=activity.id)
+        if touched_activity_ids:
+            refresh_progress_rollups(db, activity_ids=touched_activity_ids)
+            refresh_activity_occurrences(db, touched_activity_ids)
+            sync_deadline_notifications(db, activity_ids=touched_activity_ids)
+            db.commit()
+        for result, (entity, item) in zip([result for result in results if result["success"]], applied):
+            result["data"] = _batch_result_data(entity, item)
+        return JSONResponse({"success": not failed, "applied": len(applied), "failed": failed, "results": results})
+    except (sqlite3.OperationalError, SQLAlchemyError):
+        db.rollback()
+        return JSONResponse(
+            {"success": False, "error": "No se pudo escribir en la base de datos (modo solo lectura o bloqueo)."},
+            status_code=500,
+        )
+    finally:
+        db.close()
+
+
 @router.get("/api/poa/subactivities/no-owner")
 def poa_subactivities_without_owner(request: Request):
     _bind_core_symbols()
@@ -10959,30 +11592,16 @@ def poa_subactivities_without_owner(request: Request):
         objective_ids = [obj.id for obj in objectives]
         if not objective_ids:
             return JSONResponse({"success": True, "total": 0, "data": []})
-        activities = (
-            db.query(POAActivity)
-            .filter(POAActivity.objective_id.in_(objective_ids))
-            .order_by(POAActivity.id.desc())
-            .all()
-        )
-        if not activities:
-            return JSONResponse({"success": True, "total": 0, "data": []})
-        activity_ids = [int(item.id) for item in activities if getattr(item, "id", None)]
-        activity_map = {int(item.id): item for item in activities if getattr(item, "id", None)}
         objective_map = {int(obj.id): obj for obj in objectives}
         subs = (
-            db.query(POASubactivity)
-            .filter(POASubactivity.activity_id.in_(activity_ids))
+            db.query(POASubactivity, POAActivity)
+            .join(POAActivity, POAActivity.id == POASubactivity.activity_id)
+            .filter(POAActivity.objective_id.in_(objective_ids), POASubactivity.responsable_key == "")
             .order_by(POASubactivity.id.desc())
             .all()
-            if activity_ids
-            else []
         )
         rows: List[Dict[str, Any]] = []
-        for sub in subs:
-            if str(sub.responsable or "").strip():
-                continue
-            activity = activity_map.get(int(sub.activity_id or 0))
+        for sub, activity in subs:
             objective = objective_map.get(int(activity.objective_id or 0)) if activity else None
             rows.append(
                 {
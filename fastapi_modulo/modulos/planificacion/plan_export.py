@@ -0,0 +1,347 @@
+"""Exportación del plan estratégico (.doc) por secciones y con copia en disco.
+
+``render_plan_sections`` genera el documento por partes: portada, identidad,
+fundamentación y luego un eje a la vez (con sus objetivos y KPIs), consultando
+cada sección justo antes de emitirla. Las secciones se escriben en un archivo
+temporal que al terminar se publica como artefacto, y la descarga sirve ese
+archivo: la sesión de base de datos se cierra antes de enviar el primer byte,
+sin depender de la velocidad del cliente.
+
+El artefacto se nombra por la versión del plan: último cambio de ejes u
+objetivos en ``poa_change_log``, contenido de ``strategic_identity_config`` y
+el día (la portada lleva la fecha de exportación). Mientras el plan no cambie,
+las descargas salen directo del disco. Tras cada edición del plan,
+``schedule_plan_prerender`` reconstruye el artefacto en segundo plano. Al
+publicar sólo se borran los artefactos más antiguos que el nuevo.
+
+Uso desde línea de comandos::
+
+    python -m fastapi_modulo.modulos.planificacion.plan_export render
+"""
+from __future__ import annotations
+
+import glob
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from html import escape
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import func, text
+
+from fastapi_modulo.modulos.planificacion.poa_changes import ENTITY_AXIS, ENTITY_BOARD, ENTITY_OBJECTIVE
+
+PLAN_EXPORT_MEDIA_TYPE = "application/msword; charset=utf-8"
+PLAN_EXPORT_DIR = (
+    os.environ.get("PLAN_EXPORT_DIR")
+    or os.path.join(
+        (os.environ.get("SIPET_DATA_DIR") or os.path.expanduser("~/.sipet/data")).strip(),
+        "exports",
+        "plan_estrategico",
+    )
+).strip()
+PRERENDER_DELAY_SECONDS = float((os.environ.get("PLAN_EXPORT_PRERENDER_DELAY") or "2").strip() or "2")
+
+_PLAN_ENTITIES = (ENTITY_AXIS, ENTITY_OBJECTIVE, ENTITY_BOARD)
+
+_DOC_HEAD = """<!doctype html>
+<html>
+<head>
+  <meta charset="utf-8">
+  <title>Plan Estratégico</title>
+  <style>
+    @page { margin: 2.2cm; }
+    body { font-family: Arial, sans-serif; color:#0f172a; }
+    h1 { font-size: 34px; margin: 0 0 8px; color:#0f3d2e; }
+    h2 { font-size: 24px; margin: 0 0 10px; color:#0f3d2e; }
+    h3 { font-size: 17px; margin: 12px 0 6px; }
+    h4 { font-size: 15px; margin: 10px 0 4px; }
+    h5 { font-size: 13px; margin: 10px 0 6px; color:#334155; text-transform: uppercase; }
+    p, li { font-size: 12px; line-height: 1.5; }
+    .cover { display:flex; flex-direction:column; justify-content:center; min-height: 90vh; }
+    .subtitle { color:#475569; font-size:16px; }
+    .date { margin-top: 16px; color:#64748b; }
+    .page-break { page-break-before: always; }
+    .rich p { margin: 0 0 8px; }
+    .axis { margin-bottom: 20px; }
+    .objective { border:1px solid #dbe4ea; border-radius:8px; padding:10px; margin:8px 0; }
+    .kpi-table { width:100%; border-collapse: collapse; margin-top: 6px; }
+    .kpi-table th, .kpi-table td { border:1px solid #dbe4ea; padding:6px; font-size:11px; text-align:left; vertical-align:top; }
+    .kpi-table th { background:#f1f5f9; }
+  </style>
+</head>
+<body>
+"""
+
+
+def _core():
+    from fastapi_modulo import main as core
+
+    return core
+
+
+def _ejes():
+    from fastapi_modulo.modulos.planificacion import ejes_poa
+
+    return ejes_poa
+
+
+def plan_export_version(db) -> str:
+    """Huella del contenido exportable; cambia con ejes, objetivos, identidad o el día."""
+    ChangeLog = _core().POAChangeLog
+    change_id = int(
+        db.query(func.max(ChangeLog.seq)).filter(ChangeLog.entity_type.in_(_PLAN_ENTITIES)).scalar() or 0
+    )
+    identity = db.execute(
+        text("SELECT bloque, payload FROM strategic_identity_config ORDER BY bloque")
+    ).fetchall()
+    digest = hashlib.sha256()
+    digest.update(f"{change_id}|{datetime.utcnow().date().isoformat()}".encode("utf-8"))
+    for bloque, payload in identity:
+        digest.update(f"|{bloque}={payload or ''}".encode("utf-8"))
+    return digest.hexdigest()[:24]
+
+
+def _artifact_path(version: str) -> str:
+    return os.path.join(PLAN_EXPORT_DIR, f"plan_{version}.doc")
+
+
+def cached_plan_export(version: str) -> Optional[str]:
+    path = _artifact_path(version)
+    return path if os.path.isfile(path) else None
+
+
+def _lines_html(rows: List[Dict[str, str]]) -> str:
+    if not rows:
+        return "<p>N/D</p>"
+    return "<ul>" + "".join(
+        f"<li><strong>{escape(str(item.get('code') or '').upper())}</strong>: {escape(str(item.get('text') or ''))}</li>"
+        for item in rows
+    ) + "</ul>"
+
+
+def _objective_html(obj: Dict[str, Any], kpis: List[Dict[str, Any]]) -> str:
+    obj_name = escape(str(obj.get("nombre") or "Sin nombre"))
+    obj_desc = str(obj.get("descripcion") or "")
+    if kpis:
+        kpi_rows = "".join(
+            "<tr>"
+            f"<td>{escape(str(k.get('nombre') or ''))}</td>"
+            f"<td>{escape(str(k.get('proposito') or ''))}</td>"
+            f"<td>{escape(str(k.get('formula') or ''))}</td>"
+            f"<td>{escape(str(k.get('periodicidad') or ''))}</td>"
+            f"<td>{escape(str(k.get('estandar') or ''))}</td>"
+            "</tr>"
+            for k in kpis
+        )
+        kpis_html = (
+            "<table class='kpi-table'>"
+            "<thead><tr><th>Nombre</th><th>Propósito</th><th>Fórmula</th><th>Periodicidad</th><th>Estándar</th></tr></thead>"
+            f"<tbody>{kpi_rows}</tbody></table>"
+        )
+    else:
+        kpis_html = "<p>Sin KPIs registrados.</p>"
+    return (
+        "<section class='objective'>"
+        f"<h4>{obj_name}</h4>"
+        f"<div class='rich'>{obj_desc or '<p>Sin descripción.</p>'}</div>"
+        "<h5>KPIs</h5>"
+        f"{kpis_html}"
+        "</section>"
+    )
+
+
+def _axis_html(axis: Dict[str, Any], kpis_by_objective: Dict[int, List[Dict[str, Any]]]) -> str:
+    axis_name = escape(str(axis.get("nombre") or "Sin nombre"))
+    axis_desc = str(axis.get("descripcion") or "")
+    objectives_html = [
+        _objective_html(obj, kpis_by_objective.get(int(obj.get("id") or 0), []))
+        for obj in (axis.get("objetivos") or [])
+    ]
+    return (
+        "<section class='axis'>"
+        f"<h2>{axis_name}</h2>"
+        "<h3>Descripción</h3>"
+        f"<div class='rich'>{axis_desc or '<p>Sin descripción.</p>'}</div>"
+        "<h3>Objetivos estratégicos</h3>"
+        f"{''.join(objectives_html) if objectives_html else '<p>Sin objetivos registrados.</p>'}"
+        "</section>"
+    )
+
+
+def render_plan_sections(db) -> Iterator[str]:
+    """Documento completo, una sección a la vez."""
+    core = _core()
+    ejes = _ejes()
+    Axis = core.StrategicAxisConfig
+    now = datetime.utcnow().strftime("%Y-%m-%d")
+    yield (
+        _DOC_HEAD
+        + '  <section class="cover">\n'
+        + "    <h1>Plan estratégico</h1>\n"
+        + '    <p class="subtitle">Edición y administración del plan estratégico de la institución</p>\n'
+        + f'    <p class="date">Fecha de exportación: {escape(now)}</p>\n'
+        + "  </section>\n"
+    )
+
+    identity_rows = db.execute(
+        text(
+            "SELECT bloque, payload FROM strategic_identity_config "
+            "WHERE bloque IN ('mision','vision','valores','fundamentacion')"
+        )
+    ).fetchall()
+    payload_map = {str(row[0] or "").strip().lower(): str(row[1] or "") for row in identity_rows}
+
+    def _parse_lines(block: str, prefix: str) -> List[Dict[str, str]]:
+        try:
+            data = json.loads(payload_map.get(block, "[]"))
+        except Exception:
+            data = []
+        return ejes._normalize_identity_lines(data, prefix)
+
+    yield (
+        '\n  <section class="page-break">\n'
+        "    <h2>Misión, Visión y Valores</h2>\n"
+        f"    <h3>Misión</h3>\n    {_lines_html(_parse_lines('mision', 'm'))}\n"
+        f"    <h3>Visión</h3>\n    {_lines_html(_parse_lines('vision', 'v'))}\n"
+        f"    <h3>Valores</h3>\n    {_lines_html(_parse_lines('valores', 'val'))}\n"
+        "  </section>\n"
+    )
+    try:
+        foundation_payload = json.loads(payload_map.get("fundamentacion", "{}") or "{}")
+    except Exception:
+        foundation_payload = {}
+    fundamentacion_html = ejes._normalize_foundation_text(foundation_payload.get("texto"))
+    yield (
+        '\n  <section class="page-break">\n'
+        "    <h2>Fundamentación</h2>\n"
+        f"    <div class=\"rich\">{fundamentacion_html or '<p>Sin fundamentación registrada.</p>'}</div>\n"
+        "  </section>\n"
+        '\n  <section class="page-break">\n'
+        "    <h2>Ejes estratégicos</h2>\n    "
+    )
+
+    axis_ids = [
+        int(row[0])
+        for row in db.query(Axis.id)
+        .filter(Axis.is_active == True)  # noqa: E712
+        .order_by(Axis.orden.asc(), Axis.id.asc())
+        .all()
+    ]
+    for axis_id in axis_ids:
+        axis = db.query(Axis).filter(Axis.id == axis_id).first()
+        if axis is None:
+            continue
+        axis_data = ejes._serialize_strategic_axis(axis)
+        objective_ids = sorted(
+            {int(obj.get("id") or 0) for obj in axis_data.get("objetivos") or [] if int(obj.get("id") or 0) > 0}
+        )
+        yield _axis_html(axis_data, ejes._kpis_by_objective_ids(db, objective_ids))
+        db.expunge_all()
+    if not axis_ids:
+        yield "<p>Sin ejes estratégicos registrados.</p>"
+    yield "\n  </section>\n</body>\n</html>"
+
+
+def _publish(temp_path: str, version: str) -> None:
+    target = _artifact_path(version)
+    os.replace(temp_path, target)
+    published_at = os.path.getmtime(target)
+    for stale in glob.glob(os.path.join(PLAN_EXPORT_DIR, "plan_*.doc")):
+        if stale == target:
+            continue
+        try:
+            # Otro proceso pudo publicar una versión más nueva mientras se generaba esta.
+            if os.path.getmtime(stale) < published_at:
+                os.remove(stale)
+        except OSError:
+            pass
+
+
+def write_plan_export(db, version: str) -> str:
+    """Escribe el documento en un temporal y lo publica como artefacto de ``version``."""
+    os.makedirs(PLAN_EXPORT_DIR, exist_ok=True)
+    handle = tempfile.NamedTemporaryFile(prefix=".plan-", suffix=".tmp", dir=PLAN_EXPORT_DIR, delete=False)
+    try:
+        with handle:
+            for section in render_plan_sections(db):
+                handle.write(section.encode("utf-8"))
+        _publish(handle.name, version)
+    except BaseException:
+        try:
+            os.remove(handle.name)
+        except OSError:
+            pass
+        raise
+    return _artifact_path(version)
+
+
+_RENDER_LOCK = threading.Lock()
+
+
+def render_plan_export(db) -> str:
+    """Genera el artefacto de la versión vigente si falta y devuelve su ruta."""
+    version = plan_export_version(db)
+    cached = cached_plan_export(version)
+    if cached:
+        return cached
+    with _RENDER_LOCK:
+        # Peticiones simultáneas de la misma versión esperan a la primera.
+        return cached_plan_export(version) or write_plan_export(db, version)
+
+
+_PRERENDER_LOCK = threading.Lock()
+_PRERENDER_STATE = {"running": False, "pending": False}
+
+
+def _prerender_worker() -> None:
+    while True:
+        time.sleep(PRERENDER_DELAY_SECONDS)
+        with _PRERENDER_LOCK:
+            _PRERENDER_STATE["pending"] = False
+        db = _core().SessionLocal()
+        try:
+            render_plan_export(db)
+        except Exception as exc:
+            print(f"[plan-export] No se pudo pre-generar el plan estratégico: {exc}")
+        finally:
+            db.close()
+        with _PRERENDER_LOCK:
+            if not _PRERENDER_STATE["pending"]:
+                _PRERENDER_STATE["running"] = False
+                return
+
+
+def schedule_plan_prerender() -> None:
+    """Pide reconstruir el artefacto en segundo plano; agrupa ediciones seguidas."""
+    with _PRERENDER_LOCK:
+        _PRERENDER_STATE["pending"] = True
+        if _PRERENDER_STATE["running"]:
+            return
+        _PRERENDER_STATE["running"] = True
+    threading.Thread(target=_prerender_worker, name="plan-export-prerender", daemon=True).start()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = list(sys.argv[1:] if argv is None else argv)
+    command = args[0] if args else ""
+    if command != "render":
+        print("Uso: python -m fastapi_modulo.modulos.planificacion.plan_export render")
+        return 2
+    db = _core().SessionLocal()
+    try:
+        _ejes()._ensure_strategic_identity_table(db)
+        path = render_plan_export(db)
+    finally:
+        db.close()
+    print(f"Plan estratégico generado en {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
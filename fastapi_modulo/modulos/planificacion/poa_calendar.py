@@ -0,0 +1,416 @@
+"""Ocurrencias de actividades y subactividades recurrentes del POA.
+
+Una actividad recurrente (``recurrente`` con ``periodicidad`` válida) vence en
+cada fecha ``fecha_inicial + k·periodo`` anterior a su ``fecha_final`` y,
+además, en la propia ``fecha_final``; una no recurrente sólo en ``fecha_final``.
+``quincenal`` son 15 días y ``bimensual`` cada dos meses; los periodos
+mensuales conservan el día de inicio (o el último día del mes si no existe).
+
+``poa_occurrences`` materializa esas fechas dentro de la ventana de
+planeación (``POA_OCCURRENCE_PAST_DAYS`` atrás y ``POA_OCCURRENCE_AHEAD_DAYS``
+adelante de hoy), de modo que calendario y avisos de vencimiento son consultas
+por rango sobre índice. Los manejadores de escritura regeneran las filas de la
+actividad tocada en la misma transacción; no confirman. La ventana se recorre
+una vez al día y los rangos fuera de ella se expanden al vuelo: el día de la
+última reconstrucción se guarda en ``poa_occurrence_window`` y el worker que
+logra moverlo (``UPDATE`` condicional, bloquea la fila hasta el commit) borra
+y vuelve a llenar el índice en esa misma transacción; los demás sólo adoptan
+la ventana nueva.
+
+Uso desde línea de comandos::
+
+    python -m fastapi_modulo.modulos.planificacion.poa_calendar rebuild
+"""
+from __future__ import annotations
+
+import calendar
+import os
+import sys
+import threading
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import Boolean, Date, Integer, String, and_, column, delete, insert, or_, select, table, text, update
+from sqlalchemy.exc import SQLAlchemyError
+
+OCCURRENCES_TABLE = "poa_occurrences"
+WINDOW_TABLE = "poa_occurrence_window"
+ENTITY_ACTIVITY = "activity"
+ENTITY_SUBACTIVITY = "subactivity"
+
+WINDOW_PAST_DAYS = int((os.environ.get("POA_OCCURRENCE_PAST_DAYS") or "31").strip() or "31")
+WINDOW_AHEAD_DAYS = int((os.environ.get("POA_OCCURRENCE_AHEAD_DAYS") or "400").strip() or "400")
+MAX_RANGE_DAYS = 400
+
+_PERIOD_STEPS: Dict[str, Tuple[str, int]] = {
+    "diaria": ("days", 1),
+    "semanal": ("days", 7),
+    "quincenal": ("days", 15),
+    "mensual": ("months", 1),
+    "bimensual": ("months", 2),
+}
+
+_OCCURRENCES = table(
+    OCCURRENCES_TABLE,
+    column("entity_type", String),
+    column("entity_id", Integer),
+    column("occurrence_on", Date),
+    column("activity_id", Integer),
+    column("objective_id", Integer),
+    column("responsable_key", String),
+    column("is_final", Boolean),
+)
+
+_WINDOW_MARK = table(WINDOW_TABLE, column("id", Integer), column("built_on", Date))
+
+_WINDOW_LOCK = threading.Lock()
+_WINDOW: Optional[Tuple[date, date]] = None
+_WINDOW_DAY: Optional[date] = None
+
+
+def _core():
+    from fastapi_modulo import main as core
+
+    return core
+
+
+def _today() -> date:
+    return datetime.utcnow().date()
+
+
+def planning_window(today: Optional[date] = None) -> Tuple[date, date]:
+    current = today or _today()
+    return current - timedelta(days=WINDOW_PAST_DAYS), current + timedelta(days=WINDOW_AHEAD_DAYS)
+
+
+def create_occurrences_table(conn) -> None:
+    """Paso de esquema: crea el índice de ocurrencias; se llena con ``ensure_occurrences_current``."""
+    conn.execute(
+        text(
+            f"""
+            CREATE TABLE IF NOT EXISTS {OCCURRENCES_TABLE} (
+              entity_type VARCHAR(20) NOT NULL,
+              entity_id INTEGER NOT NULL,
+              occurrence_on DATE NOT NULL,
+              activity_id INTEGER NOT NULL,
+              objective_id INTEGER,
+              responsable_key VARCHAR(255) NOT NULL DEFAULT '',
+              is_final BOOLEAN NOT NULL DEFAULT FALSE,
+              PRIMARY KEY (entity_type, entity_id, occurrence_on)
+            )
+            """
+        )
+    )
+    conn.execute(
+        text(
+            f"CREATE INDEX IF NOT EXISTS ix_{OCCURRENCES_TABLE}_date "
+            f"ON {OCCURRENCES_TABLE} (occurrence_on, objective_id)"
+        )
+    )
+    conn.execute(
+        text(f"CREATE INDEX IF NOT EXISTS ix_{OCCURRENCES_TABLE}_activity ON {OCCURRENCES_TABLE} (activity_id)")
+    )
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {WINDOW_TABLE} (id INTEGER PRIMARY KEY, built_on DATE)"))
+    if conn.execute(text(f"SELECT 1 FROM {WINDOW_TABLE} WHERE id = 1")).first() is None:
+        conn.execute(text(f"INSERT INTO {WINDOW_TABLE} (id, built_on) VALUES (1, NULL)"))
+
+
+# -- reglas -----------------------------------------------------------------
+
+
+def recurrence_step(recurrente: Any, periodicidad: Any, every_days: Any) -> Optional[Tuple[str, int]]:
+    """``(unidad, tamaño)`` del periodo o ``None`` si el elemento no se repite."""
+    if not recurrente:
+        return None
+    key = str(periodicidad or "").strip().lower()
+    if key == "cada_xx_dias":
+        size = int(every_days or 0)
+        return ("days", size) if size > 0 else None
+    return _PERIOD_STEPS.get(key)
+
+
+def _add_months(anchor: date, months: int) -> date:
+    idx = (anchor.month - 1) + months
+    year, month = anchor.year + (idx // 12), (idx % 12) + 1
+    return date(year, month, min(anchor.day, calendar.monthrange(year, month)[1]))
+
+
+def occurrence_dates(
+    fecha_inicial: Optional[date],
+    fecha_final: Optional[date],
+    step: Optional[Tuple[str, int]],
+    lo: date,
+    hi: date,
+) -> List[Tuple[date, bool]]:
+    """Fechas ``(fecha, es_final)`` dentro de ``[lo, hi]``; salta directo a la primera."""
+    if not fecha_final or lo > hi:
+        return []
+    anchor = fecha_inicial or fecha_final
+    dates: List[Tuple[date, bool]] = []
+    if step is not None and anchor < fecha_final:
+        unit, size = step
+        first = max(lo, anchor)
+        if unit == "days":
+            index = -(-(first - anchor).days // size)
+            current = anchor + timedelta(days=index * size)
+            while current < fecha_final and current <= hi:
+                dates.append((current, False))
+                index += 1
+                current = anchor + timedelta(days=index * size)
+        else:
+            index = max(0, ((first.year - anchor.year) * 12 + first.month - anchor.month) // size - 1)
+            current = _add_months(anchor, index * size)
+            while current < fecha_final and current <= hi:
+                if current >= lo:
+                    dates.append((current, False))
+                index += 1
+                current = _add_months(anchor, index * size)
+    if lo <= fecha_final <= hi:
+        dates.append((fecha_final, True))
+    return dates
+
+
+# -- fuentes ----------------------------------------------------------------
+
+
+def _sources(
+    db,
+    activity_ids: Optional[Set[int]] = None,
+    lo: Optional[date] = None,
+    hi: Optional[date] = None,
+    objective_ids: Optional[Set[int]] = None,
+) -> List[Dict[str, Any]]:
+    """Actividades y subactividades con fecha de término que pueden caer en ``[lo, hi]``."""
+    core = _core()
+    Activity = core.POAActivity
+    Subactivity = core.POASubactivity
+    sources: List[Dict[str, Any]] = []
+    for entity_type, model in ((ENTITY_ACTIVITY, Activity), (ENTITY_SUBACTIVITY, Subactivity)):
+        query = db.query(
+            model.id,
+            Activity.id.label("activity_id"),
+            Activity.objective_id,
+            model.nombre,
+            model.responsable,
+            model.responsable_key,
+            model.fecha_inicial,
+            model.fecha_final,
+            model.recurrente,
+            model.periodicidad,
+            model.cada_xx_dias,
+        ).filter(model.fecha_final.isnot(None))
+        if model is Subactivity:
+            query = query.join(Activity, Activity.id == Subactivity.activity_id)
+        if activity_ids is not None:
+            query = query.filter(Activity.id.in_(sorted(activity_ids)))
+        if objective_ids is not None:
+            query = query.filter(Activity.objective_id.in_(sorted(objective_ids)))
+        if lo is not None:
+            query = query.filter(model.fecha_final >= lo)
+        if hi is not None:
+            query = query.filter(or_(model.fecha_inicial <= hi, model.fecha_final <= hi))
+        for row in query.all():
+            sources.append(
+                {
+                    "entity_type": entity_type,
+                    "entity_id": int(row.id),
+                    "activity_id": int(row.activity_id),
+                    "objective_id": int(row.objective_id) if row.objective_id else None,
+                    "nombre": row.nombre or "",
+                    "responsable": row.responsable or "",
+                    "responsable_key": row.responsable_key or "",
+                    "fecha_inicial": row.fecha_inicial,
+                    "fecha_final": row.fecha_final,
+                    "step": recurrence_step(row.recurrente, row.periodicidad, row.cada_xx_dias),
+                }
+            )
+    return sources
+
+
+def _expand(sources: Iterable[Dict[str, Any]], lo: date, hi: date) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    for source in sources:
+        for occurrence_on, is_final in occurrence_dates(
+            source["fecha_inicial"], source["fecha_final"], source["step"], lo, hi
+        ):
+            rows.append({**source, "occurrence_on": occurrence_on, "is_final": is_final})
+    return rows
+
+
+def _index_rows(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    keys = ("entity_type", "entity_id", "occurrence_on", "activity_id", "objective_id", "responsable_key", "is_final")
+    return [{key: row[key] for key in keys} for row in rows]
+
+
+# -- mantenimiento ----------------------------------------------------------
+
+
+def refresh_activity_occurrences(db, activity_ids: Iterable[Any]) -> int:
+    """Regenera las ocurrencias de las actividades y sus subactividades (también tras borrarlas)."""
+    ids = {int(value) for value in activity_ids if value}
+    if not ids:
+        return 0
+    db.flush()
+    lo, hi = _WINDOW or planning_window()
+    db.execute(delete(_OCCURRENCES).where(_OCCURRENCES.c.activity_id.in_(sorted(ids))))
+    rows = _index_rows(_expand(_sources(db, activity_ids=ids, lo=lo, hi=hi), lo, hi))
+    if rows:
+        db.execute(insert(_OCCURRENCES), rows)
+    return len(rows)
+
+
+def rebuild_occurrences(db, today: Optional[date] = None) -> int:
+    """Reconstruye todo el índice para la ventana de ``today`` y anota el día; no confirma."""
+    global _WINDOW
+    current = today or _today()
+    lo, hi = planning_window(current)
+    db.execute(update(_WINDOW_MARK).where(_WINDOW_MARK.c.id == 1).values(built_on=current))
+    db.execute(delete(_OCCURRENCES))
+    rows = _index_rows(_expand(_sources(db, lo=lo, hi=hi), lo, hi))
+    if rows:
+        db.execute(insert(_OCCURRENCES), rows)
+    _WINDOW = (lo, hi)
+    return len(rows)
+
+
+def ensure_occurrences_current(db) -> None:
+    """Desplaza la ventana una vez al día entre todos los workers."""
+    global _WINDOW, _WINDOW_DAY
+    today = _today()
+    if _WINDOW_DAY == today:
+        return
+    with _WINDOW_LOCK:
+        if _WINDOW_DAY == today:
+            return
+        try:
+            claimed = db.execute(
+                update(_WINDOW_MARK)
+                .where(
+                    _WINDOW_MARK.c.id == 1,
+                    or_(_WINDOW_MARK.c.built_on.is_(None), _WINDOW_MARK.c.built_on < today),
+                )
+                .values(built_on=today)
+            ).rowcount
+            if claimed:
+                rebuild_occurrences(db, today)
+            db.commit()
+        except SQLAlchemyError:
+            db.rollback()
+            return
+        # Si otro worker ya reconstruyó hoy, basta con usar la misma ventana.
+        _WINDOW = planning_window(today)
+        _WINDOW_DAY = today
+
+
+# -- consultas --------------------------------------------------------------
+
+
+def _serialize(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "entity_type": row["entity_type"],
+        "entity_id": int(row["entity_id"]),
+        "activity_id": int(row["activity_id"]),
+        "objective_id": row["objective_id"],
+        "fecha": row["occurrence_on"].isoformat(),
+        "es_final": bool(row["is_final"]),
+        "nombre": row.get("nombre", ""),
+        "responsable": row.get("responsable", ""),
+    }
+
+
+def _attach_names(db, rows: List[Dict[str, Any]]) -> None:
+    core = _core()
+    for entity_type, model in ((ENTITY_ACTIVITY, core.POAActivity), (ENTITY_SUBACTIVITY, core.POASubactivity)):
+        ids = sorted({row["entity_id"] for row in rows if row["entity_type"] == entity_type})
+        if not ids:
+            continue
+        names = {
+            int(item.id): (item.nombre or "", item.responsable or "")
+            for item in db.query(model.id, model.nombre, model.responsable).filter(model.id.in_(ids)).all()
+        }
+        for row in rows:
+            if row["entity_type"] == entity_type:
+                row["nombre"], row["responsable"] = names.get(row["entity_id"], ("", ""))
+
+
+def occurrences_between(
+    db,
+    start: date,
+    end: date,
+    objective_ids: Optional[Iterable[Any]] = None,
+    activity_id: Optional[int] = None,
+    include_final: bool = True,
+) -> List[Dict[str, Any]]:
+    """Ocurrencias con fecha en ``[start, end]`` ordenadas por fecha.
+
+    Dentro de la ventana materializada es una consulta por rango sobre
+    ``poa_occurrences``; fuera de ella se expanden las reglas al vuelo.
+    """
+    allowed = None if objective_ids is None else {int(value) for value in objective_ids if value}
+    if allowed is not None and not allowed:
+        return []
+    window = _WINDOW
+    if window is not None and window[0] <= start and end <= window[1]:
+        query = select(_OCCURRENCES).where(
+            _OCCURRENCES.c.occurrence_on >= start, _OCCURRENCES.c.occurrence_on <= end
+        )
+        if allowed is not None:
+            query = query.where(_OCCURRENCES.c.objective_id.in_(sorted(allowed)))
+        if activity_id:
+            query = query.where(_OCCURRENCES.c.activity_id == int(activity_id))
+        if not include_final:
+            query = query.where(_OCCURRENCES.c.is_final == False)  # noqa: E712
+        rows = [dict(row._mapping) for row in db.execute(query).all()]
+        _attach_names(db, rows)
+    else:
+        sources = _sources(
+            db,
+            activity_ids={int(activity_id)} if activity_id else None,
+            lo=start,
+            hi=end,
+            objective_ids=allowed,
+        )
+        rows = [row for row in _expand(sources, start, end) if include_final or not row["is_final"]]
+    rows.sort(key=lambda row: (row["occurrence_on"], row["activity_id"], row["entity_type"], row["entity_id"]))
+    return [_serialize(row) for row in rows]
+
+
+def upcoming_recurrences(
+    db,
+    today: date,
+    until: date,
+    activity_ids: Optional[Set[int]] = None,
+) -> List[Tuple[str, int, date]]:
+    """Ocurrencias intermedias (no finales) de ``[today, until]`` como ``(tipo, id, fecha)``."""
+    query = select(
+        _OCCURRENCES.c.entity_type, _OCCURRENCES.c.entity_id, _OCCURRENCES.c.occurrence_on
+    ).where(
+        and_(
+            _OCCURRENCES.c.occurrence_on >= today,
+            _OCCURRENCES.c.occurrence_on <= until,
+            _OCCURRENCES.c.is_final == False,  # noqa: E712
+        )
+    )
+    if activity_ids is not None:
+        query = query.where(_OCCURRENCES.c.activity_id.in_(sorted(activity_ids)))
+    return [(row[0], int(row[1]), row[2]) for row in db.execute(query).all()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = list(sys.argv[1:] if argv is None else argv)
+    command = args[0] if args else ""
+    if command != "rebuild":
+        print("Uso: python -m fastapi_modulo.modulos.planificacion.poa_calendar rebuild")
+        return 2
+    db = _core().SessionLocal()
+    try:
+        total = rebuild_occurrences(db)
+        db.commit()
+        print(f"Índice de ocurrencias reconstruido: {total} filas.")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
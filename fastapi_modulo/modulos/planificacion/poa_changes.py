@@ -0,0 +1,225 @@
+"""Registro de cambios del POA para sincronización incremental.
+
+Los manejadores de escritura de ``ejes_poa`` anotan cada entidad creada,
+actualizada o eliminada en ``poa_change_log`` dentro de la misma transacción.
+
+El cursor es ``seq``, no el ``id`` autoincremental: con escrituras
+concurrentes en Postgres los ``id`` se confirman fuera de orden y un cliente
+que ya leyó ``N`` nunca vería un ``id`` menor confirmado después. ``seq`` sale
+del contador de una sola fila ``poa_change_sequence``; el ``UPDATE`` que lo
+incrementa bloquea la fila hasta el commit, así que los valores quedan en orden
+de confirmación. El valor del contador es también la versión de datos del
+tablero, del inicio, de la ruta crítica y de la exportación del plan.
+
+Si un manejador olvida anotar su cambio, ``install_change_hooks`` sube igual el
+contador en el flush que toca ejes, objetivos, actividades, subactividades o
+aprobaciones (una vez por transacción), así la versión y el ETag del tablero
+nunca se quedan viejos.
+
+``prune_change_log`` borra lo anterior a ``POA_CHANGE_LOG_RETENTION_DAYS`` y
+guarda hasta dónde podó: un cursor más viejo recibe ``expired`` y el cliente
+recarga todo.
+
+Uso desde línea de comandos::
+
+    python -m fastapi_modulo.modulos.planificacion.poa_changes podar
+"""
+from __future__ import annotations
+
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event, func, inspect, text
+
+from fastapi_modulo.modulos.notificaciones.event_bus import queue_event
+
+ENTITY_AXIS = "axis"
+ENTITY_OBJECTIVE = "objective"
+ENTITY_ACTIVITY = "activity"
+ENTITY_SUBACTIVITY = "subactivity"
+ENTITY_BOARD = "board"
+
+ACTION_UPSERT = "upsert"
+ACTION_DELETE = "delete"
+ACTION_RESET = "reset"
+
+DEFAULT_CHANGES_LIMIT = 500
+MAX_CHANGES_LIMIT = 5000
+RETENTION_DAYS = int((os.environ.get("POA_CHANGE_LOG_RETENTION_DAYS") or "30").strip() or "30")
+
+SEQUENCE_TABLE = "poa_change_sequence"
+
+_BUMPED_KEY = "poa_version_bumped"
+
+
+def _core():
+    from fastapi_modulo import main as core
+
+    return core
+
+
+def create_change_sequence_table(conn) -> None:
+    """Paso de esquema: contador de cambios y columna ``seq`` en ``poa_change_log``."""
+    conn.execute(
+        text(
+            f"""
+            CREATE TABLE IF NOT EXISTS {SEQUENCE_TABLE} (
+              id INTEGER PRIMARY KEY,
+              value INTEGER NOT NULL DEFAULT 0,
+              pruned_through INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+    )
+    inspector = inspect(conn)
+    if inspector.has_table("poa_change_log"):
+        columns = {str(col.get("name") or "").lower() for col in inspector.get_columns("poa_change_log")}
+        if "seq" not in columns:
+            conn.execute(text("ALTER TABLE poa_change_log ADD COLUMN seq INTEGER"))
+        # Los registros previos conservan su id como cursor para no invalidar clientes abiertos.
+        conn.execute(text("UPDATE poa_change_log SET seq = id WHERE seq IS NULL"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_poa_change_log_seq ON poa_change_log (seq)"))
+        start = int(conn.execute(text("SELECT MAX(seq) FROM poa_change_log")).scalar() or 0)
+    else:
+        start = 0
+    exists = conn.execute(text(f"SELECT 1 FROM {SEQUENCE_TABLE} WHERE id = 1")).first()
+    if exists is None:
+        conn.execute(text(f"INSERT INTO {SEQUENCE_TABLE} (id, value, pruned_through) VALUES (1, :value, 0)"), {"value": start})
+
+
+def _next_seq(db) -> int:
+    """Incrementa el contador; la fila queda bloqueada hasta el commit (orden de confirmación)."""
+    statement = text(f"UPDATE {SEQUENCE_TABLE} SET value = value + 1 WHERE id = 1 RETURNING value")
+    value = db.execute(statement).scalar()
+    if value is None:
+        create_change_sequence_table(db.connection())
+        value = db.execute(statement).scalar()
+    db.info[_BUMPED_KEY] = True
+    return int(value)
+
+
+def install_change_hooks(session_factory, models) -> None:
+    """Sube la versión de datos en los flush que modifican ``models`` sin anotar el cambio."""
+    tracked = tuple(models)
+
+    def _bump(session, flush_context) -> None:
+        if session.info.get(_BUMPED_KEY):
+            return
+        touched = [*session.new, *session.deleted, *(item for item in session.dirty if session.is_modified(item))]
+        if any(isinstance(item, tracked) for item in touched):
+            _next_seq(session)
+
+    def _reset(session) -> None:
+        session.info.pop(_BUMPED_KEY, None)
+
+    event.listen(session_factory, "after_flush", _bump)
+    event.listen(session_factory, "after_commit", _reset)
+    event.listen(session_factory, "after_rollback", _reset)
+
+
+def record_poa_change(
+    db,
+    entity_type: str,
+    entity_id: Any = 0,
+    action: str = ACTION_UPSERT,
+    objective_id: Any = None,
+    activity_id: Any = None,
+) -> None:
+    """Anota un cambio y su evento en vivo; no confirma la transacción."""
+    ChangeLog = _core().POAChangeLog
+    row = ChangeLog(
+        entity_type=entity_type,
+        entity_id=int(entity_id or 0),
+        action=action,
+        objective_id=int(objective_id) if objective_id else None,
+        activity_id=int(activity_id) if activity_id else None,
+        changed_at=datetime.utcnow(),
+        seq=_next_seq(db),
+    )
+    db.add(row)
+    queue_event(
+        db,
+        f"poa.{entity_type}.{action}",
+        entity_id=row.entity_id,
+        objective_id=row.objective_id,
+        activity_id=row.activity_id,
+        cursor=row.seq,
+    )
+
+
+def record_poa_reset(db) -> None:
+    """Cambio masivo (importaciones): los clientes deben recargar el tablero completo."""
+    record_poa_change(db, ENTITY_BOARD, 0, ACTION_RESET)
+
+
+def _sequence_row(db) -> Optional[Any]:
+    return db.execute(text(f"SELECT value, pruned_through FROM {SEQUENCE_TABLE} WHERE id = 1")).first()
+
+
+def poa_data_version(db) -> int:
+    row = _sequence_row(db)
+    if row is not None:
+        return int(row[0] or 0)
+    ChangeLog = _core().POAChangeLog
+    return int(db.query(func.max(ChangeLog.seq)).scalar() or 0)
+
+
+def changes_since(db, since: int, limit: int = DEFAULT_CHANGES_LIMIT) -> Dict[str, Any]:
+    """Cambios con ``seq > since`` en orden, hasta ``limit``, más el cursor resultante.
+
+    ``expired`` indica que ``since`` es anterior a lo podado: faltan cambios y
+    el cliente debe recargar completo.
+    """
+    ChangeLog = _core().POAChangeLog
+    safe_limit = max(1, min(int(limit or DEFAULT_CHANGES_LIMIT), MAX_CHANGES_LIMIT))
+    sequence = _sequence_row(db)
+    if sequence is not None and int(since or 0) < int(sequence[1] or 0):
+        return {"rows": [], "has_more": False, "cursor": None, "expired": True}
+    rows: List[Any] = (
+        db.query(ChangeLog)
+        .filter(ChangeLog.seq > int(since or 0))
+        .order_by(ChangeLog.seq.asc())
+        .limit(safe_limit + 1)
+        .all()
+    )
+    has_more = len(rows) > safe_limit
+    rows = rows[:safe_limit]
+    cursor: Optional[int] = int(rows[-1].seq) if rows else None
+    return {"rows": rows, "has_more": has_more, "cursor": cursor, "expired": False}
+
+
+def prune_change_log(db, retention_days: int = RETENTION_DAYS) -> int:
+    """Borra cambios más viejos que ``retention_days``; no hace commit."""
+    ChangeLog = _core().POAChangeLog
+    cutoff = datetime.utcnow() - timedelta(days=max(1, int(retention_days)))
+    through = db.query(func.max(ChangeLog.seq)).filter(ChangeLog.changed_at < cutoff).scalar()
+    if through is None:
+        return 0
+    deleted = db.query(ChangeLog).filter(ChangeLog.seq <= int(through)).delete(synchronize_session=False)
+    db.execute(
+        text(f"UPDATE {SEQUENCE_TABLE} SET pruned_through = :through WHERE id = 1 AND pruned_through < :through"),
+        {"through": int(through)},
+    )
+    return int(deleted or 0)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = list(sys.argv[1:] if argv is None else argv)
+    if (args[0] if args else "").strip().lower() != "podar":
+        print("Uso: python -m fastapi_modulo.modulos.planificacion.poa_changes podar [DIAS]")
+        return 2
+    days = int(args[1]) if len(args) > 1 else RETENTION_DAYS
+    db = _core().SessionLocal()
+    try:
+        deleted = prune_change_log(db, days)
+        db.commit()
+    finally:
+        db.close()
+    print(f"Cambios podados: {deleted}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,436 @@
+"""Dependencias entre actividades del POA y ruta crítica por objetivo.
+
+``poa_activity_dependencies`` guarda una fila ``(predecessor_id,
+successor_id)`` por cada liga "termina para iniciar" dentro de un mismo
+objetivo, con un desfase opcional en días (``lag_dias``). Los manejadores de
+escritura rechazan ligas que formarían un ciclo.
+
+El cálculo recorre el grafo de cada objetivo en orden topológico (Kahn):
+
+- Ida: ``inicio_temprano`` es la fecha planeada o el día siguiente al término
+  temprano de sus predecesoras (más el desfase). Una actividad vencida y no
+  terminada se proyecta a terminar hoy, así su atraso empuja a las sucesoras.
+- Vuelta: desde la ``fecha_final`` del objetivo (o el término proyectado si no
+  tiene) se obtienen ``inicio_tardio`` / ``fin_tardio``.
+- ``holgura = fin_tardio - fin_temprano`` en días; negativa significa que la
+  actividad retrasa el cierre del objetivo. La ruta crítica son las
+  actividades pendientes con la menor holgura del objetivo.
+
+``critical_path_snapshot`` guarda el resultado por versión de datos (contador de
+``poa_change_sequence`` más el día), igual que el tablero de inicio.
+
+Uso desde línea de comandos::
+
+    python -m fastapi_modulo.modulos.planificacion.poa_critical_path resumen
+"""
+from __future__ import annotations
+
+import json
+import sys
+import threading
+from collections import deque
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from fastapi_modulo.modulos.planificacion.poa_changes import poa_data_version
+
+DEPENDENCIES_TABLE = "poa_activity_dependencies"
+MAX_LAG_DAYS = 365
+# Holgura a partir de la cual una actividad u objetivo deja de considerarse en riesgo.
+SLACK_WARNING_DAYS = 7
+# Estados de entrega con los que ``_activity_status`` da la actividad por terminada.
+_DONE_DELIVERY_STATES = {"aprobada", "declarada"}
+
+
+def _core():
+    from fastapi_modulo import main as core
+
+    return core
+
+
+def create_dependencies_table(conn) -> None:
+    """Paso de esquema: tabla de ligas entre actividades."""
+    conn.execute(
+        text(
+            f"""
+            CREATE TABLE IF NOT EXISTS {DEPENDENCIES_TABLE} (
+              predecessor_id INTEGER NOT NULL,
+              successor_id INTEGER NOT NULL,
+              objective_id INTEGER NOT NULL,
+              lag_dias INTEGER NOT NULL DEFAULT 0,
+              created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+              PRIMARY KEY (predecessor_id, successor_id)
+            )
+            """
+        )
+    )
+    conn.execute(
+        text(
+            f"CREATE INDEX IF NOT EXISTS ix_{DEPENDENCIES_TABLE}_successor "
+            f"ON {DEPENDENCIES_TABLE} (successor_id)"
+        )
+    )
+    conn.execute(
+        text(
+            f"CREATE INDEX IF NOT EXISTS ix_{DEPENDENCIES_TABLE}_objective "
+            f"ON {DEPENDENCIES_TABLE} (objective_id)"
+        )
+    )
+
+
+def _objective_edges(db, objective_id: int) -> List[Tuple[int, int]]:
+    rows = db.execute(
+        text(f"SELECT predecessor_id, successor_id FROM {DEPENDENCIES_TABLE} WHERE objective_id = :oid"),
+        {"oid": int(objective_id)},
+    ).fetchall()
+    return [(int(row[0]), int(row[1])) for row in rows]
+
+
+def _reaches(edges: List[Tuple[int, int]], start: int, target: int) -> bool:
+    successors: Dict[int, List[int]] = {}
+    for pred, succ in edges:
+        successors.setdefault(pred, []).append(succ)
+    seen = {start}
+    pending = deque([start])
+    while pending:
+        node = pending.popleft()
+        if node == target:
+            return True
+        for nxt in successors.get(node, []):
+            if nxt not in seen:
+                seen.add(nxt)
+                pending.append(nxt)
+    return False
+
+
+def add_dependency(db, predecessor, successor, lag_days: int = 0) -> None:
+    """Liga ``predecessor -> successor`` (o actualiza su desfase).
+
+    Lanza ``ValueError`` si son la misma actividad, pertenecen a objetivos
+    distintos o la liga cerraría un ciclo.
+    """
+    if int(predecessor.id) == int(successor.id):
+        raise ValueError("Una actividad no puede depender de sí misma")
+    if int(predecessor.objective_id) != int(successor.objective_id):
+        raise ValueError("Las dependencias sólo pueden ligar actividades del mismo objetivo")
+    lag = int(lag_days or 0)
+    if abs(lag) > MAX_LAG_DAYS:
+        raise ValueError(f"El desfase no puede exceder {MAX_LAG_DAYS} días")
+    params = {
+        "pred": int(predecessor.id),
+        "succ": int(successor.id),
+        "oid": int(successor.objective_id),
+        "lag": lag,
+    }
+    updated = db.execute(
+        text(
+            f"UPDATE {DEPENDENCIES_TABLE} SET lag_dias = :lag "
+            "WHERE predecessor_id = :pred AND successor_id = :succ"
+        ),
+        params,
+    )
+    if updated.rowcount:
+        return
+    if _reaches(_objective_edges(db, successor.objective_id), int(successor.id), int(predecessor.id)):
+        raise ValueError("La dependencia formaría un ciclo")
+    db.execute(
+        text(
+            f"INSERT INTO {DEPENDENCIES_TABLE} (predecessor_id, successor_id, objective_id, lag_dias, created_at) "
+            "VALUES (:pred, :succ, :oid, :lag, :created_at)"
+        ),
+        {**params, "created_at": datetime.utcnow()},
+    )
+
+
+def remove_dependency(db, predecessor_id: int, successor_id: int) -> bool:
+    deleted = db.execute(
+        text(f"DELETE FROM {DEPENDENCIES_TABLE} WHERE predecessor_id = :pred AND successor_id = :succ"),
+        {"pred": int(predecessor_id), "succ": int(successor_id)},
+    )
+    return bool(deleted.rowcount)
+
+
+def delete_activity_dependencies(db, activity_id: int) -> None:
+    db.execute(
+        text(f"DELETE FROM {DEPENDENCIES_TABLE} WHERE predecessor_id = :aid OR successor_id = :aid"),
+        {"aid": int(activity_id)},
+    )
+
+
+def delete_objective_dependencies(db, objective_id: int) -> None:
+    db.execute(text(f"DELETE FROM {DEPENDENCIES_TABLE} WHERE objective_id = :oid"), {"oid": int(objective_id)})
+
+
+def prune_dependencies(db) -> int:
+    """Borra ligas cuyas actividades ya no existen o cambiaron de objetivo; devuelve cuántas."""
+    table = _core().POAActivity.__tablename__
+    deleted = db.execute(
+        text(
+            f"""
+            DELETE FROM {DEPENDENCIES_TABLE}
+            WHERE NOT EXISTS (
+                SELECT 1 FROM {table} a
+                WHERE a.id = {DEPENDENCIES_TABLE}.predecessor_id AND a.objective_id = {DEPENDENCIES_TABLE}.objective_id
+            )
+            OR NOT EXISTS (
+                SELECT 1 FROM {table} a
+                WHERE a.id = {DEPENDENCIES_TABLE}.successor_id AND a.objective_id = {DEPENDENCIES_TABLE}.objective_id
+            )
+            """
+        )
+    )
+    return int(deleted.rowcount or 0)
+
+
+def activity_dependencies(db, activity_id: int) -> Dict[str, List[Dict[str, Any]]]:
+    """Predecesoras y sucesoras directas de una actividad."""
+    rows = db.execute(
+        text(
+            f"""
+            SELECT dep.predecessor_id, dep.successor_id, dep.lag_dias, act.nombre, act.codigo
+            FROM {DEPENDENCIES_TABLE} dep
+            JOIN poa_activities act
+              ON act.id = CASE WHEN dep.successor_id = :aid THEN dep.predecessor_id ELSE dep.successor_id END
+            WHERE dep.successor_id = :aid OR dep.predecessor_id = :aid
+            ORDER BY act.fecha_inicial, act.id
+            """
+        ),
+        {"aid": int(activity_id)},
+    ).fetchall()
+    result: Dict[str, List[Dict[str, Any]]] = {"predecesoras": [], "sucesoras": []}
+    for pred, succ, lag, nombre, codigo in rows:
+        is_predecessor = int(succ) == int(activity_id)
+        result["predecesoras" if is_predecessor else "sucesoras"].append(
+            {
+                "activity_id": int(pred if is_predecessor else succ),
+                "nombre": nombre or "",
+                "codigo": codigo or "",
+                "lag_dias": int(lag or 0),
+            }
+        )
+    return result
+
+
+def _topological_order(nodes: List[int], edges: List[Tuple[int, int, int]]) -> Tuple[List[int], List[int]]:
+    """Orden de Kahn; devuelve también los nodos atrapados en ciclos (se agregan al final)."""
+    indegree = {node: 0 for node in nodes}
+    successors: Dict[int, List[int]] = {node: [] for node in nodes}
+    for pred, succ, _ in edges:
+        successors[pred].append(succ)
+        indegree[succ] += 1
+    ready = deque(sorted(node for node in nodes if indegree[node] == 0))
+    order: List[int] = []
+    while ready:
+        node = ready.popleft()
+        order.append(node)
+        for nxt in successors[node]:
+            indegree[nxt] -= 1
+            if indegree[nxt] == 0:
+                ready.append(nxt)
+    placed = set(order)
+    cyclic = [node for node in nodes if node not in placed]
+    return order + cyclic, cyclic
+
+
+def _objective_schedule(
+    activities: List[Dict[str, Any]],
+    edges: List[Tuple[int, int, int]],
+    deadline: Optional[date],
+    today: date,
+) -> Dict[str, Any]:
+    info = {item["id"]: item for item in activities}
+    edges = [edge for edge in edges if edge[0] in info and edge[1] in info]
+    order, cyclic = _topological_order(sorted(info), edges)
+    preds: Dict[int, List[Tuple[int, int]]] = {node: [] for node in info}
+    succs: Dict[int, List[Tuple[int, int]]] = {node: [] for node in info}
+    for pred, succ, lag in edges:
+        preds[succ].append((pred, lag))
+        succs[pred].append((succ, lag))
+
+    early: Dict[int, Tuple[int, int]] = {}
+    for node in order:
+        item = info[node]
+        start = item["fecha_inicial"].toordinal()
+        span = (item["fecha_final"] - item["fecha_inicial"]).days
+        for pred, lag in preds[node]:
+            if pred in early:
+                start = max(start, early[pred][1] + 1 + lag)
+        finish = start + span
+        if not item["terminada"]:
+            finish = max(finish, today.toordinal())
+        early[node] = (start, finish)
+
+    projected_finish = max((finish for _, finish in early.values()), default=None)
+    limit = deadline.toordinal() if deadline else projected_finish
+    late: Dict[int, Tuple[int, int]] = {}
+    for node in reversed(order):
+        finish = limit
+        for succ, lag in succs[node]:
+            if succ in late:
+                finish = min(finish, late[succ][0] - 1 - lag)
+        es, ef = early[node]
+        late[node] = (finish - (ef - es), finish)
+
+    schedule: Dict[int, Dict[str, Any]] = {}
+    for node in order:
+        es, ef = early[node]
+        ls, lf = late[node]
+        schedule[node] = {
+            **info[node],
+            "inicio_temprano": date.fromordinal(es),
+            "fin_temprano": date.fromordinal(ef),
+            "inicio_tardio": date.fromordinal(ls),
+            "fin_tardio": date.fromordinal(lf),
+            "holgura": lf - ef,
+            "critica": False,
+        }
+    pending = [item for item in schedule.values() if not item["terminada"]]
+    slack = min((item["holgura"] for item in pending), default=None)
+    chain = []
+    if slack is not None:
+        chain = sorted(
+            (item for item in pending if item["holgura"] == slack),
+            key=lambda item: (item["inicio_temprano"], item["id"]),
+        )
+        for item in chain:
+            item["critica"] = True
+    return {
+        "fecha_limite": deadline,
+        "fin_proyectado": date.fromordinal(projected_finish) if projected_finish else None,
+        "holgura": slack,
+        "ruta_critica": [item["id"] for item in chain],
+        "ciclo": cyclic,
+        "actividades": schedule,
+    }
+
+
+def compute_critical_paths(db, today: Optional[date] = None) -> Dict[int, Dict[str, Any]]:
+    """Calendario temprano/tardío y ruta crítica de cada objetivo activo."""
+    core = _core()
+    Activity = core.POAActivity
+    Objective = core.StrategicObjectiveConfig
+    current = today or datetime.utcnow().date()
+    objectives = {
+        int(row[0]): row[1]
+        for row in db.query(Objective.id, Objective.fecha_final).filter(Objective.is_active == True).all()  # noqa: E712
+    }
+    if not objectives:
+        return {}
+    rows = (
+        db.query(
+            Activity.id,
+            Activity.objective_id,
+            Activity.fecha_inicial,
+            Activity.fecha_final,
+            Activity.entrega_estado,
+        )
+        .filter(
+            Activity.objective_id.in_(sorted(objectives)),
+            Activity.fecha_inicial.isnot(None),
+            Activity.fecha_final.isnot(None),
+        )
+        .all()
+    )
+    by_objective: Dict[int, List[Dict[str, Any]]] = {}
+    for row in rows:
+        fecha_final = max(row.fecha_final, row.fecha_inicial)
+        by_objective.setdefault(int(row.objective_id), []).append(
+            {
+                "id": int(row.id),
+                "fecha_inicial": row.fecha_inicial,
+                "fecha_final": fecha_final,
+                "terminada": str(row.entrega_estado or "").strip().lower() in _DONE_DELIVERY_STATES,
+            }
+        )
+    edges_by_objective: Dict[int, List[Tuple[int, int, int]]] = {}
+    for pred, succ, objective_id, lag in db.execute(
+        text(f"SELECT predecessor_id, successor_id, objective_id, lag_dias FROM {DEPENDENCIES_TABLE}")
+    ).fetchall():
+        edges_by_objective.setdefault(int(objective_id), []).append((int(pred), int(succ), int(lag or 0)))
+    return {
+        objective_id: _objective_schedule(
+            by_objective[objective_id], edges_by_objective.get(objective_id, []), objectives[objective_id], current
+        )
+        for objective_id in sorted(by_objective)
+    }
+
+
+_CACHE_LOCK = threading.Lock()
+_CACHE: Dict[str, Any] = {"version": None, "schedules": {}}
+
+
+def critical_path_snapshot(db, today: Optional[date] = None) -> Dict[int, Dict[str, Any]]:
+    """``compute_critical_paths`` guardado por versión de datos y día."""
+    current = today or datetime.utcnow().date()
+    version = (poa_data_version(db), current)
+    with _CACHE_LOCK:
+        if _CACHE["version"] == version:
+            return _CACHE["schedules"]
+    schedules = compute_critical_paths(db, current)
+    with _CACHE_LOCK:
+        _CACHE["version"] = version
+        _CACHE["schedules"] = schedules
+    return schedules
+
+
+def slack_by_activity(schedules: Dict[int, Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+    """``{activity_id: entrada del calendario}`` de todos los objetivos."""
+    return {
+        activity_id: item
+        for schedule in schedules.values()
+        for activity_id, item in schedule["actividades"].items()
+    }
+
+
+def _iso(value: Optional[date]) -> str:
+    return value.isoformat() if value else ""
+
+
+def schedule_payload(schedule: Dict[str, Any]) -> Dict[str, Any]:
+    """Versión serializable a JSON del calendario de un objetivo."""
+    activities = sorted(schedule["actividades"].values(), key=lambda item: (item["inicio_temprano"], item["id"]))
+    return {
+        "fecha_limite": _iso(schedule["fecha_limite"]),
+        "fin_proyectado": _iso(schedule["fin_proyectado"]),
+        "holgura": schedule["holgura"],
+        "ruta_critica": list(schedule["ruta_critica"]),
+        "ciclo": list(schedule["ciclo"]),
+        "actividades": [
+            {
+                "id": item["id"],
+                "terminada": item["terminada"],
+                "inicio_temprano": _iso(item["inicio_temprano"]),
+                "fin_temprano": _iso(item["fin_temprano"]),
+                "inicio_tardio": _iso(item["inicio_tardio"]),
+                "fin_tardio": _iso(item["fin_tardio"]),
+                "holgura": item["holgura"],
+                "critica": item["critica"],
+            }
+            for item in activities
+        ],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = list(sys.argv[1:] if argv is None else argv)
+    command = args[0] if args else ""
+    if command != "resumen":
+        print("Uso: python -m fastapi_modulo.modulos.planificacion.poa_critical_path resumen")
+        return 2
+    db = _core().SessionLocal()
+    try:
+        schedules = compute_critical_paths(db)
+    finally:
+        db.close()
+    summary = {
+        objective_id: {key: value for key, value in schedule_payload(schedule).items() if key != "actividades"}
+        for objective_id, schedule in schedules.items()
+    }
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
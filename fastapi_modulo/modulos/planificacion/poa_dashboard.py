@@ -0,0 +1,319 @@
+"""Agregados de estado y avance del POA para los tableros.
+
+``activity_status_case`` traduce ``_activity_status`` a una expresión CASE,
+de modo que el conteo por estado, objetivo y fecha de término sale de un solo
+``GROUP BY``. De ese resultado compacto se derivan en una pasada la dona de
+estados, las actividades por objetivo y la serie mensual esperado/real
+(acumulados sobre fechas ordenadas). Las actividades críticas y la holgura de
+cada objetivo salen de la ruta crítica (``poa_critical_path``): se ordenan por
+menor holgura en lugar de por el estado "Atrasada".
+
+``dashboard_snapshot`` guarda en memoria una sola copia del tablero, marcada con
+la versión de datos (contador de ``poa_change_sequence`` más el día); los datos
+del tablero no dependen del tenant, así que la copia es común: toda escritura
+de ejes, objetivos o POA cambia la versión y la siguiente visita lo recalcula.
+Mientras otra petición lo reconstruye se sirve la copia anterior
+(stale-while-revalidate) en lugar de repetir el cálculo en paralelo.
+
+Uso desde línea de comandos::
+
+    python -m fastapi_modulo.modulos.planificacion.poa_dashboard resumen
+"""
+from __future__ import annotations
+
+import json
+import sys
+import threading
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, case, func, or_
+
+from fastapi_modulo.modulos.planificacion.poa_changes import poa_data_version
+from fastapi_modulo.modulos.planificacion.poa_critical_path import SLACK_WARNING_DAYS, critical_path_snapshot
+from fastapi_modulo.modulos.planificacion.poa_rollup import (
+    SCOPE_ACTIVITY,
+    SCOPE_OBJECTIVE,
+    ensure_progress_rollups_current,
+    progress_by_entity,
+)
+
+STATUS_NOT_STARTED = "No iniciada"
+STATUS_IN_PROGRESS = "En proceso"
+STATUS_IN_REVIEW = "En revisión"
+STATUS_DONE = "Terminada"
+STATUS_LATE = "Atrasada"
+STATUS_NAMES = (STATUS_NOT_STARTED, STATUS_IN_PROGRESS, STATUS_IN_REVIEW, STATUS_DONE, STATUS_LATE)
+
+DEFAULT_TREND_MONTHS = 12
+DEFAULT_CRITICAL_LIMIT = 10
+
+
+def _core():
+    from fastapi_modulo import main as core
+
+    return core
+
+
+def month_start(anchor: date, delta: int = 0) -> date:
+    idx = (anchor.month - 1) + delta
+    return date(anchor.year + (idx // 12), (idx % 12) + 1, 1)
+
+
+def month_end(anchor: date) -> date:
+    return month_start(anchor, 1) - timedelta(days=1)
+
+
+def activity_status_case(today: date):
+    """Expresión SQL equivalente a ``_activity_status`` para la fecha ``today``."""
+    Activity = _core().POAActivity
+    delivery = func.lower(func.trim(func.coalesce(Activity.entrega_estado, "")))
+    return case(
+        (delivery.in_(("aprobada", "declarada")), STATUS_DONE),
+        (delivery == "pendiente", STATUS_IN_REVIEW),
+        (
+            and_(
+                Activity.fecha_inicial.isnot(None),
+                Activity.fecha_inicial > today,
+                or_(Activity.inicio_forzado.is_(None), Activity.inicio_forzado == False),  # noqa: E712
+            ),
+            STATUS_NOT_STARTED,
+        ),
+        (and_(Activity.fecha_final.isnot(None), Activity.fecha_final < today), STATUS_LATE),
+        else_=STATUS_IN_PROGRESS,
+    )
+
+
+def _active_objective_ids(db) -> List[int]:
+    Objective = _core().StrategicObjectiveConfig
+    return [
+        int(row[0])
+        for row in db.query(Objective.id).filter(Objective.is_active == True).all()  # noqa: E712
+    ]
+
+
+def _percent(value: int, total: int) -> int:
+    return int(round((value / total) * 100)) if total else 0
+
+
+def _trend_series(
+    due_counts: Dict[date, List[int]],
+    total: int,
+    today: date,
+    months: int,
+) -> List[Dict[str, Any]]:
+    """Serie mensual acumulada: ``[vencen, vencen y terminadas]`` por fecha de término."""
+    dates = sorted(due_counts)
+    expected_acc: List[int] = []
+    real_acc: List[int] = []
+    expected_sum = real_sum = 0
+    for day in dates:
+        expected_sum += due_counts[day][0]
+        real_sum += due_counts[day][1]
+        expected_acc.append(expected_sum)
+        real_acc.append(real_sum)
+    anchor = today.replace(day=1)
+    series: List[Dict[str, Any]] = []
+    for offset in range(-(months - 1), 1):
+        start = month_start(anchor, offset)
+        position = bisect_right(dates, month_end(start))
+        series.append(
+            {
+                "month": start,
+                "expected": _percent(expected_acc[position - 1] if position else 0, total),
+                "real": _percent(real_acc[position - 1] if position else 0, total),
+            }
+        )
+    return series
+
+
+def critical_activities(
+    db,
+    today: date,
+    limit: int = DEFAULT_CRITICAL_LIMIT,
+    schedules: Optional[Dict[int, Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
+    """Actividades pendientes con menor holgura (hasta ``SLACK_WARNING_DAYS``) de objetivos activos."""
+    core = _core()
+    Activity = core.POAActivity
+    Rollup = core.POAProgressRollup
+    schedules = critical_path_snapshot(db, today) if schedules is None else schedules
+    candidates = sorted(
+        (
+            (item["holgura"], activity_id)
+            for schedule in schedules.values()
+            for activity_id, item in schedule["actividades"].items()
+            if not item["terminada"] and item["holgura"] <= SLACK_WARNING_DAYS
+        )
+    )[: max(1, int(limit))]
+    if not candidates:
+        return []
+    slack = {activity_id: value for value, activity_id in candidates}
+    rows = {
+        int(row.id): row
+        for row in db.query(
+            Activity.id,
+            Activity.objective_id,
+            Activity.nombre,
+            Activity.responsable,
+            Activity.entregable,
+            Activity.fecha_inicial,
+            Activity.fecha_final,
+            activity_status_case(today).label("status"),
+            func.coalesce(Rollup.avance, 0).label("avance"),
+        )
+        .outerjoin(Rollup, and_(Rollup.scope == SCOPE_ACTIVITY, Rollup.entity_id == Activity.id))
+        .filter(Activity.id.in_(sorted(slack)))
+        .all()
+    }
+    return [
+        {
+            "id": activity_id,
+            "objective_id": int(rows[activity_id].objective_id),
+            "nombre": rows[activity_id].nombre,
+            "responsable": rows[activity_id].responsable,
+            "entregable": rows[activity_id].entregable,
+            "fecha_inicial": rows[activity_id].fecha_inicial,
+            "fecha_final": rows[activity_id].fecha_final,
+            "status": rows[activity_id].status,
+            "avance": int(rows[activity_id].avance or 0),
+            "holgura": slack[activity_id],
+            "score": SLACK_WARNING_DAYS + 1 - slack[activity_id],
+        }
+        for _, activity_id in candidates
+        if activity_id in rows
+    ]
+
+
+def dashboard_aggregates(
+    db,
+    today: Optional[date] = None,
+    months: int = DEFAULT_TREND_MONTHS,
+    critical_limit: int = DEFAULT_CRITICAL_LIMIT,
+) -> Dict[str, Any]:
+    """Dona de estados, avance por objetivo, serie mensual, holguras y actividades críticas.
+
+    Considera sólo las actividades de objetivos activos, igual que el tablero
+    de inicio.
+    """
+    core = _core()
+    Activity = core.POAActivity
+    Objective = core.StrategicObjectiveConfig
+    current = today or datetime.utcnow().date()
+    ensure_progress_rollups_current(db)
+
+    status = activity_status_case(current)
+    grouped = (
+        db.query(Activity.objective_id, status.label("status"), Activity.fecha_final, func.count(Activity.id))
+        .join(Objective, Objective.id == Activity.objective_id)
+        .filter(Objective.is_active == True)  # noqa: E712
+        .group_by(Activity.objective_id, status, Activity.fecha_final)
+        .all()
+    )
+    schedules = critical_path_snapshot(db, current)
+
+    status_counts = {name: 0 for name in STATUS_NAMES}
+    by_objective: Dict[int, int] = {}
+    due_counts: Dict[date, List[int]] = {}
+    total = 0
+    for objective_id, status_name, due_on, count in grouped:
+        count = int(count or 0)
+        total += count
+        status_counts[status_name] = status_counts.get(status_name, 0) + count
+        by_objective[int(objective_id)] = by_objective.get(int(objective_id), 0) + count
+        if due_on:
+            bucket = due_counts.setdefault(due_on, [0, 0])
+            bucket[0] += count
+            if status_name == STATUS_DONE:
+                bucket[1] += count
+
+    return {
+        "today": current,
+        "total_activities": total,
+        "status_counts": status_counts,
+        "activities_by_objective": by_objective,
+        "objective_progress": progress_by_entity(db, SCOPE_OBJECTIVE, _active_objective_ids(db)),
+        "trend": _trend_series(due_counts, total, current, max(1, int(months))),
+        "objective_slack": {objective_id: schedule["holgura"] for objective_id, schedule in schedules.items()},
+        "critical_activities": critical_activities(db, current, critical_limit, schedules) if total else [],
+    }
+
+
+class DashboardSnapshotCache:
+    """Última copia del tablero con su versión; seguro entre hilos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entry: Optional[Tuple[Any, Dict[str, Any]]] = None
+        self._building = False
+
+    def lookup(self) -> Optional[Tuple[Any, Dict[str, Any]]]:
+        with self._lock:
+            return self._entry
+
+    def begin(self) -> bool:
+        """Marca una reconstrucción; ``False`` si ya hay otra en curso."""
+        with self._lock:
+            if self._building:
+                return False
+            self._building = True
+            return True
+
+    def finish(self, version: Any = None, payload: Optional[Dict[str, Any]] = None) -> None:
+        with self._lock:
+            self._building = False
+            if payload is not None:
+                self._entry = (version, payload)
+
+
+_SNAPSHOTS = DashboardSnapshotCache()
+
+
+def dashboard_snapshot_version(db) -> Tuple[int, date]:
+    return poa_data_version(db), datetime.utcnow().date()
+
+
+def dashboard_snapshot(
+    build: Callable[[Any], Dict[str, Any]],
+    cache: Optional[DashboardSnapshotCache] = None,
+) -> Dict[str, Any]:
+    """Devuelve el tablero vigente, reconstruyéndolo con ``build(db)`` si cambió la versión."""
+    store = cache or _SNAPSHOTS
+    db = _core().SessionLocal()
+    try:
+        version = dashboard_snapshot_version(db)
+        entry = store.lookup()
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        started = store.begin()
+        if not started and entry is not None:
+            return entry[1]
+        payload: Optional[Dict[str, Any]] = None
+        try:
+            payload = build(db)
+        finally:
+            if started:
+                store.finish(version, payload)
+        return payload
+    finally:
+        db.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = list(sys.argv[1:] if argv is None else argv)
+    command = args[0] if args else ""
+    if command != "resumen":
+        print("Uso: python -m fastapi_modulo.modulos.planificacion.poa_dashboard resumen")
+        return 2
+    db = _core().SessionLocal()
+    try:
+        summary = dashboard_aggregates(db)
+    finally:
+        db.close()
+    print(json.dumps(summary, ensure_ascii=False, indent=2, default=str))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
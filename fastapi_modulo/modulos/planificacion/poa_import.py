@@ -0,0 +1,780 @@
+"""Importación por lotes de la plantilla CSV de plan estratégico y POA.
+
+El archivo subido se copia a disco por bloques y después se lee en streaming:
+nunca se carga completo en memoria. Las filas se procesan en lotes de
+``IMPORT_CHUNK_ROWS``; para cada lote se resuelven en una sola consulta los
+códigos de ejes, objetivos y actividades que menciona (con sus subactividades)
+y las altas y cambios se escriben juntas, porque el ``flush`` sólo ocurre
+cuando una fila necesita el id de un registro nuevo o al cerrar el lote.
+Toda la importación (lotes, derivados y reset) se confirma en un solo commit:
+si algo falla, el plan queda exactamente como estaba. A cambio, en SQLite el
+bloqueo de escritura se retiene mientras dura la importación.
+
+Con ``dry_run`` se aplican las mismas validaciones sin escribir: las altas
+reciben ids provisionales negativos y la sesión se descarta al terminar.
+
+Cada importación es un trabajo con estado consultable (``import_job_status``);
+los archivos grandes se procesan en segundo plano.
+
+Uso desde línea de comandos::
+
+    python -m fastapi_modulo.modulos.planificacion.poa_import plantilla.csv
+    python -m fastapi_modulo.modulos.planificacion.poa_import plantilla.csv --dry-run
+"""
+from __future__ import annotations
+
+import codecs
+import csv
+import json
+import os
+import secrets
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+
+from fastapi_modulo.modulos.notificaciones.inbox import sync_deadline_notifications
+from fastapi_modulo.modulos.planificacion.plan_export import schedule_plan_prerender
+from fastapi_modulo.modulos.planificacion.poa_calendar import rebuild_occurrences
+from fastapi_modulo.modulos.planificacion.poa_changes import record_poa_reset
+from fastapi_modulo.modulos.planificacion.poa_critical_path import prune_dependencies
+from fastapi_modulo.modulos.planificacion.poa_rollup import rebuild_progress_rollups
+from fastapi_modulo.modulos.planificacion.poa_tree import rebuild_subactivity_closure
+
+IMPORT_CHUNK_ROWS = int((os.environ.get("POA_IMPORT_CHUNK_ROWS") or "500").strip() or "500")
+IMPORT_BACKGROUND_BYTES = int((os.environ.get("POA_IMPORT_BACKGROUND_BYTES") or "1048576").strip() or "1048576")
+IMPORT_JOB_RETENTION_SECONDS = int((os.environ.get("POA_IMPORT_JOB_RETENTION_SECONDS") or "3600").strip() or "3600")
+IMPORT_READ_BLOCK = 64 * 1024
+IMPORT_MAX_ERRORS = 1000
+IMPORT_REQUIRED_HEADERS = ("tipo_registro",)
+# SQLite admite 999 parámetros por sentencia en versiones antiguas.
+_IN_BATCH = 500
+
+JOB_PENDING = "pendiente"
+JOB_RUNNING = "en_proceso"
+JOB_DONE = "completado"
+JOB_FAILED = "error"
+
+DB_WRITE_ERROR = "No se pudo escribir en la base de datos (modo solo lectura o bloqueo)."
+
+_KIND_ORDER = ("eje", "objetivo", "actividad", "subactividad")
+
+_JOBS: Dict[str, Dict[str, Any]] = {}
+_JOBS_LOCK = threading.Lock()
+
+
+def _core():
+    from fastapi_modulo import main as core
+
+    return core
+
+
+def _ejes():
+    from fastapi_modulo.modulos.planificacion import ejes_poa
+
+    return ejes_poa
+
+
+def _csv_value(row: Dict[str, Any], key: str) -> str:
+    return str((row.get(key) or "")).strip()
+
+
+def _normalize_import_kind(value: str) -> str:
+    raw = str(value or "").strip().lower()
+    aliases = {
+        "axis": "eje",
+        "eje": "eje",
+        "objetivo": "objetivo",
+        "objective": "objetivo",
+        "actividad": "actividad",
+        "activity": "actividad",
+        "subactividad": "subactividad",
+        "subactivity": "subactividad",
+    }
+    return aliases.get(raw, raw)
+
+
+def _parse_import_date(value: str) -> Any:
+    raw = str(value or "").strip()
+    if not raw:
+        return None
+    try:
+        return datetime.strptime(raw, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"Fecha inválida '{raw}', use formato YYYY-MM-DD")
+
+
+def _parse_import_int(value: str, fallback: int = 0) -> int:
+    raw = str(value or "").strip()
+    if not raw:
+        return fallback
+    return int(raw)
+
+
+def _parse_import_bool(value: str) -> bool:
+    raw = str(value or "").strip().lower()
+    return raw in {"1", "true", "yes", "si", "sí", "on"}
+
+
+def _batched(values: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    batch: List[Any] = []
+    for value in values:
+        batch.append(value)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _code_column(column):
+    return func.lower(func.trim(column))
+
+
+class PoaCsvImporter:
+    """Aplica lotes de filas de la plantilla; ``dry_run`` sólo valida."""
+
+    def __init__(self, db, dry_run: bool = False):
+        core = _core()
+        self.db = db
+        self.dry_run = bool(dry_run)
+        self.Axis = core.StrategicAxisConfig
+        self.Objective = core.StrategicObjectiveConfig
+        self.Activity = core.POAActivity
+        self.Subactivity = core.POASubactivity
+        self.summary: Dict[str, Any] = {"created": 0, "updated": 0, "skipped": 0, "errors": []}
+        self.errors_omitted = 0
+        self.rows_processed = 0
+        self.axis_by_code: Dict[str, Any] = {}
+        self.objective_by_code: Dict[str, Any] = {}
+        self.activity_by_key: Dict[str, Any] = {}
+        self.activity_by_code_list: Dict[str, List[Any]] = {}
+        self.sub_by_activity_code: Dict[str, Dict[str, Any]] = {}
+        self._activity_codes_loaded: Set[str] = set()
+        self.objective_order_by_axis: Dict[int, int] = {}
+        self.max_axis_order = int(db.query(func.max(self.Axis.orden)).scalar() or 0)
+        self._next_fake_id = 0
+
+    # -- ids ---------------------------------------------------------------
+
+    def _persist(self, item) -> None:
+        if self.dry_run:
+            self._next_fake_id -= 1
+            item.id = self._next_fake_id
+            return
+        self.db.add(item)
+
+    def _id_of(self, item) -> int:
+        if item.id is None:
+            self.db.flush()
+        return int(item.id)
+
+    # -- resolución de códigos por lote -------------------------------------
+
+    def _load_axes(self, codes: Set[str]) -> None:
+        missing = sorted(code for code in codes if code and code not in self.axis_by_code)
+        for batch in _batched(missing, _IN_BATCH):
+            rows = self.db.query(self.Axis).filter(_code_column(self.Axis.codigo).in_(batch)).order_by(self.Axis.id.asc()).all()
+            for item in rows:
+                self.axis_by_code[str(item.codigo or "").strip().lower()] = item
+            for code in batch:
+                self.axis_by_code.setdefault(code, None)
+
+    def _load_objectives(self, codes: Set[str]) -> None:
+        missing = sorted(code for code in codes if code and code not in self.objective_by_code)
+        for batch in _batched(missing, _IN_BATCH):
+            rows = (
+                self.db.query(self.Objective)
+                .filter(_code_column(self.Objective.codigo).in_(batch))
+                .order_by(self.Objective.id.asc())
+                .all()
+            )
+            for item in rows:
+                self.objective_by_code[str(item.codigo or "").strip().lower()] = item
+            for code in batch:
+                self.objective_by_code.setdefault(code, None)
+
+    def _load_activities(self, codes: Set[str]) -> None:
+        missing = sorted(code for code in codes if code and code not in self._activity_codes_loaded)
+        for batch in _batched(missing, _IN_BATCH):
+            activities = (
+                self.db.query(self.Activity)
+                .filter(_code_column(self.Activity.codigo).in_(batch))
+                .order_by(self.Activity.id.asc())
+                .all()
+            )
+            code_by_id: Dict[int, str] = {}
+            for item in activities:
+                code = str(item.codigo or "").strip().lower()
+                code_by_id[int(item.id)] = code
+                self.activity_by_key[f"{int(item.objective_id)}::{code}"] = item
+                self.activity_by_code_list.setdefault(code, []).append(item)
+            if code_by_id:
+                subactivities = (
+                    self.db.query(self.Subactivity)
+                    .filter(self.Subactivity.activity_id.in_(list(code_by_id)))
+                    .order_by(self.Subactivity.id.asc())
+                    .all()
+                )
+                for sub in subactivities:
+                    sub_code = str(sub.codigo or "").strip().lower()
+                    activity_code = code_by_id.get(int(sub.activity_id or 0), "")
+                    if activity_code and sub_code:
+                        self.sub_by_activity_code.setdefault(activity_code, {})[sub_code] = sub
+            self._activity_codes_loaded.update(batch)
+
+    def _next_objective_order(self, axis_id: int) -> int:
+        if axis_id not in self.objective_order_by_axis:
+            current = 0
+            if axis_id > 0:
+                current = int(
+                    self.db.query(func.max(self.Objective.orden)).filter(self.Objective.eje_id == axis_id).scalar() or 0
+                )
+            self.objective_order_by_axis[axis_id] = current
+        return self.objective_order_by_axis[axis_id] + 1
+
+    def _resolve_codes(self, rows: List[Tuple[int, str, Dict[str, Any]]]) -> None:
+        axis_codes: Set[str] = set()
+        objective_codes: Set[str] = set()
+        activity_codes: Set[str] = set()
+        for _, kind, row in rows:
+            if kind in {"eje", "objetivo"}:
+                axis_codes.add(_csv_value(row, "axis_codigo").lower())
+            if kind in {"objetivo", "actividad", "subactividad"}:
+                objective_codes.add(_csv_value(row, "objective_codigo").lower())
+            if kind in {"actividad", "subactividad"}:
+                activity_codes.add(_csv_value(row, "activity_codigo").lower())
+        self._load_axes(axis_codes)
+        self._load_objectives(objective_codes)
+        self._load_activities(activity_codes)
+
+    # -- filas ---------------------------------------------------------------
+
+    def _add_error(self, message: str) -> None:
+        if len(self.summary["errors"]) < IMPORT_MAX_ERRORS:
+            self.summary["errors"].append(message)
+        else:
+            self.errors_omitted += 1
+
+    def process_chunk(self, chunk: List[Tuple[int, Dict[str, Any]]]) -> None:
+        """Procesa un lote por tipo de registro (ejes, objetivos, actividades, subactividades)."""
+        classified: List[Tuple[int, str, Dict[str, Any]]] = []
+        chunk_errors: List[Tuple[int, str]] = []
+        for row_index, row in chunk:
+            kind = _normalize_import_kind(_csv_value(row, "tipo_registro"))
+            if kind not in _KIND_ORDER:
+                self.summary["skipped"] += 1
+                chunk_errors.append((row_index, f"Fila {row_index}: tipo_registro no reconocido."))
+                continue
+            classified.append((row_index, kind, row))
+        self._resolve_codes(classified)
+        handlers = {
+            "eje": self._apply_axis,
+            "objetivo": self._apply_objective,
+            "actividad": self._apply_activity,
+            "subactividad": self._apply_subactivity,
+        }
+        for stage in _KIND_ORDER:
+            handler = handlers[stage]
+            for row_index, kind, row in classified:
+                if kind != stage:
+                    continue
+                try:
+                    handler(row)
+                except (sqlite3.OperationalError, SQLAlchemyError):
+                    raise
+                except Exception as row_error:
+                    self.summary["skipped"] += 1
+                    chunk_errors.append((row_index, f"Fila {row_index}: {row_error}"))
+        for _, message in sorted(chunk_errors, key=lambda item: item[0]):
+            self._add_error(message)
+        self.rows_processed += len(chunk)
+
+    def _apply_axis(self, row: Dict[str, Any]) -> None:
+        axis_code = _csv_value(row, "axis_codigo").lower()
+        axis_name = _csv_value(row, "axis_nombre")
+        if not axis_code:
+            raise ValueError("axis_codigo es obligatorio para tipo_registro=eje.")
+        axis = self.axis_by_code.get(axis_code)
+        if not axis_name and axis is None:
+            raise ValueError("axis_nombre es obligatorio al crear un eje.")
+        axis_order = _parse_import_int(_csv_value(row, "axis_orden"), 0)
+        if axis:
+            if axis_name:
+                axis.nombre = axis_name
+            axis.lider_departamento = _csv_value(row, "axis_lider_departamento")
+            axis.responsabilidad_directa = _csv_value(row, "axis_responsabilidad_directa")
+            axis.descripcion = _csv_value(row, "axis_descripcion")
+            if axis_order > 0:
+                axis.orden = axis_order
+            self.summary["updated"] += 1
+            return
+        self.max_axis_order += 1
+        axis = self.Axis(
+            nombre=axis_name or "Nuevo eje",
+            codigo=axis_code,
+            lider_departamento=_csv_value(row, "axis_lider_departamento"),
+            responsabilidad_directa=_csv_value(row, "axis_responsabilidad_directa"),
+            descripcion=_csv_value(row, "axis_descripcion"),
+            orden=axis_order if axis_order > 0 else self.max_axis_order,
+            is_active=True,
+        )
+        self._persist(axis)
+        self.axis_by_code[axis_code] = axis
+        self.summary["created"] += 1
+
+    def _apply_objective(self, row: Dict[str, Any]) -> None:
+        core = _core()
+        axis = self.axis_by_code.get(_csv_value(row, "axis_codigo").lower())
+        if not axis:
+            raise ValueError("axis_codigo no existe. Carga primero el eje.")
+        objective_code = _csv_value(row, "objective_codigo").lower()
+        objective_name = _csv_value(row, "objective_nombre")
+        if not objective_code:
+            raise ValueError("objective_codigo es obligatorio para tipo_registro=objetivo.")
+        objective = self.objective_by_code.get(objective_code)
+        start_date = _parse_import_date(_csv_value(row, "objective_fecha_inicial"))
+        end_date = _parse_import_date(_csv_value(row, "objective_fecha_final"))
+        if (start_date and not end_date) or (end_date and not start_date):
+            raise ValueError("objective_fecha_inicial y objective_fecha_final deben definirse juntas.")
+        if start_date and end_date:
+            range_error = core._validate_date_range(start_date, end_date, "Objetivo")
+            if range_error:
+                raise ValueError(range_error)
+        objective_order = _parse_import_int(_csv_value(row, "objective_orden"), 0)
+        axis_id = self._id_of(axis)
+        if objective:
+            if objective_name:
+                objective.nombre = objective_name
+            objective.eje_id = axis_id
+            objective.hito = _csv_value(row, "objective_hito")
+            objective.lider = _csv_value(row, "objective_lider")
+            objective.fecha_inicial = start_date
+            objective.fecha_final = end_date
+            objective.descripcion = _csv_value(row, "objective_descripcion")
+            if objective_order > 0:
+                objective.orden = objective_order
+            self.summary["updated"] += 1
+            return
+        if not objective_name:
+            raise ValueError("objective_nombre es obligatorio al crear un objetivo.")
+        next_obj_order = objective_order if objective_order > 0 else self._next_objective_order(axis_id)
+        objective = self.Objective(
+            eje_id=axis_id,
+            codigo=objective_code,
+            nombre=objective_name,
+            hito=_csv_value(row, "objective_hito"),
+            lider=_csv_value(row, "objective_lider"),
+            fecha_inicial=start_date,
+            fecha_final=end_date,
+            descripcion=_csv_value(row, "objective_descripcion"),
+            orden=next_obj_order,
+            is_active=True,
+        )
+        self._persist(objective)
+        self.objective_by_code[objective_code] = objective
+        current_order = self.objective_order_by_axis.get(axis_id, 0)
+        self.objective_order_by_axis[axis_id] = max(current_order, int(next_obj_order))
+        self.summary["created"] += 1
+
+    def _apply_activity(self, row: Dict[str, Any]) -> None:
+        core = _core()
+        ejes = _ejes()
+        objective = self.objective_by_code.get(_csv_value(row, "objective_codigo").lower())
+        if not objective:
+            raise ValueError("objective_codigo no existe. Carga primero el objetivo.")
+        activity_code = _csv_value(row, "activity_codigo").lower()
+        activity_name = _csv_value(row, "activity_nombre")
+        if not activity_code:
+            raise ValueError("activity_codigo es obligatorio para tipo_registro=actividad.")
+        objective_id = self._id_of(objective)
+        activity_key = f"{objective_id}::{activity_code}"
+        activity = self.activity_by_key.get(activity_key)
+        start_date = _parse_import_date(_csv_value(row, "activity_fecha_inicial"))
+        end_date = _parse_import_date(_csv_value(row, "activity_fecha_final"))
+        if (start_date and not end_date) or (end_date and not start_date):
+            raise ValueError("activity_fecha_inicial y activity_fecha_final deben definirse juntas.")
+        if start_date and end_date:
+            range_error = core._validate_date_range(start_date, end_date, "Actividad")
+            if range_error:
+                raise ValueError(range_error)
+            parent_range_error = core._validate_child_date_range(
+                start_date,
+                end_date,
+                objective.fecha_inicial,
+                objective.fecha_final,
+                "Actividad",
+                "Objetivo",
+            )
+            if parent_range_error:
+                raise ValueError(parent_range_error)
+        recurrente = _parse_import_bool(_csv_value(row, "activity_recurrente"))
+        periodicidad = _csv_value(row, "activity_periodicidad").lower()
+        cada_xx_dias = _parse_import_int(_csv_value(row, "activity_cada_xx_dias"), 0)
+        if recurrente:
+            if periodicidad not in ejes.VALID_ACTIVITY_PERIODICITIES:
+                raise ValueError("activity_periodicidad no es válida para actividad recurrente.")
+            if periodicidad == "cada_xx_dias" and cada_xx_dias <= 0:
+                raise ValueError("activity_cada_xx_dias debe ser mayor a 0 para periodicidad cada_xx_dias.")
+        else:
+            periodicidad = ""
+            cada_xx_dias = 0
+
+        if activity:
+            if activity_name:
+                activity.nombre = activity_name
+            activity.responsable = _csv_value(row, "activity_responsable")
+            activity.entregable = _csv_value(row, "activity_entregable")
+            activity.fecha_inicial = start_date
+            activity.fecha_final = end_date
+            activity.descripcion = _csv_value(row, "activity_descripcion")
+            activity.recurrente = recurrente
+            activity.periodicidad = periodicidad
+            activity.cada_xx_dias = cada_xx_dias if periodicidad == "cada_xx_dias" else None
+            self.summary["updated"] += 1
+            return
+        if not activity_name:
+            raise ValueError("activity_nombre es obligatorio al crear una actividad.")
+        activity = self.Activity(
+            objective_id=objective_id,
+            codigo=activity_code,
+            nombre=activity_name,
+            responsable=_csv_value(row, "activity_responsable"),
+            entregable=_csv_value(row, "activity_entregable"),
+            fecha_inicial=start_date,
+            fecha_final=end_date,
+            descripcion=_csv_value(row, "activity_descripcion"),
+            recurrente=recurrente,
+            periodicidad=periodicidad,
+            cada_xx_dias=cada_xx_dias if periodicidad == "cada_xx_dias" else None,
+            entrega_estado="ninguna",
+            created_by="import_csv",
+        )
+        self._persist(activity)
+        self.activity_by_key[activity_key] = activity
+        self.activity_by_code_list.setdefault(activity_code, []).append(activity)
+        self.summary["created"] += 1
+
+    def _apply_subactivity(self, row: Dict[str, Any]) -> None:
+        core = _core()
+        ejes = _ejes()
+        objective_code = _csv_value(row, "objective_codigo").lower()
+        activity_code = _csv_value(row, "activity_codigo").lower()
+        sub_code = _csv_value(row, "subactivity_codigo").lower()
+        if not activity_code or not sub_code:
+            raise ValueError("activity_codigo y subactivity_codigo son obligatorios para subactividad.")
+
+        activity = None
+        if objective_code:
+            objective = self.objective_by_code.get(objective_code)
+            if objective:
+                activity = self.activity_by_key.get(f"{self._id_of(objective)}::{activity_code}")
+        if activity is None:
+            candidates = self.activity_by_code_list.get(activity_code, [])
+            if len(candidates) == 1:
+                activity = candidates[0]
+        if activity is None:
+            raise ValueError("No se encontró la actividad destino para esta subactividad.")
+
+        sub_map = self.sub_by_activity_code.setdefault(activity_code, {})
+        sub = sub_map.get(sub_code)
+        parent_code = _csv_value(row, "subactivity_parent_codigo").lower()
+        parent_sub = sub_map.get(parent_code) if parent_code else None
+        level_raw = _parse_import_int(_csv_value(row, "subactivity_nivel"), 0)
+        level = level_raw if level_raw > 0 else ((int(parent_sub.nivel) + 1) if parent_sub else 1)
+        if level > ejes.MAX_SUBTASK_DEPTH:
+            raise ValueError(f"subactivity_nivel no puede ser mayor a {ejes.MAX_SUBTASK_DEPTH}.")
+        sub_name = _csv_value(row, "subactivity_nombre")
+        if not sub and not sub_name:
+            raise ValueError("subactivity_nombre es obligatorio al crear una subactividad.")
+        start_date = _parse_import_date(_csv_value(row, "subactivity_fecha_inicial"))
+        end_date = _parse_import_date(_csv_value(row, "subactivity_fecha_final"))
+        if (start_date and not end_date) or (end_date and not start_date):
+            raise ValueError("subactivity_fecha_inicial y subactivity_fecha_final deben definirse juntas.")
+        if start_date and end_date:
+            range_error = core._validate_date_range(start_date, end_date, "Subactividad")
+            if range_error:
+                raise ValueError(range_error)
+            parent_range_error = core._validate_child_date_range(
+                start_date,
+                end_date,
+                activity.fecha_inicial,
+                activity.fecha_final,
+                "Subactividad",
+                "Actividad",
+            )
+            if parent_range_error:
+                raise ValueError(parent_range_error)
+
+        parent_id = self._id_of(parent_sub) if parent_sub else None
+        if sub:
+            if sub_name:
+                sub.nombre = sub_name
+            sub.parent_subactivity_id = parent_id
+            sub.nivel = level
+            sub.responsable = _csv_value(row, "subactivity_responsable")
+            sub.entregable = _csv_value(row, "subactivity_entregable")
+            sub.fecha_inicial = start_date
+            sub.fecha_final = end_date
+            sub.descripcion = _csv_value(row, "subactivity_descripcion")
+            self.summary["updated"] += 1
+            return
+        sub = self.Subactivity(
+            activity_id=self._id_of(activity),
+            parent_subactivity_id=parent_id,
+            nivel=level,
+            codigo=sub_code,
+            nombre=sub_name,
+            responsable=_csv_value(row, "subactivity_responsable"),
+            entregable=_csv_value(row, "subactivity_entregable"),
+            fecha_inicial=start_date,
+            fecha_final=end_date,
+            descripcion=_csv_value(row, "subactivity_descripcion"),
+            assigned_by="import_csv",
+        )
+        self._persist(sub)
+        sub_map[sub_code] = sub
+        self.summary["created"] += 1
+
+    def flush_chunk(self) -> None:
+        """Envía el lote a la base sin confirmar; el commit único ocurre en ``finish``."""
+        if self.dry_run:
+            return
+        self.db.flush()
+
+    def finish(self) -> None:
+        """Recalcula derivados y avisa a los clientes; en ``dry_run`` descarta todo."""
+        if self.dry_run:
+            self.db.rollback()
+            return
+        rebuild_subactivity_closure(self.db)
+        prune_dependencies(self.db)
+        rebuild_progress_rollups(self.db)
+        rebuild_occurrences(self.db)
+        sync_deadline_notifications(self.db)
+        record_poa_reset(self.db)
+        self.db.commit()
+        schedule_plan_prerender()
+
+
+# -- archivo ----------------------------------------------------------------
+
+
+async def spool_upload(upload) -> Dict[str, Any]:
+    """Copia un ``UploadFile`` a un temporal por bloques y detecta su codificación.
+
+    Devuelve ``path``, ``encoding``, ``size_bytes`` y ``rows_estimated``
+    (líneas menos el encabezado; aproximado si hay campos multilínea).
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    encoding = "utf-8-sig"
+    size = 0
+    lines = 0
+    last_byte = b""
+    handle = tempfile.NamedTemporaryFile(prefix="sipet-poa-import-", suffix=".csv", delete=False)
+    try:
+        while True:
+            block = await upload.read(IMPORT_READ_BLOCK)
+            if not block:
+                break
+            handle.write(block)
+            size += len(block)
+            lines += block.count(b"\n")
+            last_byte = block[-1:]
+            if encoding == "utf-8-sig":
+                try:
+                    decoder.decode(block)
+                except UnicodeDecodeError:
+                    encoding = "latin-1"
+        if encoding == "utf-8-sig":
+            try:
+                decoder.decode(b"", final=True)
+            except UnicodeDecodeError:
+                encoding = "latin-1"
+    finally:
+        handle.close()
+    if size and last_byte != b"\n":
+        lines += 1
+    return {"path": handle.name, "encoding": encoding, "size_bytes": size, "rows_estimated": max(0, lines - 1)}
+
+
+def read_csv_headers(path: str, encoding: str) -> List[str]:
+    with open(path, "r", encoding=encoding, newline="") as handle:
+        return [str(item or "").strip() for item in (next(csv.reader(handle), None) or [])]
+
+
+def missing_csv_headers(headers: List[str]) -> List[str]:
+    return [header for header in IMPORT_REQUIRED_HEADERS if header not in headers]
+
+
+def _iter_chunks(path: str, encoding: str, size: int) -> Iterator[List[Tuple[int, Dict[str, Any]]]]:
+    with open(path, "r", encoding=encoding, newline="") as handle:
+        reader = csv.DictReader(handle)
+        yield from _batched(enumerate(reader, start=2), max(1, int(size)))
+
+
+def import_csv_file(db, path: str, encoding: str, dry_run: bool = False, on_progress=None) -> PoaCsvImporter:
+    """Importa el archivo con ``db``; ``on_progress(importer)`` se llama tras cada lote."""
+    _ejes()._ensure_poa_subactivity_recurrence_columns(db)
+    _ejes()._ensure_subactivity_closure_table(db)
+    _ejes()._ensure_occurrences_table(db)
+    _ejes()._ensure_dependencies_table(db)
+    importer = PoaCsvImporter(db, dry_run=dry_run)
+    for chunk in _iter_chunks(path, encoding, IMPORT_CHUNK_ROWS):
+        importer.process_chunk(chunk)
+        importer.flush_chunk()
+        if on_progress:
+            on_progress(importer)
+    importer.finish()
+    return importer
+
+
+# -- trabajos -----------------------------------------------------------------
+
+
+def _prune_jobs(now: float) -> None:
+    expired = [
+        job_id
+        for job_id, job in _JOBS.items()
+        if job["status"] in {JOB_DONE, JOB_FAILED} and now - float(job.get("_finished_ts") or now) > IMPORT_JOB_RETENTION_SECONDS
+    ]
+    for job_id in expired:
+        _JOBS.pop(job_id, None)
+
+
+def create_import_job(spooled: Dict[str, Any], filename: str, dry_run: bool, owner: str = "") -> str:
+    now = time.time()
+    job_id = secrets.token_hex(16)
+    job = {
+        "id": job_id,
+        "status": JOB_PENDING,
+        "dry_run": bool(dry_run),
+        "filename": filename,
+        "owner": owner,
+        "size_bytes": int(spooled.get("size_bytes") or 0),
+        "rows_estimated": int(spooled.get("rows_estimated") or 0),
+        "rows_processed": 0,
+        "summary": {"created": 0, "updated": 0, "skipped": 0, "errors": []},
+        "errors_omitted": 0,
+        "error": "",
+        "created_at": datetime.utcnow().isoformat(),
+        "started_at": None,
+        "finished_at": None,
+        "_path": spooled.get("path"),
+        "_encoding": spooled.get("encoding") or "utf-8-sig",
+    }
+    with _JOBS_LOCK:
+        _prune_jobs(now)
+        _JOBS[job_id] = job
+    return job_id
+
+
+def _update_job(job_id: str, **fields: Any) -> None:
+    with _JOBS_LOCK:
+        job = _JOBS.get(job_id)
+        if job is not None:
+            job.update(fields)
+
+
+def import_job_status(job_id: str) -> Optional[Dict[str, Any]]:
+    """Copia pública del estado del trabajo (sin campos internos)."""
+    with _JOBS_LOCK:
+        job = _JOBS.get(str(job_id or ""))
+        if job is None:
+            return None
+        payload = {key: value for key, value in job.items() if not key.startswith("_")}
+        payload["summary"] = {**job["summary"], "errors": list(job["summary"]["errors"])}
+    estimated = payload["rows_estimated"]
+    if payload["status"] == JOB_DONE:
+        payload["progress"] = 100
+    elif estimated > 0:
+        payload["progress"] = min(99, int(payload["rows_processed"] * 100 / estimated))
+    else:
+        payload["progress"] = 0
+    return payload
+
+
+def run_import_job(job_id: str) -> None:
+    """Ejecuta el trabajo con su propia sesión; pensado para ``asyncio.to_thread``."""
+    with _JOBS_LOCK:
+        job = _JOBS.get(job_id)
+        if job is None or job["status"] != JOB_PENDING:
+            return
+        job["status"] = JOB_RUNNING
+        job["started_at"] = datetime.utcnow().isoformat()
+        path, encoding, dry_run = job["_path"], job["_encoding"], job["dry_run"]
+
+    def _progress(importer: PoaCsvImporter) -> None:
+        _update_job(
+            job_id,
+            rows_processed=importer.rows_processed,
+            summary={**importer.summary, "errors": list(importer.summary["errors"])},
+            errors_omitted=importer.errors_omitted,
+        )
+
+    db = _core().SessionLocal()
+    status, error = JOB_DONE, ""
+    try:
+        importer = import_csv_file(db, path, encoding, dry_run=dry_run, on_progress=_progress)
+        _progress(importer)
+    except (sqlite3.OperationalError, SQLAlchemyError):
+        db.rollback()
+        status, error = JOB_FAILED, DB_WRITE_ERROR
+    except Exception as exc:
+        db.rollback()
+        status, error = JOB_FAILED, f"No se pudo importar el archivo: {exc}"
+    finally:
+        db.close()
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+    _update_job(
+        job_id,
+        status=status,
+        error=error,
+        finished_at=datetime.utcnow().isoformat(),
+        _finished_ts=time.time(),
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = list(sys.argv[1:] if argv is None else argv)
+    dry_run = "--dry-run" in args
+    paths = [item for item in args if not item.startswith("--")]
+    if len(paths) != 1:
+        print("Uso: python -m fastapi_modulo.modulos.planificacion.poa_import archivo.csv [--dry-run]")
+        return 2
+    path = paths[0]
+    encoding = "utf-8-sig"
+    try:
+        with open(path, "r", encoding=encoding, newline="") as handle:
+            for _ in handle:
+                pass
+    except UnicodeDecodeError:
+        encoding = "latin-1"
+    missing = missing_csv_headers(read_csv_headers(path, encoding))
+    if missing:
+        print(f"Faltan columnas obligatorias: {', '.join(missing)}")
+        return 1
+    db = _core().SessionLocal()
+    try:
+        importer = import_csv_file(db, path, encoding, dry_run=dry_run)
+    except (sqlite3.OperationalError, SQLAlchemyError) as exc:
+        db.rollback()
+        print(f"{DB_WRITE_ERROR} {exc}")
+        return 1
+    finally:
+        db.close()
+    print(json.dumps({"dry_run": dry_run, "summary": importer.summary, "errors_omitted": importer.errors_omitted}, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
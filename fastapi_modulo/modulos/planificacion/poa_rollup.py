@@ -0,0 +1,409 @@
+"""Avance precalculado del POA por actividad, objetivo y eje.
+
+Las filas de ``poa_progress_rollup`` se recalculan dentro de la misma
+transacción que la escritura que las afecta, de modo que las lecturas sólo
+consultan porcentajes ya calculados. Una subactividad cuenta como terminada a
+partir de su ``fecha_final``; cada fila guarda ``next_change_on`` para que el
+cambio de día recalcule únicamente las actividades vencidas.
+
+Uso desde línea de comandos::
+
+    python -m fastapi_modulo.modulos.planificacion.poa_rollup rebuild
+    python -m fastapi_modulo.modulos.planificacion.poa_rollup rollover
+"""
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from fastapi_modulo.modulos.planificacion.poa_changes import prune_change_log
+
+SCOPE_ACTIVITY = "activity"
+SCOPE_OBJECTIVE = "objective"
+SCOPE_AXIS = "axis"
+
+_ROLLOVER_LOCK = threading.Lock()
+_ROLLOVER_DAY: Optional[date] = None
+
+
+def _core():
+    from fastapi_modulo import main as core
+
+    return core
+
+
+def _today() -> date:
+    return datetime.utcnow().date()
+
+
+def _average(values: List[int]) -> int:
+    return int(round(sum(values) / len(values))) if values else 0
+
+
+def _clean_ids(values: Iterable[Any]) -> Set[int]:
+    return {int(value) for value in (values or []) if value}
+
+
+def compute_activity_progress(
+    activity: Any,
+    sub_end_dates: List[Optional[date]],
+    today: date,
+) -> Tuple[int, int, int, Optional[date]]:
+    """Devuelve (avance, total, terminadas, próximo cambio) de una actividad."""
+    if sub_end_dates:
+        done = sum(1 for end in sub_end_dates if end and today >= end)
+        upcoming = [end for end in sub_end_dates if end and end > today]
+        return (
+            int(round((done / len(sub_end_dates)) * 100)),
+            len(sub_end_dates),
+            done,
+            min(upcoming) if upcoming else None,
+        )
+    finished = _core()._activity_status(activity, today) == "Terminada"
+    return (100 if finished else 0), 0, 0, None
+
+
+def _rows_by_entity(db, scope: str, entity_ids: Set[int]) -> Dict[int, Any]:
+    if not entity_ids:
+        return {}
+    Rollup = _core().POAProgressRollup
+    rows = (
+        db.query(Rollup)
+        .filter(Rollup.scope == scope, Rollup.entity_id.in_(sorted(entity_ids)))
+        .all()
+    )
+    return {int(row.entity_id): row for row in rows}
+
+
+def _store_rows(db, scope: str, entity_ids: Set[int], values: Dict[int, Dict[str, Any]]) -> Set[int]:
+    """Guarda ``values`` y elimina filas de entidades que ya no existen.
+
+    Devuelve los ``parent_id`` previos para propagar movimientos y bajas.
+    """
+    Rollup = _core().POAProgressRollup
+    existing = _rows_by_entity(db, scope, entity_ids)
+    previous_parents = {int(row.parent_id) for row in existing.values() if row.parent_id}
+    for entity_id, row in existing.items():
+        if entity_id not in values:
+            db.delete(row)
+    for entity_id, payload in values.items():
+        row = existing.get(entity_id) or Rollup(scope=scope, entity_id=entity_id)
+        for key, value in payload.items():
+            setattr(row, key, value)
+        db.add(row)
+    db.flush()
+    return previous_parents
+
+
+def _refresh_activity_rows(db, activity_ids: Set[int], today: date) -> Set[int]:
+    if not activity_ids:
+        return set()
+    core = _core()
+    ids = sorted(activity_ids)
+    activities = db.query(core.POAActivity).filter(core.POAActivity.id.in_(ids)).all()
+    end_dates: Dict[int, List[Optional[date]]] = {}
+    for activity_id, fecha_final in (
+        db.query(core.POASubactivity.activity_id, core.POASubactivity.fecha_final)
+        .filter(core.POASubactivity.activity_id.in_(ids))
+        .all()
+    ):
+        end_dates.setdefault(int(activity_id), []).append(fecha_final)
+    values: Dict[int, Dict[str, Any]] = {}
+    affected: Set[int] = set()
+    for activity in activities:
+        avance, total, done, next_change = compute_activity_progress(activity, end_dates.get(int(activity.id), []), today)
+        values[int(activity.id)] = {
+            "parent_id": int(activity.objective_id),
+            "avance": avance,
+            "total_items": total,
+            "done_items": done,
+            "next_change_on": next_change,
+        }
+        affected.add(int(activity.objective_id))
+    affected |= _store_rows(db, SCOPE_ACTIVITY, activity_ids, values)
+    return affected
+
+
+def _summarize_children(children: List[Any], parent_id: Optional[int]) -> Dict[str, Any]:
+    progress = [int(row.avance or 0) for row in children]
+    upcoming = [row.next_change_on for row in children if row.next_change_on]
+    return {
+        "parent_id": parent_id,
+        "avance": _average(progress),
+        "total_items": len(children),
+        "done_items": sum(1 for value in progress if value >= 100),
+        "next_change_on": min(upcoming) if upcoming else None,
+    }
+
+
+def _refresh_objective_rows(db, objective_ids: Set[int], today: date) -> Set[int]:
+    if not objective_ids:
+        return set()
+    core = _core()
+    ids = sorted(objective_ids)
+    objectives = (
+        db.query(core.StrategicObjectiveConfig.id, core.StrategicObjectiveConfig.eje_id)
+        .filter(core.StrategicObjectiveConfig.id.in_(ids))
+        .all()
+    )
+    activity_ids_by_objective: Dict[int, List[int]] = {}
+    for activity_id, objective_id in (
+        db.query(core.POAActivity.id, core.POAActivity.objective_id)
+        .filter(core.POAActivity.objective_id.in_(ids))
+        .all()
+    ):
+        activity_ids_by_objective.setdefault(int(objective_id), []).append(int(activity_id))
+    child_ids = {item for values in activity_ids_by_objective.values() for item in values}
+    rows = _rows_by_entity(db, SCOPE_ACTIVITY, child_ids)
+    missing = child_ids - set(rows)
+    if missing:
+        _refresh_activity_rows(db, missing, today)
+        rows = _rows_by_entity(db, SCOPE_ACTIVITY, child_ids)
+    values: Dict[int, Dict[str, Any]] = {}
+    affected: Set[int] = set()
+    for objective_id, axis_id in objectives:
+        children = [rows[item] for item in activity_ids_by_objective.get(int(objective_id), []) if item in rows]
+        values[int(objective_id)] = _summarize_children(children, int(axis_id))
+        affected.add(int(axis_id))
+    affected |= _store_rows(db, SCOPE_OBJECTIVE, objective_ids, values)
+    return affected
+
+
+def _refresh_axis_rows(db, axis_ids: Set[int], today: date) -> None:
+    if not axis_ids:
+        return
+    core = _core()
+    ids = sorted(axis_ids)
+    existing_axes = {
+        int(axis_id)
+        for (axis_id,) in db.query(core.StrategicAxisConfig.id).filter(core.StrategicAxisConfig.id.in_(ids)).all()
+    }
+    objective_ids_by_axis: Dict[int, List[int]] = {}
+    for objective_id, axis_id in (
+        db.query(core.StrategicObjectiveConfig.id, core.StrategicObjectiveConfig.eje_id)
+        .filter(core.StrategicObjectiveConfig.eje_id.in_(ids))
+        .all()
+    ):
+        objective_ids_by_axis.setdefault(int(axis_id), []).append(int(objective_id))
+    child_ids = {item for values in objective_ids_by_axis.values() for item in values}
+    rows = _rows_by_entity(db, SCOPE_OBJECTIVE, child_ids)
+    missing = child_ids - set(rows)
+    if missing:
+        _refresh_objective_rows(db, missing, today)
+        rows = _rows_by_entity(db, SCOPE_OBJECTIVE, child_ids)
+    values = {
+        axis_id: _summarize_children(
+            [rows[item] for item in objective_ids_by_axis.get(axis_id, []) if item in rows],
+            None,
+        )
+        for axis_id in existing_axes
+    }
+    _store_rows(db, SCOPE_AXIS, axis_ids, values)
+
+
+def refresh_progress_rollups(
+    db,
+    activity_ids: Iterable[Any] = (),
+    objective_ids: Iterable[Any] = (),
+    axis_ids: Iterable[Any] = (),
+    today: Optional[date] = None,
+) -> None:
+    """Recalcula las filas indicadas y sus ancestros sin hacer commit.
+
+    Se llama después de aplicar la escritura en la sesión; las entidades que
+    ya no existen se eliminan del rollup y se recalcula su padre anterior.
+    """
+    current = today or _today()
+    db.flush()
+    objectives = _clean_ids(objective_ids)
+    axes = _clean_ids(axis_ids)
+    objectives |= _refresh_activity_rows(db, _clean_ids(activity_ids), current)
+    axes |= _refresh_objective_rows(db, objectives, current)
+    _refresh_axis_rows(db, axes, current)
+
+
+def rebuild_progress_rollups(db, today: Optional[date] = None) -> int:
+    """Reconstruye todo el rollup desde cero sin hacer commit."""
+    core = _core()
+    Rollup = core.POAProgressRollup
+    current = today or _today()
+    db.query(Rollup).delete(synchronize_session=False)
+
+    end_dates: Dict[int, List[Optional[date]]] = {}
+    for activity_id, fecha_final in db.query(core.POASubactivity.activity_id, core.POASubactivity.fecha_final).all():
+        end_dates.setdefault(int(activity_id), []).append(fecha_final)
+
+    rows: List[Any] = []
+    children_by_objective: Dict[int, List[Any]] = {}
+    for activity in db.query(core.POAActivity).all():
+        avance, total, done, next_change = compute_activity_progress(activity, end_dates.get(int(activity.id), []), current)
+        row = Rollup(
+            scope=SCOPE_ACTIVITY,
+            entity_id=int(activity.id),
+            parent_id=int(activity.objective_id),
+            avance=avance,
+            total_items=total,
+            done_items=done,
+            next_change_on=next_change,
+        )
+        rows.append(row)
+        children_by_objective.setdefault(int(activity.objective_id), []).append(row)
+
+    children_by_axis: Dict[int, List[Any]] = {}
+    for objective_id, axis_id in db.query(core.StrategicObjectiveConfig.id, core.StrategicObjectiveConfig.eje_id).all():
+        row = Rollup(
+            scope=SCOPE_OBJECTIVE,
+            entity_id=int(objective_id),
+            **_summarize_children(children_by_objective.get(int(objective_id), []), int(axis_id)),
+        )
+        rows.append(row)
+        children_by_axis.setdefault(int(axis_id), []).append(row)
+
+    for (axis_id,) in db.query(core.StrategicAxisConfig.id).all():
+        rows.append(
+            Rollup(
+                scope=SCOPE_AXIS,
+                entity_id=int(axis_id),
+                **_summarize_children(children_by_axis.get(int(axis_id), []), None),
+            )
+        )
+    db.add_all(rows)
+    db.flush()
+    return len(rows)
+
+
+def roll_over_progress_rollups(db, today: Optional[date] = None) -> int:
+    """Recalcula las actividades cuyo avance cambia por fecha hasta ``today``."""
+    Rollup = _core().POAProgressRollup
+    current = today or _today()
+    due = [
+        int(entity_id)
+        for (entity_id,) in db.query(Rollup.entity_id)
+        .filter(
+            Rollup.scope == SCOPE_ACTIVITY,
+            Rollup.next_change_on.isnot(None),
+            Rollup.next_change_on <= current,
+        )
+        .all()
+    ]
+    if due:
+        refresh_progress_rollups(db, activity_ids=due, today=current)
+    return len(due)
+
+
+def ensure_progress_rollups_current(db) -> None:
+    """Aplica el cambio de día una vez por proceso; construye el rollup si está vacío."""
+    global _ROLLOVER_DAY
+    today = _today()
+    if _ROLLOVER_DAY == today:
+        return
+    with _ROLLOVER_LOCK:
+        if _ROLLOVER_DAY == today:
+            return
+        Rollup = _core().POAProgressRollup
+        try:
+            if db.query(Rollup.id).first() is None:
+                rebuild_progress_rollups(db, today)
+            else:
+                roll_over_progress_rollups(db, today)
+            db.commit()
+        except SQLAlchemyError:
+            db.rollback()
+            return
+        _ROLLOVER_DAY = today
+
+
+def progress_by_entity(db, scope: str, entity_ids: Iterable[Any]) -> Dict[int, int]:
+    """Avance precalculado por id; calcula y guarda las filas faltantes."""
+    ids = _clean_ids(entity_ids)
+    if not ids:
+        return {}
+    rows = _rows_by_entity(db, scope, ids)
+    missing = ids - set(rows)
+    if missing:
+        target = {
+            SCOPE_ACTIVITY: "activity_ids",
+            SCOPE_OBJECTIVE: "objective_ids",
+            SCOPE_AXIS: "axis_ids",
+        }[scope]
+        try:
+            refresh_progress_rollups(db, **{target: missing})
+            db.commit()
+            rows = _rows_by_entity(db, scope, ids)
+        except SQLAlchemyError:
+            db.rollback()
+            rows = _rows_by_entity(db, scope, ids)
+    return {entity_id: int(row.avance or 0) for entity_id, row in rows.items()}
+
+
+def progress_rollup_maps(
+    db,
+    activity_ids: Iterable[Any] = (),
+    objective_ids: Iterable[Any] = (),
+    axis_ids: Iterable[Any] = (),
+) -> Dict[str, Dict[int, int]]:
+    ensure_progress_rollups_current(db)
+    return {
+        SCOPE_ACTIVITY: progress_by_entity(db, SCOPE_ACTIVITY, activity_ids),
+        SCOPE_OBJECTIVE: progress_by_entity(db, SCOPE_OBJECTIVE, objective_ids),
+        SCOPE_AXIS: progress_by_entity(db, SCOPE_AXIS, axis_ids),
+    }
+
+
+async def progress_rollover_loop() -> None:
+    """Tarea de fondo: aplica el cambio de día poco después de medianoche UTC y poda ``poa_change_log``."""
+    while True:
+        now = datetime.utcnow()
+        next_run = datetime(now.year, now.month, now.day) + timedelta(days=1, minutes=1)
+        await asyncio.sleep(max(60.0, (next_run - now).total_seconds()))
+        try:
+            await asyncio.to_thread(_run_rollover_job)
+        except Exception as exc:
+            print(f"[poa-rollup] Error en cambio de día: {exc}")
+
+
+def _run_rollover_job() -> int:
+    global _ROLLOVER_DAY
+    core = _core()
+    db = core.SessionLocal()
+    try:
+        changed = roll_over_progress_rollups(db)
+        db.commit()
+        _ROLLOVER_DAY = _today()
+        prune_change_log(db)
+        db.commit()
+        return changed
+    except SQLAlchemyError:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = list(sys.argv[1:] if argv is None else argv)
+    command = (args[0] if args else "").strip().lower()
+    if command not in {"rebuild", "rollover"}:
+        print("Uso: python -m fastapi_modulo.modulos.planificacion.poa_rollup [rebuild|rollover]")
+        return 2
+    if command == "rollover":
+        print(f"[poa-rollup] Actividades recalculadas: {_run_rollover_job()}")
+        return 0
+    core = _core()
+    db = core.SessionLocal()
+    try:
+        total = rebuild_progress_rollups(db)
+        db.commit()
+    finally:
+        db.close()
+    print(f"[poa-rollup] Filas reconstruidas: {total}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
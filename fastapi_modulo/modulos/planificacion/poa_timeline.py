@@ -0,0 +1,294 @@
+"""Línea de tiempo (Gantt) del POA calculada en el servidor.
+
+Sólo se devuelven las barras que se cruzan con la ventana visible
+(``fecha_inicial <= hasta`` y ``fecha_final >= desde``), resueltas sobre el
+índice ``(fecha_inicial, fecha_final)`` de actividades y subactividades. El
+nivel de detalle depende del zoom:
+
+- ``dia`` / ``semana``: actividades y sus subactividades como barras propias.
+- ``mes``: actividades con el resumen de sus subactividades (conteo y rango).
+- ``trimestre`` / ``anio``: una barra resumen por objetivo.
+
+Cada respuesta se corta en ``POA_TIMELINE_MAX_BARS`` barras, así el tamaño no
+crece con el total de actividades del plan.
+
+Uso desde línea de comandos::
+
+    python -m fastapi_modulo.modulos.planificacion.poa_timeline ventana 2026-01-01 2026-03-31 semana
+"""
+from __future__ import annotations
+
+import json
+import os
+import sys
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, func, inspect, text
+
+from fastapi_modulo.modulos.planificacion.poa_dashboard import activity_status_case
+from fastapi_modulo.modulos.planificacion.poa_rollup import SCOPE_ACTIVITY, SCOPE_OBJECTIVE
+
+LEVEL_SUBACTIVITY = "subactividad"
+LEVEL_ACTIVITY = "actividad"
+LEVEL_OBJECTIVE = "objetivo"
+
+ZOOM_LEVELS = {
+    "dia": LEVEL_SUBACTIVITY,
+    "semana": LEVEL_SUBACTIVITY,
+    "mes": LEVEL_ACTIVITY,
+    "trimestre": LEVEL_OBJECTIVE,
+    "anio": LEVEL_OBJECTIVE,
+}
+DEFAULT_ZOOM = "mes"
+MAX_RANGE_DAYS = 3660
+MAX_BARS = int((os.environ.get("POA_TIMELINE_MAX_BARS") or "1000").strip() or "1000")
+
+_DATE_INDEX_TABLES = ("poa_activities", "poa_subactivities")
+
+
+def _core():
+    from fastapi_modulo import main as core
+
+    return core
+
+
+def create_timeline_indexes(conn) -> None:
+    """Paso de esquema: índice por rango de fechas para las consultas de ventana."""
+    inspector = inspect(conn)
+    for table_name in _DATE_INDEX_TABLES:
+        if inspector.has_table(table_name):
+            conn.execute(
+                text(
+                    f"CREATE INDEX IF NOT EXISTS ix_{table_name}_fechas "
+                    f"ON {table_name} (fecha_inicial, fecha_final)"
+                )
+            )
+
+
+def _overlaps(model, start: date, end: date):
+    return and_(model.fecha_inicial <= end, model.fecha_final >= start)
+
+
+def _iso(value: Optional[date]) -> str:
+    return value.isoformat() if value else ""
+
+
+def _objective_bars(db, objectives: Dict[int, Any], start: date, end: date, limit: int) -> List[Dict[str, Any]]:
+    core = _core()
+    Activity = core.POAActivity
+    Rollup = core.POAProgressRollup
+    if not objectives:
+        return []
+    summary = {
+        int(row[0]): row
+        for row in db.query(
+            Activity.objective_id,
+            func.count(Activity.id),
+            func.min(Activity.fecha_inicial),
+            func.max(Activity.fecha_final),
+        )
+        .filter(Activity.objective_id.in_(sorted(objectives)), _overlaps(Activity, start, end))
+        .group_by(Activity.objective_id)
+        .all()
+    }
+    progress = {
+        int(row[0]): int(row[1] or 0)
+        for row in db.query(Rollup.entity_id, Rollup.avance)
+        .filter(Rollup.scope == SCOPE_OBJECTIVE, Rollup.entity_id.in_(sorted(objectives)))
+        .all()
+    }
+    bars: List[Dict[str, Any]] = []
+    for objective_id, objective in objectives.items():
+        row = summary.get(objective_id)
+        bar_start = objective.fecha_inicial or (row[2] if row else None)
+        bar_end = objective.fecha_final or (row[3] if row else None)
+        if not bar_start or not bar_end or bar_start > end or bar_end < start:
+            continue
+        bars.append(
+            {
+                "tipo": LEVEL_OBJECTIVE,
+                "id": objective_id,
+                "objective_id": objective_id,
+                "nombre": objective.nombre or "",
+                "inicio": _iso(bar_start),
+                "fin": _iso(bar_end),
+                "avance": progress.get(objective_id, 0),
+                "actividades": int(row[1]) if row else 0,
+            }
+        )
+    bars.sort(key=lambda bar: (bar["inicio"], bar["id"]))
+    return bars[: limit + 1]
+
+
+def _activity_bars(db, objective_ids: List[int], start: date, end: date, today: date, limit: int) -> List[Dict[str, Any]]:
+    core = _core()
+    Activity = core.POAActivity
+    Rollup = core.POAProgressRollup
+    if not objective_ids:
+        return []
+    rows = (
+        db.query(
+            Activity.id,
+            Activity.objective_id,
+            Activity.nombre,
+            Activity.codigo,
+            Activity.responsable,
+            Activity.fecha_inicial,
+            Activity.fecha_final,
+            activity_status_case(today).label("status"),
+            func.coalesce(Rollup.avance, 0).label("avance"),
+        )
+        .outerjoin(Rollup, and_(Rollup.scope == SCOPE_ACTIVITY, Rollup.entity_id == Activity.id))
+        .filter(Activity.objective_id.in_(objective_ids), _overlaps(Activity, start, end))
+        .order_by(Activity.fecha_inicial.asc(), Activity.id.asc())
+        .limit(limit + 1)
+        .all()
+    )
+    return [
+        {
+            "tipo": LEVEL_ACTIVITY,
+            "id": int(row.id),
+            "objective_id": int(row.objective_id),
+            "nombre": row.nombre or "",
+            "codigo": row.codigo or "",
+            "responsable": row.responsable or "",
+            "inicio": _iso(row.fecha_inicial),
+            "fin": _iso(row.fecha_final),
+            "status": row.status,
+            "avance": int(row.avance or 0),
+        }
+        for row in rows
+    ]
+
+
+def _attach_subactivity_summary(db, bars: List[Dict[str, Any]]) -> None:
+    Subactivity = _core().POASubactivity
+    ids = [bar["id"] for bar in bars]
+    if not ids:
+        return
+    summary = {
+        int(row[0]): row
+        for row in db.query(
+            Subactivity.activity_id,
+            func.count(Subactivity.id),
+            func.min(Subactivity.fecha_inicial),
+            func.max(Subactivity.fecha_final),
+        )
+        .filter(Subactivity.activity_id.in_(ids))
+        .group_by(Subactivity.activity_id)
+        .all()
+    }
+    for bar in bars:
+        row = summary.get(bar["id"])
+        bar["subactividades"] = {
+            "total": int(row[1]) if row else 0,
+            "inicio": _iso(row[2]) if row else "",
+            "fin": _iso(row[3]) if row else "",
+        }
+
+
+def _subactivity_bars(db, activity_ids: List[int], start: date, end: date, today: date, limit: int) -> List[Dict[str, Any]]:
+    Subactivity = _core().POASubactivity
+    if not activity_ids or limit <= 0:
+        return []
+    rows = (
+        db.query(Subactivity)
+        .filter(Subactivity.activity_id.in_(activity_ids), _overlaps(Subactivity, start, end))
+        .order_by(Subactivity.fecha_inicial.asc(), Subactivity.id.asc())
+        .limit(limit + 1)
+        .all()
+    )
+    return [
+        {
+            "tipo": LEVEL_SUBACTIVITY,
+            "id": int(row.id),
+            "activity_id": int(row.activity_id),
+            "parent_subactivity_id": row.parent_subactivity_id,
+            "nivel": int(row.nivel or 1),
+            "nombre": row.nombre or "",
+            "responsable": row.responsable or "",
+            "inicio": _iso(row.fecha_inicial),
+            "fin": _iso(row.fecha_final),
+            "avance": 100 if row.fecha_final and today >= row.fecha_final else 0,
+        }
+        for row in rows
+    ]
+
+
+def timeline_window(
+    db,
+    start: date,
+    end: date,
+    zoom: str = DEFAULT_ZOOM,
+    objective_ids: Iterable[Any] = (),
+    max_bars: int = MAX_BARS,
+    today: Optional[date] = None,
+) -> Dict[str, Any]:
+    """Barras de ``objective_ids`` que se cruzan con ``[start, end]`` al nivel de ``zoom``."""
+    Objective = _core().StrategicObjectiveConfig
+    current = today or datetime.utcnow().date()
+    level = ZOOM_LEVELS.get(zoom, ZOOM_LEVELS[DEFAULT_ZOOM])
+    limit = max(1, int(max_bars))
+    ids = sorted({int(value) for value in objective_ids if value})
+    objectives = (
+        {int(item.id): item for item in db.query(Objective).filter(Objective.id.in_(ids)).all()} if ids else {}
+    )
+
+    skipped = False
+    if level == LEVEL_OBJECTIVE:
+        bars = _objective_bars(db, objectives, start, end, limit)
+    else:
+        bars = _activity_bars(db, sorted(objectives), start, end, current, limit)
+        if level == LEVEL_ACTIVITY:
+            _attach_subactivity_summary(db, bars[:limit])
+        elif len(bars) < limit:
+            activity_ids = [bar["id"] for bar in bars]
+            bars += _subactivity_bars(db, activity_ids, start, end, current, limit - len(bars))
+        else:
+            # Las actividades ya llenaron el límite: las subactividades no se consultan.
+            skipped = True
+    truncated = skipped or len(bars) > limit
+    bars = bars[:limit]
+    used = {bar["objective_id"] for bar in bars if "objective_id" in bar}
+    groups = [
+        {
+            "id": objective_id,
+            "nombre": objectives[objective_id].nombre or "",
+            "codigo": objectives[objective_id].codigo or "",
+            "eje_id": objectives[objective_id].eje_id,
+        }
+        for objective_id in sorted(used)
+    ]
+    return {
+        "desde": start.isoformat(),
+        "hasta": end.isoformat(),
+        "zoom": zoom if zoom in ZOOM_LEVELS else DEFAULT_ZOOM,
+        "nivel": level,
+        "objetivos": groups,
+        "bars": bars,
+        "truncated": truncated,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = list(sys.argv[1:] if argv is None else argv)
+    if len(args) < 3 or args[0] != "ventana":
+        print("Uso: python -m fastapi_modulo.modulos.planificacion.poa_timeline ventana DESDE HASTA [ZOOM]")
+        return 2
+    core = _core()
+    Objective = core.StrategicObjectiveConfig
+    start = date.fromisoformat(args[1])
+    end = date.fromisoformat(args[2])
+    db = core.SessionLocal()
+    try:
+        objective_ids = [int(row[0]) for row in db.query(Objective.id).all()]
+        payload = timeline_window(db, start, end, args[3] if len(args) > 3 else DEFAULT_ZOOM, objective_ids)
+    finally:
+        db.close()
+    print(json.dumps(payload, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,234 @@
+"""Índice de cierre (closure table) del árbol de subactividades del POA.
+
+``poa_subactivity_closure`` guarda una fila ``(ancestor_id, descendant_id,
+depth)`` por cada par ancestro/descendiente, incluida la fila de cada nodo
+consigo mismo con ``depth = 0``. Así el subárbol de un nodo es una sola
+consulta por ``ancestor_id`` y la cadena de ancestros una sola consulta por
+``descendant_id``, ambas sobre índice y en SQL estándar (SQLite y Postgres).
+
+Los manejadores de escritura mantienen el índice en la misma transacción; no
+confirman. ``rebuild_subactivity_closure`` lo reconstruye completo con un CTE
+recursivo (esquema inicial e importaciones masivas).
+
+Uso desde línea de comandos::
+
+    python -m fastapi_modulo.modulos.planificacion.poa_tree rebuild
+"""
+from __future__ import annotations
+
+import sys
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import bindparam, column, inspect, table, text
+
+CLOSURE_TABLE = "poa_subactivity_closure"
+# Tope de seguridad del CTE ante datos con ciclos; muy superior a MAX_SUBTASK_DEPTH.
+_MAX_REBUILD_DEPTH = 32
+
+_CLOSURE = table(CLOSURE_TABLE, column("ancestor_id"), column("descendant_id"), column("depth"))
+
+
+def _core():
+    from fastapi_modulo import main as core
+
+    return core
+
+
+def _expanding(sql: str, *names: str):
+    statement = text(sql)
+    for name in names:
+        statement = statement.bindparams(bindparam(name, expanding=True))
+    return statement
+
+
+def create_subactivity_closure_table(conn) -> None:
+    """Paso de esquema: crea el índice de cierre y lo llena desde ``parent_subactivity_id``."""
+    conn.execute(
+        text(
+            f"""
+            CREATE TABLE IF NOT EXISTS {CLOSURE_TABLE} (
+              ancestor_id INTEGER NOT NULL,
+              descendant_id INTEGER NOT NULL,
+              depth INTEGER NOT NULL DEFAULT 0,
+              PRIMARY KEY (ancestor_id, descendant_id)
+            )
+            """
+        )
+    )
+    conn.execute(
+        text(
+            f"CREATE INDEX IF NOT EXISTS ix_{CLOSURE_TABLE}_descendant "
+            f"ON {CLOSURE_TABLE} (descendant_id, depth)"
+        )
+    )
+    if inspect(conn).has_table("poa_subactivities"):
+        rebuild_subactivity_closure(conn)
+
+
+def rebuild_subactivity_closure(bind) -> None:
+    """Reconstruye todo el índice; ``bind`` puede ser una sesión o una conexión."""
+    bind.execute(text(f"DELETE FROM {CLOSURE_TABLE}"))
+    bind.execute(
+        text(
+            f"""
+            INSERT INTO {CLOSURE_TABLE} (ancestor_id, descendant_id, depth)
+            WITH RECURSIVE tree (ancestor_id, descendant_id, depth) AS (
+              SELECT id, id, 0 FROM poa_subactivities
+              UNION ALL
+              SELECT tree.ancestor_id, child.id, tree.depth + 1
+              FROM tree
+              JOIN poa_subactivities child ON child.parent_subactivity_id = tree.descendant_id
+              WHERE tree.depth < {_MAX_REBUILD_DEPTH}
+            )
+            SELECT ancestor_id, descendant_id, MIN(depth) FROM tree GROUP BY ancestor_id, descendant_id
+            """
+        )
+    )
+
+
+def link_subactivity(db, subactivity_id: int, parent_id: Optional[int]) -> None:
+    """Registra un nodo nuevo bajo ``parent_id`` (o como raíz)."""
+    params = {"node": int(subactivity_id), "parent": int(parent_id or 0)}
+    db.execute(
+        text(
+            f"""
+            INSERT INTO {CLOSURE_TABLE} (ancestor_id, descendant_id, depth)
+            SELECT ancestor_id, :node, depth + 1 FROM {CLOSURE_TABLE} WHERE descendant_id = :parent
+            UNION ALL
+            SELECT :node, :node, 0
+            """
+        ),
+        params,
+    )
+
+
+def subtree_depths(db, root_id: int) -> Dict[int, int]:
+    """``{id: profundidad relativa}`` del subárbol, incluida la raíz con 0."""
+    rows = db.execute(
+        text(f"SELECT descendant_id, depth FROM {CLOSURE_TABLE} WHERE ancestor_id = :root"),
+        {"root": int(root_id)},
+    ).fetchall()
+    return {int(row[0]): int(row[1] or 0) for row in rows}
+
+
+def descendant_ids(db, root_id: int) -> List[int]:
+    """Ids del subárbol sin la raíz."""
+    return sorted(node_id for node_id, depth in subtree_depths(db, root_id).items() if depth > 0)
+
+
+def subtree_rows(db, root_id: int) -> List[Any]:
+    """Subactividades del subárbol (raíz incluida) ordenadas por nivel y orden de alta."""
+    Subactivity = _core().POASubactivity
+    return (
+        db.query(Subactivity)
+        .join(_CLOSURE, _CLOSURE.c.descendant_id == Subactivity.id)
+        .filter(_CLOSURE.c.ancestor_id == int(root_id))
+        .order_by(Subactivity.nivel.asc(), Subactivity.id.asc())
+        .all()
+    )
+
+
+def ancestor_rows(db, subactivity_id: int) -> List[Any]:
+    """Ancestros de la subactividad desde la raíz hasta el padre directo."""
+    Subactivity = _core().POASubactivity
+    return (
+        db.query(Subactivity)
+        .join(_CLOSURE, _CLOSURE.c.ancestor_id == Subactivity.id)
+        .filter(_CLOSURE.c.descendant_id == int(subactivity_id), _CLOSURE.c.depth > 0)
+        .order_by(_CLOSURE.c.depth.desc())
+        .all()
+    )
+
+
+def unlink_subtree(db, root_id: int) -> List[int]:
+    """Quita del índice el subárbol de ``root_id`` y devuelve sus ids (raíz incluida)."""
+    node_ids = sorted(subtree_depths(db, root_id))
+    if node_ids:
+        db.execute(
+            _expanding(f"DELETE FROM {CLOSURE_TABLE} WHERE descendant_id IN :ids", "ids"),
+            {"ids": node_ids},
+        )
+    return node_ids
+
+
+def unlink_activity_subactivities(db, activity_id: int) -> None:
+    db.execute(
+        text(
+            f"""
+            DELETE FROM {CLOSURE_TABLE}
+            WHERE descendant_id IN (SELECT id FROM poa_subactivities WHERE activity_id = :aid)
+            """
+        ),
+        {"aid": int(activity_id)},
+    )
+
+
+def move_subtree(db, subactivity, new_parent, max_depth: int) -> List[int]:
+    """Cuelga el subárbol de ``subactivity`` de ``new_parent`` (``None`` = raíz).
+
+    Ajusta ``parent_subactivity_id`` y ``nivel`` de todo el subárbol. Lanza
+    ``ValueError`` si el destino está dentro del propio subárbol o si se
+    excede ``max_depth``. Devuelve los ids movidos.
+    """
+    node_id = int(subactivity.id)
+    depths = subtree_depths(db, node_id)
+    node_ids = sorted(depths)
+    if new_parent is not None and int(new_parent.id) in depths:
+        raise ValueError("No se puede mover una subactividad dentro de su propio subárbol.")
+    new_level = (int(new_parent.nivel or 1) + 1) if new_parent is not None else 1
+    height = max(depths.values()) if depths else 0
+    if new_level + height > int(max_depth):
+        raise ValueError(f"Profundidad máxima permitida: {max_depth} niveles")
+
+    db.execute(
+        _expanding(
+            f"DELETE FROM {CLOSURE_TABLE} WHERE descendant_id IN :ids AND ancestor_id NOT IN :ids",
+            "ids",
+        ),
+        {"ids": node_ids},
+    )
+    if new_parent is not None:
+        db.execute(
+            text(
+                f"""
+                INSERT INTO {CLOSURE_TABLE} (ancestor_id, descendant_id, depth)
+                SELECT above.ancestor_id, below.descendant_id, above.depth + below.depth + 1
+                FROM {CLOSURE_TABLE} above
+                CROSS JOIN {CLOSURE_TABLE} below
+                WHERE above.descendant_id = :parent AND below.ancestor_id = :node
+                """
+            ),
+            {"parent": int(new_parent.id), "node": node_id},
+        )
+    delta = new_level - int(subactivity.nivel or 1)
+    descendants = [item for item in node_ids if item != node_id]
+    if delta and descendants:
+        db.execute(
+            _expanding("UPDATE poa_subactivities SET nivel = nivel + :delta WHERE id IN :ids", "ids"),
+            {"delta": delta, "ids": descendants},
+        )
+    subactivity.parent_subactivity_id = int(new_parent.id) if new_parent is not None else None
+    subactivity.nivel = new_level
+    db.add(subactivity)
+    return node_ids
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = list(sys.argv[1:] if argv is None else argv)
+    command = args[0] if args else ""
+    if command != "rebuild":
+        print("Uso: python -m fastapi_modulo.modulos.planificacion.poa_tree rebuild")
+        return 2
+    db = _core().SessionLocal()
+    try:
+        rebuild_subactivity_closure(db)
+        db.commit()
+        total = db.execute(text(f"SELECT COUNT(*) FROM {CLOSURE_TABLE}")).scalar() or 0
+        print(f"Índice de subactividades reconstruido: {int(total)} filas.")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,394 @@
+"""Outbox transaccional para las notificaciones de envíos de formularios.
+
+Al enviar un formulario, ``enqueue_submission_notifications`` agrega a la
+misma transacción del ``FormSubmission`` una fila por correo y por webhook en
+``form_notification_outbox``; el endpoint responde en cuanto hace commit.
+
+``dispatch_loop`` corre como tarea de fondo con un ``httpx.AsyncClient``
+compartido (pool de conexiones): reclama las filas vencidas, entrega cada una
+como tarea propia (hasta ``FORM_OUTBOX_CONCURRENCY`` a la vez y
+``FORM_OUTBOX_PER_TARGET`` por destino) y reprograma los fallos con backoff
+exponencial. Cada reclamo guarda ``claimed_at`` y ``claimed_by`` (host:pid);
+una fila ``enviando`` sólo vuelve a pendiente cuando su reclamo supera
+``FORM_OUTBOX_LEASE_SECONDS`` (el proceso que la tomó se cayó), nunca mientras
+otro despachador la está entregando. Tras ``FORM_OUTBOX_MAX_ATTEMPTS`` intentos, o ante una respuesta
+4xx no reintentable, la fila queda en estado ``fallido`` (dead-letter), visible
+en ``GET /api/admin/form-outbox?estado=fallido`` y reintentable a mano.
+
+Uso desde línea de comandos::
+
+    python -m fastapi_modulo.modulos.plantillas.form_outbox despachar
+    python -m fastapi_modulo.modulos.plantillas.form_outbox fallidos
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import func
+
+CHANNEL_EMAIL = "email"
+CHANNEL_WEBHOOK = "webhook"
+
+STATUS_PENDING = "pendiente"
+STATUS_SENDING = "enviando"
+STATUS_SENT = "enviado"
+STATUS_DEAD = "fallido"
+STATUSES = (STATUS_PENDING, STATUS_SENDING, STATUS_SENT, STATUS_DEAD)
+
+MAX_ATTEMPTS = int((os.environ.get("FORM_OUTBOX_MAX_ATTEMPTS") or "6").strip() or "6")
+BACKOFF_BASE_SECONDS = float((os.environ.get("FORM_OUTBOX_BACKOFF_SECONDS") or "30").strip() or "30")
+BACKOFF_MAX_SECONDS = 60 * 60
+CONCURRENCY = int((os.environ.get("FORM_OUTBOX_CONCURRENCY") or "10").strip() or "10")
+PER_TARGET_CONCURRENCY = int((os.environ.get("FORM_OUTBOX_PER_TARGET") or "2").strip() or "2")
+LEASE_SECONDS = float((os.environ.get("FORM_OUTBOX_LEASE_SECONDS") or "300").strip() or "300")
+POLL_SECONDS = 5.0
+CLAIM_BATCH = 50
+
+_RETRYABLE_STATUS = {408, 425, 429}
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+_WAKE: Dict[str, Any] = {"loop": None, "event": None}
+
+
+def _core():
+    from fastapi_modulo import main as core
+
+    return core
+
+
+def enqueue_submission_notifications(db, form_definition, submission) -> Dict[str, Any]:
+    """Agrega a la sesión las filas de outbox del envío (requiere ``submission.id``); no hace commit."""
+    core = _core()
+    Outbox = core.FormNotificationOutbox
+    now = datetime.utcnow()
+
+    def _entry(channel: str, target: str, payload: Dict[str, Any]):
+        return Outbox(
+            submission_id=submission.id,
+            form_id=form_definition.id,
+            channel=channel,
+            target=target[:500],
+            payload=payload,
+            status=STATUS_PENDING,
+            attempts=0,
+            max_attempts=MAX_ATTEMPTS,
+            next_attempt_at=now,
+        )
+
+    email_status: Dict[str, Any]
+    message = core.build_form_submission_email(form_definition, submission)
+    if "reason" in message:
+        email_status = {"queued": False, "reason": message["reason"]}
+    else:
+        db.add(_entry(CHANNEL_EMAIL, ", ".join([*message["to"], *message["cc"]]), message))
+        email_status = {"queued": True}
+
+    hooks = core.build_form_submission_webhook_requests(form_definition, submission)
+    for hook in hooks:
+        db.add(_entry(CHANNEL_WEBHOOK, f"{hook['method']} {hook['url']}", hook))
+    return {"email": email_status, "webhooks": {"queued": len(hooks)}}
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Espera antes del intento ``attempts + 1``: exponencial con ±10 % de variación."""
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** max(0, attempts - 1)))
+    return delay * random.uniform(0.9, 1.1)
+
+
+def entry_payload(entry) -> Dict[str, Any]:
+    return {
+        "id": entry.id,
+        "submission_id": entry.submission_id,
+        "form_id": entry.form_id,
+        "channel": entry.channel,
+        "target": entry.target or "",
+        "status": entry.status,
+        "attempts": int(entry.attempts or 0),
+        "max_attempts": int(entry.max_attempts or 0),
+        "next_attempt_at": entry.next_attempt_at.isoformat() if entry.next_attempt_at else "",
+        "last_error": entry.last_error or "",
+        "last_status_code": entry.last_status_code,
+        "created_at": entry.created_at.isoformat() if entry.created_at else "",
+        "sent_at": entry.sent_at.isoformat() if entry.sent_at else "",
+    }
+
+
+def retry_entry(entry) -> None:
+    """Devuelve una fila (normalmente ``fallido``) a la cola con los intentos en cero; no hace commit."""
+    entry.status = STATUS_PENDING
+    entry.attempts = 0
+    entry.next_attempt_at = datetime.utcnow()
+    entry.last_error = ""
+
+
+def recover_in_flight(lease_seconds: float = LEASE_SECONDS) -> int:
+    """Devuelve a pendiente las filas ``enviando`` cuyo reclamo venció (despachador caído)."""
+    core = _core()
+    Outbox = core.FormNotificationOutbox
+    expired = datetime.utcnow() - timedelta(seconds=lease_seconds)
+    db = core.SessionLocal()
+    try:
+        count = (
+            db.query(Outbox)
+            .filter(
+                Outbox.status == STATUS_SENDING,
+                (Outbox.claimed_at.is_(None)) | (Outbox.claimed_at < expired),
+            )
+            .update({Outbox.status: STATUS_PENDING, Outbox.claimed_by: ""}, synchronize_session=False)
+        )
+        db.commit()
+        return int(count or 0)
+    finally:
+        db.close()
+
+
+def release_claims() -> int:
+    """Al apagar: las filas reclamadas por este proceso vuelven a pendiente."""
+    core = _core()
+    Outbox = core.FormNotificationOutbox
+    db = core.SessionLocal()
+    try:
+        count = (
+            db.query(Outbox)
+            .filter(Outbox.status == STATUS_SENDING, Outbox.claimed_by == WORKER_ID)
+            .update({Outbox.status: STATUS_PENDING, Outbox.claimed_by: ""}, synchronize_session=False)
+        )
+        db.commit()
+        return int(count or 0)
+    finally:
+        db.close()
+
+
+def _claim_due(limit: int) -> List[Dict[str, Any]]:
+    core = _core()
+    Outbox = core.FormNotificationOutbox
+    now = datetime.utcnow()
+    db = core.SessionLocal()
+    try:
+        rows = (
+            db.query(Outbox.id, Outbox.channel, Outbox.payload, Outbox.attempts, Outbox.max_attempts)
+            .filter(Outbox.status == STATUS_PENDING, Outbox.next_attempt_at <= now)
+            .order_by(Outbox.next_attempt_at.asc(), Outbox.id.asc())
+            .limit(limit)
+            .all()
+        )
+        claimed: List[Dict[str, Any]] = []
+        for row in rows:
+            # La condición sobre el estado evita que dos despachadores tomen la misma fila.
+            updated = (
+                db.query(Outbox)
+                .filter(Outbox.id == row.id, Outbox.status == STATUS_PENDING)
+                .update(
+                    {Outbox.status: STATUS_SENDING, Outbox.claimed_at: now, Outbox.claimed_by: WORKER_ID},
+                    synchronize_session=False,
+                )
+            )
+            if updated:
+                claimed.append(
+                    {
+                        "id": int(row.id),
+                        "channel": row.channel,
+                        "payload": row.payload or {},
+                        "attempts": int(row.attempts or 0),
+                        "max_attempts": int(row.max_attempts or MAX_ATTEMPTS),
+                    }
+                )
+        db.commit()
+        return claimed
+    finally:
+        db.close()
+
+
+def _seconds_until_next_due() -> float:
+    core = _core()
+    Outbox = core.FormNotificationOutbox
+    db = core.SessionLocal()
+    try:
+        next_at = (
+            db.query(func.min(Outbox.next_attempt_at)).filter(Outbox.status == STATUS_PENDING).scalar()
+        )
+    finally:
+        db.close()
+    if next_at is None:
+        return POLL_SECONDS
+    return min(POLL_SECONDS, max(0.05, (next_at - datetime.utcnow()).total_seconds()))
+
+
+def _finish(item: Dict[str, Any], ok: bool, retryable: bool, status_code: Optional[int], error: str) -> str:
+    core = _core()
+    Outbox = core.FormNotificationOutbox
+    now = datetime.utcnow()
+    attempts = item["attempts"] + 1
+    values: Dict[Any, Any] = {
+        Outbox.attempts: attempts,
+        Outbox.last_status_code: status_code,
+        Outbox.last_error: error[:2000],
+    }
+    if ok:
+        status = STATUS_SENT
+        values[Outbox.sent_at] = now
+    elif retryable and attempts < item["max_attempts"]:
+        status = STATUS_PENDING
+        values[Outbox.next_attempt_at] = now + timedelta(seconds=backoff_seconds(attempts))
+    else:
+        status = STATUS_DEAD
+    values[Outbox.status] = status
+    values[Outbox.claimed_by] = ""
+    db = core.SessionLocal()
+    try:
+        # Si el reclamo venció y otro despachador retomó la fila, el resultado es suyo.
+        db.query(Outbox).filter(
+            Outbox.id == item["id"], Outbox.status == STATUS_SENDING, Outbox.claimed_by == WORKER_ID
+        ).update(values, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+    return status
+
+
+async def _deliver_webhook(client: httpx.AsyncClient, payload: Dict[str, Any]) -> Tuple[bool, bool, Optional[int], str]:
+    method = str(payload.get("method") or "POST").upper()
+    body = payload.get("body")
+    kwargs: Dict[str, Any] = {
+        "headers": payload.get("headers") or {},
+        "timeout": float(payload.get("timeout") or 10.0),
+    }
+    if method == "GET":
+        kwargs["params"] = body if isinstance(body, dict) else {}
+    else:
+        kwargs["json"] = body
+    try:
+        response = await client.request(method, str(payload.get("url") or ""), **kwargs)
+    except httpx.HTTPError as exc:
+        return False, True, None, f"{type(exc).__name__}: {exc}"
+    code = response.status_code
+    if 200 <= code < 300:
+        return True, False, code, ""
+    return False, code >= 500 or code in _RETRYABLE_STATUS, code, f"HTTP {code}"
+
+
+async def _deliver_email(payload: Dict[str, Any]) -> Tuple[bool, bool, Optional[int], str]:
+    try:
+        await asyncio.to_thread(_core().deliver_form_email, payload)
+    except Exception as exc:
+        return False, True, None, f"{type(exc).__name__}: {exc}"
+    return True, False, None, ""
+
+
+def _target_key(item: Dict[str, Any]) -> str:
+    if item["channel"] == CHANNEL_WEBHOOK:
+        return httpx.URL(str(item["payload"].get("url") or "")).host or "webhook"
+    return CHANNEL_EMAIL
+
+
+async def dispatch_due(client: httpx.AsyncClient, limit: int = CLAIM_BATCH) -> int:
+    """Entrega concurrentemente las filas vencidas; devuelve cuántas se procesaron."""
+    items = await asyncio.to_thread(_claim_due, limit)
+    if not items:
+        return 0
+    global_limit = asyncio.Semaphore(max(1, CONCURRENCY))
+    per_target: Dict[str, asyncio.Semaphore] = {}
+
+    async def _run(item: Dict[str, Any]) -> None:
+        target_limit = per_target.setdefault(_target_key(item), asyncio.Semaphore(max(1, PER_TARGET_CONCURRENCY)))
+        async with global_limit, target_limit:
+            try:
+                if item["channel"] == CHANNEL_WEBHOOK:
+                    result = await _deliver_webhook(client, item["payload"])
+                elif item["channel"] == CHANNEL_EMAIL:
+                    result = await _deliver_email(item["payload"])
+                else:
+                    result = (False, False, None, f"Canal desconocido: {item['channel']}")
+            except Exception as exc:
+                result = (False, True, None, f"{type(exc).__name__}: {exc}")
+        await asyncio.to_thread(_finish, item, *result)
+
+    await asyncio.gather(*(_run(item) for item in items))
+    return len(items)
+
+
+def wake_dispatcher() -> None:
+    """Avisa al despachador que hay filas nuevas; se puede llamar desde cualquier hilo."""
+    loop, event = _WAKE["loop"], _WAKE["event"]
+    if loop is not None and event is not None and not loop.is_closed():
+        loop.call_soon_threadsafe(event.set)
+
+
+async def dispatch_loop() -> None:
+    """Tarea de fondo: despacha la outbox con un cliente HTTP compartido."""
+    _WAKE["loop"] = asyncio.get_running_loop()
+    _WAKE["event"] = asyncio.Event()
+    limits = httpx.Limits(max_connections=max(1, CONCURRENCY), max_keepalive_connections=max(1, CONCURRENCY))
+    next_recovery = 0.0
+    try:
+        async with httpx.AsyncClient(limits=limits) as client:
+            while True:
+                if time.monotonic() >= next_recovery:
+                    try:
+                        await asyncio.to_thread(recover_in_flight)
+                    except Exception as exc:
+                        print(f"[form-outbox] Error al recuperar entregas vencidas: {exc}")
+                    next_recovery = time.monotonic() + max(POLL_SECONDS, LEASE_SECONDS / 2)
+                processed = 0
+                try:
+                    processed = await dispatch_due(client)
+                except Exception as exc:
+                    print(f"[form-outbox] Error al despachar: {exc}")
+                if processed:
+                    continue
+                try:
+                    timeout = await asyncio.to_thread(_seconds_until_next_due)
+                except Exception:
+                    timeout = POLL_SECONDS
+                event = _WAKE["event"]
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+                event.clear()
+    finally:
+        _WAKE["loop"] = None
+        _WAKE["event"] = None
+        try:
+            release_claims()
+        except Exception as exc:
+            print(f"[form-outbox] Error al liberar entregas reclamadas: {exc}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = list(sys.argv[1:] if argv is None else argv)
+    command = (args[0] if args else "").strip().lower()
+    if command == "despachar":
+
+        async def _once() -> int:
+            async with httpx.AsyncClient() as client:
+                return await dispatch_due(client)
+
+        print(f"Entregas procesadas: {asyncio.run(_once())}")
+        return 0
+    if command == "fallidos":
+        core = _core()
+        Outbox = core.FormNotificationOutbox
+        db = core.SessionLocal()
+        try:
+            rows = db.query(Outbox).filter(Outbox.status == STATUS_DEAD).order_by(Outbox.id.desc()).limit(100).all()
+            print(json.dumps([entry_payload(row) for row in rows], ensure_ascii=False, indent=2))
+        finally:
+            db.close()
+        return 0
+    print("Uso: python -m fastapi_modulo.modulos.plantillas.form_outbox despachar | fallidos")
+    return 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -13,6 +13,15 @@ from openpyxl import Workbook
 from pydantic import ValidationError
 from sqlalchemy import func
 
+from fastapi_modulo.modulos.plantillas.form_outbox import (
+    STATUSES as OUTBOX_STATUSES,
+    STATUS_DEAD as OUTBOX_STATUS_DEAD,
+    enqueue_submission_notifications,
+    entry_payload as outbox_entry_payload,
+    retry_entry as retry_outbox_entry,
+    wake_dispatcher,
+)
+
 router = APIRouter()
 
 _CORE_BOUND = False
@@ -48,8 +57,7 @@ def _bind_core_symbols() -> None:
         '_build_submission_export_columns',
         '_normalize_submission_value',
         '_normalize_form_submission_payload',
-        'send_form_submission_email_notification',
-        'send_form_submission_webhooks',
+        'FormNotificationOutbox',
         '_get_login_identity_context',
     ]
     for name in names:
@@ -634,6 +642,7 @@ def delete_form_definition(
     _bind_core_symbols()
     require_admin_or_superadmin(request)
     form = _get_form_by_id_for_request(db, form_id, request)
+    db.query(FormNotificationOutbox).filter(FormNotificationOutbox.form_id == form.id).delete(synchronize_session=False)
     db.delete(form)
     db.commit()
     return {"success": True, "message": "Formulario eliminado"}
@@ -711,6 +720,48 @@ def export_form_submissions(
     raise HTTPException(status_code=400, detail="Formato no soportado. Usa csv o excel")
 
 
+@router.get("/api/admin/form-outbox")
+def list_form_outbox(
+    request: Request,
+    estado: str = OUTBOX_STATUS_DEAD,
+    form_id: Optional[int] = None,
+    limit: int = 100,
+    db=Depends(get_db_proxy),
+):
+    _bind_core_symbols()
+    require_admin_or_superadmin(request)
+    if estado not in OUTBOX_STATUSES:
+        raise HTTPException(status_code=400, detail="Estado inválido")
+    query = _forms_scope_query_by_tenant(
+        db.query(FormNotificationOutbox).join(FormDefinition, FormDefinition.id == FormNotificationOutbox.form_id),
+        request,
+    ).filter(FormNotificationOutbox.status == estado)
+    if form_id:
+        query = query.filter(FormNotificationOutbox.form_id == form_id)
+    rows = query.order_by(FormNotificationOutbox.id.desc()).limit(max(1, min(int(limit), 500))).all()
+    return {"success": True, "data": [outbox_entry_payload(row) for row in rows]}
+
+
+@router.post("/api/admin/form-outbox/{entry_id}/retry")
+def retry_form_outbox_entry(
+    entry_id: int,
+    request: Request,
+    db=Depends(get_db_proxy),
+):
+    _bind_core_symbols()
+    require_admin_or_superadmin(request)
+    entry = _forms_scope_query_by_tenant(
+        db.query(FormNotificationOutbox).join(FormDefinition, FormDefinition.id == FormNotificationOutbox.form_id),
+        request,
+    ).filter(FormNotificationOutbox.id == entry_id).first()
+    if not entry:
+        raise HTTPException(status_code=404, detail="Entrega no encontrada")
+    retry_outbox_entry(entry)
+    db.commit()
+    wake_dispatcher()
+    return {"success": True, "data": outbox_entry_payload(entry)}
+
+
 @router.get("/api/forms/{slug}")
 def get_public_form_definition(
     slug: str,
@@ -759,19 +810,16 @@ def submit_public_form(
         user_agent=request.headers.get("user-agent"),
     )
     db.add(submission)
+    db.flush()
+    notification_status = enqueue_submission_notifications(db, form, submission)
     db.commit()
-    db.refresh(submission)
-    email_status = send_form_submission_email_notification(form, submission)
-    webhook_status = send_form_submission_webhooks(form, submission)
+    wake_dispatcher()
 
     return {
         "success": True,
         "message": "Formulario enviado correctamente",
         "submission_id": submission.id,
-        "notification": {
-            "email": email_status,
-            "webhooks": webhook_status,
-        },
+        "notification": notification_status,
     }
 
 
@@ -848,18 +896,15 @@ async def submit_public_form_v2(
         user_agent=request.headers.get("user-agent"),
     )
     db.add(submission)
+    db.flush()
+    notification_status = enqueue_submission_notifications(db, form, submission)
     db.commit()
-    db.refresh(submission)
-    email_status = send_form_submission_email_notification(form, submission)
-    webhook_status = send_form_submission_webhooks(form, submission)
+    wake_dispatcher()
     return {
         "success": True,
         "message": "Formulario enviado correctamente",
         "submission_id": submission.id,
-        "notification": {
-            "email": email_status,
-            "webhooks": webhook_status,
-        },
+        "notification": notification_status,
     }
 
 
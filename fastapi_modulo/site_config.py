@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Caché de configuración del sitio (colores, identidad de login, logo y plantillas).
+
+Los shells de página consultan esta configuración en cada render; aquí se
+conserva en memoria y sólo se recarga cuando:
+
+- un endpoint de guardado llama a ``invalidate`` (invalidación explícita), o
+- cambia el ``mtime`` de alguno de los archivos/directorios vigilados por la
+  entrada (respaldo ante ediciones externas). La revisión de ``mtime`` se hace
+  como máximo cada ``SITE_CONFIG_CHECK_SECONDS`` segundos, así la mayoría de
+  los renders no tocan ni la base de datos ni el sistema de archivos.
+
+Las entradas sin archivos vigilados (p. ej. colores en BD) pueden declarar
+``max_age`` para recargarse periódicamente aunque nadie las invalide.
+"""
+from __future__ import annotations
+
+import copy
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+CHECK_SECONDS = float((os.environ.get("SITE_CONFIG_CHECK_SECONDS") or "5").strip() or "5")
+DB_MAX_AGE_SECONDS = float((os.environ.get("SITE_CONFIG_DB_MAX_AGE") or "300").strip() or "300")
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+class _Entry:
+    __slots__ = ("value", "paths", "stamps", "loaded_at", "checked_at")
+
+    def __init__(self, value: Any, paths: Tuple[str, ...], stamps: Tuple[float, ...], now: float):
+        self.value = value
+        self.paths = paths
+        self.stamps = stamps
+        self.loaded_at = now
+        self.checked_at = now
+
+
+class SiteConfigCache:
+    """Valores de configuración cargados bajo demanda e invalidables por clave."""
+
+    def __init__(self, check_seconds: float = CHECK_SECONDS):
+        self.check_seconds = max(0.0, float(check_seconds))
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.RLock()
+
+    def _is_fresh(self, entry: _Entry, now: float, max_age: Optional[float]) -> bool:
+        if max_age is not None and now - entry.loaded_at >= max_age:
+            return False
+        if not entry.paths or now - entry.checked_at < self.check_seconds:
+            return True
+        entry.checked_at = now
+        return tuple(_mtime(path) for path in entry.paths) == entry.stamps
+
+    def get(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        watch: Iterable[str] = (),
+        max_age: Optional[float] = None,
+    ) -> Any:
+        """Copia del valor de ``key``; lo recarga con ``loader`` si está vencido."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not self._is_fresh(entry, now, max_age):
+                paths = tuple(watch)
+                # Se toma el mtime antes de cargar: una escritura concurrente fuerza otra recarga.
+                stamps = tuple(_mtime(path) for path in paths)
+                entry = _Entry(loader(), paths, stamps, now)
+                self._entries[key] = entry
+            return copy.deepcopy(entry.value)
+
+    def invalidate(self, *keys: str) -> None:
+        """Descarta ``keys`` (o toda la caché si no se indican)."""
+        with self._lock:
+            if not keys:
+                self._entries.clear()
+                return
+            for key in keys:
+                self._entries.pop(key, None)
+
+
+site_config_cache = SiteConfigCache()
@@ -0,0 +1,353 @@
+# -*- coding: utf-8 -*-
+"""
+Búfer de escritura diferida para ``/api/public/track-visit``.
+
+Las visitas se acumulan en memoria y un hilo las escribe por lotes cada
+``VISIT_BUFFER_BATCH_SIZE`` registros o ``VISIT_BUFFER_FLUSH_MS`` milisegundos,
+lo que ocurra primero: un solo INSERT de varias filas (``executemany``), la
+actualización de ``landing_analytics`` y un commit por lote, en lugar de un
+commit por visita.
+
+Nada se pierde si la base no está disponible:
+
+- un lote que falla vuelve al frente de la cola y se reintenta hasta
+  ``VISIT_BUFFER_MAX_ATTEMPTS`` veces; después se guarda como spill;
+- si la cola supera ``VISIT_BUFFER_MAX_PENDING`` o la escritura final del
+  apagado falla, las visitas pendientes se guardan como archivos JSONL
+  (*spill*) en ``VISIT_BUFFER_SPILL_DIR``, que se vuelven a cargar al arrancar.
+  Al recuperarlos, cada archivo se reclama con un rename atómico a
+  ``*.claimed-<pid>`` (un solo worker lo procesa) y la copia reclamada se
+  reescribe tras cada lote confirmado con lo que falta, así un fallo a la
+  mitad no duplica visitas.
+
+``visit_buffer.stats()`` expone la profundidad de la cola y la latencia de los
+últimos vaciados.
+
+Uso desde línea de comandos::
+
+    python -m fastapi_modulo.visit_buffer recuperar
+"""
+from __future__ import annotations
+
+import glob
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Deque, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from fastapi_modulo.geoip import KIND_VISIT, enqueue_enrichment
+from fastapi_modulo.landing_analytics import record_visits
+
+BATCH_SIZE = int((os.environ.get("VISIT_BUFFER_BATCH_SIZE") or "200").strip() or "200")
+FLUSH_INTERVAL_MS = int((os.environ.get("VISIT_BUFFER_FLUSH_MS") or "1000").strip() or "1000")
+MAX_PENDING = int((os.environ.get("VISIT_BUFFER_MAX_PENDING") or "20000").strip() or "20000")
+MAX_FLUSH_ATTEMPTS = int((os.environ.get("VISIT_BUFFER_MAX_ATTEMPTS") or "5").strip() or "5")
+SPILL_DIR = (
+    os.environ.get("VISIT_BUFFER_SPILL_DIR")
+    or os.path.join(
+        (os.environ.get("SIPET_DATA_DIR") or os.path.expanduser("~/.sipet/data")).strip(),
+        "spill",
+        "public_visits",
+    )
+).strip()
+LATENCY_SAMPLES = 200
+
+VISIT_FIELDS = ("page", "ip_address", "user_agent", "referrer", "country", "region", "city", "created_at")
+
+
+def _core():
+    from fastapi_modulo import main as core
+
+    return core
+
+
+def needs_geo_enrichment(record: Dict[str, Any]) -> bool:
+    return not (record.get("country") and (record.get("region") or record.get("city")))
+
+
+def write_visits(records: List[Dict[str, Any]]) -> List[int]:
+    """Inserta ``records`` en un solo lote, actualiza los rollups y hace commit; devuelve los ids."""
+    if not records:
+        return []
+    core = _core()
+    table = core.PublicLandingVisit.__table__
+    rows = [{field: record.get(field) for field in VISIT_FIELDS} for record in records]
+    db = core.SessionLocal()
+    try:
+        result = db.execute(insert(table).returning(table.c.id, sort_by_parameter_order=True), rows)
+        ids = [int(row[0]) for row in result]
+        record_visits(db, [SimpleNamespace(**row) for row in rows])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    for visit_id, row in zip(ids, rows):
+        if needs_geo_enrichment(row):
+            enqueue_enrichment(KIND_VISIT, visit_id, row.get("ip_address") or "")
+    return ids
+
+
+def _encode(record: Dict[str, Any]) -> Dict[str, Any]:
+    created_at = record.get("created_at")
+    return {**record, "created_at": created_at.isoformat() if isinstance(created_at, datetime) else created_at}
+
+
+def _decode(payload: Dict[str, Any]) -> Dict[str, Any]:
+    record = {field: payload.get(field) for field in VISIT_FIELDS}
+    try:
+        record["created_at"] = datetime.fromisoformat(str(payload.get("created_at") or ""))
+    except ValueError:
+        record["created_at"] = datetime.utcnow()
+    return record
+
+
+def _write_jsonl(path: str, records: List[Dict[str, Any]]) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        for record in records:
+            fh.write(json.dumps(_encode(record), ensure_ascii=False) + "\n")
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp_path, path)
+
+
+def write_spill_file(records: List[Dict[str, Any]], spill_dir: str = SPILL_DIR) -> str:
+    """Guarda ``records`` como JSONL (escritura atómica); devuelve la ruta."""
+    os.makedirs(spill_dir, exist_ok=True)
+    stamp = datetime.utcnow().strftime("%Y%m%d%H%M%S%f")
+    path = os.path.join(spill_dir, f"visitas_{stamp}_{secrets.token_hex(3)}.jsonl")
+    _write_jsonl(path, records)
+    return path
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def _claim_spill_files(spill_dir: str) -> List[str]:
+    """Reclama los archivos spill renombrándolos a ``*.claimed-<pid>``.
+
+    ``os.rename`` es atómico: si otro proceso ya lo reclamó, el rename falla y
+    el archivo se omite. También se retoman los reclamados por procesos que ya
+    no existen (caída a mitad de la recuperación).
+    """
+    suffix = f".claimed-{os.getpid()}"
+    claimed: List[str] = []
+    for path in sorted(glob.glob(os.path.join(spill_dir, "visitas_*.jsonl"))):
+        try:
+            os.rename(path, path + suffix)
+        except OSError:
+            continue
+        claimed.append(path + suffix)
+    for path in sorted(glob.glob(os.path.join(spill_dir, "visitas_*.jsonl.claimed-*"))):
+        base, _, owner = path.rpartition(".claimed-")
+        if not owner.isdigit() or int(owner) == os.getpid() or _pid_alive(int(owner)):
+            continue
+        try:
+            os.rename(path, base + suffix)
+        except OSError:
+            continue
+        claimed.append(base + suffix)
+    return claimed
+
+
+def replay_spill_files(spill_dir: str = SPILL_DIR, batch_size: int = BATCH_SIZE) -> int:
+    """Escribe en la base las visitas de los archivos spill y los elimina.
+
+    Cada archivo se reclama antes de leerlo, así varios workers arrancando a la
+    vez no lo recuperan dos veces. Tras cada lote confirmado la copia reclamada
+    se reescribe con lo pendiente; si un lote falla, se libera el reclamo y el
+    siguiente intento empieza justo después del último commit.
+    """
+    size = max(1, batch_size)
+    total = 0
+    for claimed in _claim_spill_files(spill_dir):
+        with open(claimed, "r", encoding="utf-8") as fh:
+            records = [_decode(json.loads(line)) for line in fh if line.strip()]
+        try:
+            while records:
+                write_visits(records[:size])
+                total += len(records[:size])
+                records = records[size:]
+                if records:
+                    _write_jsonl(claimed, records)
+        except Exception:
+            os.replace(claimed, claimed.rpartition(".claimed-")[0])
+            raise
+        os.remove(claimed)
+    return total
+
+
+class VisitBuffer:
+    """Cola en memoria con un hilo que la vacía por tamaño o por tiempo."""
+
+    def __init__(
+        self,
+        batch_size: int = BATCH_SIZE,
+        flush_interval_ms: int = FLUSH_INTERVAL_MS,
+        max_pending: int = MAX_PENDING,
+        spill_dir: str = SPILL_DIR,
+    ):
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(1, int(flush_interval_ms)) / 1000.0
+        self.max_pending = max(self.batch_size, int(max_pending))
+        self.spill_dir = spill_dir
+        self._pending: Deque[Dict[str, Any]] = deque()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self._counters = {
+            "flushed_total": 0,
+            "flush_count": 0,
+            "failed_flushes": 0,
+            "spilled_total": 0,
+        }
+        self._last_flush_at: Optional[str] = None
+        self._last_error = ""
+
+    def start(self) -> None:
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="visit-buffer", daemon=True)
+            self._thread.start()
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """Encola una visita; no toca la base en la petición."""
+        overflow: List[Dict[str, Any]] = []
+        with self._cond:
+            self._pending.append(record)
+            if len(self._pending) > self.max_pending:
+                overflow = [self._pending.popleft() for _ in range(self.batch_size)]
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+        if overflow:
+            self._spill(overflow)
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+
+    def _take(self) -> List[Dict[str, Any]]:
+        count = min(len(self._pending), self.batch_size)
+        return [self._pending.popleft() for _ in range(count)]
+
+    def _spill(self, records: List[Dict[str, Any]]) -> bool:
+        try:
+            write_spill_file(records, self.spill_dir)
+        except OSError as exc:
+            print(f"[visit-buffer] No se pudo guardar spill de {len(records)} visitas: {exc}")
+            return False
+        self._counters["spilled_total"] += len(records)
+        return True
+
+    def flush_batch(self, batch: List[Dict[str, Any]]) -> bool:
+        started = time.perf_counter()
+        try:
+            write_visits(batch)
+        except Exception as exc:
+            self._counters["failed_flushes"] += 1
+            self._last_error = str(exc)
+            print(f"[visit-buffer] Error al escribir {len(batch)} visitas: {exc}")
+            return False
+        self._latencies.append((time.perf_counter() - started) * 1000.0)
+        self._counters["flushed_total"] += len(batch)
+        self._counters["flush_count"] += 1
+        self._last_flush_at = datetime.utcnow().isoformat()
+        return True
+
+    def _run(self) -> None:
+        attempts = 0
+        while True:
+            with self._cond:
+                if not self._stopping and len(self._pending) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                if self._stopping:
+                    return
+                batch = self._take()
+            if not batch:
+                continue
+            if self.flush_batch(batch):
+                attempts = 0
+                continue
+            attempts += 1
+            # Tras MAX_FLUSH_ATTEMPTS el lote sale de la cola a disco para no bloquear a los siguientes.
+            if attempts >= MAX_FLUSH_ATTEMPTS and self._spill(batch):
+                attempts = 0
+                continue
+            with self._cond:
+                self._pending.extendleft(reversed(batch))
+                self._cond.wait(self.flush_interval)
+
+    def stop(self, timeout: float = 5.0) -> int:
+        """Detiene el hilo y vacía la cola; lo que no se pueda escribir va a spill."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        with self._cond:
+            remaining = list(self._pending)
+            self._pending.clear()
+        written = 0
+        for start in range(0, len(remaining), self.batch_size):
+            batch = remaining[start:start + self.batch_size]
+            if self.flush_batch(batch):
+                written += len(batch)
+            else:
+                self._spill(remaining[start:])
+                break
+        return written
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            depth = len(self._pending)
+            latencies = sorted(self._latencies)
+        spill_files = len(glob.glob(os.path.join(self.spill_dir, "visitas_*.jsonl")))
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0
+        return {
+            "queue_depth": depth,
+            "batch_size": self.batch_size,
+            "flush_interval_ms": int(self.flush_interval * 1000),
+            **self._counters,
+            "spill_files": spill_files,
+            "last_flush_at": self._last_flush_at,
+            "last_flush_ms": round(self._latencies[-1], 2) if self._latencies else 0.0,
+            "avg_flush_ms": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            "p95_flush_ms": round(p95, 2),
+            "max_flush_ms": round(latencies[-1], 2) if latencies else 0.0,
+            "last_error": self._last_error,
+        }
+
+
+visit_buffer = VisitBuffer()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = list(sys.argv[1:] if argv is None else argv)
+    if (args[0] if args else "").strip().lower() != "recuperar":
+        print("Uso: python -m fastapi_modulo.visit_buffer recuperar")
+        return 2
+    print(f"Visitas recuperadas: {replay_spill_files()}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
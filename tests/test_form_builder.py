@@ -1,7 +1,10 @@
+import asyncio
 import secrets
 import sys
+from datetime import datetime, timedelta
 from pathlib import Path
 
+import httpx
 from fastapi.testclient import TestClient
 
 ROOT = Path(__file__).resolve().parents[1]
@@ -9,18 +12,21 @@ if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
 import fastapi_modulo.main as main_module
+from fastapi_modulo.modulos.plantillas import form_outbox
 from fastapi_modulo.main import AUTH_COOKIE_NAME, _build_session_cookie, app
 
 
-client = TestClient(app)
+# El middleware CSRF exige Origin en las mutaciones autenticadas.
+client = TestClient(app, headers={"origin": "http://testserver"})
 
 
-def _auth_cookies(role: str = "superadministrador", username: str = "test_superadmin"):
-    token = _build_session_cookie(username, role)
+def _auth_cookies(role: str = "superadministrador", username: str = "test_superadmin", tenant_id: str = "default"):
+    token = _build_session_cookie(username, role, tenant_id)
     return {
         AUTH_COOKIE_NAME: token,
         "user_role": role,
         "user_name": username,
+        "tenant_id": tenant_id,
     }
 
 
@@ -203,18 +209,12 @@ def test_export_submissions_csv():
     assert "Juan" in content
 
 
-def test_webhook_triggered_on_submit(monkeypatch):
+def test_webhook_triggered_on_submit():
     captured = []
 
-    class FakeResponse:
-        def __init__(self, status_code=200):
-            self.status_code = status_code
-
-    def fake_request(method, url, **kwargs):
-        captured.append({"method": method, "url": url, "kwargs": kwargs})
-        return FakeResponse(200)
-
-    monkeypatch.setattr(main_module.httpx, "request", fake_request)
+    def fake_handler(request):
+        captured.append({"method": request.method, "url": str(request.url)})
+        return httpx.Response(200)
 
     slug = f"webhook-{secrets.token_hex(4)}"
     create_payload = {
@@ -253,9 +253,24 @@ def test_webhook_triggered_on_submit(monkeypatch):
     assert submit_response.status_code == 200, submit_response.text
     response_json = submit_response.json()
     assert response_json.get("success") is True
-    assert response_json.get("notification", {}).get("webhooks", {}).get("attempted") == 1
-    assert len(captured) == 1
-    assert captured[0]["url"] == "https://example.test/hook"
+    assert response_json.get("notification", {}).get("webhooks", {}).get("queued") == 1
+
+    async def dispatch():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(fake_handler)) as http_client:
+            return await form_outbox.dispatch_due(http_client)
+
+    assert asyncio.run(dispatch()) >= 1
+    assert {"method": "POST", "url": "https://example.test/hook"} in captured
+    db = main_module.SessionLocal()
+    try:
+        entry = (
+            db.query(main_module.FormNotificationOutbox)
+            .filter(main_module.FormNotificationOutbox.submission_id == response_json["submission_id"])
+            .one()
+        )
+        assert entry.status == form_outbox.STATUS_SENT
+    finally:
+        db.close()
 
 
 def test_multi_checkbox_and_likert_submit():
@@ -439,3 +454,87 @@ def test_layout_fields_do_not_break_submission():
     )
     assert submit_response.status_code == 200, submit_response.text
     assert submit_response.json().get("success") is True
+
+
+def test_outbox_retries_with_backoff_and_dead_letters(monkeypatch):
+    monkeypatch.setattr(form_outbox, "MAX_ATTEMPTS", 2)
+    calls = {}
+
+    def fake_handler(request):
+        host = request.url.host
+        calls[host] = calls.get(host, 0) + 1
+        if host == "ok.example.test":
+            return httpx.Response(200)
+        if host == "flaky.example.test" and calls[host] > 1:
+            return httpx.Response(200)
+        return httpx.Response(503)
+
+    Outbox = main_module.FormNotificationOutbox
+    db = main_module.SessionLocal()
+    try:
+        form = main_module.FormDefinition(
+            name="Outbox Form",
+            slug=f"outbox-{secrets.token_hex(4)}",
+            config={
+                "notifications": {
+                    "webhooks": [
+                        "https://ok.example.test/hook",
+                        "https://flaky.example.test/hook",
+                        "https://down.example.test/hook",
+                    ]
+                }
+            },
+        )
+        db.add(form)
+        db.flush()
+        submission = main_module.FormSubmission(form_id=form.id, data={"nombre": "Ana"})
+        db.add(submission)
+        db.flush()
+        queued = form_outbox.enqueue_submission_notifications(db, form, submission)
+        db.commit()
+        submission_id = submission.id
+    finally:
+        db.close()
+    assert queued["webhooks"]["queued"] == 3
+
+    async def dispatch():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(fake_handler)) as http_client:
+            return await form_outbox.dispatch_due(http_client, limit=500)
+
+    def entries_by_host():
+        db = main_module.SessionLocal()
+        try:
+            rows = db.query(Outbox).filter(Outbox.submission_id == submission_id).all()
+            return {httpx.URL(row.payload["url"]).host: row for row in rows}
+        finally:
+            db.close()
+
+    before = datetime.utcnow()
+    asyncio.run(dispatch())
+    entries = entries_by_host()
+    assert entries["ok.example.test"].status == form_outbox.STATUS_SENT
+    for host in ("flaky.example.test", "down.example.test"):
+        entry = entries[host]
+        assert entry.status == form_outbox.STATUS_PENDING
+        assert entry.attempts == 1
+        assert entry.last_status_code == 503
+        assert entry.next_attempt_at >= before + timedelta(seconds=form_outbox.BACKOFF_BASE_SECONDS * 0.9)
+
+    # Adelanta el backoff para que el siguiente despacho tome los reintentos.
+    db = main_module.SessionLocal()
+    try:
+        db.query(Outbox).filter(
+            Outbox.submission_id == submission_id,
+            Outbox.status == form_outbox.STATUS_PENDING,
+        ).update({Outbox.next_attempt_at: datetime.utcnow() - timedelta(seconds=1)}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+    asyncio.run(dispatch())
+    entries = entries_by_host()
+    assert entries["flaky.example.test"].status == form_outbox.STATUS_SENT
+    assert entries["flaky.example.test"].attempts == 2
+    assert entries["down.example.test"].status == form_outbox.STATUS_DEAD
+    assert entries["down.example.test"].attempts == 2
+    assert calls["ok.example.test"] == 1
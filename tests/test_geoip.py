@@ -0,0 +1,96 @@
+import gzip
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from fastapi_modulo.geoip import HTTPProviderBackend, LocalRangeBackend, build_backend
+
+
+def _backend(path, content):
+    path.write_text(content, encoding="utf-8")
+    backend = LocalRangeBackend(str(path))
+    return backend, backend.load()
+
+
+def test_header_file_with_networks_and_ranges(tmp_path):
+    backend, loaded = _backend(
+        tmp_path / "rangos.csv",
+        "# comentario antes del encabezado\n"
+        "network,start_ip,end_ip,country_code,region,city\n"
+        "8.8.8.0/24,,,us,California,Mountain View\n"
+        ",200.1.0.0,200.1.255.255,mx,Jalisco,Guadalajara\n"
+        "2001:db8::/32,,,de,Berlin,Berlin\n"
+        "10.0.0.0/8,,,,,\n"
+        "no-es-ip,,,xx,,\n",
+    )
+    assert loaded == 3
+    assert backend.lookup("8.8.8.8") == {"country": "US", "region": "California", "city": "Mountain View"}
+    assert backend.lookup("200.1.128.7") == {"country": "MX", "region": "Jalisco", "city": "Guadalajara"}
+    assert backend.lookup("2001:db8::1")["country"] == "DE"
+    assert backend.lookup("8.8.9.1") is None
+    assert backend.lookup("10.1.2.3") is None
+    assert backend.lookup("no-es-ip") is None
+
+
+def test_headerless_cidr_and_integer_bounds(tmp_path):
+    backend, loaded = _backend(
+        tmp_path / "rangos.csv",
+        "1.0.0.0/24,AU,Queensland,Brisbane\n"
+        "16777472,16778239,cn,Fujian,Fuzhou\n"
+        "3.0.0.0,3.0.0.255,Estados Unidos,Virginia,\n",
+    )
+    assert loaded == 3
+    assert backend.lookup("1.0.0.200")["city"] == "Brisbane"
+    # 16777472..16778239 = 1.0.1.0..1.0.3.255
+    assert backend.lookup("1.0.2.9") == {"country": "CN", "region": "Fujian", "city": "Fuzhou"}
+    assert backend.lookup("1.0.4.0") is None
+    # Los nombres de país largos se conservan tal cual.
+    assert backend.lookup("3.0.0.1")["country"] == "Estados Unidos"
+
+
+def test_nested_and_overlapping_ranges_prefer_most_specific(tmp_path):
+    backend, loaded = _backend(
+        tmp_path / "rangos.csv",
+        "10.0.0.0/8,MX,,\n"
+        "10.1.0.0/16,MX,Jalisco,\n"
+        "10.1.2.0/24,MX,Jalisco,Guadalajara\n"
+        "10.200.0.0,10.255.255.255,US,Texas,\n"
+        "11.0.0.0,11.0.0.255,AR,,\n"
+        "11.0.0.128,11.0.1.127,CL,,\n",
+    )
+    assert loaded == 6
+    assert backend.lookup("10.1.2.3")["city"] == "Guadalajara"
+    # Después de un rango anidado se vuelve al que lo contiene.
+    assert backend.lookup("10.1.3.1") == {"country": "MX", "region": "Jalisco", "city": ""}
+    assert backend.lookup("10.2.0.1") == {"country": "MX", "region": "", "city": ""}
+    assert backend.lookup("10.250.0.1")["country"] == "US"
+    # Traslape parcial del mismo tamaño: gana el que empieza después.
+    assert backend.lookup("11.0.0.100")["country"] == "AR"
+    assert backend.lookup("11.0.0.200")["country"] == "CL"
+    assert backend.lookup("11.0.1.100")["country"] == "CL"
+    assert backend.lookup("11.0.1.200") is None
+
+
+def test_gzip_file_is_supported(tmp_path):
+    path = tmp_path / "rangos.csv.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as fh:
+        fh.write("1.2.3.0/24,BR,Sao Paulo,Campinas\n")
+    backend = LocalRangeBackend(str(path))
+    assert backend.load() == 1
+    assert backend.lookup("1.2.3.4")["country"] == "BR"
+
+
+def test_missing_file_warns_and_chain_falls_back_to_http(tmp_path, capsys):
+    backend = LocalRangeBackend(str(tmp_path / "no-existe.csv"))
+    assert backend.load() == 0
+    assert backend.loaded is True
+    assert "no-existe.csv" in capsys.readouterr().out
+    assert backend.lookup("8.8.8.8") is None
+
+    chain = build_backend("local,http")
+    assert [type(item) for item in chain.backends] == [LocalRangeBackend, HTTPProviderBackend]
+    # Sin permiso de red, el backend http no se consulta.
+    assert HTTPProviderBackend().lookup("8.8.8.8", allow_network=False) is None
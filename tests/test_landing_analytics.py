@@ -0,0 +1,52 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from fastapi_modulo.landing_analytics import (
+    UNKNOWN_LOCATION,
+    empty_sketch,
+    location_label,
+    sketch_add,
+    sketch_estimate,
+    sketch_merge,
+)
+
+
+def _sketch_of(values):
+    registers = empty_sketch()
+    for value in values:
+        sketch_add(registers, value)
+    return registers
+
+
+def test_small_cardinalities_are_exact():
+    assert sketch_estimate(None) == 0
+    assert sketch_estimate(bytes(empty_sketch())) == 0
+    registers = _sketch_of(f"10.0.0.{index}" for index in range(37))
+    assert sketch_estimate(registers) == 37
+    # Repetir valores no cambia el sketch.
+    assert not sketch_add(registers, "10.0.0.1")
+    assert sketch_estimate(registers) == 37
+
+
+def test_large_cardinality_within_error_bound():
+    registers = _sketch_of(f"192.168.{index // 256}.{index % 256}-{index}" for index in range(20000))
+    assert abs(sketch_estimate(registers) - 20000) <= 20000 * 0.05
+
+
+def test_merge_counts_union_of_sketches():
+    left = _sketch_of(f"ip-{index}" for index in range(0, 3000))
+    right = _sketch_of(f"ip-{index}" for index in range(2000, 5000))
+    sketch_merge(left, bytes(right))
+    assert abs(sketch_estimate(left) - 5000) <= 5000 * 0.05
+
+
+def test_location_label_prefers_most_specific_parts():
+    assert location_label("MX", "Jalisco", "Guadalajara") == "Guadalajara, Jalisco"
+    assert location_label("MX", "", "Guadalajara") == "Guadalajara, MX"
+    assert location_label("MX", "Jalisco", "") == "Jalisco, MX"
+    assert location_label("MX", None, None) == "MX"
+    assert location_label(None, None, None) == UNKNOWN_LOCATION
@@ -0,0 +1,71 @@
+import sys
+from datetime import date
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from fastapi_modulo.modulos.planificacion.poa_calendar import occurrence_dates, recurrence_step
+
+
+def test_monthly_occurrences_clamp_to_month_end():
+    step = recurrence_step(True, "mensual", None)
+    dates = occurrence_dates(date(2026, 1, 31), date(2026, 6, 30), step, date(2026, 1, 1), date(2026, 12, 31))
+    assert dates == [
+        (date(2026, 1, 31), False),
+        (date(2026, 2, 28), False),
+        (date(2026, 3, 31), False),
+        (date(2026, 4, 30), False),
+        (date(2026, 5, 31), False),
+        (date(2026, 6, 30), True),
+    ]
+
+
+def test_quincenal_steps_fifteen_days_and_ends_on_final_date():
+    step = recurrence_step(True, "quincenal", None)
+    assert step == ("days", 15)
+    dates = occurrence_dates(date(2026, 3, 1), date(2026, 4, 15), step, date(2026, 1, 1), date(2026, 12, 31))
+    assert dates == [
+        (date(2026, 3, 1), False),
+        (date(2026, 3, 16), False),
+        (date(2026, 3, 31), False),
+        (date(2026, 4, 15), True),
+    ]
+
+
+def test_cada_xx_dias_uses_custom_interval():
+    assert recurrence_step(True, "cada_xx_dias", 0) is None
+    step = recurrence_step(True, "cada_xx_dias", 10)
+    assert step == ("days", 10)
+    dates = occurrence_dates(date(2026, 5, 1), date(2026, 5, 25), step, date(2026, 5, 1), date(2026, 5, 31))
+    assert dates == [
+        (date(2026, 5, 1), False),
+        (date(2026, 5, 11), False),
+        (date(2026, 5, 21), False),
+        (date(2026, 5, 25), True),
+    ]
+
+
+def test_jumps_directly_to_range_start():
+    daily = occurrence_dates(
+        date(2020, 1, 1), date(2030, 1, 1), recurrence_step(True, "diaria", None), date(2026, 5, 10), date(2026, 5, 12)
+    )
+    assert daily == [(date(2026, 5, 10), False), (date(2026, 5, 11), False), (date(2026, 5, 12), False)]
+    weekly = occurrence_dates(
+        date(2026, 1, 1), date(2026, 12, 31), recurrence_step(True, "semanal", None), date(2026, 3, 2), date(2026, 3, 15)
+    )
+    assert weekly == [(date(2026, 3, 5), False), (date(2026, 3, 12), False)]
+    monthly = occurrence_dates(
+        date(2020, 1, 15), date(2030, 1, 15), recurrence_step(True, "mensual", None), date(2026, 3, 1), date(2026, 4, 30)
+    )
+    assert monthly == [(date(2026, 3, 15), False), (date(2026, 4, 15), False)]
+
+
+def test_non_recurring_only_yields_final_date_inside_range():
+    assert recurrence_step(False, "mensual", None) is None
+    assert occurrence_dates(date(2026, 1, 1), date(2026, 2, 1), None, date(2026, 1, 1), date(2026, 3, 1)) == [
+        (date(2026, 2, 1), True)
+    ]
+    assert occurrence_dates(date(2026, 1, 1), date(2026, 2, 1), None, date(2026, 3, 1), date(2026, 4, 1)) == []
+    assert occurrence_dates(date(2026, 1, 1), None, ("days", 1), date(2026, 1, 1), date(2026, 4, 1)) == []
@@ -0,0 +1,83 @@
+import sys
+from datetime import date
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from fastapi_modulo.modulos.planificacion.poa_critical_path import _objective_schedule, _topological_order
+
+TODAY = date(2026, 6, 10)
+
+
+def _activity(activity_id, start, end, terminada=False):
+    return {"id": activity_id, "fecha_inicial": start, "fecha_final": end, "terminada": terminada}
+
+
+def _chain_activities():
+    return [
+        _activity(1, date(2026, 6, 1), date(2026, 6, 5)),
+        _activity(2, date(2026, 6, 6), date(2026, 6, 15)),
+        _activity(3, date(2026, 6, 16), date(2026, 6, 25)),
+        _activity(4, date(2026, 6, 1), date(2026, 6, 30)),
+        _activity(5, date(2026, 6, 1), date(2026, 6, 3), terminada=True),
+    ]
+
+
+def test_forward_pass_projects_overdue_work_and_applies_lag():
+    schedule = _objective_schedule(_chain_activities(), [(1, 2, 0), (2, 3, 2)], date(2026, 7, 15), TODAY)
+    items = schedule["actividades"]
+    # La actividad 1 está vencida y sin terminar: se proyecta a terminar hoy.
+    assert items[1]["fin_temprano"] == TODAY
+    assert items[2]["inicio_temprano"] == date(2026, 6, 11)
+    assert items[2]["fin_temprano"] == date(2026, 6, 20)
+    assert items[3]["inicio_temprano"] == date(2026, 6, 23)
+    assert items[3]["fin_temprano"] == date(2026, 7, 2)
+    assert items[5]["fin_temprano"] == date(2026, 6, 3)
+    assert schedule["fin_proyectado"] == date(2026, 7, 2)
+    assert schedule["ciclo"] == []
+
+
+def test_backward_pass_slack_and_critical_chain():
+    schedule = _objective_schedule(_chain_activities(), [(1, 2, 0), (2, 3, 2)], date(2026, 7, 15), TODAY)
+    items = schedule["actividades"]
+    assert items[3]["fin_tardio"] == date(2026, 7, 15)
+    assert items[3]["inicio_tardio"] == date(2026, 7, 6)
+    assert items[2]["fin_tardio"] == date(2026, 7, 3)
+    assert items[1]["fin_tardio"] == date(2026, 6, 23)
+    assert [items[node]["holgura"] for node in (1, 2, 3)] == [13, 13, 13]
+    assert items[4]["holgura"] == 15
+    assert schedule["holgura"] == 13
+    assert schedule["ruta_critica"] == [1, 2, 3]
+    assert items[1]["critica"] and not items[4]["critica"]
+
+
+def test_negative_slack_when_deadline_is_behind_projection():
+    schedule = _objective_schedule(_chain_activities(), [(1, 2, 0), (2, 3, 2)], date(2026, 6, 25), TODAY)
+    assert schedule["holgura"] == -7
+    assert schedule["ruta_critica"] == [1, 2, 3]
+
+
+def test_without_deadline_uses_projected_finish():
+    schedule = _objective_schedule(_chain_activities(), [(1, 2, 0), (2, 3, 2)], None, TODAY)
+    assert schedule["fecha_limite"] is None
+    assert schedule["holgura"] == 0
+    assert schedule["actividades"][3]["fin_tardio"] == date(2026, 7, 2)
+
+
+def test_cycles_are_reported_and_still_scheduled():
+    order, cyclic = _topological_order([1, 2, 3, 4], [(1, 2, 0), (2, 3, 0), (3, 2, 0)])
+    assert order == [1, 4, 2, 3]
+    assert cyclic == [2, 3]
+
+    activities = [
+        _activity(1, date(2026, 7, 1), date(2026, 7, 5)),
+        _activity(2, date(2026, 7, 6), date(2026, 7, 10)),
+        _activity(3, date(2026, 7, 11), date(2026, 7, 15)),
+    ]
+    schedule = _objective_schedule(activities, [(1, 2, 0), (2, 3, 0), (3, 2, 0), (3, 99, 0)], date(2026, 7, 31), TODAY)
+    assert schedule["ciclo"] == [2, 3]
+    assert set(schedule["actividades"]) == {1, 2, 3}
+    assert schedule["actividades"][2]["inicio_temprano"] == date(2026, 7, 6)
+    assert schedule["actividades"][3]["inicio_temprano"] == date(2026, 7, 11)
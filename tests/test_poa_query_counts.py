@@ -0,0 +1,131 @@
+import secrets
+import sys
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import fastapi_modulo.main as main_module
+from fastapi_modulo.main import AUTH_COOKIE_NAME, _build_session_cookie, app
+
+
+client = TestClient(app)
+
+
+def _auth_cookies(role: str = "superadministrador", username: str = "test_superadmin"):
+    token = _build_session_cookie(username, role, "default")
+    return {
+        AUTH_COOKIE_NAME: token,
+        "user_role": role,
+        "user_name": username,
+        "tenant_id": "default",
+    }
+
+
+@contextmanager
+def _count_queries():
+    statements = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(main_module.engine, "before_cursor_execute", _before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(main_module.engine, "before_cursor_execute", _before_cursor_execute)
+
+
+def _seed_activity():
+    db = main_module.SessionLocal()
+    try:
+        suffix = secrets.token_hex(4)
+        axis = main_module.StrategicAxisConfig(nombre=f"Eje {suffix}", codigo=f"qc-{suffix}", orden=900, is_active=True)
+        db.add(axis)
+        db.flush()
+        objective = main_module.StrategicObjectiveConfig(
+            eje_id=axis.id,
+            nombre=f"Objetivo {suffix}",
+            codigo=f"qc-{suffix}-01",
+            orden=1,
+            is_active=True,
+            fecha_inicial=date(2026, 1, 1),
+            fecha_final=date(2026, 12, 31),
+        )
+        db.add(objective)
+        db.flush()
+        activity = main_module.POAActivity(objective_id=objective.id, nombre=f"Actividad {suffix}", responsable="test_superadmin")
+        db.add(activity)
+        db.commit()
+        return int(axis.id), int(objective.id), int(activity.id)
+    finally:
+        db.close()
+
+
+def _add_approvals(objective_id: int, activity_id: int, total: int):
+    db = main_module.SessionLocal()
+    try:
+        for _ in range(total):
+            db.add(
+                main_module.POADeliverableApproval(
+                    activity_id=activity_id,
+                    objective_id=objective_id,
+                    process_owner="test_superadmin",
+                    requester="test_user",
+                    status="pendiente",
+                )
+            )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _cleanup(axis_id: int, objective_id: int, activity_id: int):
+    db = main_module.SessionLocal()
+    try:
+        db.query(main_module.POADeliverableApproval).filter(
+            main_module.POADeliverableApproval.activity_id == activity_id
+        ).delete(synchronize_session=False)
+        db.query(main_module.POAActivity).filter(main_module.POAActivity.id == activity_id).delete(synchronize_session=False)
+        db.query(main_module.StrategicObjectiveConfig).filter(
+            main_module.StrategicObjectiveConfig.id == objective_id
+        ).delete(synchronize_session=False)
+        db.query(main_module.StrategicAxisConfig).filter(main_module.StrategicAxisConfig.id == axis_id).delete(
+            synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _queries_for(path: str) -> int:
+    cookies = _auth_cookies()
+    warmup = client.get(path, cookies=cookies)
+    assert warmup.status_code == 200, warmup.text
+    with _count_queries() as statements:
+        response = client.get(path, cookies=cookies)
+    assert response.status_code == 200, response.text
+    return len(statements)
+
+
+def test_pending_approvals_query_count_does_not_grow():
+    axis_id, objective_id, activity_id = _seed_activity()
+    try:
+        _add_approvals(objective_id, activity_id, 1)
+        board_few = _queries_for("/api/poa/board-data")
+        summary_few = _queries_for("/api/notificaciones/resumen")
+
+        _add_approvals(objective_id, activity_id, 10)
+        board_many = _queries_for("/api/poa/board-data")
+        summary_many = _queries_for("/api/notificaciones/resumen")
+
+        assert board_many == board_few
+        assert summary_many == summary_few
+    finally:
+        _cleanup(axis_id, objective_id, activity_id)